@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Benchmark dos backups deduplicados: tempo e espaço de backups repetidos.
+
+Gera um data/ sintético (banco SQLite em WAL, binários e JSON), faz um
+backup completo, um sem mudanças e um depois de pequenas alterações, e
+compara o repositório com o custo de cópias completas.
+
+    python bench_backup.py [--mb 200]
+"""
+import argparse
+import filecmp
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from src.backup import BackupStore
+
+
+def gerar_data(data_dir: Path, mb: int):
+    random.seed(13)
+    (data_dir / "chroma_db" / "segmento").mkdir(parents=True)
+    # Binário grande (como os segmentos HNSW do Chroma)
+    with open(data_dir / "chroma_db" / "segmento" / "data_level0.bin", "wb") as f:
+        f.write(os.urandom(mb * 1024 * 1024 // 2))
+    # Banco SQLite em WAL com texto
+    conn = sqlite3.connect(data_dir / "search.db")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT)")
+    palavras = ["python", "docker", "erro", "arquivo", "projeto", "servidor", "banco", "consulta"]
+    linhas = mb * 1024 * 1024 // 2 // 200
+    conn.executemany("INSERT INTO messages (content) VALUES (?)",
+                     ((" ".join(random.choices(palavras, k=30)),) for _ in range(linhas)))
+    conn.commit()
+    conn.close()
+    (data_dir / "messages.json").write_text(json.dumps([{"i": i} for i in range(5000)]))
+
+
+def alterar(data_dir: Path):
+    """Muda pouco: linhas novas no SQLite e 4 KB reescritos no meio do binário"""
+    conn = sqlite3.connect(data_dir / "search.db")
+    conn.executemany("INSERT INTO messages (content) VALUES (?)", (("mensagem nova",),) * 100)
+    conn.commit()
+    conn.close()
+    binario = data_dir / "chroma_db" / "segmento" / "data_level0.bin"
+    with open(binario, "r+b") as f:
+        f.seek(binario.stat().st_size // 2)
+        f.write(os.urandom(4096))
+
+
+def tamanho(caminho: Path) -> int:
+    return sum(f.stat().st_size for f in caminho.rglob("*") if f.is_file())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=200)
+    args = parser.parse_args()
+
+    base = Path(tempfile.mkdtemp())
+    data_dir = base / "data"
+    gerar_data(data_dir, args.mb)
+    store = BackupStore(str(base / "backups"))
+    total_data = tamanho(data_dir)
+    print(f"data/: {total_data / 1024 / 1024:.0f} MB")
+
+    copias = 0
+    for etapa in ("completo", "sem mudanças", "após alterações"):
+        if etapa == "após alterações":
+            alterar(data_dir)
+        resumo = store.criar({"data": str(data_dir)}, rotulo="bench")
+        copias += tamanho(data_dir)
+        print(f"{etapa:<16} {resumo['segundos']:7.2f}s | {resumo['arquivos_lidos']} arquivos lidos | "
+              f"{resumo['bytes_novos'] / 1024 / 1024:8.2f} MB novos | repositório "
+              f"{store.tamanho() / 1024 / 1024:7.1f} MB (cópias completas: {copias / 1024 / 1024:.0f} MB)")
+
+    inicio = time.perf_counter()
+    verificacao = store.verificar()
+    print(f"verify: {verificacao['pedacos']} pedaços em {time.perf_counter() - inicio:.2f}s, "
+          f"{len(verificacao['problemas'])} problemas")
+
+    inicio = time.perf_counter()
+    destino = base / "restaurado"
+    store.restaurar(resumo["id"], str(destino))
+    iguais = filecmp.cmp(data_dir / "chroma_db" / "segmento" / "data_level0.bin",
+                         destino / "data" / "chroma_db" / "segmento" / "data_level0.bin", shallow=False)
+    conn = sqlite3.connect(destino / "data" / "search.db")
+    linhas = conn.execute("SELECT COUNT(*) FROM messages WHERE content = 'mensagem nova'").fetchone()[0]
+    print(f"restore: {time.perf_counter() - inicio:.2f}s, binário idêntico: {iguais}, linhas novas no SQLite: {linhas}")
+
+
+if __name__ == "__main__":
+    main()
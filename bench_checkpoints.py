@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark dos checkpoints: disco, tempo de gravação, listagem e restauração.
+
+Compara o formato antigo (um JSON indentado com o estado inteiro por
+checkpoint) com o CheckpointStore (deltas comprimidos + manifesto).
+
+    python bench_checkpoints.py [--checkpoints 500] [--mensagens-por-checkpoint 4]
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.checkpoints import CheckpointStore
+
+PALAVRAS = ["python", "docker", "erro", "arquivo", "projeto", "configuração", "função", "servidor",
+            "banco", "consulta", "memória", "telegram", "bot", "resposta", "comando", "script"]
+
+
+def estados(n: int, por_checkpoint: int):
+    """Estado de chat que cresce a cada checkpoint e às vezes edita a última mensagem"""
+    random.seed(9)
+    mensagens = []
+    for i in range(n):
+        if mensagens and random.random() < 0.1:
+            mensagens[-1] = dict(mensagens[-1], content=mensagens[-1]["content"] + " (editado)")
+        for _ in range(por_checkpoint):
+            mensagens.append({
+                "role": random.choice(("user", "assistant")),
+                "content": " ".join(random.choices(PALAVRAS, k=random.randint(10, 80))),
+                "timestamp": datetime.now().isoformat()
+            })
+        yield {"timestamp": datetime.now().isoformat(), "description": f"checkpoint {i}",
+               "model": "deepseek", "messages": list(mensagens)}
+
+
+def tamanho(diretorio: Path) -> int:
+    return sum(f.stat().st_size for f in diretorio.rglob("*") if f.is_file())
+
+
+def antigo(diretorio: Path, lista_estados):
+    """Reproduz save/list/load do formato anterior"""
+    inicio = time.perf_counter()
+    for i, estado in enumerate(lista_estados):
+        with open(diretorio / f"{i}.json", "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+    gravacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for arquivo in diretorio.glob("*.json"):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+            _ = (dados.get("timestamp"), dados.get("description"))
+    listagem = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with open(diretorio / f"{len(lista_estados) // 2}.json", "r", encoding="utf-8") as f:
+        json.load(f)
+    return gravacao, listagem, time.perf_counter() - inicio
+
+
+def novo(diretorio: Path, lista_estados):
+    store = CheckpointStore(diretorio)
+    ids = []
+    inicio = time.perf_counter()
+    for estado in lista_estados:
+        ids.append(store.salvar(estado))
+    gravacao = time.perf_counter() - inicio
+
+    # Listagem e restauração num processo "novo" (manifesto lido do disco)
+    inicio = time.perf_counter()
+    store = CheckpointStore(diretorio)
+    store.listar()
+    listagem = time.perf_counter() - inicio
+
+    # Pior caso: o checkpoint mais fundo na cadeia de deltas
+    alvo = max(ids, key=lambda i: store._entradas[i]["profundidade"])
+    inicio = time.perf_counter()
+    restaurado = store.carregar(alvo)
+    restauracao = time.perf_counter() - inicio
+    assert restaurado == lista_estados[ids.index(alvo)]
+    return gravacao, listagem, restauracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoints", type=int, default=500)
+    parser.add_argument("--mensagens-por-checkpoint", type=int, default=4)
+    args = parser.parse_args()
+
+    lista_estados = list(estados(args.checkpoints, args.mensagens_por_checkpoint))
+    print(f"{args.checkpoints} checkpoints, {len(lista_estados[-1]['messages'])} mensagens no último")
+    for nome, funcao in (("JSON completo", antigo), ("deltas + manifesto", novo)):
+        diretorio = Path(tempfile.mkdtemp())
+        gravacao, listagem, restauracao = funcao(diretorio, lista_estados)
+        print(f"{nome:<20} disco {tamanho(diretorio) / 1024 / 1024:8.1f} MB | gravação "
+              f"{gravacao / len(lista_estados) * 1000:6.2f} ms/checkpoint | listagem {listagem * 1000:8.1f} ms | "
+              f"restauração {restauracao * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark do serviço de embeddings: vazão, latência de consulta e cache.
+
+Compara os motores (função padrão do Chroma em fp32 e ONNX int8) com cache
+vazio e mede a taxa de acerto do cache numa carga de chat com repetições.
+
+    python bench_embeddings.py [--textos 2000] [--motores chroma onnx-int8]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src.embeddings import EmbeddingService, criar_motor
+
+PALAVRAS = [
+    "python", "docker", "erro", "arquivo", "projeto", "diretório", "configuração", "função",
+    "classe", "teste", "servidor", "banco", "consulta", "memória", "log", "telegram", "bot",
+    "resposta", "mensagem", "comando", "script", "instalar", "pacote", "versão", "ambiente",
+]
+# Mensagens curtas que se repetem muito numa conversa real
+FREQUENTES = ["oi", "olá", "obrigado", "ok", "bom dia", "/status", "/ajuda", "listar arquivos",
+              "criar projeto", "mostrar logs", "valeu", "continua"]
+
+
+def texto_aleatorio() -> str:
+    return " ".join(random.choices(PALAVRAS, k=random.randint(6, 40)))
+
+
+def carga_chat(n: int) -> list:
+    """~40% de mensagens frequentes (distribuição de Zipf) e o resto único"""
+    pesos = [1 / (i + 1) for i in range(len(FREQUENTES))]
+    return [random.choices(FREQUENTES, pesos)[0] if random.random() < 0.4 else texto_aleatorio()
+            for _ in range(n)]
+
+
+def p95(valores: list) -> float:
+    valores = sorted(valores)
+    return valores[int(len(valores) * 0.95) - 1]
+
+
+def medir(backend: str, n: int):
+    data_dir = Path(tempfile.mkdtemp())
+    inicio = time.perf_counter()
+    motor = criar_motor(data_dir / "modelos", backend)
+    carga = time.perf_counter() - inicio
+    servico = EmbeddingService(str(data_dir), motor=motor)
+    servico.embed(["aquecimento"])
+
+    # Vazão em lote com cache vazio
+    textos = [texto_aleatorio() for _ in range(n)]
+    inicio = time.perf_counter()
+    for i in range(0, n, 256):
+        servico.embed(textos[i:i + 256])
+    vazao = n / (time.perf_counter() - inicio)
+
+    # Latência de uma consulta isolada (sem cache e com cache)
+    frios, quentes = [], []
+    for _ in range(200):
+        consulta = texto_aleatorio()
+        inicio = time.perf_counter()
+        servico.embed([consulta])
+        frios.append((time.perf_counter() - inicio) * 1000)
+        inicio = time.perf_counter()
+        servico.embed([consulta])
+        quentes.append((time.perf_counter() - inicio) * 1000)
+
+    # Vários chamadores concorrentes (agrupados num lote pela thread do serviço)
+    consultas = [[texto_aleatorio()] for _ in range(400)]
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=lambda c=c: servico.embed(c)) for c in consultas]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    concorrente = len(consultas) / (time.perf_counter() - inicio)
+
+    # Taxa de acerto numa carga de chat, partindo de cache vazio
+    servico_chat = EmbeddingService(tempfile.mkdtemp(), motor=motor)
+    for mensagem in carga_chat(n):
+        servico_chat.embed([mensagem])
+    taxa = servico_chat.estatisticas()["taxa_acerto"]
+
+    print(f"{motor.nome:<24} carga {carga:5.1f}s | {vazao:7.0f} emb/s em lote | "
+          f"{concorrente:6.0f} emb/s com 400 chamadores | consulta p50 {statistics.median(frios):6.2f} ms "
+          f"p95 {p95(frios):6.2f} ms | com cache p95 {p95(quentes):5.3f} ms | acerto no chat {taxa:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--textos", type=int, default=2000)
+    parser.add_argument("--motores", nargs="+", default=["chroma", "onnx-int8"])
+    args = parser.parse_args()
+
+    random.seed(3)
+    for backend in args.motores:
+        medir(backend, args.textos)
+
+
+if __name__ == "__main__":
+    main()
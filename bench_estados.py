@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Benchmark dos estados de projeto por chat: memória, custo de atualizar, gravações em lote e crash.
+
+Popula o banco com N chats, carrega todos (como se cada um mandasse uma
+mensagem depois de reiniciar) e mede a memória por chat ocioso e o tempo
+da primeira leitura. Depois faz uma rajada de atualizações e conta quantas
+linhas foram de fato gravadas. Por fim mata com SIGKILL um processo
+que estava atualizando e confere o que sobreviveu no banco.
+
+    python bench_estados.py [--chats 50000] [--atualizacoes 100000] [--intervalo 0.25]
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.agents.estados.estado_projeto import EstadosProjeto
+from src.metrics import ESTADOS_GRAVADOS
+
+FILHO = """
+import sys, time
+from src.agents.estados.estado_projeto import EstadosProjeto
+estados = EstadosProjeto(data_dir=sys.argv[1], intervalo=float(sys.argv[2]))
+estados.iniciar()
+i = 0
+while True:
+    i += 1
+    estados.obter(1).atualizar(ultimo_comando=f"/cd {i}")
+    if i % 100 == 0:
+        print(i, flush=True)
+    time.sleep(0.001)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50_000)
+    parser.add_argument("--atualizacoes", type=int, default=100_000)
+    parser.add_argument("--intervalo", type=float, default=0.25)
+    args = parser.parse_args()
+    data_dir = tempfile.mkdtemp()
+
+    estados = EstadosProjeto(data_dir=data_dir, intervalo=args.intervalo)
+    for chat in range(1, args.chats + 1):
+        estados.obter(chat).atualizar(projeto_atual=f"projeto{chat % 20}", diretorio_atual=f"/root/projetos/projeto{chat % 20}",
+                                      ultimo_comando=f"/cd src{chat}")
+    inicio = time.perf_counter()
+    gravados = estados.gravar()
+    print(f"{gravados} chats gravados numa transação em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    # Reinício: cada chat é lido na primeira mensagem
+    estados = EstadosProjeto(data_dir=data_dir, intervalo=args.intervalo)
+    tracemalloc.start()
+    tempos = []
+    for chat in range(1, args.chats + 1):
+        inicio = time.perf_counter()
+        estados.obter(chat)
+        tempos.append((time.perf_counter() - inicio) * 1e6)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tempos.sort()
+    print(f"primeira leitura: p50 {statistics.median(tempos):.0f} µs, p99 {tempos[int(len(tempos) * 0.99)]:.0f} µs")
+    print(f"memória: {memoria / 1024 / 1024:.1f} MB para {len(estados)} chats ({memoria / len(estados):.0f} bytes por chat)")
+    assert estados.obter(7).get_projeto_atual() == "projeto7"
+
+    # Rajada de atualizações em poucos chats ativos
+    estados.iniciar()
+    gravados_antes = sum(ESTADOS_GRAVADOS.valores().values())
+    inicio = time.perf_counter()
+    for i in range(args.atualizacoes):
+        estados.obter(i % 100 + 1).atualizar(ultimo_comando=f"/ls {i}")
+    duracao = time.perf_counter() - inicio
+    time.sleep(args.intervalo * 2)
+    estados.parar()
+    gravados = sum(ESTADOS_GRAVADOS.valores().values()) - gravados_antes
+    print(f"{args.atualizacoes} atualizações em 100 chats: {duracao / args.atualizacoes * 1e6:.1f} µs cada, "
+          f"{gravados:.0f} linhas gravadas em {duracao:.2f}s (uma por chat a cada {args.intervalo}s, no máximo)")
+
+    # Crash no meio das atualizações
+    filho = subprocess.Popen([sys.executable, "-c", FILHO, data_dir, str(args.intervalo)],
+                             stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    ultimo = 0
+    while ultimo < 1000:
+        ultimo = int(filho.stdout.readline())
+    filho.send_signal(signal.SIGKILL)
+    filho.wait()
+    estados = EstadosProjeto(data_dir=data_dir)
+    sobreviveu = int(estados.obter(1).ultimo_comando.split()[1])
+    integridade = estados.conn.execute("PRAGMA integrity_check").fetchone()[0]
+    print(f"SIGKILL após a atualização {ultimo}: banco {integridade}, estado recuperado da atualização {sobreviveu}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark do executor de comandos: concorrência, latência do loop e edições por comando.
+
+Dispara N comandos ao mesmo tempo (cada um imprime linhas por alguns
+segundos, em stdout e stderr), acompanha todos como a interface do
+Telegram faria e mede o atraso máximo do event loop com um relógio de
+10 ms rodando em paralelo. Também mede o cancelamento e o limite de tempo.
+
+    python bench_exec.py [--comandos 200] [--linhas 50] [--concorrentes 16] [--intervalo 1.5]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+
+from src.executor import Executor, formatar
+
+
+async def relogio(atrasos, parar: asyncio.Event):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        atrasos.append((time.perf_counter() - inicio - 0.01) * 1000)
+
+
+async def acompanhar(execucao, intervalo: float):
+    """Conta as 'edições' que a interface faria"""
+    edicoes = 0
+    async for atual in execucao.acompanhar(intervalo):
+        formatar(atual)
+        edicoes += 1
+    return edicoes
+
+
+async def principal(args):
+    executor = Executor(max_concorrentes=args.concorrentes, limite_segundos=60)
+    script = ("import sys, time\n"
+              f"for i in range({args.linhas}):\n"
+              "    print('linha', i, 'x' * 60, flush=True)\n"
+              "    if i % 10 == 0: print('aviso', i, file=sys.stderr, flush=True)\n"
+              "    time.sleep(0.02)\n")
+    cwd = tempfile.mkdtemp()
+
+    atrasos = []
+    parar = asyncio.Event()
+    tarefa_relogio = asyncio.create_task(relogio(atrasos, parar))
+    inicio = time.perf_counter()
+    execucoes = [executor.iniciar([sys.executable, "-c", script], cwd, chat_id=i) for i in range(args.comandos)]
+    edicoes = await asyncio.gather(*(acompanhar(e, args.intervalo) for e in execucoes))
+    total = time.perf_counter() - inicio
+    parar.set()
+    await tarefa_relogio
+
+    ok = sum(e.estado == "concluido" for e in execucoes)
+    print(f"{args.comandos} comandos concorrentes ({args.linhas} linhas cada): {ok} ok em {total:.2f}s "
+          f"(um sozinho leva ~{args.linhas * 0.02:.1f}s)")
+    print(f"edições por comando: média {statistics.mean(edicoes):.1f}, máx {max(edicoes)} "
+          f"(intervalo mínimo {args.intervalo}s)")
+    print(f"atraso do event loop: p50 {statistics.median(atrasos):.2f} ms, "
+          f"p99 {sorted(atrasos)[int(len(atrasos) * 0.99)]:.2f} ms, máx {max(atrasos):.2f} ms")
+
+    # Cancelamento: sleep com filho em background no mesmo grupo de processos
+    execucao = executor.iniciar(["sh", "-c", "sleep 30 & sleep 30"], cwd)
+    await asyncio.sleep(0.2)
+    inicio = time.perf_counter()
+    executor.cancelar(execucao.id)
+    await execucao.aguardar()
+    print(f"cancelamento: {execucao.estado} em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    execucao = executor.iniciar(["sleep", "30"], cwd, limite_segundos=0.5)
+    await execucao.aguardar()
+    print(f"limite de tempo: {execucao.estado} após {execucao.segundos:.2f}s")
+
+    execucao = executor.iniciar([sys.executable, "-c", "print('y' * 10_000_000)"], cwd)
+    await execucao.aguardar()
+    print(f"limite de saída: {execucao.total / 1024 / 1024:.1f} MB produzidos, "
+          f"{len(execucao.saida()) / 1024:.0f} KB guardados, mensagem de {len(formatar(execucao))} caracteres")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comandos", type=int, default=200)
+    parser.add_argument("--linhas", type=int, default=50)
+    parser.add_argument("--concorrentes", type=int, default=16, help="Limite do semáforo do executor")
+    parser.add_argument("--intervalo", type=float, default=1.5)
+    asyncio.run(principal(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
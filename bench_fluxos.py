@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark do roteamento de comandos e dos assistentes de vários passos.
+
+Mede o tempo de achar a rota na árvore de prefixos com os comandos do bot
+e com milhares de comandos sintéticos (deve ficar igual), o custo de
+cada passo do /projeto com muitos chats no meio do assistente e a memória
+dessas instâncias.
+
+    python bench_fluxos.py [--comandos 10000] [--chats 20000]
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+import tracemalloc
+
+from src.agents.comando_agent import ComandoAgent
+from src.agents.fluxos import TrieComandos
+
+
+def medir(funcao, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--comandos", type=int, default=10_000)
+    parser.add_argument("--chats", type=int, default=20_000)
+    args = parser.parse_args()
+
+    agente = ComandoAgent(None)
+    random.seed(3)
+    sinteticos = {"/" + "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 12))): None
+                  for _ in range(args.comandos)}
+    grande = TrieComandos({**sinteticos, "/branch": agente._branch})
+    for nome, trie in (("comandos do bot", agente.rotas), (f"{len(sinteticos)} comandos", grande)):
+        print(f"rota /branch com {nome}: {medir(lambda: trie.rota('/branch'), 200_000):.0f} ns, "
+              f"inexistente: {medir(lambda: trie.rota('/brnch'), 200_000):.0f} ns")
+
+    async def passos():
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        for chat in range(args.chats):
+            await agente.analisar_comando("/projeto", chat)
+            await agente.analisar_comando(f"app{chat}", chat)
+        duracao = time.perf_counter() - inicio
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{args.chats} chats no meio do /projeto: {duracao / (2 * args.chats) * 1e6:.1f} µs por passo, "
+              f"{memoria / args.chats:.0f} bytes por assistente")
+        inicio = time.perf_counter()
+        for chat in range(args.chats):
+            resultado = await agente.analisar_comando("/root/projetos", chat)
+        assert resultado["tipo_comando"] == "projeto" and not len(agente.fluxos)
+        print(f"conclusão: {(time.perf_counter() - inicio) / args.chats * 1e6:.1f} µs por chat")
+
+    asyncio.run(passos())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark da busca na base de conhecimento: relevância e latência.
+
+Usa o conjunto data/benchmarks/knowledge_qa.json e compara busca vetorial,
+lexical (BM25), híbrida (RRF) e híbrida com re-rank.
+
+    python bench_knowledge.py [--ruido 5000] [--reranker cross-encoder/ms-marco-MiniLM-L-6-v2]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.knowledge import KnowledgeBase
+
+QA_PATH = Path(__file__).parent / "data" / "benchmarks" / "knowledge_qa.json"
+
+PALAVRAS_RUIDO = [
+    "servidor", "configuração", "arquivo", "usuário", "projeto", "rede", "memória", "processo",
+    "pacote", "versão", "atualização", "permissão", "diretório", "serviço", "cliente", "token",
+]
+
+
+def carregar_base(kb: KnowledgeBase, dados: dict, ruido: int):
+    documentos = [(d["id"], d["texto"], d["metadata"]) for d in dados["documentos"]]
+    random.seed(11)
+    for i in range(ruido):
+        texto = " ".join(random.choices(PALAVRAS_RUIDO, k=random.randint(12, 40)))
+        documentos.append((f"ruido{i}", texto, {"categoria": "ruido", "tecnologia": "nenhuma"}))
+
+    for inicio in range(0, len(documentos), 1000):
+        lote = documentos[inicio:inicio + 1000]
+        kb.collection.add(
+            ids=[d[0] for d in lote],
+            documents=[d[1] for d in lote],
+            metadatas=[d[2] for d in lote]
+        )
+        kb.lexical.upsert_many(lote)
+
+
+def avaliar(nome: str, buscar, perguntas: list):
+    recall, mrr, tempos = {}, {}, []
+    for pergunta in perguntas:
+        inicio = time.perf_counter()
+        ids = [r["id"] for r in buscar(pergunta["pergunta"], pergunta.get("where"))]
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+        relevantes = set(pergunta["relevantes"])
+        tipo = pergunta["tipo"]
+        recall.setdefault(tipo, []).append(len(relevantes & set(ids[:5])) / len(relevantes))
+        posicao = next((i for i, doc_id in enumerate(ids[:10], start=1) if doc_id in relevantes), None)
+        mrr.setdefault(tipo, []).append(1 / posicao if posicao else 0.0)
+
+    todos_recall = [v for valores in recall.values() for v in valores]
+    todos_mrr = [v for valores in mrr.values() for v in valores]
+    tempos.sort()
+    por_tipo = " | ".join(
+        f"{tipo} R@5 {statistics.mean(recall[tipo]):.2f}" for tipo in sorted(recall)
+    )
+    print(f"{nome:<16} R@5 {statistics.mean(todos_recall):.2f}  MRR@10 {statistics.mean(todos_mrr):.2f}  "
+          f"p50 {statistics.median(tempos):6.1f} ms  p99 {tempos[int(len(tempos) * 0.99) - 1]:6.1f} ms  "
+          f"({por_tipo})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ruido", type=int, default=0, help="Documentos extras para medir latência com mais volume")
+    parser.add_argument("--reranker", help="Modelo de cross-encoder para o re-rank")
+    parser.add_argument("--orcamento-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    dados = json.loads(QA_PATH.read_text(encoding="utf-8"))
+    perguntas = dados["perguntas"]
+
+    kb = KnowledgeBase(tempfile.mkdtemp(), reranker_model=args.reranker, orcamento_ms=args.orcamento_ms)
+    carregar_base(kb, dados, args.ruido)
+    print(f"{len(dados['documentos']) + args.ruido} documentos, {len(perguntas)} perguntas")
+
+    # Aquecimento (modelo de embedding, cache do SQLite, cross-encoder)
+    kb.search_knowledge("aquecimento")
+    if kb.reranker is not None:
+        while kb.reranker.encoder is None:
+            time.sleep(0.1)
+        kb.search_knowledge("aquecimento", orcamento_ms=10_000)
+
+    avaliar("vetorial", lambda q, w: kb._busca_vetorial(q, 10, w), perguntas)
+    avaliar("lexical (BM25)", lambda q, w: kb._busca_lexical(q, 10, w), perguntas)
+    avaliar("híbrida (RRF)", lambda q, w: kb.search_knowledge(q, 10, where=w, rerank=False), perguntas)
+    if kb.reranker is not None:
+        avaliar("híbrida + rerank", lambda q, w: kb.search_knowledge(q, 10, where=w), perguntas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark do monitor de logs: linhas/s e CPU ociosa (inotify x polling)"""
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from src.log_viewer import LogFollower, colorize_log_line, formatar_lote, get_current_log_file
+
+NIVEIS = ["INFO"] * 8 + ["WARNING", "ERROR"]
+
+def gerar_linhas(n: int):
+    return [
+        f"2024-01-01 12:00:00,000 - src.agents - {random.choice(NIVEIS)} - mensagem de teste {i} " + "x" * 60
+        for i in range(n)
+    ]
+
+def bench_saida(linhas):
+    """Saída antiga (um print por linha) x nova (filtro + uma escrita por lote)"""
+    with open(os.devnull, "w") as devnull:
+        inicio = time.perf_counter()
+        for line in linhas:
+            print(colorize_log_line(line.strip()), file=devnull)
+        antigo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in range(0, len(linhas), 500):
+            devnull.write(formatar_lote(linhas[i:i + 500]))
+        novo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        filtro = re.compile(r"teste 1\d")
+        for i in range(0, len(linhas), 500):
+            devnull.write(formatar_lote(linhas[i:i + 500], "WARNING", filtro))
+        filtrado = time.perf_counter() - inicio
+
+    print(f"Saída ({len(linhas)} linhas): print por linha {len(linhas) / antigo:,.0f} linhas/s | "
+          f"lote {len(linhas) / novo:,.0f} linhas/s | "
+          f"lote com nível+regex {len(linhas) / filtrado:,.0f} linhas/s")
+
+def bench_vazao(usar_inotify: bool, linhas, lote_escrita: int = 500):
+    log_dir = tempfile.mkdtemp()
+    caminho = get_current_log_file(log_dir)
+    open(caminho, "w").close()
+
+    follower = LogFollower(log_dir, usar_inotify=usar_inotify)
+    recebidas = 0
+    pronto = threading.Event()
+
+    def consumir():
+        nonlocal recebidas
+        for lote in follower.lotes():
+            formatar_lote(lote)
+            recebidas += len(lote)
+            if recebidas >= len(linhas):
+                break
+        pronto.set()
+
+    thread = threading.Thread(target=consumir, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    inicio = time.perf_counter()
+    with open(caminho, "a") as f:
+        for i in range(0, len(linhas), lote_escrita):
+            f.write("\n".join(linhas[i:i + lote_escrita]) + "\n")
+            f.flush()
+    pronto.wait(60)
+    duracao = time.perf_counter() - inicio
+
+    modo = "inotify" if usar_inotify else "polling"
+    print(f"Vazão ({modo}): {recebidas / duracao:,.0f} linhas/s ({recebidas} linhas em {duracao:.2f}s)")
+
+def bench_cpu_ociosa(usar_inotify: bool, segundos: float = 3.0):
+    log_dir = tempfile.mkdtemp()
+    caminho = get_current_log_file(log_dir)
+    open(caminho, "w").close()
+    follower = LogFollower(log_dir, usar_inotify=usar_inotify)
+    cpu = {}
+
+    def consumir():
+        inicio = time.thread_time()
+        # Sem escrita o gerador fica esperando; a linha final o libera
+        for _ in follower.lotes():
+            break
+        cpu["total"] = time.thread_time() - inicio
+
+    thread = threading.Thread(target=consumir, daemon=True)
+    thread.start()
+    time.sleep(segundos)
+    with open(caminho, "a") as f:
+        f.write("fim\n")
+    thread.join(10)
+
+    modo = "inotify" if usar_inotify else "polling 100ms"
+    print(f"CPU ociosa ({modo}): {cpu.get('total', 0) * 1000:.2f} ms de CPU em {segundos:.0f}s "
+          f"({cpu.get('total', 0) / segundos * 100:.3f}%)")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    linhas = gerar_linhas(n)
+
+    bench_saida(linhas)
+    for usar_inotify in (True, False):
+        bench_vazao(usar_inotify, linhas)
+    for usar_inotify in (True, False):
+        bench_cpu_ociosa(usar_inotify)
+
+if __name__ == "__main__":
+    main()
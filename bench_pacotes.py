@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark do cache de pacotes: tempo até o projeto ficar pronto (lockfile + node_modules).
+
+Sobe um registry npm local de mentira (packuments + tarballs sintéticos,
+com latência artificial por requisição) e mede CachePacotes com cache
+frio, com cache quente e em modo offline. Com --npm, mede também
+`npm install` contra o mesmo registry, com o cache do npm frio e quente.
+
+    python bench_pacotes.py [--pacotes 150] [--latencia-ms 20] [--npm]
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from src.pacotes import CachePacotes
+
+VERSOES = ["1.0.0", "1.1.0", "1.2.3", "2.0.0"]
+
+
+def tarball(nome: str, versao: str, dependencias: dict, arquivos: int) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        conteudos = {"package/package.json": json.dumps({"name": nome, "version": versao,
+                                                         "dependencies": dependencias}).encode()}
+        for i in range(arquivos):
+            conteudos[f"package/lib/arquivo{i}.js"] = (f"module.exports = '{nome}@{versao} {i}';\n" * 200).encode()
+        for caminho, dados in conteudos.items():
+            info = tarfile.TarInfo(caminho)
+            info.size = len(dados)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(dados))
+    return buffer.getvalue()
+
+
+def gerar_registry(n: int, arquivos: int, porta: int):
+    """Grafo aleatório: cada pacote depende de até 4 pacotes de índice maior"""
+    random.seed(7)
+    packuments, tarballs = {}, {}
+    for i in reversed(range(n)):
+        nome = f"pacote-{i}"
+        versoes = {}
+        for versao in VERSOES:
+            candidatos = range(i + 1, n)
+            escolhidos = random.sample(candidatos, min(len(candidatos), random.randint(0, 4)))
+            dependencias = {f"pacote-{j}": random.choice(["^1.0.0", "^2.0.0", "~1.1.0"]) for j in escolhidos}
+            dados = tarball(nome, versao, dependencias, arquivos)
+            url = f"http://127.0.0.1:{porta}/tarballs/{nome}-{versao}.tgz"
+            tarballs[f"/tarballs/{nome}-{versao}.tgz"] = dados
+            versoes[versao] = {
+                "name": nome, "version": versao, "dependencies": dependencias,
+                "dist": {"tarball": url, "shasum": hashlib.sha1(dados).hexdigest(),
+                         "integrity": "sha512-" + base64.b64encode(hashlib.sha512(dados).digest()).decode()}
+            }
+        packuments[f"/{nome}"] = json.dumps({"name": nome, "dist-tags": {"latest": "1.2.3"},
+                                             "versions": versoes}).encode()
+    return packuments, tarballs
+
+
+def subir_registry(n: int, arquivos: int, latencia: float):
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    packuments, tarballs = gerar_registry(n, arquivos, servidor.server_address[1])
+    contador = {"requisicoes": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            contador["requisicoes"] += 1
+            time.sleep(latencia)
+            dados = packuments.get(self.path) or tarballs.get(self.path)
+            if dados is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json" if self.path in packuments else "application/octet-stream")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    servidor.RequestHandlerClass = Handler
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, contador
+
+
+def novo_projeto(raiz: Path, nome: str, dependencias: dict) -> Path:
+    projeto = raiz / nome
+    projeto.mkdir()
+    (projeto / "package.json").write_text(json.dumps({"name": nome, "version": "1.0.0", "dependencies": dependencias}))
+    return projeto
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pacotes", type=int, default=150)
+    parser.add_argument("--arquivos", type=int, default=10, help="Arquivos por tarball")
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--npm", action="store_true")
+    args = parser.parse_args()
+
+    servidor, contador = subir_registry(args.pacotes, args.arquivos, args.latencia_ms / 1000)
+    registry = f"http://127.0.0.1:{servidor.server_address[1]}"
+    dependencias = {f"pacote-{i}": "^1.0.0" for i in range(10)}
+    raiz = Path(tempfile.mkdtemp())
+
+    def medir(rotulo, cache, projeto):
+        antes = contador["requisicoes"]
+        inicio = time.perf_counter()
+        resultado = cache.preparar_projeto(str(projeto), instalar=True)
+        segundos = time.perf_counter() - inicio
+        print(f"{rotulo:<22} {segundos * 1000:8.0f} ms | {resultado['pacotes']:4d} pacotes | "
+              f"{contador['requisicoes'] - antes:4d} requisições | {resultado['instalacao']['formas']}")
+
+    diretorio = raiz / "cache"
+    medir("cache frio", CachePacotes(str(diretorio), registry), novo_projeto(raiz, "frio", dependencias))
+    medir("cache quente", CachePacotes(str(diretorio), registry), novo_projeto(raiz, "quente", dependencias))
+    medir("offline", CachePacotes(str(diretorio), registry, offline=True), novo_projeto(raiz, "offline", dependencias))
+
+    if args.npm and shutil.which("npm"):
+        cache_npm = raiz / "npm-cache"
+        for rotulo in ("npm install (frio)", "npm install (quente)"):
+            projeto = novo_projeto(raiz, rotulo.split("(")[1][:-1] + "-npm", dependencias)
+            antes = contador["requisicoes"]
+            inicio = time.perf_counter()
+            subprocess.run(["npm", "install", "--registry", registry, "--cache", str(cache_npm), "--no-audit",
+                            "--no-fund", "--prefer-offline", "--loglevel", "error"], cwd=projeto, check=True)
+            print(f"{rotulo:<22} {(time.perf_counter() - inicio) * 1000:8.0f} ms | {contador['requisicoes'] - antes:4d} requisições")
+
+    servidor.shutdown()
+    shutil.rmtree(raiz)
+
+
+if __name__ == "__main__":
+    main()
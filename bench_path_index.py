@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark do índice de caminhos do workspace: memória, montagem e latência de busca.
+
+Monta uma árvore sintética com a forma de projetos reais (muitos nomes
+repetidos: src, components, index.ts) direto no PathIndex e compara a
+memória com um set de caminhos completos. Com --disco, cria parte da
+árvore de verdade e mede a varredura e a atualização via inotify.
+
+    python bench_path_index.py [--caminhos 500000] [--disco 20000]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from src.path_index import PathIndex
+
+PASTAS = ["src", "components", "pages", "services", "hooks", "utils", "types", "styles", "tests",
+          "api", "models", "views", "assets", "lib", "config", "docs", "scripts", "public"]
+EXTENSOES = [".ts", ".tsx", ".js", ".py", ".md", ".json", ".css"]
+BASES = ["index", "main", "app", "button", "header", "footer", "user", "auth", "login", "form",
+         "modal", "table", "list", "card", "layout", "router", "store", "client", "server", "helpers"]
+
+
+def caminhos_sinteticos(n: int):
+    random.seed(5)
+    caminhos = []
+    projetos = max(1, n // 5000)
+    while len(caminhos) < n:
+        projeto = f"projeto-{random.randrange(projetos)}"
+        pastas = random.choices(PASTAS, k=random.randint(1, 4))
+        nome = random.choice(BASES) + random.choice(["", "", str(random.randrange(200))]) + random.choice(EXTENSOES)
+        caminhos.append("/".join([projeto, *pastas, nome]))
+    return caminhos
+
+
+def medir_ms(funcao, repeticoes: int = 20):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), max(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--caminhos", type=int, default=500000)
+    parser.add_argument("--disco", type=int, default=0, help="Arquivos reais para medir varredura e inotify")
+    args = parser.parse_args()
+
+    caminhos = caminhos_sinteticos(args.caminhos)
+
+    tracemalloc.start()
+    # Cópias novas: as strings contam na memória do set, como contariam num índice de strings
+    conjunto = {(caminho + "/")[:-1] for caminho in caminhos}
+    memoria_set = tracemalloc.get_traced_memory()[0]
+    del conjunto
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    indice = PathIndex(tempfile.mkdtemp())
+    for caminho in caminhos:
+        indice.adicionar(caminho)
+    indice._pronto.set()
+    montagem = time.perf_counter() - inicio
+    memoria_indice = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{len(caminhos)} caminhos: {indice.estatisticas()}")
+    print(f"memória: set de strings {memoria_set / 1024 / 1024:6.1f} MB | PathIndex {memoria_indice / 1024 / 1024:6.1f} MB "
+          f"| montagem {montagem:.1f}s")
+
+    print("completar 'projeto-1/src/co'     p50 %.2f ms, pior %.2f ms" % medir_ms(lambda: indice.completar("projeto-1/src/co")))
+    indice._cache_busca = None
+    print("buscar 'usrfrm' (frio)          p50 %.1f ms, pior %.1f ms" % medir_ms(
+        lambda: (setattr(indice, "_cache_busca", None), indice.buscar("usrfrm")), 5))
+    consulta = "components/header"
+    tempos = []
+    for i in range(1, len(consulta) + 1):
+        inicio = time.perf_counter()
+        indice.buscar(consulta[:i])
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"buscar digitando '{consulta}' letra a letra: p50 {statistics.median(tempos):.1f} ms, pior {max(tempos):.1f} ms")
+    print(f"  -> {indice.buscar(consulta, limite=3)}")
+
+    if args.disco:
+        raiz = tempfile.mkdtemp()
+        for caminho in caminhos[:args.disco]:
+            destino = os.path.join(raiz, caminho)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            open(destino, "a").close()
+        indice = PathIndex(raiz)
+        inicio = time.perf_counter()
+        indice.iniciar()
+        indice.aguardar()
+        print(f"varredura de {args.disco} arquivos em disco: {time.perf_counter() - inicio:.2f}s | {indice.estatisticas()}")
+        inicio = time.perf_counter()
+        os.makedirs(os.path.join(raiz, "novo/pasta"))
+        while not indice.existe("novo/pasta"):
+            time.sleep(0.001)
+        print(f"mkdir visível no índice após {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        indice.parar()
+        shutil.rmtree(raiz)
+
+
+if __name__ == "__main__":
+    main()
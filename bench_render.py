@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark do box do terminal: implementação antiga (quadrática) x src.render"""
+import io
+import random
+import re
+import sys
+import time
+import unicodedata
+
+from src.config import COLORS
+from src import render
+
+
+# Cópia da implementação anterior de Assistant.create_box, como referência
+def _antigo_strip_ansi(text):
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    return ansi_escape.sub('', text)
+
+def _antigo_width(text):
+    width = 0
+    text = _antigo_strip_ansi(text)
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if ord(char) >= 0x1F000:
+            width += 2
+            i += 2 if i + 1 < len(text) and 0xD800 <= ord(text[i]) <= 0xDBFF else 1
+        elif unicodedata.east_asian_width(char) in ['F', 'W']:
+            width += 2
+            i += 1
+        else:
+            width += 1
+            i += 1
+    return width
+
+def antigo_create_box(text, color=COLORS.GREEN, width=50):
+    formatted_lines = []
+    for line in text.split("\n"):
+        current_line = line
+        while _antigo_width(current_line) > width - 4:
+            visible_text = _antigo_strip_ansi(current_line)
+            test_width = 0
+            split_point = 0
+            last_space = None
+            for i, char in enumerate(visible_text):
+                if char == " ":
+                    last_space = i
+                char_width = 2 if ord(char) >= 0x1F000 or unicodedata.east_asian_width(char) in ['F', 'W'] else 1
+                test_width += char_width
+                if test_width > width - 4:
+                    split_point = last_space if last_space is not None else i
+                    break
+            formatted_lines.append(current_line[:split_point])
+            current_line = current_line[split_point:].lstrip()
+        if current_line:
+            formatted_lines.append(current_line)
+
+    box_top = f"{color}╔{'═' * (width-2)}╗{COLORS.RESET}"
+    box_bottom = f"{color}╚{'═' * (width-2)}╝{COLORS.RESET}"
+    box_content = []
+    for line in formatted_lines:
+        padding = width - 4 - _antigo_width(line)
+        box_content.append(f"{color}║{COLORS.RESET} {line}{' ' * padding} {color}║{COLORS.RESET}")
+    return "\n".join([box_top] + box_content + [box_bottom])
+
+
+PALAVRAS = ["def", "return", "self", "valor", "resultado", "ação", "função", "日本語", "🚀", "✅", "x" * 12]
+
+def gerar_listagem(tamanho: int) -> str:
+    """Código com linhas curtas, como uma listagem típica"""
+    linhas, total = [], 0
+    while total < tamanho:
+        linha = "    " * random.randint(0, 3) + " ".join(random.choices(PALAVRAS, k=random.randint(3, 14)))
+        linhas.append(linha)
+        total += len(linha.encode("utf-8")) + 1
+    return "\n".join(linhas)
+
+def gerar_paragrafo(tamanho: int) -> str:
+    """Um parágrafo único sem quebras de linha, o pior caso do algoritmo antigo"""
+    partes, total = [], 0
+    while total < tamanho:
+        palavra = random.choice(PALAVRAS)
+        if random.random() < 0.1:
+            palavra = f"{COLORS.YELLOW}{palavra}{COLORS.RESET}"
+        partes.append(palavra)
+        total += len(palavra.encode("utf-8")) + 1
+    return " ".join(partes)
+
+def medir(funcao, *args) -> float:
+    inicio = time.perf_counter()
+    funcao(*args)
+    return time.perf_counter() - inicio
+
+def main():
+    tamanho = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(42)
+
+    for nome, texto in (("listagem", gerar_listagem(tamanho)), ("parágrafo único", gerar_paragrafo(tamanho))):
+        antigo = medir(antigo_create_box, texto)
+        novo = medir(render.create_box, texto)
+        stream = io.StringIO()
+        impresso = medir(render.print_box, texto, COLORS.GREEN, 50, stream)
+        print(f"{nome} ({len(texto.encode('utf-8')) / 1024:.0f}KB): antigo {antigo * 1000:,.1f} ms | "
+              f"create_box {novo * 1000:,.1f} ms | print_box {impresso * 1000:,.1f} ms | "
+              f"{antigo / novo:,.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark da retenção de chat_memory: tamanho e latência antes e depois da compactação.
+
+Gera um ano de conversas sintéticas em vários chats e roda uma compactação
+com a política padrão (ou a informada na linha de comando).
+
+    python bench_retention.py [--mensagens 50000] [--chats 50] [--ttl-dias 180]
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from src.memory import Memory
+from src.retention import CompactadorMemoria, POLITICA_PADRAO, medir_consultas, tamanho_diretorio
+
+PALAVRAS = [
+    "python", "docker", "erro", "arquivo", "projeto", "diretório", "configuração", "função",
+    "classe", "teste", "servidor", "banco", "consulta", "memória", "log", "telegram", "bot",
+    "resposta", "mensagem", "comando", "script", "instalar", "pacote", "versão", "ambiente",
+]
+CONSULTAS = ["erro no docker", "criar projeto react", "configurar bot do telegram", "instalar pacote python"]
+
+
+def popular(memory: Memory, mensagens: int, chats: int):
+    agora = time.time()
+    random.seed(5)
+    for inicio in range(0, mensagens, 1000):
+        ids, documentos, metadados = [], [], []
+        for i in range(inicio, min(inicio + 1000, mensagens)):
+            ts = agora - random.random() * 365 * 86400
+            chat_id = str(random.randint(1, chats))
+            role = "user" if i % 2 == 0 else "assistant"
+            conteudo = " ".join(random.choices(PALAVRAS, k=random.randint(5, 30)))
+            ids.append(f"{chat_id}_{ts}")
+            documentos.append(json.dumps({"role": role, "content": conteudo,
+                                          "timestamp": datetime.fromtimestamp(ts).isoformat()}))
+            metadados.append({"chat_id": chat_id, "role": role, "ts": ts})
+        memory.collection.add(ids=ids, documents=documentos, metadatas=metadados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mensagens", type=int, default=50_000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--ttl-dias", type=int, default=POLITICA_PADRAO["ttl_dias"])
+    parser.add_argument("--max-por-chat", type=int, default=POLITICA_PADRAO["max_por_chat"])
+    parser.add_argument("--resumir-apos-dias", type=int, default=POLITICA_PADRAO["resumir_apos_dias"])
+    args = parser.parse_args()
+
+    memory = Memory(tempfile.mkdtemp())
+    inicio = time.perf_counter()
+    popular(memory, args.mensagens, args.chats)
+    print(f"{args.mensagens} mensagens em {args.chats} chats carregadas em {time.perf_counter() - inicio:.1f}s")
+
+    politica = {"ttl_dias": args.ttl_dias, "max_por_chat": args.max_por_chat,
+                "resumir_apos_dias": args.resumir_apos_dias}
+    compactador = CompactadorMemoria(memory, politicas={"padrao": politica, "chats": {}})
+
+    medir_consultas(memory, CONSULTAS, 1)  # aquecimento
+    antes = medir_consultas(memory, CONSULTAS, 25)
+    relatorio = compactador.compactar()
+    depois = medir_consultas(memory, CONSULTAS, 25)
+
+    print(f"Política: {politica}")
+    print(f"Documentos: {relatorio['antes']['documentos']:>8} -> {relatorio['depois']['documentos']:<8} "
+          f"({relatorio['expirados']} expirados, {relatorio['resumidos']} resumidos, "
+          f"{relatorio['excedentes']} acima da cota)")
+    print(f"chroma_db:  {relatorio['antes']['bytes'] / 1024 / 1024:>7.1f} MB -> "
+          f"{tamanho_diretorio(memory.chroma_dir) / 1024 / 1024:.1f} MB"
+          f"{' (coleção reconstruída)' if relatorio['reconstruida'] else ''}")
+    print(f"Consulta:   p50 {antes['p50_ms']} -> {depois['p50_ms']} ms | p95 {antes['p95_ms']} -> {depois['p95_ms']} ms")
+    print(f"Compactação levou {relatorio['segundos']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Benchmark do scaffolding de projetos: template sintético com muitos arquivos.
+
+Compara a escrita em série com fsync por arquivo (como criar_projeto fazia
+com open/json.dump, mais a durabilidade) com gerar(): render pré-compilado,
+escrita paralela e uma única barreira de sync. Com --node-modules, o
+template ganha uma árvore imutável e gerar() também roda com TemplateStore
+(reflink/hardlink em vez de cópia); a coluna "bytes novos" é o que cada
+projeto ocupa de fato em disco.
+
+    python bench_scaffold.py [--arquivos 200] [--node-modules 2000] [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.materializer import TemplateStore
+from src.scaffold import Template, gerar
+
+COMPONENTE = """import React from 'react';
+
+interface {{ nome_projeto|pascal }}Props {
+  titulo?: string;
+}
+
+const Componente%(i)d: React.FC = () => {
+  return <div className="p-4">{{ nome_projeto }} %(i)d</div>;
+};
+
+export default Componente%(i)d;
+"""
+
+
+def criar_template(raiz: Path, n: int, node_modules: int) -> Path:
+    diretorio = raiz / "sintetico"
+    arquivos = diretorio / "arquivos"
+    for i in range(n):
+        destino = arquivos / "src" / f"modulo{i % 20}" / f"Componente{i}.tsx"
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_text(COMPONENTE % {"i": i} * 4)
+    for i in range(node_modules):
+        destino = arquivos / "node_modules" / f"pacote{i % 100}" / f"arquivo{i}.js"
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        destino.write_bytes(os.urandom(64 * 1024))
+    (diretorio / "template.json").write_text(json.dumps({"variaveis": {"nome_projeto": None}}))
+    return diretorio
+
+
+def em_serie(template: Template, destino: Path, variaveis: dict) -> None:
+    """Referência: um arquivo por vez, cada um com seu fsync"""
+    valores = template.valores(variaveis)
+    for caminho, conteudo, _, _ in template.arquivos:
+        alvo = destino / caminho.render(valores)
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        dados = template.raiz.joinpath(conteudo).read_bytes() if isinstance(conteudo, str) else \
+            conteudo.render(valores).encode("utf-8")
+        with open(alvo, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def bytes_novos(destino: Path) -> int:
+    """Bytes de arquivos que não compartilham inode (hardlinks não contam)"""
+    return sum(p.stat().st_size for p in destino.rglob("*") if p.is_file() and p.stat().st_nlink == 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--arquivos", type=int, default=200)
+    parser.add_argument("--node-modules", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    raiz = Path(tempfile.mkdtemp())
+    diretorio = criar_template(raiz, args.arquivos, args.node_modules)
+    inicio = time.perf_counter()
+    template = Template(diretorio)
+    print(f"Template com {len(template.arquivos)} arquivos compilado em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    store = TemplateStore(str(raiz / "store"))
+    variantes = [("em série + fsync", em_serie), ("gerar()", gerar)]
+    if args.node_modules:
+        inicio = time.perf_counter()
+        store.preparar(template)
+        print(f"Versão {template.versao} adicionada ao store em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        variantes.append(("gerar() + store", lambda t, d, v: gerar(t, d, v, store=store)))
+
+    for nome, funcao in variantes:
+        tempos = []
+        for i in range(args.repeticoes):
+            destino = raiz / f"saida-{i}"
+            inicio = time.perf_counter()
+            funcao(template, destino, {"nome_projeto": "meu-app"})
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            novos = bytes_novos(destino)
+            shutil.rmtree(destino)
+        print(f"{nome:<18} mediana {statistics.median(tempos):7.1f} ms | pior {max(tempos):7.1f} ms | "
+              f"bytes novos {novos / 1024 / 1024:7.1f} MB")
+
+    shutil.rmtree(raiz)
+
+
+if __name__ == "__main__":
+    main()
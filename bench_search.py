@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark do índice FTS5 de conversas: carga e latência de busca"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.search import MessageIndex
+
+VOCABULARIO = [
+    "python", "docker", "erro", "arquivo", "projeto", "diretório", "configuração", "função",
+    "classe", "teste", "servidor", "banco", "consulta", "memória", "log", "telegram", "bot",
+    "resposta", "mensagem", "comando", "script", "instalar", "pacote", "versão", "ambiente",
+    "variável", "lista", "dicionário", "api", "chave", "token", "modelo", "groq", "deepseek",
+] + [f"termo{i}" for i in range(5000)]
+
+def gerar_mensagens(n: int):
+    inicio = datetime(2024, 1, 1)
+    for i in range(n):
+        palavras = random.choices(VOCABULARIO[:34], k=random.randint(4, 12))
+        palavras += random.choices(VOCABULARIO[34:], k=random.randint(1, 4))
+        yield {
+            "id": f"m{i}",
+            "chat_id": str(random.randint(1, 500)),
+            "role": random.choice(("user", "assistant")),
+            "timestamp": (inicio + timedelta(seconds=i * 30)).isoformat(),
+            "content": " ".join(palavras)
+        }
+
+def medir(index: MessageIndex, descricao: str, repeticoes: int = 200, **kwargs):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        index.search(**kwargs)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p99 = tempos[int(len(tempos) * 0.99) - 1]
+    print(f"{descricao:<45} p50 {statistics.median(tempos):7.2f} ms | p99 {p99:7.2f} ms")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(7)
+    caminho = os.path.join(tempfile.mkdtemp(), "search.db")
+    index = MessageIndex(caminho)
+
+    inicio = time.perf_counter()
+    lote = []
+    for mensagem in gerar_mensagens(n):
+        lote.append(mensagem)
+        if len(lote) == 50_000:
+            index.add_many(lote)
+            lote = []
+    if lote:
+        index.add_many(lote)
+    duracao = time.perf_counter() - inicio
+    print(f"Carga: {n:,} mensagens em {duracao:.1f}s ({n / duracao:,.0f}/s), "
+          f"{os.path.getsize(caminho) / 1024 / 1024:.0f} MB")
+
+    inicio = time.perf_counter()
+    for i in range(200):
+        index.add(f"mensagem nova termo{i}", "user", chat_id=1)
+    print(f"Inserção incremental: {(time.perf_counter() - inicio) / 200 * 1000:.2f} ms/mensagem")
+
+    medir(index, "termo raro", query="termo4321")
+    medir(index, "dois termos raros", query="termo12 termo13")
+    medir(index, "prefixo raro", query="termo432*")
+    medir(index, "termo raro + chat + role", query="termo77", chat_id="42", role="user")
+    medir(index, "termo comum + chat", query="docker", chat_id="42", repeticoes=50)
+    medir(index, "termo comum + chat + período", query="docker erro", chat_id="42",
+          start_date="2024-03-01", end_date="2024-03-31", repeticoes=50)
+    medir(index, "termo comum (ranking de ~25% do índice)", query="docker", repeticoes=10)
+
+if __name__ == "__main__":
+    main()
@@ -61,13 +61,47 @@ def restart_bot():
     time.sleep(2)
     start_bot()
 
+def _soma(metricas, nome, filtro=""):
+    return sum(v for rotulos, v in metricas.get(nome, {}).items() if filtro in rotulos)
+
+def _media_ms(metricas, nome, filtro=""):
+    total = _soma(metricas, f"{nome}_sum", filtro)
+    contagem = _soma(metricas, f"{nome}_count", filtro)
+    return (total / contagem * 1000) if contagem else 0.0
+
+def show_metrics():
+    """Mostra um resumo do endpoint /metrics do bot; False se indisponível"""
+    from src.metrics import ler_metricas
+    
+    try:
+        metricas = ler_metricas()
+    except Exception:
+        return False
+    
+    print("\n📊 Métricas:")
+    total = _soma(metricas, "nexusia_mensagens_total")
+    erros = _soma(metricas, "nexusia_mensagens_total", 'tipo="erro"')
+    print(f"  • Mensagens processadas: {total:.0f} (erros: {erros:.0f})")
+    print(f"  • Tempo médio de processamento: {_media_ms(metricas, 'nexusia_processamento_segundos'):.0f} ms")
+    
+    for rotulos in sorted(metricas.get("nexusia_llm_latencia_segundos_count", {})):
+        print(f"  • LLM {{{rotulos}}}: {_media_ms(metricas, 'nexusia_llm_latencia_segundos', rotulos):.0f} ms em média")
+    print(f"  • Tokens entrada/saída: {_soma(metricas, 'nexusia_llm_tokens_total', 'entrada'):.0f}"
+          f" / {_soma(metricas, 'nexusia_llm_tokens_total', 'saida'):.0f}")
+    print(f"  • ChromaDB: {_media_ms(metricas, 'nexusia_chroma_segundos'):.1f} ms em média")
+    print(f"  • Erros de envio no Telegram: {_soma(metricas, 'nexusia_telegram_erros_envio_total'):.0f}")
+    for rotulos, valor in sorted(metricas.get("nexusia_fila_tamanho", {}).items()):
+        print(f"  • Fila {{{rotulos}}}: {valor:.0f}")
+    return True
+
 def status_bot():
     pid = get_bot_pid()
     if is_bot_running(pid):
         print(f"✅ Bot está rodando (PID: {pid})")
-        # Mostra últimas linhas do log
-        print("\n📝 Últimas 5 linhas do log:")
-        subprocess.run(["tail", "-n", "5", "telegram.log"])
+        if not show_metrics():
+            # Sem endpoint de métricas, mostra últimas linhas do log
+            print("\n📝 Últimas 5 linhas do log:")
+            subprocess.run(["tail", "-n", "5", "telegram.log"])
     else:
         print("❌ Bot não está rodando")
 
@@ -1,16 +1,10 @@
 import os
 import logging
+from src.logger import configurar_logging
 from src.telegram_bot import TelegramInterface
 
-# Configuração de logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler("telegram.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging (escrita em lote numa thread, sem bloquear o bot)
+configurar_logging("telegram.log")
 
 logger = logging.getLogger(__name__)
 
@@ -9,16 +9,10 @@ import json
 import asyncio
 from groq import AsyncGroq
 from openai import AsyncOpenAI
+from src.logger import configurar_logging
 
-# Configuração de logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configuração de logging (escrita em lote numa thread, sem bloquear o bot)
+configurar_logging("bot.log")
 
 logger = logging.getLogger(__name__)
 
@@ -1,22 +1,39 @@
 import sys
-from .assistant import main as assistant_main
-from .log_viewer import main as log_viewer_main
+import importlib
 import asyncio
 
+# Subcomando -> módulo com main(argv); cada um só é importado quando chamado
+SUBCOMANDOS = {
+    "logs": ".log_viewer",
+    "traces": ".tracing",
+    "ingest": ".ingest",
+    "compact": ".retention",
+    "backup": ".backup",
+    "pacotes": ".pacotes",
+    "startup": ".startup",
+}
+
 def print_usage():
     print("Uso:")
     print("  chat-ia          - Inicia o chat")
     print("  chat-ia logs     - Monitora os logs em tempo real")
+    print("  chat-ia traces   - Mostra p50/p99 por etapa dos agentes")
+    print("  chat-ia ingest   - Ingere um diretório de documentos na base de conhecimento")
+    print("  chat-ia compact  - Aplica a retenção à memória de conversas e mostra o relatório")
+    print("  chat-ia backup   - Backups deduplicados (create|list|restore|verify|prune)")
+    print("  chat-ia pacotes  - Lockfiles e cache offline de pacotes npm (lock|install|status|prune)")
+    print("  chat-ia startup  - Tempo de importação de cada ponto de entrada (orçamento de partida)")
 
 def main():
     if len(sys.argv) > 1:
-        if sys.argv[1] == "logs":
-            log_viewer_main()
-            return
-        else:
+        modulo = SUBCOMANDOS.get(sys.argv[1])
+        if modulo is None:
             print_usage()
             return
+        importlib.import_module(modulo, __package__).main(sys.argv[2:])
+        return
     
+    from .assistant import main as assistant_main
     asyncio.run(assistant_main())
 
 if __name__ == "__main__":
@@ -12,14 +12,22 @@ Estrutura:
 - orquestrador_agent.py: Coordena todos os outros agentes
 """
 
-from .analisador_agent import AnalisadorAgent
-from .conversa_agent import ConversaAgent
-from .diretorio_agent import DiretorioAgent
-from .orquestrador_agent import OrquestradorAgent
+import importlib
 
-__all__ = [
-    'AnalisadorAgent',
-    'ConversaAgent',
-    'DiretorioAgent',
-    'OrquestradorAgent'
-]
+# Importados só quando usados: `from src.agents.estados... import` não deve
+# trazer o orquestrador (e com ele openai, Chroma, índices) junto
+_MODULOS = {
+    'AnalisadorAgent': '.analisador_agent',
+    'ConversaAgent': '.conversa_agent',
+    'DiretorioAgent': '.diretorio_agent',
+    'OrquestradorAgent': '.orquestrador_agent'
+}
+
+__all__ = list(_MODULOS)
+
+def __getattr__(nome):
+    if nome not in _MODULOS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(_MODULOS[nome], __name__), nome)
+    globals()[nome] = valor
+    return valor
@@ -1,12 +1,14 @@
-from typing import Dict
+from typing import TYPE_CHECKING, Dict
 import logging
-from openai import OpenAI
 import json
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = logging.getLogger(__name__)
 
 class AnalisadorAgent:
-    def __init__(self, client: OpenAI):
+    def __init__(self, client: "OpenAI"):
         self.client = client
         self.models = {
             "mixtral": "mixtral-8x7b-32768",
@@ -27,7 +29,9 @@ class AnalisadorAgent:
             
             Retorne um JSON com:
             - tipo: 'comando_arquivo', 'comando_diretorio' ou 'conversa'
-            - detalhes: para comandos, extraia nome do arquivo/diretório e conteúdo se houver
+            - detalhes: para comandos, extraia nome do arquivo/diretório e conteúdo se houver;
+              com vários diretórios use "nomes" (lista); com vários arquivos use "arquivos"
+              (lista de {{"nome", "conteudo"}}) para que sejam criados de uma vez
             - raciocinio: explique como você chegou a essa conclusão
             
             Exemplos:
@@ -43,6 +47,12 @@ class AnalisadorAgent:
                 "raciocinio": "Identificado comando de criar arquivo pela palavra 'arquivo' e extensão .txt"
             }}
             
+            "crie as pastas src, docs e tests" -> {{
+                "tipo": "comando_diretorio",
+                "detalhes": {{"nomes": ["src", "docs", "tests"]}},
+                "raciocinio": "Vários diretórios pedidos na mesma mensagem"
+            }}
+            
             "como faço para..." -> {{
                 "tipo": "conversa",
                 "raciocinio": "Identificado como pergunta de conversação por começar com 'como faço'"
@@ -84,7 +94,7 @@ class AnalisadorAgent:
             # Para comandos, valida os detalhes
             if resultado["tipo"].startswith("comando_"):
                 detalhes = resultado.get("detalhes", {})
-                if not detalhes.get("nome"):
+                if not (detalhes.get("nome") or detalhes.get("nomes") or detalhes.get("arquivos")):
                     return {"sucesso": False, "mensagem": "Nome não encontrado no comando"}
             
             return {"sucesso": True, **resultado}
@@ -1,55 +1,79 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import functools
 import logging
 import os
 import shutil
 
+from .fluxos import CANCELAR, Fluxos, TrieComandos
+
 logger = logging.getLogger(__name__)
 
+# Comandos de vários passos (motor em fluxos.py): perguntas, validações e transições como dados
+FLUXOS = {
+    "projeto": {
+        "comando": "/projeto",
+        "titulo": "Criação do projeto",
+        "argumentos": ["template"],
+        "valores": {"template": "react-ts"},
+        "inicio": "nome",
+        "passos": {
+            "nome": {
+                "pergunta": "🚀 Legal! Vamos criar um novo projeto. Qual será o nome dele?",
+                "validar": "nome",
+                "proximo": "caminho"
+            },
+            "caminho": {
+                "pergunta": "📂 Qual será o caminho da pasta principal do projeto? (Ex: /root/projetos)",
+                "validar": "caminho_absoluto",
+                "sugestoes": ["/root/projetos"]
+            }
+        }
+    }
+}
+
 class ComandoAgent:
-    def __init__(self, client):
+    def __init__(self, client, estados=None):
         self.client = client
-        self.estado_comando = {}
+        # Assistentes em andamento, um por chat (persistidos junto do estado do chat)
+        self.fluxos = Fluxos(FLUXOS, estados)
+        
+        rotas = {
+            "/branch": self._branch,
+            "/status": self._git,
+            "/log": self._git,
+            "/diff": self._git,
+            "/cd": self._cd,
+            "/touch": self._criar,
+            "/mkdir": self._criar,
+            "/exec": self._exec,
+            "/confirmar": self._confirmar,
+            "/cancelar": self._cancelar,
+            "/mv": self._mover,
+            "/cp": self._mover,
+            "/rm": self._remover
+        }
+        for nome, definicao in FLUXOS.items():
+            rotas[definicao["comando"]] = functools.partial(self._iniciar_fluxo, nome)
+        self.rotas = TrieComandos(rotas)
     
-    async def is_comando(self, mensagem: str) -> bool:
+    async def is_comando(self, mensagem: str, chat_id: Optional[int] = None) -> bool:
         """Verifica se a mensagem é um comando"""
-        # Se estamos aguardando resposta ou a mensagem começa com /
-        return mensagem.startswith("/") or self.estado_comando.get("aguardando_resposta")
+        # Se a mensagem começa com / ou o chat está no meio de um assistente
+        return mensagem.startswith("/") or self.fluxos.ativo(chat_id) is not None
     
-    async def analisar_comando(self, mensagem: str) -> Dict:
+    async def analisar_comando(self, mensagem: str, chat_id: Optional[int] = None) -> Dict:
         """Analisa um comando e retorna informações sobre ele"""
         try:
-            # Se estamos aguardando uma resposta para um comando em andamento
-            if self.estado_comando.get("aguardando_resposta"):
-                comando_atual = self.estado_comando["comando"]
-                
-                if comando_atual == "/projeto":
-                    if self.estado_comando.get("aguardando") == "nome":
-                        # Recebemos o nome do projeto
-                        self.estado_comando["nome_projeto"] = mensagem
-                        self.estado_comando["aguardando"] = "caminho"
-                        
-                        return {
-                            "tipo": "pergunta",
-                            "resposta": "📂 Qual será o caminho da pasta principal do projeto? (Ex: /root/projetos)"
-                        }
-                        
-                    elif self.estado_comando.get("aguardando") == "caminho":
-                        # Recebemos o caminho do projeto
-                        caminho = mensagem
-                        nome_projeto = self.estado_comando["nome_projeto"]
-                        
-                        # Limpa o estado
-                        self.estado_comando = {}
-                        
-                        # Retorna as informações para criar o projeto
-                        return {
-                            "tipo": "sucesso",
-                            "tipo_comando": "projeto",
-                            "projeto": nome_projeto,
-                            "caminho_base": caminho,
-                            "diretorio_atual": os.path.join(caminho, nome_projeto),
-                            "resposta": f"✅ Criando projeto {nome_projeto} em {caminho}..."
-                        }
+            partes = mensagem.split()
+            comando = partes[0].lower() if partes else ""
+            rota = self.rotas.rota(comando) if mensagem.startswith("/") else None
+            
+            # Resposta a um passo de um assistente em andamento (um comando conhecido
+            # no meio dele roda normalmente; "/root/..." não é comando e vira resposta)
+            if rota is None or mensagem.strip().lower() in CANCELAR:
+                resultado = self.fluxos.responder(chat_id, mensagem)
+                if resultado is not None:
+                    return self._resultado_fluxo(resultado)
             
             # Se é um novo comando
             if not mensagem.startswith("/"):
@@ -58,80 +82,185 @@ class ComandoAgent:
                     "resposta": "❌ Comando inválido. Use /help para ver os comandos disponíveis."
                 }
             
-            partes = mensagem.split()
-            comando = partes[0].lower()
-            
-            # Comandos de projeto
-            if comando == "/projeto":
-                # Inicia o processo de criação do projeto
-                self.estado_comando = {
-                    "comando": "/projeto",
-                    "aguardando_resposta": True,
-                    "aguardando": "nome"
-                }
-                
-                return {
-                    "tipo": "pergunta",
-                    "resposta": "🚀 Legal! Vamos criar um novo projeto. Qual será o nome dele?"
-                }
-            
-            # Comandos de branch
-            elif comando == "/branch":
-                if len(partes) < 2:
-                    return {
-                        "tipo": "erro",
-                        "resposta": "❌ Por favor, especifique o nome da branch"
-                    }
-                
-                return {
-                    "tipo": "sucesso",
-                    "tipo_comando": "branch",
-                    "branch": partes[1],
-                    "resposta": f"✅ Branch alterada para {partes[1]}"
-                }
-            
-            # Comandos de diretório
-            elif comando == "/cd":
-                if len(partes) < 2:
-                    return {
-                        "tipo": "erro",
-                        "resposta": "❌ Por favor, especifique o diretório"
-                    }
-                
-                novo_dir = " ".join(partes[1:])
-                return {
-                    "tipo": "sucesso",
-                    "tipo_comando": "diretorio",
-                    "diretorio": novo_dir,
-                    "resposta": f"✅ Diretório alterado para {novo_dir}"
-                }
-            
-            # Comandos de arquivo
-            elif comando == "/touch" or comando == "/mkdir":
-                if len(partes) < 2:
-                    return {
-                        "tipo": "erro",
-                        "resposta": "❌ Por favor, especifique o nome do arquivo/diretório"
-                    }
-                
-                return {
-                    "tipo": "sucesso",
-                    "tipo_comando": "arquivo",
-                    "operacao": "criar",
-                    "tipo_arquivo": "arquivo" if comando == "/touch" else "diretorio",
-                    "nome": partes[1],
-                    "resposta": f"✅ {'Arquivo' if comando == '/touch' else 'Diretório'} {partes[1]} criado"
-                }
+            if rota is not None:
+                return rota(comando, partes, mensagem, chat_id)
             
             # Se não é um comando conhecido
+            parecidos = self.rotas.parecidos(comando)
             return {
                 "tipo": "erro",
                 "resposta": "❌ Comando não reconhecido. Use /help para ver os comandos disponíveis."
+                            + ("\nVocê quis dizer:" if parecidos else ""),
+                "sugestoes": [{"texto": p, "comando": " ".join([p, *partes[1:]])} for p in parecidos]
             }
-            
+        
         except Exception as e:
             logger.error(f"Erro ao analisar comando: {e}")
             return {
                 "tipo": "erro",
                 "resposta": f"❌ Erro ao analisar comando: {str(e)}"
             }
+    
+    # --- Assistentes ---
+    
+    def _iniciar_fluxo(self, nome: str, comando: str, partes: List[str], mensagem: str,
+                       chat_id: Optional[int]) -> Dict:
+        """/projeto [template] e outros comandos definidos em FLUXOS"""
+        return self._resultado_fluxo(self.fluxos.iniciar(chat_id, nome, partes[1:]))
+    
+    def _resultado_fluxo(self, resultado: Dict) -> Dict:
+        """Converte a conclusão de um assistente nas informações do comando"""
+        if resultado["tipo"] != "concluido":
+            return resultado
+        
+        valores = resultado["valores"]
+        if resultado["fluxo"] == "projeto":
+            nome_projeto = valores["nome"]
+            caminho = valores["caminho"]
+            return {
+                "tipo": "sucesso",
+                "tipo_comando": "projeto",
+                "projeto": nome_projeto,
+                "caminho_base": caminho,
+                "template": valores["template"],
+                "diretorio_atual": os.path.join(caminho, nome_projeto),
+                "resposta": f"✅ Criando projeto {nome_projeto} em {caminho}..."
+            }
+        
+        raise ValueError(f"Fluxo sem conclusão: {resultado['fluxo']}")
+    
+    # --- Comandos de uma mensagem ---
+    
+    def _branch(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """Comandos de git (/branch sem nome lista; -c cria a branch)"""
+        criar = "-c" in partes[1:]
+        nomes = [p for p in partes[1:] if p != "-c"]
+        if criar and not nomes:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Uso: /branch -c <nome>"
+            }
+        if any(nome.startswith("-") for nome in nomes):
+            # Só -c é opção; o resto iria para o git switch como opção (--orphan, --detach...)
+            return {
+                "tipo": "erro",
+                "resposta": f"❌ Nome de branch inválido: {next(n for n in nomes if n.startswith('-'))}"
+            }
+        
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "git",
+            "operacao": "switch" if nomes else "branches",
+            "branch": nomes[0] if nomes else None,
+            "criar": criar,
+            "resposta": f"🌿 Trocando para {nomes[0]}" if nomes else "🌿 Branches"
+        }
+    
+    def _git(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """/status, /log [n] e /diff"""
+        quantidade = int(partes[1]) if comando == "/log" and len(partes) > 1 and partes[1].isdigit() else 10
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "git",
+            "operacao": comando[1:],
+            "quantidade": quantidade,
+            "resposta": f"🌿 git {comando[1:]}"
+        }
+    
+    def _cd(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """Navegação (sem caminho lista os subdiretórios do diretório atual)"""
+        caminho = mensagem.strip()[len(partes[0]):].strip()
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "cd",
+            "caminho": caminho,
+            "resposta": f"📂 Indo para {caminho}" if caminho else "📂 Subdiretórios"
+        }
+    
+    def _criar(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """Comandos de arquivo (vários caminhos por comando: /mkdir a b c; /touch -p cria as pastas)"""
+        nomes = [p for p in partes[1:] if p != "-p"]
+        if not nomes:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Por favor, especifique o nome do arquivo/diretório"
+            }
+        
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "arquivo",
+            "operacao": "criar",
+            "tipo_arquivo": "arquivo" if comando == "/touch" else "diretorio",
+            "nome": nomes[0],
+            "nomes": nomes,
+            "criar_pais": comando == "/mkdir" or "-p" in partes[1:],
+            "resposta": f"✅ {'Arquivo' if comando == '/touch' else 'Diretório'} {', '.join(nomes)} criado"
+        }
+    
+    def _exec(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """Comandos de shell: /exec só pede confirmação (o botão traz o token de /confirmar)"""
+        linha = mensagem.strip()[len(partes[0]):].strip()
+        if not linha:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Uso: /exec <comando>"
+            }
+        
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "exec",
+            "comando": linha,
+            "resposta": f"▶️ {linha}"
+        }
+    
+    def _confirmar(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        """Confirmação de um /exec pendente (token de uso único guardado no Executor)"""
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "exec",
+            "token": partes[1] if len(partes) > 1 else "",
+            "resposta": "▶️ Confirmando"
+        }
+    
+    def _cancelar(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "cancelar",
+            "execucao": partes[1] if len(partes) > 1 else None,
+            "resposta": "⏹ Cancelando"
+        }
+    
+    def _mover(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        if len(partes) < 3:
+            return {
+                "tipo": "erro",
+                "resposta": f"❌ Uso: {comando} <origem...> <destino>"
+            }
+        
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "arquivo",
+            "operacao": "mover" if comando == "/mv" else "copiar",
+            "nome": partes[1],
+            "nomes": partes[1:],
+            "resposta": f"✅ {', '.join(partes[1:-1])} → {partes[-1]}"
+        }
+    
+    def _remover(self, comando: str, partes: List[str], mensagem: str, chat_id: Optional[int]) -> Dict:
+        recursivo = "-r" in partes[1:]
+        nomes = [p for p in partes[1:] if p != "-r"]
+        if not nomes:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Uso: /rm [-r] <caminho...>"
+            }
+        
+        return {
+            "tipo": "sucesso",
+            "tipo_comando": "arquivo",
+            "operacao": "remover",
+            "recursivo": recursivo,
+            "nome": nomes[0],
+            "nomes": nomes,
+            "resposta": f"✅ {', '.join(nomes)} removido"
+        }
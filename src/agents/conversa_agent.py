@@ -1,11 +1,16 @@
 from typing import Dict, List, Optional
 import logging
+import time
+
+from ..metrics import LLM_LATENCIA, LLM_TOKENS, LLM_ERROS
 
 logger = logging.getLogger(__name__)
 
 class ConversaAgent:
-    def __init__(self, client):
+    def __init__(self, client, provider: str = "groq", modelo: str = "mixtral-8x7b-32768"):
         self.client = client
+        self.provider = provider
+        self.modelo = modelo
         self.projeto_atual = None
     
     async def processar_mensagem(self, mensagem: str, contexto: Optional[List[Dict]] = None) -> Dict:
@@ -27,10 +32,17 @@ class ConversaAgent:
                     Sempre mantenha o contexto do projeto atual.
                     
                     Comandos disponíveis:
-                    /projeto - Cria um novo projeto
-                    /cd <caminho> - Navega entre diretórios
-                    /touch <arquivo> - Cria um arquivo
-                    /mkdir <diretório> - Cria um diretório
+                    /projeto [template] - Cria um novo projeto (pergunta nome e caminho; /cancelar desiste)
+                    /cd [caminho] - Navega entre diretórios (sugere caminhos parecidos)
+                    /touch [-p] <arquivo...> - Cria um ou mais arquivos (-p cria as pastas)
+                    /mkdir <diretório...> - Cria um ou mais diretórios
+                    /mv <origem...> <destino> - Move arquivos ou diretórios
+                    /cp <origem...> <destino> - Copia arquivos ou diretórios
+                    /rm [-r] <caminho...> - Remove arquivos ou diretórios
+                    /exec <comando> - Executa um comando de shell no diretório atual (pede confirmação)
+                    /cancelar [id] - Cancela um comando em execução
+                    /branch [-c] [nome] - Lista, troca ou cria (-c) branches do git
+                    /status, /log [n], /diff - Estado, histórico e diferenças do repositório
                     
                     Responda em português do Brasil.
                     
@@ -44,12 +56,27 @@ class ConversaAgent:
             ]
             
             # Gera a resposta usando o modelo
-            completion = self.client.chat.completions.create(
-                model="mixtral-8x7b-32768",
-                messages=mensagens,
-                temperature=0.7,
-                max_tokens=2000
-            )
+            inicio = time.perf_counter()
+            try:
+                completion = self.client.chat.completions.create(
+                    model=self.modelo,
+                    messages=mensagens,
+                    temperature=0.7,
+                    max_tokens=2000
+                )
+            except Exception:
+                LLM_ERROS.inc(provider=self.provider, modelo=self.modelo)
+                raise
+            finally:
+                LLM_LATENCIA.observe(time.perf_counter() - inicio, provider=self.provider, modelo=self.modelo)
+            
+            # Contabiliza os tokens, quando o provider informa o uso
+            uso = getattr(completion, "usage", None)
+            if uso is not None:
+                LLM_TOKENS.inc(getattr(uso, "prompt_tokens", 0) or 0,
+                               provider=self.provider, modelo=self.modelo, direcao="entrada")
+                LLM_TOKENS.inc(getattr(uso, "completion_tokens", 0) or 0,
+                               provider=self.provider, modelo=self.modelo, direcao="saida")
             
             resposta = completion.choices[0].message.content
             
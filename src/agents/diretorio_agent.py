@@ -1,15 +1,21 @@
 from pathlib import Path
 from typing import Dict, List
+import asyncio
 import logging
 import os
 
+from ..fileops import executar_lote
+
 logger = logging.getLogger(__name__)
 
 class DiretorioAgent:
-    def __init__(self):
+    def __init__(self, indexer=None):
         # Diretório padrão para operações
         self.workspace = Path("/root/projetos/chat-ia-terminal/workspace")
         
+        # WorkspaceIndexer opcional para manter o índice do workspace em dia
+        self.indexer = indexer
+        
         # Log de processo
         self._processo_log: List[str] = []
         
@@ -31,15 +37,11 @@ class DiretorioAgent:
         self._processo_log = []
         
         try:
-            # Usa as informações do AnalisadorAgent se disponíveis
-            if info_comando and info_comando.get("detalhes", {}).get("nome"):
-                nome_dir = info_comando["detalhes"]["nome"]
-            else:
-                return {
-                    "sucesso": False,
-                    "mensagem": "Não foi possível entender o nome do diretório",
-                    "processo": self._processo_log
-                }
+            # Usa as informações do AnalisadorAgent se disponíveis (um nome ou vários)
+            detalhes = (info_comando or {}).get("detalhes", {})
+            nomes = detalhes.get("nomes") or ([detalhes["nome"]] if detalhes.get("nome") else [])
+            if not nomes:
+                return self._resposta(False, "Não foi possível entender o nome do diretório")
             
             # Usa o diretório atual se fornecido, senão usa o workspace
             if diretorio_atual:
@@ -47,60 +49,58 @@ class DiretorioAgent:
             else:
                 caminho_base = str(self.workspace)
             
-            # Remove aspas do nome se presentes
-            nome_dir = nome_dir.strip('"\'')
-            
-            # Constrói o caminho completo
-            caminho_completo = os.path.join(caminho_base, nome_dir)
+            # Remove aspas dos nomes se presentes
+            nomes = [nome.strip('"\'') for nome in nomes]
             
             # Processo de criação com feedback
             self._add_log("🔄 Analisando seu comando...")
             self._add_log("✓ Comando interpretado corretamente")
             
             self._add_log("🔄 Verificando permissões...")
-            # Verifica se tem permissão para criar no diretório pai
-            if not os.access(os.path.dirname(caminho_completo), os.W_OK):
-                return {
-                    "sucesso": False,
-                    "mensagem": f"Sem permissão para criar diretório em {os.path.dirname(caminho_completo)}",
-                    "processo": self._processo_log
-                }
+            # Verifica se tem permissão para criar no diretório base (fora do event loop)
+            if not await asyncio.to_thread(os.access, caminho_base, os.W_OK):
+                return self._resposta(False, f"Sem permissão para criar diretório em {caminho_base}")
             self._add_log("✓ Permissões verificadas")
             
-            self._add_log("🔄 Criando diretório...")
-            # Tenta criar o diretório
-            try:
-                os.makedirs(caminho_completo, exist_ok=True)
-                self._add_log("✓ Diretório criado com sucesso!")
-            except Exception as e:
-                return {
-                    "sucesso": False,
-                    "mensagem": f"Erro ao criar diretório: {str(e)}",
-                    "processo": self._processo_log
-                }
+            self._add_log(f"🔄 Criando {len(nomes)} diretório(s)...")
+            lote = await asyncio.to_thread(
+                executar_lote, [{"op": "criar_diretorio", "caminho": nome} for nome in nomes], caminho_base
+            )
+            criados = [r for r in lote["resultados"] if r["ok"]]
+            for resultado in lote["resultados"]:
+                if resultado["ok"]:
+                    self._add_log(f"✓ {os.path.relpath(resultado['caminho'], caminho_base)} criado")
+                    if self.indexer:
+                        self.indexer.agendar(resultado["caminho"])
+                else:
+                    self._add_log(f"✗ {os.path.relpath(resultado['caminho'], caminho_base)}: {resultado['erro']}")
             
-            # Verifica se o diretório foi realmente criado
-            if not os.path.exists(caminho_completo):
-                return {
-                    "sucesso": False,
-                    "mensagem": "Falha ao criar diretório",
-                    "processo": self._processo_log
-                }
+            if not criados:
+                return self._resposta(False, f"Erro ao criar diretório: {lote['resultados'][0]['erro']}")
             
-            return {
-                "sucesso": True,
-                "mensagem": f"Diretório \"{nome_dir}\" criado com sucesso!",
-                "processo": self._processo_log,
-                "info": {
-                    "nome": nome_dir,
-                    "caminho_completo": caminho_completo,
-                    "permissoes": oct(os.stat(caminho_completo).st_mode)[-3:]
-                }
-            }
+            permissoes = await asyncio.to_thread(lambda: {r["caminho"]: oct(os.stat(r["caminho"]).st_mode)[-3:]
+                                                          for r in criados})
+            if len(nomes) == 1:
+                mensagem = f"Diretório \"{nomes[0]}\" criado com sucesso!"
+            else:
+                mensagem = f"{len(criados)} de {len(nomes)} diretórios criados em {caminho_base}"
+            return self._resposta(lote["ok"], mensagem, info={
+                "nome": nomes[0],
+                "caminho_completo": criados[0]["caminho"],
+                "permissoes": permissoes[criados[0]["caminho"]],
+                "criados": [{"caminho": c, "permissoes": p} for c, p in permissoes.items()]
+            })
             
         except Exception as e:
-            return {
-                "sucesso": False,
-                "mensagem": f"Erro: {str(e)}",
-                "processo": self._processo_log
-            }
+            return self._resposta(False, f"Erro: {str(e)}")
+    
+    def _resposta(self, sucesso: bool, mensagem: str, **extras) -> Dict:
+        """Resposta no formato deste agente e no dos outros agentes (tipo/resposta)"""
+        return {
+            "sucesso": sucesso,
+            "mensagem": mensagem,
+            "processo": self._processo_log,
+            "tipo": "sucesso" if sucesso else "erro",
+            "resposta": f"{'✅' if sucesso else '❌'} {mensagem}",
+            **extras
+        }
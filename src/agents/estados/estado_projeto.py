@@ -1,62 +1,270 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Set
 from datetime import datetime
+from pathlib import Path
+import atexit
+import json
 import logging
+import sqlite3
+import sys
+import threading
+import time
+
+from ...gitrepo import descrever
+from ...metrics import ESTADOS_GRAVADOS, FILA
 
 logger = logging.getLogger(__name__)
 
+# Alterações de um chat esperam no máximo isso para ir ao disco (várias viram uma gravação)
+INTERVALO_GRAVACAO = 0.25
+
+_CAMPOS = ("projeto_atual", "branch_atual", "diretorio_atual", "ultimo_comando", "timestamp", "contexto_adicional")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS estados (
+    chat_id INTEGER PRIMARY KEY,
+    projeto_atual TEXT,
+    branch_atual TEXT,
+    diretorio_atual TEXT,
+    ultimo_comando TEXT,
+    timestamp REAL,
+    contexto_adicional TEXT
+);
+"""
+
+
+def _internar(valor):
+    # Muitos chats no mesmo projeto/diretório passam a dividir a mesma string
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
 class EstadoProjeto:
-    def __init__(self):
+    """Projeto, diretório e branch de um chat.
+
+    Os campos ficam em __slots__ (sem dict por instância) para caber muitos
+    chats ociosos em memória; com uma `loja`, cada alteração marca o chat
+    para a próxima gravação em lote.
+    """
+    __slots__ = ("git", "chat_id", "_loja") + _CAMPOS
+
+    def __init__(self, git=None, chat_id: int = 0, loja: "Optional[EstadosProjeto]" = None):
+        # GitIndex opcional: branch e alterações vêm do cache dele, sem chamar o git
+        self.git = git
+        self.chat_id = chat_id
+        self._loja = None
         self.reset()
-    
+        self._loja = loja
+
     def reset(self) -> None:
         """Reseta o estado para valores padrão"""
-        self._estado = {
-            "projeto_atual": None,
-            "branch_atual": None,
-            "diretorio_atual": None,
-            "ultimo_comando": None,
-            "timestamp": None,
-            "contexto_adicional": {}
-        }
-    
+        self.projeto_atual: Optional[str] = None
+        self.branch_atual: Optional[str] = None
+        self.diretorio_atual: Optional[str] = None
+        self.ultimo_comando: Optional[str] = None
+        self.timestamp: Optional[float] = None
+        self.contexto_adicional: Optional[Dict] = None  # None = vazio, sem alocar um dict
+        if self._loja is not None:
+            self._loja.marcar(self)
+
     def atualizar(self, **kwargs) -> None:
         """Atualiza o estado com novos valores"""
         for key, value in kwargs.items():
-            if key in self._estado:
-                self._estado[key] = value
-        self._estado["timestamp"] = datetime.now().isoformat()
-        logger.info(f"Estado atualizado: {self.get_resumo()}")
-    
+            if key in _CAMPOS and key != "timestamp":
+                setattr(self, key, _internar(value))
+        if self.git and kwargs.get("diretorio_atual"):
+            self.git.acompanhar(kwargs["diretorio_atual"])
+        self.timestamp = time.time()
+        if self._loja is not None:
+            self._loja.marcar(self)
+        logger.info(f"Estado atualizado (chat {self.chat_id}): {self.get_resumo()}")
+
+    def set_contexto(self, chave: str, valor) -> None:
+        """Guarda (ou remove, com None) um item do contexto_adicional, persistido com o resto"""
+        # Dict novo a cada alteração: a thread de gravação pode estar serializando o anterior
+        contexto = dict(self.contexto_adicional or {})
+        if valor is None:
+            contexto.pop(chave, None)
+        else:
+            contexto[chave] = valor
+        self.contexto_adicional = contexto or None
+        if self._loja is not None:
+            self._loja.marcar(self)
+
     def get_estado(self) -> Dict:
         """Retorna o estado completo"""
-        return self._estado.copy()
-    
+        estado = {campo: getattr(self, campo) for campo in _CAMPOS}
+        estado["timestamp"] = datetime.fromtimestamp(self.timestamp).isoformat() if self.timestamp else None
+        estado["contexto_adicional"] = dict(self.contexto_adicional or {})
+        return estado
+
     def get_resumo(self) -> str:
         """Retorna um resumo do estado atual em formato legível"""
-        if not self._estado["projeto_atual"]:
+        if not self.projeto_atual:
             return "🤖 Nenhum projeto selecionado"
-        
-        resumo = f"🚀 Projeto: {self._estado['projeto_atual']}"
-        
-        if self._estado["branch_atual"]:
-            resumo += f"\n📌 Branch: {self._estado['branch_atual']}"
-        
-        if self._estado["diretorio_atual"]:
-            resumo += f"\n📂 Diretório: {self._estado['diretorio_atual']}"
-        
-        if self._estado["ultimo_comando"]:
-            resumo += f"\n⚡ Último comando: {self._estado['ultimo_comando']}"
-        
+
+        resumo = f"🚀 Projeto: {self.projeto_atual}"
+
+        git = self.get_status_git()
+        if self.get_branch_atual():
+            resumo += f"\n📌 Branch: {self.get_branch_atual()}"
+        if git:
+            resumo += f"\n{descrever(git)}"
+
+        if self.diretorio_atual:
+            resumo += f"\n📂 Diretório: {self.diretorio_atual}"
+
+        if self.ultimo_comando:
+            resumo += f"\n⚡ Último comando: {self.ultimo_comando}"
+
         return resumo
-    
+
     def tem_projeto_ativo(self) -> bool:
         """Verifica se há um projeto ativo"""
-        return bool(self._estado["projeto_atual"])
-    
+        return bool(self.projeto_atual)
+
     def get_projeto_atual(self) -> Optional[str]:
         """Retorna o nome do projeto atual"""
-        return self._estado["projeto_atual"]
-    
+        return self.projeto_atual
+
+    def get_diretorio_atual(self) -> Optional[str]:
+        """Retorna o diretório atual"""
+        return self.diretorio_atual
+
+    def get_status_git(self) -> Optional[Dict]:
+        """Status em cache do repositório do diretório atual (None se não houver)"""
+        if not self.git or not self.diretorio_atual:
+            return None
+        return self.git.status_em_cache(self.diretorio_atual)
+
     def get_branch_atual(self) -> Optional[str]:
         """Retorna o nome da branch atual"""
-        return self._estado["branch_atual"]
+        git = self.get_status_git()
+        if git:
+            return git["branch"] or f"(HEAD solto em {git['head']})"
+        return self.branch_atual
+
+    def _linha(self) -> tuple:
+        return (self.chat_id, self.projeto_atual, self.branch_atual, self.diretorio_atual, self.ultimo_comando,
+                self.timestamp, json.dumps(self.contexto_adicional, ensure_ascii=False) if self.contexto_adicional else None)
+
+
+class EstadosProjeto:
+    """Estados de projeto por chat, persistidos em SQLite.
+
+    Um chat só é lido do banco na primeira mensagem dele depois de
+    iniciar (obter). atualizar() só marca o chat como sujo; uma thread grava
+    os sujos numa única transação até INTERVALO_GRAVACAO depois da primeira
+    marcação. Cada lote é atômico (WAL), então um crash perde no máximo o
+    último intervalo e nunca deixa um estado pela metade.
+    """
+
+    def __init__(self, git=None, data_dir: str = "/root/projetos/chat-ia-terminal/data",
+                 intervalo: float = INTERVALO_GRAVACAO):
+        self.git = git
+        self.intervalo = intervalo
+        self._estados: Dict[int, EstadoProjeto] = {}
+        self._sujos: Set[int] = set()
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ativo = False
+
+        caminho = Path(data_dir) / "estados.db"
+        try:
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(caminho), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"Estados por chat sem persistência ({caminho}): {e}")
+            self.conn = None
+
+        FILA.set_funcao(lambda: len(self._sujos), fila="estados_sujos")
+
+    def __len__(self) -> int:
+        return len(self._estados)
+
+    def obter(self, chat_id: Optional[int]) -> EstadoProjeto:
+        """Estado do chat, lido do banco na primeira vez (ou vazio, se o chat é novo)"""
+        chat_id = chat_id or 0
+        estado = self._estados.get(chat_id)
+        if estado is not None:
+            return estado
+
+        estado = EstadoProjeto(self.git, chat_id)
+        linha = None
+        if self.conn is not None:
+            try:
+                with self._lock:
+                    linha = self.conn.execute(
+                        f"SELECT {', '.join(_CAMPOS)} FROM estados WHERE chat_id = ?", (chat_id,)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao carregar o estado do chat {chat_id}: {e}")
+        if linha is not None:
+            for campo, valor in zip(_CAMPOS, linha):
+                setattr(estado, campo, _internar(valor))
+            if estado.contexto_adicional:
+                estado.contexto_adicional = json.loads(estado.contexto_adicional)
+            if self.git and estado.diretorio_atual:
+                self.git.acompanhar(estado.diretorio_atual)
+        estado._loja = self
+        # Duas corrotinas podem ter carregado o mesmo chat: fica o primeiro
+        return self._estados.setdefault(chat_id, estado)
+
+    def marcar(self, estado: EstadoProjeto) -> None:
+        with self._cond:
+            if not self._sujos:
+                self._cond.notify()
+            self._sujos.add(estado.chat_id)
+
+    def gravar(self) -> int:
+        """Grava agora os chats alterados; retorna quantos foram gravados"""
+        with self._cond:
+            sujos, self._sujos = self._sujos, set()
+            # A linha é tirada com o lock: uma alteração depois disso marca o chat de novo
+            linhas = [self._estados[chat_id]._linha() for chat_id in sujos]
+        if not linhas or self.conn is None:
+            return 0
+        try:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO estados (chat_id, {', '.join(_CAMPOS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    linhas
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao gravar {len(linhas)} estado(s): {e}")
+            with self._cond:
+                self._sujos |= sujos
+            return 0
+        ESTADOS_GRAVADOS.inc(len(linhas))
+        return len(linhas)
+
+    def _rodar(self) -> None:
+        while True:
+            with self._cond:
+                while self._ativo and not self._sujos:
+                    self._cond.wait()
+                if not self._ativo:
+                    break
+                # Junta o que mudar até o fim do intervalo (parar() acorda antes)
+                self._cond.wait(self.intervalo)
+            self.gravar()
+
+    def iniciar(self) -> None:
+        """Thread de gravação em lote; o que estiver pendente é gravado ao sair"""
+        if self._ativo:
+            return
+        self._ativo = True
+        self._thread = threading.Thread(target=self._rodar, daemon=True, name="estados-projeto")
+        self._thread.start()
+        atexit.register(self.parar)
+
+    def parar(self) -> None:
+        with self._cond:
+            self._ativo = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.gravar()
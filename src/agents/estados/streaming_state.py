@@ -1,92 +1,204 @@
 from typing import Dict, Optional, List
-from datetime import datetime
+from contextlib import contextmanager
 import logging
+import uuid
+
+from ...tracing import Span, ExportadorOTLPArquivo, STATUS_OK, STATUS_ERROR, trace_id_de
 
 logger = logging.getLogger(__name__)
 
+# Status que encerram a etapa (e o span correspondente)
+STATUS_FINAIS = {"sucesso": STATUS_OK, "erro": STATUS_ERROR}
+
 class StreamingState:
-    def __init__(self):
+    def __init__(self, exportador: Optional[ExportadorOTLPArquivo] = None):
         self.fluxo_atual: List[Dict] = []
         self.chat_id: Optional[int] = None
-        
-    def iniciar_fluxo(self, chat_id: int, descricao: str):
+        self.request_id: Optional[str] = None
+        self.trace_id: Optional[str] = None
+        self.exportador = exportador
+
+        # Span raiz do fluxo e pilha de spans abertos (para aninhamento)
+        self._span_raiz: Optional[Span] = None
+        self._abertos: List[Span] = []
+        self._spans: List[Span] = []
+
+    def iniciar_fluxo(self, chat_id: int, descricao: str, request_id: Optional[str] = None):
         """Inicia um novo fluxo de trabalho"""
         self.chat_id = chat_id
+        self.request_id = request_id or uuid.uuid4().hex
+        self.trace_id = trace_id_de(self.request_id)
+
+        self._span_raiz = Span(
+            self.trace_id,
+            "fluxo",
+            atributos={
+                "agente": "Sistema",
+                "acao": "fluxo",
+                "chat_id": chat_id,
+                "request_id": self.request_id,
+                "descricao": descricao
+            }
+        )
+        self._abertos = []
+        self._spans = [self._span_raiz]
+
         self.fluxo_atual = [{
-            "timestamp": datetime.now().isoformat(),
+            "span": self._span_raiz,
             "agente": "Sistema",
             "acao": "🔄 Iniciando novo fluxo de trabalho",
             "descricao": descricao,
             "status": "iniciado"
         }]
-        logger.info(f"Fluxo iniciado: {descricao}")
-    
+        logger.info(f"Fluxo iniciado [{self.request_id}]: {descricao}")
+
+    def _abrir_span(self, agente: str, acao: str) -> Span:
+        """Abre um span filho do span aberto mais interno"""
+        pai = self._abertos[-1] if self._abertos else self._span_raiz
+        span = Span(
+            self.trace_id or uuid.uuid4().hex,
+            f"{agente}: {acao}",
+            parent_id=pai.span_id if pai else None,
+            atributos={
+                "agente": agente,
+                "acao": acao,
+                "chat_id": self.chat_id if self.chat_id is not None else "",
+                "request_id": self.request_id or ""
+            }
+        )
+        self._spans.append(span)
+        self._abertos.append(span)
+        return span
+
+    def _fechar_span(self, span: Span, status: str) -> None:
+        """Fecha um span e o remove da pilha de abertos"""
+        span.finalizar(STATUS_FINAIS.get(status, STATUS_OK))
+        if span in self._abertos:
+            self._abertos.remove(span)
+
     def adicionar_estado(self, agente: str, acao: str, status: str = "processando"):
         """Adiciona um novo estado ao fluxo"""
         emoji = self._get_status_emoji(status)
+        span = self._abrir_span(agente, acao)
         estado = {
-            "timestamp": datetime.now().isoformat(),
+            "span": span,
             "agente": agente,
             "acao": f"{emoji} {acao}",
             "status": status
         }
+        if status in STATUS_FINAIS:
+            self._fechar_span(span, status)
         self.fluxo_atual.append(estado)
         logger.info(f"Estado adicionado: {agente} - {acao} ({status})")
-        
+
     def atualizar_ultimo_estado(self, status: str, descricao: Optional[str] = None):
         """Atualiza o status do último estado adicionado"""
         if self.fluxo_atual:
             ultimo_estado = self.fluxo_atual[-1]
             emoji = self._get_status_emoji(status)
-            
+
             # Atualiza a ação com o novo emoji
             acao_sem_emoji = ultimo_estado["acao"].split(" ", 1)[1]
             ultimo_estado["acao"] = f"{emoji} {acao_sem_emoji}"
-            
+
             ultimo_estado["status"] = status
             if descricao:
                 ultimo_estado["descricao"] = descricao
-            
+                ultimo_estado["span"].atributos["descricao"] = descricao
+
+            # Status final encerra a etapa
+            if status in STATUS_FINAIS:
+                self._fechar_span(ultimo_estado["span"], status)
+
             logger.info(f"Estado atualizado: {ultimo_estado['agente']} - {status}")
-    
+
+    @contextmanager
+    def etapa(self, agente: str, acao: str):
+        """Executa um bloco como etapa do fluxo, aninhando as etapas internas"""
+        self.adicionar_estado(agente, acao, "processando")
+        estado = self.fluxo_atual[-1]
+        try:
+            yield estado
+        except Exception:
+            self._finalizar_estado(estado, "erro")
+            raise
+        else:
+            if not estado["span"].finalizado:
+                self._finalizar_estado(estado, "sucesso")
+
+    def _finalizar_estado(self, estado: Dict, status: str) -> None:
+        """Encerra um estado específico (não necessariamente o último)"""
+        acao_sem_emoji = estado["acao"].split(" ", 1)[1]
+        estado["acao"] = f"{self._get_status_emoji(status)} {acao_sem_emoji}"
+        estado["status"] = status
+        self._fechar_span(estado["span"], status)
+
     def finalizar_fluxo(self, sucesso: bool = True):
         """Finaliza o fluxo atual"""
         status = "sucesso" if sucesso else "erro"
+
+        # Fecha as etapas que ficaram abertas antes do marco final
+        for estado in reversed(self.fluxo_atual[1:]):
+            if not estado["span"].finalizado:
+                self._finalizar_estado(estado, status)
+
         self.adicionar_estado(
             "Sistema",
             "Fluxo de trabalho finalizado",
             status
         )
-        logger.info(f"Fluxo finalizado: {status}")
-    
+
+        if self._span_raiz:
+            self._span_raiz.finalizar(STATUS_FINAIS[status])
+
+        self._exportar_spans()
+        logger.info(f"Fluxo finalizado [{self.request_id}]: {status}")
+
+    def _exportar_spans(self) -> None:
+        """Envia os spans do fluxo ao exportador, sem afetar o processamento"""
+        if not self.exportador:
+            return
+        try:
+            self.exportador.exportar(self._spans)
+        except Exception as e:
+            logger.error(f"Erro ao exportar spans: {e}")
+
+    def get_spans(self) -> List[Span]:
+        """Retorna os spans do fluxo atual"""
+        return list(self._spans)
+
     def get_mensagem_streaming(self) -> str:
         """Retorna uma mensagem formatada com o estado atual do streaming"""
         if not self.fluxo_atual:
             return "Nenhum fluxo em andamento"
-        
+
         mensagem = "🤖 Fluxo de Processamento:\n\n"
-        
+
         for estado in self.fluxo_atual:
-            # Formata o timestamp para hora:minuto:segundo
-            timestamp = datetime.fromisoformat(estado["timestamp"]).strftime("%H:%M:%S")
-            
+            span = estado["span"]
+
+            # Formata o início da etapa para hora:minuto:segundo
+            timestamp = span.inicio_datetime().strftime("%H:%M:%S")
+
             # Formata a linha do agente
             linha_agente = f"[{timestamp}] {estado['agente']}:\n"
-            
-            # Formata a linha da ação
-            linha_acao = f"  {estado['acao']}\n"
-            
+
+            # Formata a linha da ação, com a duração quando a etapa já terminou
+            duracao = span.duracao_ms()
+            sufixo = f" ({duracao:.1f} ms)" if duracao is not None else ""
+            linha_acao = f"  {estado['acao']}{sufixo}\n"
+
             # Adiciona a descrição se existir
             linha_descricao = f"  └─ {estado['descricao']}\n" if "descricao" in estado else ""
-            
+
             # Adiciona uma linha em branco após cada estado
             mensagem += linha_agente + linha_acao + linha_descricao + "\n"
-        
+
         # Adiciona uma linha divisória no final
         mensagem += "─" * 40 + "\n"
-        
+
         return mensagem
-    
+
     def _get_status_emoji(self, status: str) -> str:
         """Retorna o emoji apropriado para cada status"""
         return {
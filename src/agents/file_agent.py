@@ -1,14 +1,51 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import asyncio
 import logging
 import os
 
+from ..fileops import LoteError, executar_lote
+
 logger = logging.getLogger(__name__)
 
+DESCRICAO_OPERACOES = {
+    "criar_arquivo": "Arquivo criado",
+    "criar_diretorio": "Diretório criado",
+    "escrever": "Arquivo escrito",
+    "mover": "Movido",
+    "copiar": "Copiado",
+    "remover": "Removido"
+}
+
 class FileAgent:
-    def __init__(self):
+    def __init__(self, indexer=None):
         self.workspace = "/root/projetos"
+        # WorkspaceIndexer opcional: arquivos criados entram no índice do workspace
+        self.indexer = indexer
         logger.info(f"✓ Workspace configurado em {self.workspace}")
     
+    def _operacoes(self, info_comando: Dict) -> List[Dict]:
+        """Monta o lote a partir do comando (/mkdir a b c, /mv, /rm) ou dos arquivos gerados pelo LLM"""
+        if info_comando.get("operacoes"):
+            return info_comando["operacoes"]
+        
+        # Vários arquivos com conteúdo (saída do AnalisadorAgent/LLM)
+        arquivos = info_comando.get("arquivos") or info_comando.get("detalhes", {}).get("arquivos")
+        if arquivos:
+            return [{"op": "escrever", "caminho": a["nome"], "conteudo": a.get("conteudo", "")} for a in arquivos]
+        
+        nomes = info_comando.get("nomes") or [info_comando["nome"]]
+        operacao = info_comando["operacao"]
+        if operacao == "criar":
+            op = "criar_arquivo" if info_comando["tipo_arquivo"] == "arquivo" else "criar_diretorio"
+            return [{"op": op, "caminho": nome} for nome in nomes]
+        if operacao in ("mover", "copiar"):
+            *origens, destino = nomes
+            return [{"op": operacao, "caminho": origem, "destino": destino} for origem in origens]
+        if operacao == "remover":
+            return [{"op": "remover", "caminho": nome, "recursivo": info_comando.get("recursivo", False)}
+                    for nome in nomes]
+        raise LoteError(f"Operação {operacao} não suportada")
+    
     async def processar_comando(self, mensagem: str, diretorio_atual: Optional[str], info_comando: Dict) -> Dict:
         """Processa um comando relacionado a arquivos"""
         try:
@@ -18,27 +55,10 @@ class FileAgent:
                     "resposta": "❌ Nenhum diretório selecionado. Use /projeto primeiro."
                 }
             
-            caminho_completo = os.path.join(diretorio_atual, info_comando["nome"])
-            
-            if info_comando["operacao"] == "criar":
-                if info_comando["tipo_arquivo"] == "arquivo":
-                    # Cria um arquivo vazio
-                    with open(caminho_completo, "w") as f:
-                        pass
-                else:
-                    # Cria um diretório
-                    os.makedirs(caminho_completo, exist_ok=True)
-                
-                return {
-                    "tipo": "sucesso",
-                    "resposta": f"✅ {'Arquivo' if info_comando['tipo_arquivo'] == 'arquivo' else 'Diretório'} {info_comando['nome']} criado em {diretorio_atual}"
-                }
-            
-            else:
-                return {
-                    "tipo": "erro",
-                    "resposta": f"❌ Operação {info_comando['operacao']} não suportada"
-                }
+            operacoes = self._operacoes(info_comando)
+            # Arquivos gerados pelo LLM entram todos ou nenhum
+            atomico = info_comando.get("atomico", any(op["op"] == "escrever" for op in operacoes))
+            return await self.executar_lote(operacoes, diretorio_atual, atomico)
             
         except Exception as e:
             logger.error(f"Erro ao processar comando de arquivo: {e}")
@@ -46,3 +66,35 @@ class FileAgent:
                 "tipo": "erro",
                 "resposta": f"❌ Erro ao processar comando: {str(e)}"
             }
+    
+    async def executar_lote(self, operacoes: List[Dict], diretorio_atual: str, atomico: bool = False) -> Dict:
+        """Executa o lote fora do event loop e resume o resultado de cada item"""
+        lote = await asyncio.to_thread(executar_lote, operacoes, diretorio_atual, atomico)
+        
+        if self.indexer:
+            for resultado in lote["resultados"]:
+                if resultado["ok"]:
+                    self.indexer.agendar(resultado.get("destino") or resultado["caminho"])
+        
+        linhas = []
+        for resultado in lote["resultados"]:
+            nome = os.path.relpath(resultado["caminho"], diretorio_atual)
+            if resultado["ok"]:
+                destino = f" → {os.path.relpath(resultado['destino'], diretorio_atual)}" if "destino" in resultado else ""
+                linhas.append(f"✅ {DESCRICAO_OPERACOES[resultado['op']]}: {nome}{destino}")
+            else:
+                linhas.append(f"❌ {nome}: {resultado['erro']}")
+        
+        ok = sum(1 for r in lote["resultados"] if r["ok"])
+        if lote["ok"]:
+            cabecalho = f"✅ {ok} operações concluídas em {diretorio_atual}" if len(linhas) > 1 else ""
+        elif atomico:
+            cabecalho = "❌ Nenhuma alteração feita (lote atômico desfeito)"
+        else:
+            cabecalho = f"⚠️ {ok} de {len(linhas)} operações concluídas em {diretorio_atual}"
+        
+        return {
+            "tipo": "sucesso" if lote["ok"] else "erro",
+            "resposta": "\n".join(([cabecalho] if cabecalho else []) + linhas),
+            "resultados": lote["resultados"]
+        }
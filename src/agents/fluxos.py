@@ -0,0 +1,255 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Um assistente sem resposta por esse tempo é abandonado (a próxima mensagem vai para a conversa)
+TTL_PADRAO = 600.0
+# Intervalo mínimo entre duas varreduras dos assistentes expirados
+INTERVALO_LIMPEZA = 60.0
+# Respostas que abandonam o assistente em qualquer passo
+CANCELAR = {"/cancelar", "cancelar", "/sair"}
+
+
+# --- Roteamento ---
+
+class TrieComandos:
+    """Tabela de comandos como árvore de prefixos, montada uma vez.
+
+    Achar a rota custa O(tamanho do comando), não importa quantos comandos
+    existam; o mesmo caminho na árvore dá os comandos parecidos para
+    sugerir quando o digitado não existe.
+    """
+
+    def __init__(self, rotas: Dict[str, Callable]):
+        self._raiz: Dict = {}
+        for comando, destino in rotas.items():
+            no = self._raiz
+            for letra in comando.lower():
+                no = no.setdefault(letra, {})
+            no[""] = destino  # "" nunca é uma letra: marca o fim de um comando
+
+    def rota(self, comando: str) -> Optional[Callable]:
+        no = self._raiz
+        for letra in comando.lower():
+            no = no.get(letra)
+            if no is None:
+                return None
+        return no.get("")
+
+    def parecidos(self, comando: str, limite: int = 5) -> List[str]:
+        """Comandos que compartilham o maior prefixo com `comando`"""
+        no, prefixo = self._raiz, ""
+        for letra in comando.lower():
+            if letra not in no:
+                break
+            no, prefixo = no[letra], prefixo + letra
+        if len(prefixo) < 2:  # só a "/" não diz nada
+            return []
+        encontrados: List[str] = []
+        pilha = [(no, prefixo)]
+        while pilha and len(encontrados) < limite:
+            no, texto = pilha.pop()
+            if "" in no:
+                encontrados.append(texto)
+            pilha.extend((filho, texto + letra) for letra, filho in sorted(no.items(), reverse=True) if letra)
+        return encontrados
+
+
+# --- Validadores (referenciados por nome nas definições) ---
+
+def _texto(valor: str) -> str:
+    if not valor.strip():
+        raise ValueError("A resposta não pode ser vazia")
+    return valor.strip()
+
+
+def _nome(valor: str) -> str:
+    valor = _texto(valor)
+    if "/" in valor or valor in (".", "..") or len(valor) > 100:
+        raise ValueError(f"Nome inválido: {valor} (sem '/', até 100 caracteres)")
+    return valor
+
+
+def _caminho_absoluto(valor: str) -> str:
+    valor = os.path.expanduser(_texto(valor))
+    if not os.path.isabs(valor):
+        raise ValueError(f"Use um caminho absoluto (começando com /): {valor}")
+    return os.path.normpath(valor)
+
+
+def _inteiro(valor: str) -> int:
+    try:
+        return int(valor.strip())
+    except ValueError:
+        raise ValueError(f"Esperava um número: {valor}")
+
+
+VALIDADORES: Dict[str, Callable[[str], object]] = {
+    "texto": _texto,
+    "nome": _nome,
+    "caminho_absoluto": _caminho_absoluto,
+    "inteiro": _inteiro,
+}
+
+
+# --- Instâncias ---
+
+class InstanciaFluxo:
+    """Um assistente em andamento num chat: só nomes e valores, serializável como dict"""
+    __slots__ = ("fluxo", "passo", "valores", "expira_em")
+
+    def __init__(self, fluxo: str, passo: str, valores: Dict, expira_em: float):
+        self.fluxo = fluxo
+        self.passo = passo
+        self.valores = valores
+        self.expira_em = expira_em  # time.time(): continua valendo depois de reiniciar
+
+    def expirou(self, agora: Optional[float] = None) -> bool:
+        return (agora or time.time()) >= self.expira_em
+
+    def para_dict(self) -> Dict:
+        return {"fluxo": self.fluxo, "passo": self.passo, "valores": dict(self.valores), "expira_em": self.expira_em}
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> "InstanciaFluxo":
+        return cls(dados["fluxo"], dados["passo"], dict(dados["valores"]), dados["expira_em"])
+
+
+class Fluxos:
+    """Motor dos assistentes de vários passos (ex.: /projeto pergunta nome e caminho).
+
+    Cada definição é só dados:
+
+        {"comando": "/projeto", "titulo": "Criação do projeto",
+         "argumentos": ["template"],          # /projeto <template> preenche valores
+         "valores": {"template": "react-ts"}, # padrões
+         "inicio": "nome", "ttl": 600,
+         "passos": {
+             "nome": {"pergunta": "...", "validar": "nome", "proximo": "caminho"},
+             "caminho": {"pergunta": "...", "validar": "caminho_absoluto",
+                         "sugestoes": ["/root/projetos"]}}}
+
+    O valor de cada passo vai para valores[<nome do passo>]. "proximo"
+    pode ser o nome do passo seguinte, um dict {resposta: passo, "*": passo}
+    ou faltar (fim). Passos cujo valor já veio nos argumentos são pulados.
+
+    Há uma instância por chat. Com `estados` (EstadosProjeto), ela também
+    vai para o contexto_adicional do chat e sobrevive a um reinício.
+    """
+
+    def __init__(self, definicoes: Dict[str, Dict], estados=None):
+        for nome, definicao in definicoes.items():
+            for passo, dados in definicao["passos"].items():
+                if dados.get("validar", "texto") not in VALIDADORES:
+                    raise ValueError(f"Fluxo {nome}, passo {passo}: validador desconhecido {dados['validar']}")
+        self.definicoes = definicoes
+        self.estados = estados
+        self._instancias: Dict[int, InstanciaFluxo] = {}
+        self._ultima_limpeza = time.time()
+
+    def __len__(self) -> int:
+        return len(self._instancias)
+
+    def _salvar(self, chat_id: int, instancia: Optional[InstanciaFluxo]) -> None:
+        if instancia is None:
+            self._instancias.pop(chat_id, None)
+        else:
+            self._instancias[chat_id] = instancia
+        if self.estados is not None:
+            self.estados.obter(chat_id).set_contexto("fluxo", instancia.para_dict() if instancia else None)
+
+    def ativo(self, chat_id: Optional[int]) -> Optional[InstanciaFluxo]:
+        """Assistente em andamento no chat (None se não há ou se expirou)"""
+        chat_id = chat_id or 0
+        instancia = self._instancias.get(chat_id)
+        if instancia is None and self.estados is not None:
+            salvo = (self.estados.obter(chat_id).contexto_adicional or {}).get("fluxo")
+            if salvo:
+                instancia = self._instancias[chat_id] = InstanciaFluxo.de_dict(salvo)
+        if instancia is not None and (instancia.expirou() or instancia.fluxo not in self.definicoes):
+            logger.info(f"Fluxo {instancia.fluxo} do chat {chat_id} expirou no passo {instancia.passo}")
+            self._salvar(chat_id, None)
+            return None
+        return instancia
+
+    def expirar(self) -> int:
+        """Descarta os assistentes expirados; retorna quantos"""
+        agora = time.time()
+        self._ultima_limpeza = agora
+        expirados = [chat_id for chat_id, instancia in self._instancias.items() if instancia.expirou(agora)]
+        for chat_id in expirados:
+            self._salvar(chat_id, None)
+        return len(expirados)
+
+    def _perguntar(self, instancia: InstanciaFluxo, erro: Optional[str] = None) -> Dict:
+        passo = self.definicoes[instancia.fluxo]["passos"][instancia.passo]
+        return {
+            "tipo": "pergunta",
+            "resposta": (f"❌ {erro}\n" if erro else "") + passo["pergunta"],
+            "sugestoes": [{"texto": s, "comando": s} for s in passo.get("sugestoes", [])]
+        }
+
+    def _avancar(self, chat_id: int, instancia: InstanciaFluxo, passo: Optional[str]) -> Dict:
+        """Vai para `passo` (pulando os já preenchidos); sem passo, conclui"""
+        definicao = self.definicoes[instancia.fluxo]
+        while passo is not None and passo in instancia.valores:
+            passo = self._proximo(definicao["passos"][passo], instancia.valores[passo])
+        if passo is None:
+            self._salvar(chat_id, None)
+            return {"tipo": "concluido", "fluxo": instancia.fluxo, "valores": instancia.valores}
+        instancia.passo = passo
+        instancia.expira_em = time.time() + definicao.get("ttl", TTL_PADRAO)
+        self._salvar(chat_id, instancia)
+        return self._perguntar(instancia)
+
+    @staticmethod
+    def _proximo(passo: Dict, valor) -> Optional[str]:
+        proximo = passo.get("proximo")
+        if isinstance(proximo, dict):
+            return proximo.get(str(valor), proximo.get("*"))
+        return proximo
+
+    def iniciar(self, chat_id: Optional[int], nome: str, argumentos: Iterable[str] = ()) -> Dict:
+        """Começa o assistente `nome` (substitui o que estiver em andamento no chat)"""
+        chat_id = chat_id or 0
+        if time.time() - self._ultima_limpeza > INTERVALO_LIMPEZA:
+            self.expirar()
+        definicao = self.definicoes[nome]
+        valores = dict(definicao.get("valores", {}))
+        valores.update(zip(definicao.get("argumentos", []), argumentos))
+        for passo, dados in definicao["passos"].items():
+            if passo in valores and passo not in definicao.get("valores", {}):
+                try:
+                    valores[passo] = VALIDADORES[dados.get("validar", "texto")](valores[passo])
+                except ValueError as e:
+                    return {"tipo": "erro", "resposta": f"❌ {e}"}
+        instancia = InstanciaFluxo(nome, definicao["inicio"], valores, 0.0)
+        return self._avancar(chat_id, instancia, definicao["inicio"])
+
+    def responder(self, chat_id: Optional[int], mensagem: str) -> Optional[Dict]:
+        """Aplica a resposta ao passo atual: próxima pergunta, erro de validação ou conclusão.
+
+        None se o chat não tem assistente em andamento.
+        """
+        chat_id = chat_id or 0
+        instancia = self.ativo(chat_id)
+        if instancia is None:
+            return None
+        definicao = self.definicoes[instancia.fluxo]
+        if mensagem.strip().lower() in CANCELAR:
+            self._salvar(chat_id, None)
+            return {
+                "tipo": "sucesso",
+                "resposta": f"⏹ {definicao.get('titulo', instancia.fluxo)} cancelada"
+            }
+
+        passo = definicao["passos"][instancia.passo]
+        try:
+            valor = VALIDADORES[passo.get("validar", "texto")](mensagem)
+        except ValueError as e:
+            return self._perguntar(instancia, str(e))
+        instancia.valores[instancia.passo] = valor
+        return self._avancar(chat_id, instancia, self._proximo(passo, valor))
@@ -1,47 +1,117 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+import asyncio
 import logging
-from openai import OpenAI
+import os
+import threading
 
 from .conversa_agent import ConversaAgent
 from .comando_agent import ComandoAgent
 from .diretorio_agent import DiretorioAgent
 from .file_agent import FileAgent
 from .projeto_agent import ProjetoAgent
-from .estados.estado_projeto import EstadoProjeto
+from .estados.estado_projeto import EstadoProjeto, EstadosProjeto
 from .estados.streaming_state import StreamingState
 from ..memory import Memory
+from ..retention import CompactadorMemoria, resumidor_llm
+from ..workspace_index import WorkspaceIndexer
+from ..path_index import get_path_index
+from ..executor import Executor
+from ..gitrepo import GitError, GitIndex, descrever
+from ..tracing import ExportadorOTLPArquivo
+from ..metrics import MENSAGENS, PROCESSAMENTO
+from ..lazy import Preguicoso
 
 logger = logging.getLogger(__name__)
 
+# Operações de arquivo que apagam ou sobrescrevem: mesma lista de chats do /exec
+OPERACOES_RESTRITAS = {"mover", "copiar", "remover"}
+
 class OrquestradorAgent:
     def __init__(self, groq_api_key: str):
-        # Inicializa o cliente OpenAI
-        self.client = OpenAI(
-            base_url="https://api.groq.com/openai/v1",
-            api_key=groq_api_key
-        )
+        # Cliente OpenAI (compatível com a Groq), criado no primeiro uso: o SDK
+        # leva quase um segundo para importar
+        def criar_cliente():
+            from openai import OpenAI
+            return OpenAI(
+                base_url="https://api.groq.com/openai/v1",
+                api_key=groq_api_key
+            )
+        self.client = Preguicoso(criar_cliente, "cliente OpenAI")
+        
+        # Índice incremental dos arquivos dos projetos (varredura inicial e
+        # observador rodam em background)
+        try:
+            self.workspace_index = WorkspaceIndexer()
+            self.workspace_index.iniciar()
+        except Exception as e:
+            logger.error(f"Erro ao iniciar o índice do workspace: {e}")
+            self.workspace_index = None
+        
+        # Árvore de caminhos em memória para /cd e autocompletar (inotify)
+        try:
+            self.path_index = get_path_index()
+        except Exception as e:
+            logger.error(f"Erro ao iniciar o índice de caminhos: {e}")
+            self.path_index = None
+        
+        # Status dos repositórios git em cache (invalidado por eventos do .git e da árvore)
+        self.git = GitIndex(self.path_index)
+        self.git.iniciar()
+        
+        # Execução de comandos de shell aprovados (subprocessos assíncronos)
+        self.executor = Executor()
+        
+        # Estado do projeto por chat (carregado na primeira mensagem, gravado em lote no SQLite)
+        self.estados = EstadosProjeto(self.git)
+        self.estados.iniciar()
         
         # Inicializa os agentes
         self.conversa = ConversaAgent(self.client)
-        self.comando = ComandoAgent(self.client)
-        self.diretorio = DiretorioAgent()
-        self.file = FileAgent()
-        self.projeto = ProjetoAgent()
+        self.comando = ComandoAgent(self.client, self.estados)
+        self.diretorio = DiretorioAgent(self.workspace_index)
+        self.file = FileAgent(self.workspace_index)
+        self.projeto = ProjetoAgent(self.workspace_index)
         
         # Inicializa o sistema de memória
         self.memory = Memory()
         
-        # Inicializa o estado do projeto
-        self.estado = EstadoProjeto()
+        # Retenção da memória (TTL, cota por chat e resumo dos turnos antigos)
+        self.compactador = CompactadorMemoria(self.memory, resumidor_llm(self.client))
+        self.compactador.iniciar()
         
-        # Inicializa o streaming de estados
-        self.streaming = StreamingState()
+        # Inicializa o streaming de estados (spans exportados em OTLP/JSON)
+        self.streaming = StreamingState(ExportadorOTLPArquivo())
         
         logger.info("OrquestradorAgent inicializado com sucesso")
     
+    def aquecer(self) -> threading.Thread:
+        """Carrega numa thread o que foi adiado (SDK do LLM, ChromaDB, modelo de embedding),
+        em sequência, para a primeira mensagem não pagar por isso"""
+        def carregar():
+            etapas = (("cliente OpenAI", self.client.obter),
+                      ("memória", lambda: self.memory.embeddings.motor))
+            for nome, etapa in etapas:
+                try:
+                    etapa()
+                except Exception as e:
+                    logger.error(f"Erro ao aquecer {nome}: {e}")
+        
+        thread = threading.Thread(target=carregar, daemon=True, name="aquecimento")
+        thread.start()
+        return thread
+    
     async def processar_mensagem(self, mensagem: str, chat_id: int) -> Dict:
         """Processa uma mensagem e retorna a resposta apropriada"""
+        with PROCESSAMENTO.tempo():
+            resultado = await self._processar_mensagem(mensagem, chat_id)
+        MENSAGENS.inc(tipo=resultado.get("tipo", "desconhecido"))
+        return resultado
+    
+    async def _processar_mensagem(self, mensagem: str, chat_id: int) -> Dict:
+        """Executa o fluxo de processamento de uma mensagem"""
         try:
+            estado = self.estados.obter(chat_id)
+            
             # Inicia o streaming para esta mensagem
             self.streaming.iniciar_fluxo(
                 chat_id,
@@ -54,7 +124,7 @@ class OrquestradorAgent:
                 "Analisando se é um comando",
                 "processando"
             )
-            is_comando = await self.comando.is_comando(mensagem)
+            is_comando = await self.comando.is_comando(mensagem, chat_id)
             
             if is_comando:
                 self.streaming.atualizar_ultimo_estado(
@@ -69,15 +139,19 @@ class OrquestradorAgent:
                     "Processando comando",
                     "processando"
                 )
-                resultado = await self.comando.analisar_comando(mensagem)
+                resultado = await self.comando.analisar_comando(mensagem, chat_id)
                 
                 if resultado["tipo"] == "sucesso":
                     self.streaming.atualizar_ultimo_estado("sucesso")
                 else:
                     self.streaming.atualizar_ultimo_estado("erro")
+                
+                # Comando completo: executa (a análise só interpreta a mensagem)
+                if resultado["tipo"] == "sucesso" and resultado.get("tipo_comando"):
+                    resultado = await self.processar_comando(mensagem, resultado, chat_id)
                     
-                # Se o comando não foi reconhecido, processa como conversa
-                if resultado["tipo"] == "erro" and "não reconhecido" in resultado["resposta"]:
+                # Se o comando não foi reconhecido (nem parece com um conhecido), processa como conversa
+                if resultado["tipo"] == "erro" and "não reconhecido" in resultado["resposta"] and not resultado.get("sugestoes"):
                     self.streaming.adicionar_estado(
                         "ConversaAgent",
                         "Processando como conversa",
@@ -113,7 +187,7 @@ class OrquestradorAgent:
                 self.streaming.atualizar_ultimo_estado("sucesso")
                 
                 # Adiciona resumo do estado ao contexto
-                if self.estado.tem_projeto_ativo():
+                if estado.tem_projeto_ativo():
                     self.streaming.adicionar_estado(
                         "EstadoAgent",
                         "Adicionando contexto do projeto",
@@ -121,10 +195,32 @@ class OrquestradorAgent:
                     )
                     contexto.append({
                         "role": "system",
-                        "content": f"\nContexto atual:\n{self.estado.get_resumo()}"
+                        "content": f"\nContexto atual:\n{estado.get_resumo()}"
                     })
                     self.streaming.atualizar_ultimo_estado("sucesso")
                 
+                # Adiciona trechos relevantes dos arquivos do workspace
+                if self.workspace_index:
+                    self.streaming.adicionar_estado(
+                        "WorkspaceIndex",
+                        "Buscando trechos dos arquivos do projeto",
+                        "processando"
+                    )
+                    try:
+                        # O embedding da consulta bloqueia até o lote do serviço sair; fora do loop
+                        trechos = await asyncio.to_thread(
+                            self.workspace_index.contexto, mensagem, estado.get_diretorio_atual()
+                        )
+                        if trechos:
+                            contexto.append({
+                                "role": "system",
+                                "content": f"\nTrechos relevantes dos arquivos do projeto:\n{trechos}"
+                            })
+                        self.streaming.atualizar_ultimo_estado("sucesso")
+                    except Exception as e:
+                        logger.error(f"Erro ao buscar no índice do workspace: {e}")
+                        self.streaming.atualizar_ultimo_estado("erro")
+                
                 # Processa a mensagem com o contexto
                 self.streaming.adicionar_estado(
                     "ConversaAgent",
@@ -141,7 +237,7 @@ class OrquestradorAgent:
                         "Salvando interação na memória",
                         "processando"
                     )
-                    self.memory.add_interaction(chat_id, mensagem, resultado["resposta"])
+                    await asyncio.to_thread(self.memory.add_interaction, chat_id, mensagem, resultado["resposta"])
                     self.streaming.atualizar_ultimo_estado("sucesso")
                 else:
                     self.streaming.atualizar_ultimo_estado("erro")
@@ -169,22 +265,26 @@ class OrquestradorAgent:
                 "streaming": self.streaming.get_mensagem_streaming()
             }
     
-    async def processar_comando(self, mensagem: str) -> Dict:
+    async def processar_comando(self, mensagem: str, info_comando: Optional[Dict] = None,
+                                chat_id: Optional[int] = None) -> Dict:
         """Processa um comando e retorna o resultado"""
         try:
-            # Analisa o comando
-            self.streaming.adicionar_estado(
-                "ComandoAgent",
-                "Analisando comando",
-                "processando"
-            )
-            info_comando = await self.comando.analisar_comando(mensagem)
+            estado = self.estados.obter(chat_id)
             
-            if info_comando["tipo"] == "erro":
-                self.streaming.atualizar_ultimo_estado("erro")
-                return info_comando
-            
-            self.streaming.atualizar_ultimo_estado("sucesso")
+            # Analisa o comando (se ainda não foi analisado)
+            if info_comando is None:
+                self.streaming.adicionar_estado(
+                    "ComandoAgent",
+                    "Analisando comando",
+                    "processando"
+                )
+                info_comando = await self.comando.analisar_comando(mensagem, chat_id)
+                
+                if info_comando["tipo"] == "erro":
+                    self.streaming.atualizar_ultimo_estado("erro")
+                    return info_comando
+                
+                self.streaming.atualizar_ultimo_estado("sucesso")
             
             # Se for uma pergunta, retorna direto
             if info_comando["tipo"] == "pergunta":
@@ -200,7 +300,8 @@ class OrquestradorAgent:
                 )
                 resultado = await self.projeto.criar_projeto(
                     info_comando["projeto"],
-                    info_comando.get("caminho_base")
+                    info_comando.get("caminho_base"),
+                    info_comando.get("template", "react-ts")
                 )
                 
                 if resultado["tipo"] == "sucesso":
@@ -211,7 +312,7 @@ class OrquestradorAgent:
                         "Atualizando estado do projeto",
                         "processando"
                     )
-                    self.estado.atualizar(
+                    estado.atualizar(
                         projeto_atual=info_comando["projeto"],
                         diretorio_atual=info_comando["diretorio_atual"]
                     )
@@ -227,14 +328,47 @@ class OrquestradorAgent:
                 "Atualizando estado",
                 "processando"
             )
-            self.estado.atualizar(
-                ultimo_comando=mensagem,
-                diretorio_atual=info_comando.get("diretorio_atual")
-            )
+            if info_comando.get("diretorio_atual"):
+                estado.atualizar(ultimo_comando=mensagem, diretorio_atual=info_comando["diretorio_atual"])
+            else:
+                estado.atualizar(ultimo_comando=mensagem)
             self.streaming.atualizar_ultimo_estado("sucesso")
+            diretorio_atual = info_comando.get("diretorio_atual") or estado.get_diretorio_atual()
             
             # Processa o comando de acordo com o tipo
-            if info_comando["tipo_comando"] == "diretorio":
+            if info_comando["tipo_comando"] == "cd":
+                self.streaming.adicionar_estado(
+                    "PathIndex",
+                    "Resolvendo diretório",
+                    "processando"
+                )
+                resultado = self._navegar(info_comando.get("caminho", ""), diretorio_atual, estado)
+                self.streaming.atualizar_ultimo_estado(
+                    "sucesso" if resultado["tipo"] == "sucesso" else "erro"
+                )
+                return resultado
+            
+            elif info_comando["tipo_comando"] == "git":
+                self.streaming.adicionar_estado(
+                    "GitIndex",
+                    f"git {info_comando['operacao']}",
+                    "processando"
+                )
+                resultado = await self._operacao_git(info_comando, diretorio_atual, estado)
+                self.streaming.atualizar_ultimo_estado(
+                    "sucesso" if resultado["tipo"] == "sucesso" else "erro"
+                )
+                return resultado
+            
+            elif info_comando["tipo_comando"] == "exec":
+                return self._executar(info_comando, diretorio_atual, chat_id)
+            
+            elif info_comando["tipo_comando"] == "cancelar":
+                return self._cancelar(info_comando.get("execucao"), chat_id)
+            
+            elif info_comando["tipo_comando"] == "diretorio":
+                if diretorio_atual and not self._permitido(diretorio_atual):
+                    return self._fora_das_raizes(diretorio_atual)
                 self.streaming.adicionar_estado(
                     "DiretorioAgent",
                     "Processando comando de diretório",
@@ -242,7 +376,7 @@ class OrquestradorAgent:
                 )
                 resultado = await self.diretorio.processar_comando(
                     mensagem,
-                    info_comando.get("diretorio_atual"),
+                    diretorio_atual,
                     info_comando
                 )
                 self.streaming.atualizar_ultimo_estado(
@@ -251,6 +385,19 @@ class OrquestradorAgent:
                 return resultado
                 
             elif info_comando["tipo_comando"] == "arquivo":
+                if info_comando.get("operacao") in OPERACOES_RESTRITAS and not self.executor.autorizado(chat_id):
+                    logger.warning(f"Operação {info_comando['operacao']} recusada para o chat {chat_id} (fora de EXEC_CHATS_AUTORIZADOS)")
+                    return {
+                        "tipo": "erro",
+                        "resposta": "⛔ Este chat não tem permissão para mover, copiar ou remover arquivos."
+                    }
+                if diretorio_atual and not self._permitido(diretorio_atual):
+                    return self._fora_das_raizes(diretorio_atual)
+                if diretorio_atual and info_comando.get("tipo_arquivo") == "arquivo" and not info_comando.get("criar_pais"):
+                    pergunta = self._pasta_inexistente(info_comando, diretorio_atual)
+                    if pergunta:
+                        return pergunta
+                
                 self.streaming.adicionar_estado(
                     "FileAgent",
                     "Processando comando de arquivo",
@@ -258,7 +405,7 @@ class OrquestradorAgent:
                 )
                 resultado = await self.file.processar_comando(
                     mensagem,
-                    info_comando.get("diretorio_atual"),
+                    diretorio_atual,
                     info_comando
                 )
                 self.streaming.atualizar_ultimo_estado(
@@ -288,3 +435,234 @@ class OrquestradorAgent:
                 "tipo": "erro",
                 "resposta": f"❌ Desculpe, ocorreu um erro ao processar seu comando. Detalhes: {str(e)}"
             }
+    
+    def _e_diretorio(self, caminho: str) -> bool:
+        # Acerto no índice não custa syscall; na falta, confirma no disco (symlinks, evento ainda na fila)
+        return bool(self.path_index and self.path_index.e_diretorio(caminho)) or os.path.isdir(caminho)
+    
+    def _sugestoes(self, texto: str, base: str, dentro: Optional[str] = None) -> List[str]:
+        """Diretórios existentes parecidos com `texto` (absolutos): prefixo primeiro, depois busca aproximada"""
+        if not self.path_index:
+            return []
+        completos = self.path_index.completar(texto, base, limite=8, so_diretorios=True)
+        if completos:
+            return [os.path.normpath(os.path.join(base, c)) for c in completos]
+        if not texto.strip("./"):
+            return []
+        return [os.path.normpath(os.path.join(str(self.path_index.raiz), c))
+                for c in self.path_index.buscar(texto, limite=8, so_diretorios=True, dentro=dentro)]
+    
+    def _raizes(self) -> List[str]:
+        """Onde /cd e as operações de arquivo podem agir: o workspace e as raízes dos projetos"""
+        if self.workspace_index:
+            raizes = [self.workspace_index.workspace, *self.workspace_index.projetos]
+        else:
+            raizes = [self.path_index.raiz if self.path_index else "/root/projetos"]
+        return [os.path.realpath(raiz) for raiz in raizes]
+    
+    def _permitido(self, caminho: str) -> bool:
+        # realpath: um symlink dentro do workspace não leva para fora dele
+        real = os.path.realpath(caminho)
+        return any(real == raiz or real.startswith(raiz + os.sep) for raiz in self._raizes())
+    
+    def _fora_das_raizes(self, caminho: str) -> Dict:
+        return {
+            "tipo": "erro",
+            "resposta": f"⛔ {caminho} está fora do workspace e dos projetos ({', '.join(self._raizes())}). Use /cd."
+        }
+    
+    def _navegar(self, caminho: str, diretorio_atual: Optional[str], estado: EstadoProjeto) -> Dict:
+        """Executa /cd: muda o diretório atual ou devolve sugestões (teclado no Telegram)"""
+        base = diretorio_atual or (str(self.path_index.raiz) if self.path_index else "/root/projetos")
+        if not self._permitido(base):
+            # Diretório salvo antes do limite às raízes: recomeça pelo workspace
+            base = self._raizes()[0]
+        if not caminho:
+            sugestoes = self._sugestoes("", base)
+            return {
+                "tipo": "sucesso",
+                "resposta": f"📂 Diretório atual: {base}" + ("" if sugestoes else "\n(sem subdiretórios)"),
+                "sugestoes": [{"texto": os.path.relpath(s, base) + "/", "comando": f"/cd {s}"} for s in sugestoes]
+            }
+        
+        alvo = os.path.normpath(os.path.join(base, os.path.expanduser(caminho)))
+        if not self._permitido(alvo):
+            return self._fora_das_raizes(alvo)
+        if self._e_diretorio(alvo):
+            estado.atualizar(diretorio_atual=alvo)
+            return {
+                "tipo": "sucesso",
+                "resposta": f"📂 Diretório atual: {alvo}"
+            }
+        
+        sugestoes = [s for s in self._sugestoes(caminho, base) if s != alvo]
+        return {
+            "tipo": "erro",
+            "resposta": f"❌ Diretório não encontrado: {alvo}" + ("\nVocê quis dizer:" if sugestoes else ""),
+            "sugestoes": [{"texto": os.path.relpath(s, base) if s.startswith(base + os.sep) else s,
+                           "comando": f"/cd {s}"} for s in sugestoes]
+        }
+    
+    def _pasta_inexistente(self, info_comando: Dict, diretorio_atual: str) -> Optional[Dict]:
+        """/touch em pasta que não existe: sugere pastas parecidas em vez de criar uma nova por engano"""
+        nomes = info_comando.get("nomes") or [info_comando["nome"]]
+        for indice, nome in enumerate(nomes):
+            pasta = os.path.dirname(nome)
+            if not pasta or self._e_diretorio(os.path.normpath(os.path.join(diretorio_atual, pasta))):
+                continue
+            
+            def comando(novo: str) -> str:
+                return " ".join(["/touch", *nomes[:indice], novo, *nomes[indice + 1:]])
+            
+            sugestoes = [s for s in self._sugestoes(pasta, diretorio_atual, dentro=diretorio_atual)
+                         if s.startswith(diretorio_atual + os.sep)]
+            botoes = []
+            for sugestao in sugestoes:
+                novo = os.path.join(os.path.relpath(sugestao, diretorio_atual), os.path.basename(nome))
+                botoes.append({"texto": novo, "comando": comando(novo)})
+            botoes.append({"texto": f"Criar {pasta}/", "comando": comando(nome).replace("/touch", "/touch -p", 1)})
+            return {
+                "tipo": "pergunta",
+                "resposta": f"📂 A pasta {pasta} não existe em {diretorio_atual}. "
+                            f"Escolha uma das existentes ou crie com /touch -p.",
+                "sugestoes": botoes
+            }
+        return None
+    
+    def _executar(self, info_comando: Dict, diretorio_atual: Optional[str], chat_id: Optional[int]) -> Dict:
+        """Executa /exec: sem token devolve a confirmação; com um token válido, inicia e devolve a execução"""
+        if not self.executor.autorizado(chat_id):
+            logger.warning(f"/exec recusado para o chat {chat_id} (fora de EXEC_CHATS_AUTORIZADOS)")
+            return {
+                "tipo": "erro",
+                "resposta": "⛔ Este chat não tem permissão para executar comandos."
+            }
+        
+        if "token" not in info_comando:
+            comando = info_comando["comando"]
+            cwd = diretorio_atual or (str(self.path_index.raiz) if self.path_index else "/root/projetos")
+            token = self.executor.pedir_aprovacao(comando, cwd, chat_id)
+            return {
+                "tipo": "pergunta",
+                "resposta": f"⚠️ Executar em {cwd}?\n\n$ {comando}",
+                "sugestoes": [{"texto": "▶️ Executar", "comando": f"/confirmar {token}"}]
+            }
+        
+        aprovado = self.executor.aprovar(info_comando["token"], chat_id)
+        if aprovado is None:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Confirmação inválida ou expirada. Envie o /exec de novo."
+            }
+        comando, cwd = aprovado
+        
+        self.streaming.adicionar_estado(
+            "Executor",
+            f"Iniciando: {comando[:50]}",
+            "processando"
+        )
+        try:
+            execucao = self.executor.iniciar(comando, cwd, chat_id)
+        except (ValueError, OSError) as e:
+            self.streaming.atualizar_ultimo_estado("erro")
+            return {
+                "tipo": "erro",
+                "resposta": f"❌ Não foi possível executar: {e}"
+            }
+        self.streaming.atualizar_ultimo_estado("sucesso")
+        # A saída chega pela execução (a interface acompanha e edita a mensagem)
+        return {
+            "tipo": "sucesso",
+            "resposta": f"▶️ [{execucao.id}] $ {execucao.comando}",
+            "execucao": execucao
+        }
+    
+    def _cancelar(self, id: Optional[str], chat_id: Optional[int]) -> Dict:
+        """Executa /cancelar: a execução indicada ou a mais recente do chat"""
+        ativas = self.executor.ativas(chat_id)
+        if id is None and ativas:
+            id = ativas[-1].id
+        execucao = self.executor.obter(id) if id else None
+        if execucao is None or execucao.chat_id != chat_id or not self.executor.cancelar(id):
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Nenhum comando em andamento" + (f" com id {id}" if id else "")
+            }
+        return {
+            "tipo": "sucesso",
+            "resposta": f"⏹ Cancelando [{id}] $ {execucao.comando}"
+        }
+    
+    async def _operacao_git(self, info_comando: Dict, diretorio_atual: Optional[str],
+                            estado: EstadoProjeto) -> Dict:
+        """Executa /branch, /status, /log e /diff no repositório do diretório atual"""
+        if not diretorio_atual:
+            return {
+                "tipo": "erro",
+                "resposta": "❌ Nenhum diretório selecionado. Use /cd ou /projeto primeiro."
+            }
+        
+        operacao = info_comando["operacao"]
+        try:
+            if operacao == "branches":
+                branches = await self.git.branches(diretorio_atual)
+                atual = estado.get_branch_atual()
+                linhas = [f"{'*' if b == atual else ' '} {b}" for b in branches] or ["(nenhuma branch: repositório sem commits)"]
+                return {
+                    "tipo": "sucesso",
+                    "resposta": "🌿 Branches:\n" + "\n".join(linhas),
+                    "sugestoes": [{"texto": f"🌿 {b}", "comando": f"/branch {b}"} for b in branches if b != atual]
+                }
+            
+            if operacao == "switch":
+                status = await self.git.checkout(diretorio_atual, info_comando["branch"], info_comando.get("criar", False))
+                estado.atualizar(branch_atual=status["branch"])
+                return {
+                    "tipo": "sucesso",
+                    "resposta": f"✅ Branch {'criada e ' if info_comando.get('criar') else ''}alterada para "
+                                f"{status['branch']}\n{descrever(status)}"
+                }
+            
+            if operacao == "status":
+                status = await self.git.status(diretorio_atual)
+                linhas = [f"📌 {status['branch'] or '(HEAD solto)'} {status['head'] or '(sem commits)'}", descrever(status)]
+                linhas += [f"  {xy} {caminho}" for xy, caminho in status["arquivos"][:20]]
+                if status["total_arquivos"] > 20:
+                    linhas.append(f"  ... e mais {status['total_arquivos'] - 20}")
+                return {
+                    "tipo": "sucesso",
+                    "resposta": "\n".join(linhas)
+                }
+            
+            if operacao == "log":
+                commits = await self.git.log(diretorio_atual, info_comando.get("quantidade", 10))
+                if not commits:
+                    return {"tipo": "sucesso", "resposta": "📜 Nenhum commit ainda"}
+                return {
+                    "tipo": "sucesso",
+                    "resposta": "📜 Commits:\n" + "\n".join(
+                        f"{c['sha']} {c['assunto']} ({c['autor']}, {c['quando']})" for c in commits)
+                }
+            
+            if operacao == "diff":
+                diff = await self.git.diff_resumo(diretorio_atual)
+                if not diff["arquivos"]:
+                    return {"tipo": "sucesso", "resposta": "✅ Nenhuma diferença em relação ao último commit"}
+                linhas = [f"📝 {len(diff['arquivos'])} arquivo(s), +{diff['adicoes']} -{diff['remocoes']}"]
+                for arquivo in diff["arquivos"][:20]:
+                    variacao = "(binário)" if arquivo["binario"] else f"+{arquivo['adicoes']} -{arquivo['remocoes']}"
+                    linhas.append(f"  {variacao} {arquivo['arquivo']}")
+                return {
+                    "tipo": "sucesso",
+                    "resposta": "\n".join(linhas)
+                }
+        except GitError as e:
+            return {
+                "tipo": "erro",
+                "resposta": f"❌ git {operacao}: {e}"
+            }
+        
+        return {
+            "tipo": "erro",
+            "resposta": f"❌ Operação git não suportada: {operacao}"
+        }
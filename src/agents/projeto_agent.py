@@ -1,17 +1,48 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Set
+import asyncio
 import logging
 import os
-import shutil
+
+from ..materializer import TemplateStore
+from ..pacotes import CachePacotes
+from ..scaffold import TemplateError, TemplateRegistry, TEMPLATES_DIR, arvore, gerar
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_PADRAO = "react-ts"
+
 class ProjetoAgent:
-    def __init__(self):
+    def __init__(self, indexer=None, templates_dir: Optional[str] = None):
         self.workspace = "/root/projetos"
+        # WorkspaceIndexer opcional: projetos e páginas criados entram no índice
+        self.indexer = indexer
+        # Templates em templates/<nome> (package.json, tsconfig.json, ... com {{ variaveis }})
+        self.templates = TemplateRegistry(templates_dir or TEMPLATES_DIR)
+        # Versões imutáveis dos arquivos estáticos: projetos novos usam reflink/hardlink em vez de cópia
+        self.store = TemplateStore()
+        # Lockfiles resolvidos e tarballs em cache; instalar no /projeto é opcional (leva segundos com cache frio)
+        self.pacotes = CachePacotes()
+        self.instalar_dependencias = os.getenv("PROJETO_INSTALAR_DEPENDENCIAS", "0") == "1"
+        # Preparações de dependências em segundo plano (referência até terminarem)
+        self._dependencias: Set[asyncio.Task] = set()
         logger.info(f"✓ Workspace configurado em {self.workspace}")
     
-    async def criar_projeto(self, nome_projeto: str, caminho_base: Optional[str] = None) -> Dict:
-        """Cria um novo projeto com a estrutura básica"""
+    def listar_templates(self) -> Dict:
+        """Lista os templates de projeto disponíveis"""
+        linhas = []
+        for nome in self.templates.listar():
+            try:
+                linhas.append(f"  - {nome}: {self.templates.get(nome).descricao}")
+            except TemplateError as e:
+                linhas.append(f"  - {nome}: ⚠️ {e}")
+        return {
+            "tipo": "sucesso",
+            "resposta": "📦 Templates disponíveis:\n" + "\n".join(linhas) if linhas else "❌ Nenhum template encontrado"
+        }
+    
+    async def criar_projeto(self, nome_projeto: str, caminho_base: Optional[str] = None,
+                            template: str = TEMPLATE_PADRAO) -> Dict:
+        """Cria um novo projeto a partir de um template"""
         try:
             # Define o caminho do projeto
             if caminho_base:
@@ -19,67 +50,34 @@ class ProjetoAgent:
             
             caminho_projeto = os.path.join(self.workspace, nome_projeto)
             
-            # Cria a estrutura de diretórios
-            os.makedirs(caminho_projeto, exist_ok=True)
-            os.makedirs(os.path.join(caminho_projeto, "src"), exist_ok=True)
-            os.makedirs(os.path.join(caminho_projeto, "src", "components"), exist_ok=True)
-            os.makedirs(os.path.join(caminho_projeto, "src", "pages"), exist_ok=True)
-            os.makedirs(os.path.join(caminho_projeto, "src", "services"), exist_ok=True)
-            os.makedirs(os.path.join(caminho_projeto, "src", "types"), exist_ok=True)
-            
-            # Cria arquivo package.json básico
-            package_json = {
-                "name": nome_projeto,
-                "version": "1.0.0",
-                "private": True,
-                "dependencies": {
-                    "react": "^18.2.0",
-                    "react-dom": "^18.2.0",
-                    "typescript": "^4.9.5"
-                }
-            }
-            
-            with open(os.path.join(caminho_projeto, "package.json"), "w") as f:
-                import json
-                json.dump(package_json, f, indent=2)
+            # Renderiza e grava em paralelo fora do event loop
+            manifesto = await asyncio.to_thread(
+                gerar, self.templates.get(template), caminho_projeto, {"nome_projeto": nome_projeto},
+                store=self.store
+            )
             
-            # Cria arquivo tsconfig.json básico
-            tsconfig_json = {
-                "compilerOptions": {
-                    "target": "es5",
-                    "lib": ["dom", "dom.iterable", "esnext"],
-                    "allowJs": True,
-                    "skipLibCheck": True,
-                    "esModuleInterop": True,
-                    "allowSyntheticDefaultImports": True,
-                    "strict": True,
-                    "forceConsistentCasingInFileNames": True,
-                    "noFallthroughCasesInSwitch": True,
-                    "module": "esnext",
-                    "moduleResolution": "node",
-                    "resolveJsonModule": True,
-                    "isolatedModules": True,
-                    "noEmit": True,
-                    "jsx": "react-jsx"
-                },
-                "include": ["src"]
-            }
+            dependencias = ""
+            if any(a["caminho"] == "package.json" for a in manifesto["arquivos"]):
+                # Resolver o lockfile pode ir à rede (até 30 s, ou o timeout inteiro offline):
+                # roda depois da resposta em vez de segurar o /projeto
+                tarefa = asyncio.create_task(self._preparar_dependencias(caminho_projeto))
+                self._dependencias.add(tarefa)
+                tarefa.add_done_callback(self._dependencias.discard)
+                dependencias = "\n🔒 package-lock.json sendo preparado em segundo plano"
             
-            with open(os.path.join(caminho_projeto, "tsconfig.json"), "w") as f:
-                json.dump(tsconfig_json, f, indent=2)
+            if self.indexer:
+                self.indexer.registrar_projeto(caminho_projeto)
+            compartilhados = sum(1 for a in manifesto["arquivos"] if a["forma"] in ("reflink", "hardlink"))
             
             return {
                 "tipo": "sucesso",
                 "resposta": f"✅ Projeto {nome_projeto} criado com sucesso em {caminho_projeto}\n" + \
-                           f"📁 Estrutura criada:\n" + \
-                           f"  - /src\n" + \
-                           f"    - /components\n" + \
-                           f"    - /pages\n" + \
-                           f"    - /services\n" + \
-                           f"    - /types\n" + \
-                           f"📝 Arquivos de configuração criados:\n" + \
-                           f"  - package.json\n" + \
-                           f"  - tsconfig.json"
+                           f"📁 Estrutura criada ({template}):\n" + \
+                           f"{arvore(manifesto)}\n" + \
+                           f"📝 {len(manifesto['arquivos'])} arquivos em {manifesto['segundos'] * 1000:.0f} ms" + \
+                           (f" ({compartilhados} compartilhados com o template)" if compartilhados else "") + \
+                           dependencias,
+                "manifesto": manifesto
             }
             
         except Exception as e:
@@ -89,6 +87,20 @@ class ProjetoAgent:
                 "resposta": f"❌ Erro ao criar projeto: {str(e)}"
             }
     
+    async def _preparar_dependencias(self, caminho_projeto: str) -> None:
+        """package-lock.json pré-resolvido (e node_modules, se configurado); falha aqui não desfaz o projeto"""
+        try:
+            resultado = await asyncio.to_thread(
+                self.pacotes.preparar_projeto, caminho_projeto, self.instalar_dependencias
+            )
+        except Exception as e:
+            logger.warning(f"Dependências de {caminho_projeto} não resolvidas: {e}")
+            return
+        linha = f"package-lock.json de {caminho_projeto} com {resultado['pacotes']} pacotes"
+        if "instalacao" in resultado:
+            linha += f", node_modules instalado em {resultado['instalacao']['segundos']}s"
+        logger.info(linha)
+    
     async def criar_pagina(self, nome_projeto: str, nome_pagina: str) -> Dict:
         """Cria uma nova página no projeto"""
         try:
@@ -103,31 +115,20 @@ class ProjetoAgent:
                     "resposta": f"❌ Projeto {nome_projeto} não encontrado"
                 }
             
-            # Cria o diretório da página
-            os.makedirs(caminho_pagina, exist_ok=True)
-            
-            # Cria o arquivo index.tsx
-            conteudo_index = f"""import React from 'react';
-
-const {nome_pagina}: React.FC = () => {{
-  return (
-    <div className="container mx-auto p-4">
-      <h1 className="text-2xl font-bold mb-4">{nome_pagina}</h1>
-    </div>
-  );
-}};
-
-export default {nome_pagina};
-"""
+            manifesto = await asyncio.to_thread(
+                gerar, self.templates.get("pagina-react"), caminho_projeto, {"nome_pagina": nome_pagina},
+                store=self.store
+            )
             
-            with open(os.path.join(caminho_pagina, "index.tsx"), "w") as f:
-                f.write(conteudo_index)
+            if self.indexer:
+                self.indexer.agendar(caminho_pagina)
             
             return {
                 "tipo": "sucesso",
                 "resposta": f"✅ Página {nome_pagina} criada em {caminho_pagina}\n" + \
                            f"📝 Arquivos criados:\n" + \
-                           f"  - index.tsx"
+                           "\n".join(f"  - {os.path.relpath(os.path.join(caminho_projeto, a['caminho']), caminho_pagina)}"
+                                     for a in manifesto["arquivos"])
             }
             
         except Exception as e:
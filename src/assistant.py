@@ -6,41 +6,42 @@ from datetime import datetime
 import pytz
 from dotenv import load_dotenv
 import sys
-import threading
-import time
-import re
-import unicodedata
+import uuid
+from prompt_toolkit import PromptSession
 
 from .chat import ChatAssistant, ChatError
 from .config import COLORS
+from . import render
 from .database import Database
 
 class LoadingAnimation:
+    """Spinner como task do asyncio, no mesmo loop que recebe a resposta"""
+
     def __init__(self, message: str = "Processando"):
-        self.is_running = False
-        self.thread = None
+        self.task: Optional[asyncio.Task] = None
         self.frames = [
             "⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"
         ]
         self.current_frame = 0
         self.message = message
 
-    def animate(self):
-        while self.is_running:
+    async def animate(self):
+        while True:
             sys.stdout.write(f"\r{COLORS.BLUE}{self.message} {self.frames[self.current_frame]}{COLORS.RESET}")
             sys.stdout.flush()
             self.current_frame = (self.current_frame + 1) % len(self.frames)
-            time.sleep(0.1)
+            await asyncio.sleep(0.1)
 
     def start(self):
-        self.is_running = True
-        self.thread = threading.Thread(target=self.animate)
-        self.thread.start()
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.animate())
 
     def stop(self):
-        self.is_running = False
-        if self.thread:
-            self.thread.join()
+        if self.task is None:
+            return
+        # Cancelar basta: o frame só é escrito entre dois awaits
+        self.task.cancel()
+        self.task = None
         sys.stdout.write("\r\033[K")  # Limpa a linha
         sys.stdout.flush()
 
@@ -50,6 +51,7 @@ class Assistant:
         self.db = Database()
         self.running = True
         self.loading = LoadingAnimation()
+        self.session = PromptSession()
         signal.signal(signal.SIGINT, self.signal_handler)
     
     def signal_handler(self, signum, frame):
@@ -58,96 +60,39 @@ class Assistant:
     
     def strip_ansi(self, text: str) -> str:
         """Remove códigos ANSI de uma string"""
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        return ansi_escape.sub('', text)
+        return render.strip_ansi(text)
     
     def get_string_width(self, text: str) -> int:
         """Calcula a largura visual de uma string, considerando emojis e caracteres especiais"""
-        width = 0
-        text = self.strip_ansi(text)
-        
-        i = 0
-        while i < len(text):
-            # Pega o caractere atual
-            char = text[i]
-            
-            # Verifica se é um emoji (surrogate pair)
-            if ord(char) >= 0x1F000:
-                width += 2
-                i += 2 if i + 1 < len(text) and 0xD800 <= ord(text[i]) <= 0xDBFF else 1
-            # Verifica se é um caractere de largura dupla
-            elif unicodedata.east_asian_width(char) in ['F', 'W']:
-                width += 2
-                i += 1
-            # Caractere normal
-            else:
-                width += 1
-                i += 1
-        
-        return width
+        return render.string_width(text)
     
     def create_box(self, text: str, color: str = COLORS.GREEN, width: int = 50) -> str:
-        # Divide o texto em linhas
-        lines = text.split("\n")
-        formatted_lines = []
-        
-        for line in lines:
-            current_line = line
-            while self.get_string_width(current_line) > width - 4:  # -4 para os caracteres ║ e espaços
-                # Encontra o último espaço antes do limite
-                visible_text = self.strip_ansi(current_line)
-                test_width = 0
-                split_point = 0
-                
-                for i, char in enumerate(visible_text):
-                    if char == " ":
-                        last_space = i
-                    
-                    char_width = 2 if ord(char) >= 0x1F000 or unicodedata.east_asian_width(char) in ['F', 'W'] else 1
-                    test_width += char_width
-                    
-                    if test_width > width - 4:
-                        split_point = last_space if 'last_space' in locals() else i
-                        break
-                
-                # Divide a linha mantendo os códigos ANSI
-                formatted_lines.append(current_line[:split_point])
-                current_line = current_line[split_point:].lstrip()
-            
-            if current_line:
-                formatted_lines.append(current_line)
-
-        # Cria o box
-        box_top = f"{color}╔{'═' * (width-2)}╗{COLORS.RESET}"
-        box_bottom = f"{color}╚{'═' * (width-2)}╝{COLORS.RESET}"
-        box_content = []
-        
-        for line in formatted_lines:
-            # Calcula o padding baseado na largura visual do texto
-            visible_width = self.get_string_width(line)
-            padding = width - 4 - visible_width  # -4 para os caracteres ║ e espaços
-            box_content.append(f"{color}║{COLORS.RESET} {line}{' ' * padding} {color}║{COLORS.RESET}")
-        
-        return "\n".join([box_top] + box_content + [box_bottom])
+        return render.create_box(text, color, width)
+    
+    def print_box(self, text: str, color: str = COLORS.GREEN, width: int = 50):
+        """Escreve o box linha a linha, sem montar a string inteira"""
+        render.print_box(text, color, width)
     
     def print_welcome(self):
-        print(self.create_box("Bem-vindo ao Chat IA", COLORS.GREEN, 40))
+        self.print_box("Bem-vindo ao Chat IA", COLORS.GREEN, 40)
     
     def print_menu(self):
         print("Escolha o provedor:\n")
         print("1. Groq")
         print("2. Deepseek\n")
     
-    def get_provider_choice(self) -> str:
+    async def get_provider_choice(self) -> str:
         while True:
             try:
-                choice = input("Opção (1-2): ").strip()
+                choice = (await self.session.prompt_async("Opção (1-2): ")).strip()
                 if choice == "1":
                     return "groq"
                 elif choice == "2":
                     return "deepseek"
                 else:
                     print("Opção inválida. Tente novamente.")
+            except (KeyboardInterrupt, EOFError):
+                raise
             except Exception as e:
                 print(f"Erro: {str(e)}")
     
@@ -186,10 +131,9 @@ class Assistant:
             return f"LLM: {self.chat.provider.upper()} | Modelo: {self.chat.model}"
         return ""
 
-    def get_user_input(self) -> str:
-        sys.stdout.write("Você: ")
-        sys.stdout.flush()
-        return input().strip()
+    async def get_user_input(self) -> str:
+        # Prompt assíncrono: o loop continua livre enquanto o usuário digita
+        return (await self.session.prompt_async("Você: ")).strip()
     
     async def handle_restore(self, message_id: str):
         # Cria um loading específico para restauração
@@ -214,7 +158,7 @@ class Assistant:
                         f"{COLORS.LIGHT_BLACK}Estado restaurado até:{COLORS.RESET}",
                         last_message["content"]
                     ]
-                    print(self.create_box("\n".join(restored_message), COLORS.YELLOW))
+                    self.print_box("\n".join(restored_message), COLORS.YELLOW)
             else:
                 print(f"\nErro: Checkpoint {message_id} não encontrado")
         except Exception as e:
@@ -247,18 +191,53 @@ class Assistant:
             loading.stop()
             print(f"\nErro ao listar checkpoints: {str(e)}")
     
+    async def stream_reply(self):
+        """Mostra a resposta da IA à medida que os tokens chegam"""
+        ai_message_id = str(uuid.uuid4())
+        box = render.BoxStreamer(COLORS.BLUE)
+        
+        def cabecalho():
+            box.escrever("\n".join([
+                f"{COLORS.LIGHT_BLACK}ID: {ai_message_id}{COLORS.RESET}",
+                f"{COLORS.LIGHT_BLACK}{self.format_timestamp()}{COLORS.RESET}",
+                f"{COLORS.LIGHT_BLACK}{self.get_model_info()}{COLORS.RESET}",
+                ""
+            ]))
+        
+        # O spinner só aparece até o primeiro token
+        self.loading.start()
+        try:
+            async for fragment in self.chat.stream_response(ai_message_id):
+                if self.loading.task is not None:
+                    self.loading.stop()
+                    cabecalho()
+                box.escrever(fragment)
+            if not box.aberto:
+                # Stream terminou sem nenhum fragmento: mostra a resposta vazia em vez de nada
+                self.loading.stop()
+                cabecalho()
+                box.escrever(f"{COLORS.LIGHT_BLACK}(o modelo não retornou texto){COLORS.RESET}")
+        finally:
+            self.loading.stop()
+            if box.aberto:
+                box.fechar()
+    
     async def run(self):
         try:
             self.print_welcome()
             self.print_menu()
             
-            provider = self.get_provider_choice()
+            provider = await self.get_provider_choice()
             await self.initialize(provider)
             
             while self.running:
                 try:
                     print()  # Linha em branco para separar mensagens
-                    user_input = self.get_user_input()
+                    try:
+                        user_input = await self.get_user_input()
+                    except (KeyboardInterrupt, EOFError):
+                        print("\nEncerrando...")
+                        break
                     
                     if not user_input:
                         continue
@@ -290,57 +269,30 @@ class Assistant:
                         f"{COLORS.LIGHT_BLACK}{self.format_timestamp()}{COLORS.RESET}",
                         f"Você: {user_input}"
                     ]
-                    print(self.create_box("\n".join(user_message), COLORS.GREEN))
+                    self.print_box("\n".join(user_message), COLORS.GREEN)
                     print()  # Linha em branco após a mensagem do usuário
                     
                     # Salva mensagens após input do usuário
                     await self.db.save_messages(self.chat.messages)
                     
-                    # Inicia animação de loading
-                    self.loading.start()
+                    await self.stream_reply()
                     
-                    try:
-                        # Obtém resposta da IA
-                        response = await self.chat.get_response()
-                        
-                        # Para a animação de loading
-                        self.loading.stop()
-                        
-                        # Pega o ID da última mensagem (resposta da IA)
-                        ai_message_id = self.chat.messages[-1]["id"]
-                        
-                        # Cria mensagem completa com ID, timestamp, modelo e resposta
-                        ai_message = [
-                            f"{COLORS.LIGHT_BLACK}ID: {ai_message_id}{COLORS.RESET}",
-                            f"{COLORS.LIGHT_BLACK}{self.format_timestamp()}{COLORS.RESET}",
-                            f"{COLORS.LIGHT_BLACK}{self.get_model_info()}{COLORS.RESET}",
-                            response
-                        ]
-                        
-                        # Mostra box com todas as informações
-                        print(self.create_box("\n".join(ai_message), COLORS.BLUE))
-                        
-                        # Salva mensagens após resposta da IA
-                        await self.db.save_messages(self.chat.messages)
-                        
-                    except Exception as e:
-                        # Para a animação de loading em caso de erro
-                        self.loading.stop()
-                        raise e
+                    # Salva mensagens após resposta da IA
+                    await self.db.save_messages(self.chat.messages)
                     
                 except ChatError as e:
                     error_message = [
                         f"{COLORS.LIGHT_BLACK}{self.format_timestamp()}{COLORS.RESET}",
                         f"Erro: {str(e)}"
                     ]
-                    print(self.create_box("\n".join(error_message), COLORS.RED))
+                    self.print_box("\n".join(error_message), COLORS.RED)
                 
                 except Exception as e:
                     error_message = [
                         f"{COLORS.LIGHT_BLACK}{self.format_timestamp()}{COLORS.RESET}",
                         f"Erro inesperado: {str(e)}"
                     ]
-                    print(self.create_box("\n".join(error_message), COLORS.RED))
+                    self.print_box("\n".join(error_message), COLORS.RED)
             
         except Exception as e:
             print(f"Erro fatal: {str(e)}")
@@ -0,0 +1,505 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos dos pedaços (FastCDC): média de 64 KiB, entre 16 KiB e 256 KiB
+TAMANHO_MINIMO = 16 * 1024
+TAMANHO_MEDIO = 64 * 1024
+TAMANHO_MAXIMO = 256 * 1024
+BLOCO_LEITURA = 8 * 1024 * 1024
+NIVEL_COMPRESSAO = 3
+
+_M32 = 0xFFFFFFFF
+# Tabela "gear" fixa: mudar estes valores muda os cortes e quebra a deduplicação
+_GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big") for i in range(256)]
+# Hash gear de 32 bits: os bits altos dependem só dos últimos 32 bytes, então o
+# valor numa posição não depende de onde o pedaço começou (e pode ser calculado
+# para o buffer inteiro de uma vez com numpy). Normalização do FastCDC: máscara
+# mais difícil antes do tamanho médio e mais fácil depois.
+_JANELA = 32
+_BITS_MEDIO = TAMANHO_MEDIO.bit_length() - 1
+_MASCARA_DIFICIL = ((1 << (_BITS_MEDIO + 2)) - 1) << (32 - _BITS_MEDIO - 2)
+_MASCARA_FACIL = ((1 << (_BITS_MEDIO - 2)) - 1) << (32 - _BITS_MEDIO + 2)
+
+try:
+    import numpy as np
+    _GEAR_NP = np.array(_GEAR, dtype=np.uint32)
+except ImportError:  # sem numpy os cortes são calculados byte a byte
+    np = None
+
+_SQLITE_CABECALHO = b"SQLite format 3\x00"
+# Arquivos auxiliares do SQLite: o conteúdo entra pela cópia feita com a API de backup
+_SUFIXOS_SQLITE = ("-wal", "-shm", "-journal")
+
+
+class _CortadorPython:
+    """Procura os cortes byte a byte (mesmo resultado do _CortadorNumpy)"""
+
+    def __init__(self, dados: bytes):
+        self.dados = dados
+
+    def corte(self, inicio: int, fim_dados: int) -> int:
+        restante = fim_dados - inicio
+        if restante <= TAMANHO_MINIMO:
+            return fim_dados
+        fim_medio = inicio + min(TAMANHO_MEDIO, restante)
+        fim = inicio + min(TAMANHO_MAXIMO, restante)
+        dados, gear, dificil, facil = self.dados, _GEAR, _MASCARA_DIFICIL, _MASCARA_FACIL
+
+        # Os primeiros TAMANHO_MINIMO bytes nunca são corte; só a janela antes
+        # da primeira posição candidata precisa entrar no hash
+        h = 0
+        for i in range(inicio + TAMANHO_MINIMO - _JANELA + 1, inicio + TAMANHO_MINIMO):
+            h = ((h << 1) + gear[dados[i]]) & _M32
+        i = inicio + TAMANHO_MINIMO
+        while i < fim_medio:
+            h = ((h << 1) + gear[dados[i]]) & _M32
+            i += 1
+            if not h & dificil:
+                return i
+        while i < fim:
+            h = ((h << 1) + gear[dados[i]]) & _M32
+            i += 1
+            if not h & facil:
+                return i
+        return fim
+
+
+class _CortadorNumpy:
+    """Calcula o hash de todas as posições do buffer de uma vez e busca os cortes por bisseção"""
+
+    def __init__(self, dados: bytes):
+        # h[i] = soma de gear[dados[i - j]] << j para j < 32, por duplicação da
+        # janela (2, 4, 8, 16, 32 bytes): 5 passadas em vez de 31
+        h = _GEAR_NP[np.frombuffer(dados, dtype=np.uint8)]
+        janela = 1
+        while janela < _JANELA:
+            anterior = h.copy()
+            h[janela:] += anterior[:len(h) - janela] << np.uint32(janela)
+            janela *= 2
+        self.dificeis = np.flatnonzero((h & np.uint32(_MASCARA_DIFICIL)) == 0)
+        self.faceis = np.flatnonzero((h & np.uint32(_MASCARA_FACIL)) == 0)
+
+    @staticmethod
+    def _primeiro(candidatos, de: int, ate: int) -> Optional[int]:
+        k = int(np.searchsorted(candidatos, de))
+        if k < len(candidatos) and candidatos[k] < ate:
+            return int(candidatos[k]) + 1
+        return None
+
+    def corte(self, inicio: int, fim_dados: int) -> int:
+        restante = fim_dados - inicio
+        if restante <= TAMANHO_MINIMO:
+            return fim_dados
+        fim_medio = inicio + min(TAMANHO_MEDIO, restante)
+        fim = inicio + min(TAMANHO_MAXIMO, restante)
+        corte = self._primeiro(self.dificeis, inicio + TAMANHO_MINIMO, fim_medio)
+        if corte is None:
+            corte = self._primeiro(self.faceis, fim_medio, fim)
+        return corte or fim
+
+
+_Cortador = _CortadorNumpy if np is not None else _CortadorPython
+
+
+def pedacos_arquivo(caminho: Path) -> Iterator[bytes]:
+    """Divide um arquivo em pedaços definidos pelo conteúdo (FastCDC, lido em blocos)"""
+    with open(caminho, "rb") as f:
+        buffer = b""
+        fim_arquivo = False
+        while True:
+            if not fim_arquivo and len(buffer) < TAMANHO_MAXIMO:
+                bloco = f.read(BLOCO_LEITURA)
+                fim_arquivo = not bloco
+                buffer += bloco
+                continue
+            if not buffer:
+                return
+            cortador = _Cortador(buffer)
+            inicio = 0
+            # Só corta enquanto houver um pedaço máximo inteiro à frente
+            while inicio < len(buffer) and (fim_arquivo or len(buffer) - inicio >= TAMANHO_MAXIMO):
+                corte = cortador.corte(inicio, len(buffer))
+                yield buffer[inicio:corte]
+                inicio = corte
+            buffer = buffer[inicio:]
+            if fim_arquivo and not buffer:
+                return
+
+
+def _eh_sqlite(caminho: Path) -> bool:
+    try:
+        with open(caminho, "rb") as f:
+            return f.read(16) == _SQLITE_CABECALHO
+    except OSError:
+        return False
+
+
+@contextmanager
+def _copia_consistente(caminho: Path):
+    """Cópia consistente de um banco SQLite aberto (inclui o que está no WAL)"""
+    descritor, temporario = tempfile.mkstemp(suffix=".sqlite")
+    os.close(descritor)
+    try:
+        origem = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=30)
+        destino = sqlite3.connect(temporario)
+        try:
+            origem.backup(destino)
+        finally:
+            destino.close()
+            origem.close()
+        yield Path(temporario)
+    finally:
+        os.unlink(temporario)
+
+
+class BackupStore:
+    """Repositório de backups deduplicados por pedaços definidos pelo conteúdo.
+
+    Os arquivos são cortados com FastCDC (os cortes dependem do conteúdo,
+    então uma inserção no meio do arquivo só muda os pedaços vizinhos) e
+    cada pedaço único é gravado uma vez, comprimido, em
+    pedacos/<hash[:2]>/<hash>. Um backup é só um manifesto em snapshots/
+    com a lista de pedaços de cada arquivo. Arquivos com mtime e tamanho
+    iguais aos do backup anterior reaproveitam a lista sem serem lidos.
+    """
+
+    def __init__(self, repositorio: Optional[str] = None,
+                 padrao: str = "/root/projetos/chat-ia-terminal/backups"):
+        # Caminho explícito (ex.: --repositorio) > BACKUP_DIR > padrão de quem chama
+        self.repositorio = Path(repositorio or os.getenv("BACKUP_DIR", padrao))
+        self.pedacos_dir = self.repositorio / "pedacos"
+        self.snapshots_dir = self.repositorio / "snapshots"
+        self.pedacos_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _trava(self):
+        """Impede create/prune simultâneos no mesmo repositório (inclusive de outros processos)"""
+        with open(self.repositorio / "trava", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Pedaços ---
+
+    def _caminho_pedaco(self, hash_pedaco: str) -> Path:
+        return self.pedacos_dir / hash_pedaco[:2] / hash_pedaco
+
+    def _gravar_pedaco(self, dados: bytes) -> Tuple[str, int]:
+        """Grava o pedaço se ainda não existir; retorna (hash, bytes gravados)"""
+        hash_pedaco = hashlib.sha256(dados).hexdigest()
+        destino = self._caminho_pedaco(hash_pedaco)
+        if destino.exists():
+            return hash_pedaco, 0
+        comprimido = zlib.compress(dados, NIVEL_COMPRESSAO)
+        # Dados já comprimidos ficam crus
+        conteudo = b"z" + comprimido if len(comprimido) < len(dados) else b"r" + dados
+        destino.parent.mkdir(exist_ok=True)
+        temporario = destino.with_suffix(".tmp")
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, destino)
+        return hash_pedaco, len(conteudo)
+
+    def _ler_pedaco(self, hash_pedaco: str) -> bytes:
+        with open(self._caminho_pedaco(hash_pedaco), "rb") as f:
+            conteudo = f.read()
+        dados = zlib.decompress(conteudo[1:]) if conteudo[:1] == b"z" else conteudo[1:]
+        if hashlib.sha256(dados).hexdigest() != hash_pedaco:
+            raise ValueError(f"Pedaço {hash_pedaco} corrompido")
+        return dados
+
+    # --- Snapshots ---
+
+    def _manifesto(self, snapshot_id: str) -> Dict:
+        caminho = self.snapshots_dir / f"{snapshot_id}.json"
+        if not caminho.exists():
+            raise FileNotFoundError(f"Backup {snapshot_id} não encontrado")
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _manifestos(self) -> Iterator[Dict]:
+        for caminho in self.snapshots_dir.glob("*.json"):
+            with open(caminho, "r", encoding="utf-8") as f:
+                yield json.load(f)
+
+    def listar(self, rotulo: Optional[str] = None) -> List[Dict]:
+        """Backups do mais antigo ao mais novo (sem a lista de arquivos)"""
+        resumos = []
+        for manifesto in self._manifestos():
+            if rotulo and manifesto["rotulo"] != rotulo:
+                continue
+            manifesto.pop("arquivos")
+            resumos.append(manifesto)
+        return sorted(resumos, key=lambda r: r["criado_em"])
+
+    def _ultimo(self, rotulo: str) -> Optional[Dict]:
+        candidatos = [m for m in self._manifestos() if m["rotulo"] == rotulo]
+        return max(candidatos, key=lambda m: m["criado_em"]) if candidatos else None
+
+    def _novo_id(self) -> str:
+        base = datetime.now().strftime("%Y%m%d_%H%M%S")
+        snapshot_id, n = base, 1
+        while (self.snapshots_dir / f"{snapshot_id}.json").exists():
+            n += 1
+            snapshot_id = f"{base}_{n}"
+        return snapshot_id
+
+    def _gravar_arquivo(self, origem: Path) -> Tuple[List[str], int, int]:
+        pedacos, tamanho, novos = [], 0, 0
+        for dados in pedacos_arquivo(origem):
+            hash_pedaco, gravados = self._gravar_pedaco(dados)
+            pedacos.append(hash_pedaco)
+            tamanho += len(dados)
+            novos += gravados
+        return pedacos, tamanho, novos
+
+    def criar(self, raizes: Dict[str, str], rotulo: str = "manual",
+              extras: Optional[Dict[str, bytes]] = None, ignorar: Tuple[str, ...] = ()) -> Dict:
+        """Cria um backup dos diretórios em `raizes` ({nome: caminho}).
+
+        `extras` são arquivos virtuais ({caminho: conteúdo}), por exemplo o
+        estado do sistema serializado. Caminhos em `ignorar` (absolutos)
+        ficam de fora, junto com o próprio repositório.
+        """
+        inicio = time.perf_counter()
+        ignorados = {Path(p).resolve() for p in ignorar} | {self.repositorio.resolve()}
+        with self._trava():
+            anterior = self._ultimo(rotulo)
+            conhecidos = {a["caminho"]: a for a in anterior["arquivos"]} if anterior else {}
+
+            arquivos, lidos, bytes_novos, total = [], 0, 0, 0
+            for nome, raiz in raizes.items():
+                raiz = Path(raiz)
+                if not raiz.exists():
+                    continue
+                for atual, dirs, nomes in os.walk(raiz):
+                    dirs[:] = sorted(d for d in dirs if Path(atual, d).resolve() not in ignorados)
+                    for nome_arquivo in sorted(nomes):
+                        origem = Path(atual) / nome_arquivo
+                        if nome_arquivo.endswith(_SUFIXOS_SQLITE) or origem.is_symlink() or origem.resolve() in ignorados:
+                            continue
+                        try:
+                            stat = origem.stat()
+                        except FileNotFoundError:
+                            continue
+                        caminho = f"{nome}/{origem.relative_to(raiz).as_posix()}"
+                        # Um WAL não vazio também entra na assinatura de um banco SQLite
+                        assinatura = [stat.st_mtime_ns, stat.st_size]
+                        try:
+                            wal_stat = Path(f"{origem}-wal").stat()
+                            if wal_stat.st_size:
+                                assinatura += [wal_stat.st_mtime_ns, wal_stat.st_size]
+                        except FileNotFoundError:
+                            pass
+
+                        conhecido = conhecidos.get(caminho)
+                        if conhecido and conhecido["assinatura"] == assinatura and \
+                                all(self._caminho_pedaco(h).exists() for h in conhecido["pedacos"]):
+                            arquivos.append(conhecido)
+                            total += conhecido["tamanho"]
+                            continue
+
+                        try:
+                            if _eh_sqlite(origem):
+                                with _copia_consistente(origem) as copia:
+                                    pedacos, tamanho, novos = self._gravar_arquivo(copia)
+                            else:
+                                pedacos, tamanho, novos = self._gravar_arquivo(origem)
+                        except (OSError, sqlite3.Error) as e:
+                            logger.warning(f"Arquivo {origem} fora do backup: {e}")
+                            continue
+                        lidos += 1
+                        bytes_novos += novos
+                        total += tamanho
+                        arquivos.append({"caminho": caminho, "modo": stat.st_mode & 0o7777,
+                                         "mtime_ns": stat.st_mtime_ns, "tamanho": tamanho,
+                                         "assinatura": assinatura, "pedacos": pedacos})
+
+            for caminho, conteudo in (extras or {}).items():
+                pedacos = []
+                for posicao in range(0, max(len(conteudo), 1), TAMANHO_MAXIMO):
+                    hash_pedaco, novos = self._gravar_pedaco(conteudo[posicao:posicao + TAMANHO_MAXIMO])
+                    pedacos.append(hash_pedaco)
+                    bytes_novos += novos
+                arquivos.append({"caminho": caminho, "modo": 0o644, "mtime_ns": time.time_ns(),
+                                 "tamanho": len(conteudo), "assinatura": None, "pedacos": pedacos})
+                total += len(conteudo)
+
+            manifesto = {
+                "id": self._novo_id(),
+                "rotulo": rotulo,
+                "criado_em": datetime.now().isoformat(),
+                "raizes": {nome: str(raiz) for nome, raiz in raizes.items()},
+                "total_arquivos": len(arquivos),
+                "total_bytes": total,
+                "arquivos_lidos": lidos,
+                "bytes_novos": bytes_novos,
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "arquivos": arquivos
+            }
+            destino = self.snapshots_dir / f"{manifesto['id']}.json"
+            temporario = destino.with_suffix(".tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(manifesto, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, destino)
+
+        logger.info(f"Backup {manifesto['id']} ({rotulo}): {len(arquivos)} arquivos, {lidos} lidos, "
+                    f"{bytes_novos} bytes novos em {manifesto['segundos']}s")
+        manifesto.pop("arquivos")
+        return manifesto
+
+    def ler(self, snapshot_id: str, caminho: str) -> bytes:
+        """Conteúdo de um arquivo de um backup"""
+        for arquivo in self._manifesto(snapshot_id)["arquivos"]:
+            if arquivo["caminho"] == caminho:
+                return b"".join(self._ler_pedaco(h) for h in arquivo["pedacos"])
+        raise FileNotFoundError(f"{caminho} não está no backup {snapshot_id}")
+
+    def restaurar(self, snapshot_id: str, destino: str, prefixo: str = "") -> Dict:
+        """Restaura os arquivos do backup (opcionalmente só os sob `prefixo`) em `destino`"""
+        destino = Path(destino)
+        restaurados = 0
+        for arquivo in self._manifesto(snapshot_id)["arquivos"]:
+            if prefixo and not arquivo["caminho"].startswith(prefixo):
+                continue
+            alvo = destino / arquivo["caminho"]
+            alvo.parent.mkdir(parents=True, exist_ok=True)
+            temporario = alvo.with_name(f".{alvo.name}.restaurando")
+            with open(temporario, "wb") as f:
+                for hash_pedaco in arquivo["pedacos"]:
+                    f.write(self._ler_pedaco(hash_pedaco))
+            os.chmod(temporario, arquivo["modo"])
+            os.utime(temporario, ns=(arquivo["mtime_ns"], arquivo["mtime_ns"]))
+            os.replace(temporario, alvo)
+            restaurados += 1
+        return {"id": snapshot_id, "destino": str(destino), "arquivos": restaurados}
+
+    def verificar(self, snapshot_id: Optional[str] = None, ler_dados: bool = True) -> Dict:
+        """Confere se os pedaços dos backups existem (e, com `ler_dados`, se o hash bate)"""
+        ids = [snapshot_id] if snapshot_id else [s["id"] for s in self.listar()]
+        verificados, problemas = set(), []
+        for atual in ids:
+            for arquivo in self._manifesto(atual)["arquivos"]:
+                for hash_pedaco in arquivo["pedacos"]:
+                    if hash_pedaco in verificados:
+                        continue
+                    verificados.add(hash_pedaco)
+                    try:
+                        if ler_dados:
+                            self._ler_pedaco(hash_pedaco)
+                        elif not self._caminho_pedaco(hash_pedaco).exists():
+                            raise FileNotFoundError(hash_pedaco)
+                    except (OSError, ValueError, zlib.error) as e:
+                        problemas.append(f"{atual}: {arquivo['caminho']}: {e}")
+        return {"backups": len(ids), "pedacos": len(verificados), "problemas": problemas}
+
+    def podar(self, manter_ultimos: int = 7, manter_diarios: int = 7, manter_semanais: int = 4) -> Dict:
+        """Remove backups fora da política de retenção (por rótulo) e os pedaços órfãos"""
+        with self._trava():
+            por_rotulo: Dict[str, List[Dict]] = {}
+            for resumo in self.listar():
+                por_rotulo.setdefault(resumo["rotulo"], []).append(resumo)
+
+            removidos = []
+            for resumos in por_rotulo.values():
+                resumos.sort(key=lambda r: r["criado_em"], reverse=True)
+                manter = {r["id"] for r in resumos[:manter_ultimos]}
+                agora = datetime.now()
+                for dias, quantidade, chave in ((1, manter_diarios, "%Y-%m-%d"), (7, manter_semanais, "%G-%V")):
+                    limite = agora - timedelta(days=dias * quantidade)
+                    periodos = set()
+                    for resumo in resumos:
+                        criado = datetime.fromisoformat(resumo["criado_em"])
+                        periodo = criado.strftime(chave)
+                        if criado >= limite and periodo not in periodos:
+                            periodos.add(periodo)
+                            manter.add(resumo["id"])
+                for resumo in resumos:
+                    if resumo["id"] not in manter:
+                        (self.snapshots_dir / f"{resumo['id']}.json").unlink()
+                        removidos.append(resumo["id"])
+
+            # Marca e varre: apaga os pedaços que nenhum backup restante usa
+            usados = set()
+            for manifesto in self._manifestos():
+                for arquivo in manifesto["arquivos"]:
+                    usados.update(arquivo["pedacos"])
+            pedacos_removidos = liberados = 0
+            for caminho in self.pedacos_dir.glob("*/*"):
+                if caminho.name not in usados:
+                    liberados += caminho.stat().st_size
+                    caminho.unlink()
+                    pedacos_removidos += 1
+
+        logger.info(f"Poda de backups: {len(removidos)} backups e {pedacos_removidos} pedaços removidos")
+        return {"backups_removidos": removidos, "pedacos_removidos": pedacos_removidos, "bytes_liberados": liberados}
+
+    def tamanho(self) -> int:
+        return sum(f.stat().st_size for f in self.repositorio.rglob("*") if f.is_file())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia backup", description="Backups deduplicados de data/ e config/")
+    parser.add_argument("--repositorio", help="Padrão: $BACKUP_DIR ou /root/projetos/chat-ia-terminal/backups")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    criar = sub.add_parser("create", help="Cria um backup")
+    criar.add_argument("diretorios", nargs="*", default=["/root/projetos/chat-ia-terminal/data",
+                                                         "/root/projetos/chat-ia-terminal/config"])
+    criar.add_argument("--rotulo", default="manual")
+    sub.add_parser("list", help="Lista os backups")
+    restaurar = sub.add_parser("restore", help="Restaura um backup num diretório")
+    restaurar.add_argument("id")
+    restaurar.add_argument("destino")
+    verificar = sub.add_parser("verify", help="Verifica a integridade dos backups")
+    verificar.add_argument("id", nargs="?")
+    podar = sub.add_parser("prune", help="Aplica a retenção e remove pedaços órfãos")
+    podar.add_argument("--ultimos", type=int, default=7)
+    podar.add_argument("--diarios", type=int, default=7)
+    podar.add_argument("--semanais", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    store = BackupStore(args.repositorio)
+    if args.comando == "create":
+        resumo = store.criar({Path(d).name: d for d in args.diretorios}, rotulo=args.rotulo)
+        print(f"Backup {resumo['id']}: {resumo['total_arquivos']} arquivos ({resumo['total_bytes'] / 1024 / 1024:.1f} MB), "
+              f"{resumo['arquivos_lidos']} lidos, {resumo['bytes_novos'] / 1024:.0f} KB novos em {resumo['segundos']}s")
+    elif args.comando == "list":
+        for resumo in store.listar():
+            print(f"{resumo['id']}  {resumo['rotulo']:<8} {resumo['total_arquivos']:>6} arquivos  "
+                  f"{resumo['total_bytes'] / 1024 / 1024:8.1f} MB  +{resumo['bytes_novos'] / 1024:.0f} KB")
+        print(f"Repositório: {store.tamanho() / 1024 / 1024:.1f} MB")
+    elif args.comando == "restore":
+        resultado = store.restaurar(args.id, args.destino)
+        print(f"{resultado['arquivos']} arquivos restaurados em {resultado['destino']}")
+    elif args.comando == "verify":
+        resultado = store.verificar(args.id)
+        print(f"{resultado['backups']} backups, {resultado['pedacos']} pedaços verificados")
+        for problema in resultado["problemas"]:
+            print(f"  ❌ {problema}")
+    elif args.comando == "prune":
+        resultado = store.podar(args.ultimos, args.diarios, args.semanais)
+        print(f"{len(resultado['backups_removidos'])} backups e {resultado['pedacos_removidos']} pedaços removidos "
+              f"({resultado['bytes_liberados'] / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,10 +24,17 @@ class Bot:
         """Comando /help"""
         await update.message.reply_text(
             "🤖 Aqui estão os comandos disponíveis:\n\n" + \
-            "/projeto - Cria um novo projeto\n" + \
-            "/cd <caminho> - Navega entre diretórios\n" + \
-            "/touch <arquivo> - Cria um arquivo\n" + \
-            "/mkdir <diretório> - Cria um diretório\n\n" + \
+            "/projeto [template] - Cria um novo projeto (/cancelar desiste)\n" + \
+            "/cd [caminho] - Navega entre diretórios (sugere caminhos parecidos)\n" + \
+            "/touch [-p] <arquivo...> - Cria um ou mais arquivos (-p cria as pastas)\n" + \
+            "/mkdir <diretório...> - Cria um ou mais diretórios\n" + \
+            "/mv <origem...> <destino> - Move arquivos ou diretórios\n" + \
+            "/cp <origem...> <destino> - Copia arquivos ou diretórios\n" + \
+            "/rm [-r] <caminho...> - Remove arquivos ou diretórios\n" + \
+            "/exec <comando> - Executa um comando de shell (pede confirmação)\n" + \
+            "/cancelar [id] - Cancela um comando em execução\n" + \
+            "/branch [-c] [nome] - Lista, troca ou cria (-c) branches do git\n" + \
+            "/status, /log [n], /diff - Estado, histórico e diferenças do repositório\n\n" + \
             "Você também pode conversar normalmente comigo para tirar dúvidas!"
         )
     
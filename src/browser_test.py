@@ -1,5 +1,4 @@
 from typing import Optional, List, Dict
-from playwright.sync_api import sync_playwright
 from pathlib import Path
 import json
 from datetime import datetime
@@ -48,6 +47,7 @@ class BrowserTest:
         }
         
         try:
+            from playwright.sync_api import sync_playwright
             with sync_playwright() as p:
                 # Inicia o navegador
                 browser = p.chromium.launch()
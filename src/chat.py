@@ -1,13 +1,18 @@
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
 from datetime import datetime
 import uuid
 import json
 from pathlib import Path
-from groq import Groq
-from openai import OpenAI
+
+from .search import MessageIndex
 
 DATA_DIR = Path("/root/projetos/chat-ia-terminal/data")
 
+MODELOS = {
+    "groq": "mixtral-8x7b-32768",
+    "deepseek": "deepseek-chat"
+}
+
 class ChatError(Exception):
     pass
 
@@ -15,8 +20,11 @@ class ChatAssistant:
     def __init__(self, api_key: str, provider: str):
         self.api_key = api_key
         self.provider = provider
+        self.model = MODELOS.get(provider, MODELOS["deepseek"])
+        self._async_client = None
         self.messages_file = DATA_DIR / "messages.json"
         self.messages: List[Dict] = []
+        self.search_index = MessageIndex(DATA_DIR / "search.db")
         self._load_messages()
     
     def _load_messages(self):
@@ -24,6 +32,9 @@ class ChatAssistant:
             if self.messages_file.exists():
                 with open(self.messages_file, "r", encoding="utf-8") as f:
                     self.messages = json.load(f)
+                # Indexa o histórico anterior ao índice de busca (uma vez só)
+                if self.search_index.count("terminal") < len(self.messages):
+                    self.search_index.add_many(self.messages, chat_id="terminal")
         except Exception as e:
             print(f"Erro ao carregar mensagens: {str(e)}")
             self.messages = []
@@ -36,27 +47,92 @@ class ChatAssistant:
         except Exception as e:
             print(f"Erro ao salvar mensagens: {str(e)}")
     
-    def add_message(self, role: str, content: str):
+    def add_message(self, role: str, content: str, message_id: Optional[str] = None) -> str:
         message = {
-            "id": str(uuid.uuid4()),
+            "id": message_id or str(uuid.uuid4()),
             "role": role,
             "content": content,
             "timestamp": datetime.now().isoformat()
         }
         self.messages.append(message)
         self._save_messages()
+        try:
+            self.search_index.add(content, role, chat_id="terminal",
+                                  timestamp=message["timestamp"], message_id=message["id"])
+        except Exception as e:
+            print(f"Erro ao indexar mensagem: {str(e)}")
+        return message["id"]
+    
+    def clear_messages(self):
+        self.messages = []
+        self._save_messages()
+    
+    def _get_async_client(self):
+        """Cliente assíncrono, criado uma vez e reaproveitado entre respostas"""
+        if self._async_client is None:
+            # Só o SDK do provedor em uso é importado (cada um leva centenas de ms)
+            if self.provider == "groq":
+                from groq import AsyncGroq
+                self._async_client = AsyncGroq(api_key=self.api_key)
+            else:  # deepseek
+                from openai import AsyncOpenAI
+                self._async_client = AsyncOpenAI(api_key=self.api_key, base_url="https://api.deepseek.com/v1")
+        return self._async_client
+    
+    def _history(self) -> List[Dict]:
+        return [{"role": m["role"], "content": m["content"]} for m in self.messages]
+    
+    async def get_response(self) -> str:
+        """Gera a resposta para o histórico atual de uma vez"""
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                model=self.model,
+                messages=self._history()
+            )
+        except Exception as e:
+            raise ChatError(f"Erro ao processar mensagem: {str(e)}")
+        
+        assistant_message = response.choices[0].message.content
+        self.add_message("assistant", assistant_message)
+        return assistant_message
+    
+    async def stream_response(self, message_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Gera a resposta em fragmentos, à medida que o provedor envia os tokens.
+        
+        A mensagem completa só entra no histórico no fim do stream.
+        """
+        parts = []
+        try:
+            stream = await self._get_async_client().chat.completions.create(
+                model=self.model,
+                messages=self._history(),
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            raise ChatError(f"Erro ao processar mensagem: {str(e)}")
+        
+        self.add_message("assistant", "".join(parts), message_id)
     
     async def async_chat(self, message: str) -> str:
         try:
             self.add_message("user", message)
             
             if self.provider == "groq":
+                from groq import Groq
                 client = Groq(api_key=self.api_key)
                 response = client.chat.completions.create(
                     model="mixtral-8x7b-32768",
                     messages=[{"role": "user", "content": message}]
                 )
             else:  # deepseek
+                from openai import OpenAI
                 client = OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com/v1")
                 response = client.chat.completions.create(
                     model="deepseek-chat",
@@ -0,0 +1,228 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Deltas seguidos até gravar um snapshot completo (limita o replay na restauração)
+MAX_CADEIA = 16
+# Grava completo quando o delta passa dessa fração do snapshot
+FRACAO_MAXIMA_DELTA = 0.5
+NIVEL_COMPRESSAO = 6
+
+
+def _serializar(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def calcular_delta(antigo: Any, novo: Any) -> Dict:
+    """Delta estrutural entre dois valores JSON.
+
+    Dicionários guardam só as chaves alteradas ("d") e removidas ("r");
+    listas guardam o tamanho do prefixo comum ("p") e o que vem depois
+    ("a"), o caso típico de um histórico que só cresce. O resto é
+    substituído inteiro ("v").
+    """
+    if isinstance(antigo, dict) and isinstance(novo, dict):
+        alteradas = {k: calcular_delta(antigo[k], v) if k in antigo else {"v": v}
+                     for k, v in novo.items() if k not in antigo or antigo[k] != v}
+        removidas = [k for k in antigo if k not in novo]
+        delta = {}
+        if alteradas:
+            delta["d"] = alteradas
+        if removidas:
+            delta["r"] = removidas
+        return delta
+    if isinstance(antigo, list) and isinstance(novo, list):
+        prefixo = 0
+        limite = min(len(antigo), len(novo))
+        while prefixo < limite and antigo[prefixo] == novo[prefixo]:
+            prefixo += 1
+        if prefixo * 2 >= len(antigo):
+            return {"p": prefixo, "a": novo[prefixo:]}
+    return {"v": novo}
+
+
+def aplicar_delta(antigo: Any, delta: Dict) -> Any:
+    if "v" in delta:
+        return delta["v"]
+    if "p" in delta:
+        return antigo[:delta["p"]] + delta["a"]
+    novo = {k: v for k, v in antigo.items() if k not in delta.get("r", ())}
+    for chave, sub in delta.get("d", {}).items():
+        novo[chave] = aplicar_delta(novo.get(chave), sub)
+    return novo
+
+
+class CheckpointStore:
+    """Checkpoints comprimidos, endereçados por conteúdo e codificados como deltas.
+
+    Cada checkpoint é um objeto zlib em objetos/<hash[:2]>/<hash> com um
+    snapshot completo ou um delta contra o checkpoint anterior. O manifesto
+    (index.jsonl, só de acréscimo) guarda id, timestamp, descrição, objeto
+    e base de cada checkpoint, então listar não lê nenhum objeto. Uma
+    restauração aplica no máximo MAX_CADEIA deltas sobre um snapshot.
+    """
+
+    def __init__(self, diretorio: Path):
+        self.diretorio = Path(diretorio)
+        self.objetos_dir = self.diretorio / "objetos"
+        self.objetos_dir.mkdir(parents=True, exist_ok=True)
+        self.manifesto = self.diretorio / "index.jsonl"
+
+        self._lock = threading.Lock()
+        self._entradas: Dict[str, Dict] = {}
+        self._ordem: List[str] = []
+        self._ultimo: Optional[Tuple[str, Any]] = None  # (id, estado) do último checkpoint
+
+        self._carregar_manifesto()
+        self._migrar_legados()
+
+    # --- Manifesto ---
+
+    def _carregar_manifesto(self) -> None:
+        if not self.manifesto.exists():
+            return
+        with open(self.manifesto, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma gravação interrompida
+                    logger.warning(f"Linha inválida ignorada no manifesto {self.manifesto}")
+                    continue
+                if entrada["id"] in self._entradas:
+                    # Id repetido (gravado antes de salvar() recusar ids existentes): a
+                    # entrada nova pode ter a si mesma como base, então vale a primeira
+                    logger.warning(f"Checkpoint {entrada['id']} repetido ignorado no manifesto {self.manifesto}")
+                    continue
+                self._ordem.append(entrada["id"])
+                self._entradas[entrada["id"]] = entrada
+
+    def _registrar(self, entrada: Dict) -> None:
+        with open(self.manifesto, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._entradas[entrada["id"]] = entrada
+        self._ordem.append(entrada["id"])
+
+    def _migrar_legados(self) -> None:
+        """Importa os checkpoints antigos (<id>.json com o estado inteiro)"""
+        legados = sorted(self.diretorio.glob("*.json"), key=lambda p: p.stem)
+        for arquivo in legados:
+            if arquivo.stem in self._entradas:
+                arquivo.unlink()
+                continue
+            try:
+                with open(arquivo, "r", encoding="utf-8") as f:
+                    estado = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Checkpoint antigo {arquivo} não importado: {e}")
+                continue
+            self.salvar(estado, checkpoint_id=arquivo.stem)
+            arquivo.unlink()
+        if legados:
+            logger.info(f"{len(legados)} checkpoints antigos importados para {self.diretorio}")
+
+    # --- Objetos ---
+
+    def _gravar_objeto(self, dados: bytes) -> str:
+        comprimido = zlib.compress(dados, NIVEL_COMPRESSAO)
+        hash_objeto = hashlib.sha256(comprimido).hexdigest()
+        destino = self.objetos_dir / hash_objeto[:2] / hash_objeto
+        if not destino.exists():
+            destino.parent.mkdir(exist_ok=True)
+            temporario = destino.with_suffix(".tmp")
+            with open(temporario, "wb") as f:
+                f.write(comprimido)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, destino)
+        return hash_objeto
+
+    def _ler_objeto(self, hash_objeto: str) -> Any:
+        with open(self.objetos_dir / hash_objeto[:2] / hash_objeto, "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    # --- API ---
+
+    def salvar(self, estado: Dict, checkpoint_id: Optional[str] = None) -> str:
+        with self._lock:
+            if not checkpoint_id:
+                # Dois checkpoints no mesmo microssegundo recebem um sufixo
+                base_id = checkpoint_id = str(datetime.now().timestamp())
+                sufixo = 1
+                while checkpoint_id in self._entradas:
+                    checkpoint_id = f"{base_id}-{sufixo}"
+                    sufixo += 1
+            elif checkpoint_id in self._entradas:
+                # Um id repetido viraria a base de si mesmo na cadeia de deltas
+                raise ValueError(f"Checkpoint {checkpoint_id} já existe")
+            completo = _serializar(estado)
+            dados = completo
+            # Normaliza (tuplas, chaves não-string) como ficará ao ser restaurado
+            estado = json.loads(completo)
+
+            entrada = {
+                "id": checkpoint_id,
+                "timestamp": estado.get("timestamp", "") if isinstance(estado, dict) else "",
+                "description": estado.get("description", "") if isinstance(estado, dict) else "",
+                "base": None,
+                "profundidade": 0
+            }
+
+            if self._ordem:
+                anterior_id = self._ordem[-1]
+                anterior = self._entradas[anterior_id]
+                if anterior["profundidade"] < MAX_CADEIA:
+                    delta = _serializar(calcular_delta(self._estado_ultimo(), estado))
+                    if len(delta) <= len(completo) * FRACAO_MAXIMA_DELTA:
+                        entrada["base"] = anterior_id
+                        entrada["profundidade"] = anterior["profundidade"] + 1
+                        dados = delta
+
+            entrada["objeto"] = self._gravar_objeto(dados)
+            entrada["bytes"] = len(dados)
+            self._registrar(entrada)
+            self._ultimo = (checkpoint_id, estado)
+            return checkpoint_id
+
+    def _estado_ultimo(self) -> Any:
+        ultimo_id = self._ordem[-1]
+        if self._ultimo is None or self._ultimo[0] != ultimo_id:
+            self._ultimo = (ultimo_id, self._reconstruir(ultimo_id))
+        return self._ultimo[1]
+
+    def _reconstruir(self, checkpoint_id: str) -> Any:
+        cadeia = []
+        atual = self._entradas[checkpoint_id]
+        while atual["base"] is not None:
+            cadeia.append(atual)
+            atual = self._entradas[atual["base"]]
+        estado = self._ler_objeto(atual["objeto"])
+        for entrada in reversed(cadeia):
+            estado = aplicar_delta(estado, self._ler_objeto(entrada["objeto"]))
+        return estado
+
+    def carregar(self, checkpoint_id: str) -> Dict:
+        with self._lock:
+            if checkpoint_id not in self._entradas:
+                raise FileNotFoundError(f"Checkpoint {checkpoint_id} não encontrado")
+            if self._ultimo is not None and self._ultimo[0] == checkpoint_id:
+                return json.loads(_serializar(self._ultimo[1]))
+            return self._reconstruir(checkpoint_id)
+
+    def listar(self) -> List[Dict]:
+        with self._lock:
+            return [{
+                "id": checkpoint_id,
+                "timestamp": self._entradas[checkpoint_id]["timestamp"],
+                "description": self._entradas[checkpoint_id]["description"]
+            } for checkpoint_id in self._ordem]
@@ -1,7 +1,16 @@
 from typing import Dict, Any, Optional
 from pathlib import Path
 import json
-from datetime import datetime
+
+class COLORS:
+    """Códigos ANSI usados pelo terminal e pelo monitor de logs"""
+    RED = "\033[31m"
+    GREEN = "\033[32m"
+    YELLOW = "\033[33m"
+    BLUE = "\033[34m"
+    LIGHT_BLACK = "\033[90m"
+    LIGHT_BLUE = "\033[94m"
+    RESET = "\033[0m"
 
 class Config:
     def __init__(self, config_dir: str = "/root/projetos/chat-ia-terminal/config"):
@@ -78,22 +87,25 @@ class Config:
         self.save_config()
     
     def backup(self) -> str:
-        """Cria um backup das configurações"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.config_dir / f"config_backup_{timestamp}.json"
-        
-        with open(backup_file, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
-        
-        return str(backup_file)
+        """Cria um backup incremental do diretório de configurações"""
+        # Garante que o config.json reflete o estado em memória
+        self.save_config()
+        resumo = self.backup_store().criar({"config": str(self.config_dir)}, rotulo="config")
+        return resumo["id"]
+    
+    def backup_store(self):
+        """Repositório de backups ao lado de data/"""
+        from .backup import BackupStore
+        data_dir = Path(self.get("paths", {}).get("data", "/root/projetos/chat-ia-terminal/data"))
+        return BackupStore(padrao=str(data_dir.parent / "backups"))
     
     def restore(self, backup_file: str):
-        """Restaura configurações de um backup"""
+        """Restaura configurações de um backup (id do BackupStore ou arquivo JSON antigo)"""
         backup_path = Path(backup_file)
-        if not backup_path.exists():
-            raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_file}")
-        
-        with open(backup_path, "r", encoding="utf-8") as f:
-            self.config = json.load(f)
+        if backup_path.exists():
+            with open(backup_path, "r", encoding="utf-8") as f:
+                self.config = json.load(f)
+        else:
+            self.config = json.loads(self.backup_store().ler(backup_file, "config/config.json"))
         
         self.save_config()
@@ -0,0 +1,384 @@
+from typing import Dict, Iterable, List, Optional
+from array import array
+from concurrent.futures import Future
+from pathlib import Path
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .lazy import Preguicoso
+from .metrics import EMBEDDINGS_CACHE, EMBEDDING_LATENCIA, FILA
+
+logger = logging.getLogger(__name__)
+
+# Mesmo modelo que o Chroma usa por padrão (baixado por ele em ~/.cache/chroma)
+MODELO_PADRAO = "all-MiniLM-L6-v2"
+DIRETORIO_MODELO_CHROMA = Path.home() / ".cache" / "chroma" / "onnx_models" / MODELO_PADRAO / "onnx"
+MAXIMO_TOKENS = 256
+# Textos por chamada ao modelo e espera máxima para juntar pedidos de vários chamadores
+LOTE_PADRAO = 64
+ESPERA_MS_PADRAO = 2.0
+# Vetores mantidos em memória além do cache em disco
+CAPACIDADE_MEMORIA = 4096
+# Nome do motor de cada EMBEDDING_BACKEND: vetores de motores diferentes não são comparáveis
+BACKENDS = {
+    "onnx-int8": f"{MODELO_PADRAO}-int8",
+    "onnx": f"{MODELO_PADRAO}-fp32",
+    "chroma": f"{MODELO_PADRAO}-chroma",
+}
+MOTORES = tuple(BACKENDS.values())
+# Documentos por lote ao migrar uma coleção para o motor atual
+LOTE_MIGRACAO = 256
+
+
+class MotorChroma:
+    """Função de embedding padrão do Chroma (ONNX fp32)"""
+
+    def __init__(self):
+        from chromadb.utils import embedding_functions
+        self._funcao = embedding_functions.DefaultEmbeddingFunction()
+        self.nome = f"{MODELO_PADRAO}-chroma"
+
+    def __call__(self, textos: List[str]) -> List[List[float]]:
+        return [[float(x) for x in vetor] for vetor in self._funcao(textos)]
+
+
+class MotorONNX:
+    """MiniLM em ONNX Runtime na CPU, opcionalmente quantizado para int8.
+
+    A quantização dinâmica (pesos int8, ativações quantizadas em tempo de
+    execução) é feita uma vez e o modelo resultante fica em `modelos_dir`.
+    Os textos de um lote são ordenados por tamanho para reduzir padding.
+    """
+
+    def __init__(self, modelos_dir: Path, diretorio_modelo: Optional[Path] = None,
+                 quantizar: bool = True, threads: Optional[int] = None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+        diretorio_modelo = Path(diretorio_modelo or os.getenv("EMBEDDING_MODEL_DIR") or DIRETORIO_MODELO_CHROMA)
+        if not (diretorio_modelo / "model.onnx").exists():
+            # Deixa o Chroma baixar o modelo na primeira execução
+            MotorChroma()(["ok"])
+
+        modelo = diretorio_modelo / "model.onnx"
+        if quantizar:
+            modelo = self._quantizar(modelo, Path(modelos_dir))
+
+        self.tokenizer = Tokenizer.from_file(str(diretorio_modelo / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAXIMO_TOKENS)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opcoes.intra_op_num_threads = threads
+        self.sessao = onnxruntime.InferenceSession(str(modelo), opcoes, providers=["CPUExecutionProvider"])
+        self._entradas = {e.name for e in self.sessao.get_inputs()}
+        self.nome = f"{MODELO_PADRAO}-{'int8' if quantizar else 'fp32'}"
+
+    @staticmethod
+    def _quantizar(modelo: Path, modelos_dir: Path) -> Path:
+        destino = modelos_dir / f"{MODELO_PADRAO}-int8.onnx"
+        if destino.exists():
+            return destino
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        modelos_dir.mkdir(parents=True, exist_ok=True)
+        temporario = destino.with_suffix(".tmp.onnx")
+        quantize_dynamic(str(modelo), str(temporario), weight_type=QuantType.QInt8)
+        os.replace(temporario, destino)
+        logger.info(f"Modelo de embedding quantizado em {destino}")
+        return destino
+
+    def _lote(self, textos: List[str]) -> "np.ndarray":
+        import numpy as np
+        codificados = self.tokenizer.encode_batch(textos)
+        ids = np.array([c.ids for c in codificados], dtype=np.int64)
+        mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+        entradas = {"input_ids": ids, "attention_mask": mascara}
+        if "token_type_ids" in self._entradas:
+            entradas["token_type_ids"] = np.zeros_like(ids)
+        saida = self.sessao.run(None, entradas)[0]
+
+        # Mean pooling sobre os tokens reais, seguido de normalização L2
+        pesos = mascara[..., None].astype(np.float32)
+        vetores = (saida * pesos).sum(axis=1) / np.clip(pesos.sum(axis=1), 1e-9, None)
+        return vetores / np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+
+    def __call__(self, textos: List[str], tamanho_lote: int = 32) -> List[List[float]]:
+        ordem = sorted(range(len(textos)), key=lambda i: len(textos[i]))
+        resultado: List[Optional[List[float]]] = [None] * len(textos)
+        for inicio in range(0, len(ordem), tamanho_lote):
+            indices = ordem[inicio:inicio + tamanho_lote]
+            for i, vetor in zip(indices, self._lote([textos[i] for i in indices])):
+                resultado[i] = vetor.tolist()
+        return resultado
+
+
+def criar_motor(modelos_dir: Path, backend: Optional[str] = None):
+    """Escolhe o motor de embedding (EMBEDDING_BACKEND: onnx-int8, onnx ou chroma)"""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+    if backend != "chroma":
+        try:
+            return MotorONNX(modelos_dir, quantizar=backend == "onnx-int8")
+        except ImportError:  # sem onnxruntime usamos a função padrão do Chroma
+            logger.warning("onnxruntime/tokenizers não instalados; usando a função de embedding do Chroma")
+        except Exception as e:
+            logger.error(f"Erro ao carregar o modelo ONNX ({e}); usando a função de embedding do Chroma")
+    return MotorChroma()
+
+
+def nome_motor(backend: Optional[str] = None) -> str:
+    """Nome do motor que criar_motor(backend) devolve, sem carregar o modelo.
+
+    Sem onnxruntime/tokenizers instalados já prevê a função do Chroma; a
+    queda por erro ao carregar o modelo só aparece quando ele é carregado.
+    """
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+    if backend != "chroma" and not all(importlib.util.find_spec(m) for m in ("onnxruntime", "tokenizers")):
+        backend = "chroma"
+    return BACKENDS.get(backend, BACKENDS["onnx"])
+
+
+def backend_de(nome: str) -> str:
+    """EMBEDDING_BACKEND que produz o motor `nome`"""
+    return next(backend for backend, motor in BACKENDS.items() if motor == nome)
+
+
+def nome_colecao(base: str, motor: str) -> str:
+    """Nome da coleção `base` para os vetores do motor `motor`"""
+    return f"{base}__{motor}"
+
+
+def abrir_colecao(client, base: str, embeddings: "EmbeddingService"):
+    """Abre a coleção `base` do motor atual, migrando as de outros motores.
+
+    Coleções sem versão (anteriores à troca de motor) ou de outro motor têm
+    seus documentos reembeddados na coleção atual e depois são apagadas.
+    Como a cópia é por upsert e a antiga só some no fim, uma migração
+    interrompida recomeça na próxima abertura.
+    """
+    nome = nome_colecao(base, embeddings.nome)
+    colecao = client.get_or_create_collection(nome, embedding_function=embeddings)
+    for antigo in [base] + [nome_colecao(base, motor) for motor in MOTORES if motor != embeddings.nome]:
+        try:
+            origem = client.get_collection(antigo, embedding_function=embeddings)
+        except Exception:  # o tipo do erro de coleção inexistente muda entre versões do Chroma
+            continue
+        total = 0
+        while True:
+            lote = origem.get(include=["documents", "metadatas"], limit=LOTE_MIGRACAO, offset=total)
+            if not lote["ids"]:
+                break
+            colecao.upsert(ids=lote["ids"], documents=lote["documents"], metadatas=lote["metadatas"])
+            total += len(lote["ids"])
+        client.delete_collection(antigo)
+        logger.info(f"Coleção {antigo} migrada para {nome} ({total} documentos reembeddados)")
+    return colecao
+
+
+class CacheEmbeddings:
+    """Cache de embeddings em SQLite, endereçado pelo hash do texto e do modelo"""
+
+    def __init__(self, caminho: Path, capacidade_memoria: int = CAPACIDADE_MEMORIA):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(caminho), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vetor BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self._memoria: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.capacidade_memoria = capacidade_memoria
+
+    def _lembrar(self, chave: str, vetor: List[float]) -> None:
+        self._memoria[chave] = vetor
+        self._memoria.move_to_end(chave)
+        if len(self._memoria) > self.capacidade_memoria:
+            self._memoria.popitem(last=False)
+
+    def get_many(self, chaves: Iterable[str]) -> Dict[str, List[float]]:
+        encontrados = {}
+        with self._lock:
+            faltando = []
+            for chave in chaves:
+                vetor = self._memoria.get(chave)
+                if vetor is None:
+                    faltando.append(chave)
+                else:
+                    self._memoria.move_to_end(chave)
+                    encontrados[chave] = vetor
+            # O SQLite limita o número de parâmetros por consulta
+            for inicio in range(0, len(faltando), 500):
+                parte = faltando[inicio:inicio + 500]
+                linhas = self.conn.execute(
+                    f"SELECT hash, vetor FROM embeddings WHERE hash IN ({','.join('?' * len(parte))})", parte
+                ).fetchall()
+                for chave, blob in linhas:
+                    vetor = array("f", blob).tolist()
+                    self._lembrar(chave, vetor)
+                    encontrados[chave] = vetor
+        return encontrados
+
+    def put_many(self, vetores: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vetor) VALUES (?, ?)",
+                ((chave, array("f", vetor).tobytes()) for chave, vetor in vetores.items())
+            )
+            self.conn.commit()
+            for chave, vetor in vetores.items():
+                self._lembrar(chave, vetor)
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingService:
+    """Serviço de embeddings compartilhado por Memory, KnowledgeBase e o índice do workspace.
+
+    Pode ser passado como `embedding_function` de uma coleção do Chroma.
+    Textos já vistos saem do cache sem passar pelo modelo; os demais vão
+    para uma fila única, e a thread do serviço junta os pedidos de todos os
+    chamadores que chegarem dentro de `espera_ms` num só lote.
+    """
+
+    def __init__(self, data_dir: str = "/root/projetos/chat-ia-terminal/data",
+                 motor=None, tamanho_lote: int = LOTE_PADRAO, espera_ms: float = ESPERA_MS_PADRAO):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        # O modelo só é carregado no primeiro texto que não está no cache (ou no aquecimento do bot);
+        # até lá o nome (chave do cache e das coleções) vem da configuração
+        self.nome = motor.nome if motor is not None else nome_motor()
+        self._motor = Preguicoso(lambda: self._carregar(motor), "modelo de embedding")
+        self.cache = CacheEmbeddings(self.data_dir / "embeddings_cache.db")
+        self.tamanho_lote = tamanho_lote
+        self.espera = espera_ms / 1000
+
+        self.acertos = 0
+        self.faltas = 0
+
+        self._fila: "queue.Queue[tuple]" = queue.Queue()
+        FILA.set_funcao(self._fila.qsize, fila="embeddings")
+        threading.Thread(target=self._processar, daemon=True, name="embeddings").start()
+        logger.info("Serviço de embeddings iniciado")
+
+    def _carregar(self, motor):
+        motor = motor or criar_motor(self.data_dir / "modelos", backend_de(self.nome))
+        if motor.nome != self.nome:
+            # criar_motor caiu para a função do Chroma: outro modelo, outras chaves e coleções
+            logger.warning(f"Motor de embedding {motor.nome} no lugar de {self.nome}")
+            self.nome = motor.nome
+        return motor
+
+    @property
+    def motor(self):
+        return self._motor.obter()
+
+    def _chave(self, texto: str) -> str:
+        return hashlib.sha256(f"{self.nome}\0{texto}".encode("utf-8")).hexdigest()
+
+    # --- Interface de embedding function do Chroma ---
+
+    def name(self) -> str:
+        return self.nome
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input))
+
+    # --- API ---
+
+    def embed(self, textos: List[str]) -> List[List[float]]:
+        """Embeddings dos textos, na mesma ordem"""
+        if not textos:
+            return []
+        nome = self.nome
+        chaves = [self._chave(t) for t in textos]
+        encontrados = self.cache.get_many(set(chaves))
+
+        # Textos repetidos na mesma chamada só vão ao modelo uma vez
+        faltando = {c: t for c, t in zip(chaves, textos) if c not in encontrados}
+        # Só uma falta carrega o modelo; se ele não for o previsto, as chaves mudaram
+        if faltando and self.motor.nome != nome:
+            return self.embed(textos)
+        self.acertos += len(textos) - len(faltando)
+        self.faltas += len(faltando)
+        EMBEDDINGS_CACHE.inc(len(textos) - len(faltando), resultado="acerto")
+        EMBEDDINGS_CACHE.inc(len(faltando), resultado="falta")
+
+        if faltando:
+            futuro: Future = Future()
+            self._fila.put((faltando, futuro))
+            encontrados.update(futuro.result())
+        return [encontrados[c] for c in chaves]
+
+    async def embed_async(self, textos: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed, textos)
+
+    def estatisticas(self) -> Dict:
+        total = self.acertos + self.faltas
+        return {
+            "motor": self.nome,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "em_cache": self.cache.count()
+        }
+
+    # --- Thread do serviço ---
+
+    def _processar(self) -> None:
+        while True:
+            pedidos = [self._fila.get()]
+            pendentes = dict(pedidos[0][0])
+
+            # Junta pedidos de outros chamadores até encher o lote ou esgotar a espera
+            limite = time.monotonic() + self.espera
+            while len(pendentes) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                pendentes.update(pedido[0])
+
+            try:
+                # Outro lote pode ter calculado os mesmos textos enquanto este esperava
+                prontos = self.cache.get_many(pendentes)
+                calcular = [(c, t) for c, t in pendentes.items() if c not in prontos]
+                for inicio in range(0, len(calcular), self.tamanho_lote):
+                    parte = calcular[inicio:inicio + self.tamanho_lote]
+                    with EMBEDDING_LATENCIA.tempo(motor=self.motor.nome):
+                        vetores = self.motor([t for _, t in parte])
+                    novos = {c: v for (c, _), v in zip(parte, vetores)}
+                    self.cache.put_many(novos)
+                    prontos.update(novos)
+                for faltando, futuro in pedidos:
+                    futuro.set_result({c: prontos[c] for c in faltando})
+            except Exception as e:
+                logger.error(f"Erro ao calcular embeddings: {e}")
+                for _, futuro in pedidos:
+                    futuro.set_exception(e)
+
+
+_servicos: Dict[str, EmbeddingService] = {}
+_servicos_lock = threading.Lock()
+
+
+def get_embedding_service(data_dir: str = "/root/projetos/chat-ia-terminal/data") -> EmbeddingService:
+    """Instância compartilhada por diretório de dados (um modelo e um cache por processo)"""
+    chave = str(Path(data_dir).resolve())
+    with _servicos_lock:
+        if chave not in _servicos:
+            _servicos[chave] = EmbeddingService(data_dir)
+        return _servicos[chave]
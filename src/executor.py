@@ -0,0 +1,323 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+import asyncio
+import itertools
+import logging
+import os
+import re
+import secrets
+import shlex
+import signal
+import time
+
+from .metrics import EXECUCOES, EXECUCOES_ATIVAS
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão de cada comando
+LIMITE_SEGUNDOS = float(os.getenv("EXEC_TIMEOUT", "300"))
+LIMITE_SAIDA = 256 * 1024  # bytes guardados: o final da saída, o começo é descartado
+MAX_CONCORRENTES = int(os.getenv("EXEC_MAX_CONCORRENTES", "16"))
+# Intervalo mínimo entre edições da mensagem no Telegram
+INTERVALO = 1.5
+# Chats do Telegram que podem usar /exec (ids separados por vírgula); vazio = nenhum
+CHATS_AUTORIZADOS = frozenset(int(id) for id in os.getenv("EXEC_CHATS_AUTORIZADOS", "").replace(",", " ").split())
+# Validade do botão de confirmação de um comando
+VALIDADE_APROVACAO = 300
+# Variáveis do bot que não vão para os comandos (tokens de API)
+_SEGREDOS = re.compile(r"TOKEN|KEY|SECRET|PASSWORD|SENHA", re.IGNORECASE)
+# Pipes, redirecionamentos, &&, globs, variáveis: a linha vai para /bin/sh -c
+_SINTAXE_SHELL = re.compile(r"[|&;<>()$`*?~\n]|^\s*\w+=")
+
+
+def argv_de(linha: str) -> List[str]:
+    """Argumentos para create_subprocess_exec; linhas com sintaxe de shell passam pelo sh"""
+    if _SINTAXE_SHELL.search(linha):
+        return ["/bin/sh", "-c", linha]
+    return shlex.split(linha)
+
+
+class Execucao:
+    """Um comando em andamento ou terminado, com stdout e stderr intercalados como num terminal"""
+
+    def __init__(self, id: str, argv: List[str], cwd: str, chat_id: Optional[int],
+                 limite_segundos: float, limite_saida: int, texto: Optional[str] = None):
+        self.id = id
+        self.argv = argv
+        self.texto = texto
+        self.cwd = cwd
+        self.chat_id = chat_id
+        self.limite_segundos = limite_segundos
+        self.limite_saida = limite_saida
+        self.estado = "aguardando"  # rodando, concluido, erro, cancelado, tempo_esgotado
+        self.codigo: Optional[int] = None
+        self.pid: Optional[int] = None
+        self.inicio = time.monotonic()
+        self.fim: Optional[float] = None
+        self.total = 0  # bytes produzidos, inclusive os descartados
+        self._saida = bytearray()
+        self._descartados = 0
+        # Trocado a cada mudança: quem espera pega o atual antes de olhar o estado
+        self._mudou = asyncio.Event()
+        self._terminou = asyncio.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<Execucao {self.id} {self.estado} {self.comando!r}>"
+
+    @property
+    def comando(self) -> str:
+        return self.texto or shlex.join(self.argv)
+
+    @property
+    def terminou(self) -> bool:
+        return self._terminou.is_set()
+
+    @property
+    def segundos(self) -> float:
+        return (self.fim or time.monotonic()) - self.inicio
+
+    @property
+    def truncada(self) -> bool:
+        return self._descartados > 0
+
+    def _avisar(self) -> None:
+        evento, self._mudou = self._mudou, asyncio.Event()
+        evento.set()
+
+    def _acrescentar(self, dados: bytes) -> None:
+        self._saida += dados
+        self.total += len(dados)
+        excesso = len(self._saida) - self.limite_saida
+        if excesso > 0:
+            del self._saida[:excesso]
+            self._descartados += excesso
+        self._avisar()
+
+    def _finalizar(self, estado: str) -> None:
+        self.estado = estado
+        self.fim = time.monotonic()
+        self._terminou.set()
+        self._avisar()
+        EXECUCOES.inc(resultado=estado)
+        logger.info(f"Execução {self.id} ({self.comando}) terminou: {estado}, código {self.codigo}, "
+                    f"{self.total} bytes em {self.segundos:.1f}s")
+
+    def saida(self, desde: int = 0) -> str:
+        """Saída a partir do byte `desde` (o que já saiu do buffer é pulado)"""
+        return self._saida[max(desde - self._descartados, 0):].decode("utf-8", errors="replace")
+
+    async def aguardar(self) -> "Execucao":
+        await self._terminou.wait()
+        return self
+
+    async def acompanhar(self, intervalo: float = INTERVALO) -> AsyncIterator["Execucao"]:
+        """Produz a execução a cada mudança, no máximo uma vez por `intervalo`, e sempre no fim"""
+        visto = None
+        ultimo = 0.0
+        while True:
+            evento = self._mudou
+            chave = (self.total, self.estado)
+            if chave != visto:
+                visto = chave
+                ultimo = time.monotonic()
+                yield self
+            if self.terminou:
+                return
+            await evento.wait()
+            restante = intervalo - (time.monotonic() - ultimo)
+            if restante > 0:
+                try:
+                    # Junta a saída que chegar nesse meio tempo; o fim não espera
+                    await asyncio.wait_for(self._terminou.wait(), restante)
+                except asyncio.TimeoutError:
+                    pass
+
+
+def formatar(execucao: Execucao, limite: int = 3500) -> str:
+    """Texto da execução para uma mensagem: comando, final da saída e situação"""
+    saida = execucao.saida()
+    cortada = execucao.truncada or len(saida) > limite
+    if len(saida) > limite:
+        saida = saida[-limite:]
+        if "\n" in saida.rstrip("\n"):
+            # Começa numa linha inteira
+            saida = saida.split("\n", 1)[1]
+    linhas = [f"$ {execucao.comando}", f"📂 {execucao.cwd}", ""]
+    if cortada:
+        linhas.append("[...]")
+    linhas.append(saida.rstrip("\n") or "(sem saída)")
+    situacao = {
+        "aguardando": "⏳ Na fila",
+        "rodando": f"⏳ Rodando há {execucao.segundos:.0f}s",
+        "concluido": f"✅ Concluído em {execucao.segundos:.1f}s",
+        "erro": f"❌ Código {execucao.codigo} em {execucao.segundos:.1f}s",
+        "cancelado": f"⏹ Cancelado após {execucao.segundos:.1f}s",
+        "tempo_esgotado": f"⏱ Tempo esgotado ({execucao.limite_segundos:.0f}s)"
+    }[execucao.estado]
+    linhas += ["", f"{situacao} [{execucao.id}]"]
+    return "\n".join(linhas)
+
+
+class Executor:
+    """Roda comandos aprovados pelo usuário em subprocessos, sem bloquear o loop.
+
+    Cada comando roda com create_subprocess_exec numa sessão
+    própria, com stdin fechado; tempo esgotado ou cancelamento mata o grupo
+    de processos inteiro (SIGTERM e, se não bastar, SIGKILL). Um semáforo
+    limita quantos rodam ao mesmo tempo; os demais esperam na fila.
+    """
+
+    def __init__(self, limite_segundos: float = LIMITE_SEGUNDOS, limite_saida: int = LIMITE_SAIDA,
+                 max_concorrentes: int = MAX_CONCORRENTES, manter: int = 100):
+        self.limite_segundos = limite_segundos
+        self.limite_saida = limite_saida
+        self.manter = manter
+        self._semaforo = asyncio.Semaphore(max_concorrentes)
+        self._execucoes: Dict[str, Execucao] = {}
+        self._ids = itertools.count(1)
+        # Confirmações pendentes: token -> (chat, comando, diretório, validade); o token nunca vai ao usuário
+        self._aprovacoes: Dict[str, Tuple[Optional[int], str, str, float]] = {}
+        EXECUCOES_ATIVAS.set_funcao(lambda: len(self.ativas()))
+
+    @staticmethod
+    def _ambiente() -> Dict[str, str]:
+        ambiente = {k: v for k, v in os.environ.items() if not _SEGREDOS.search(k)}
+        # Nada de paginador ou prompt esperando por um terminal que não existe
+        ambiente.update(TERM="dumb", PAGER="cat", GIT_PAGER="cat", GIT_TERMINAL_PROMPT="0")
+        return ambiente
+
+    @staticmethod
+    def autorizado(chat_id: Optional[int]) -> bool:
+        """Se o chat está em EXEC_CHATS_AUTORIZADOS"""
+        return chat_id in CHATS_AUTORIZADOS
+
+    def pedir_aprovacao(self, comando: str, cwd: str, chat_id: Optional[int]) -> str:
+        """Guarda o comando à espera de confirmação e devolve o token de uso único"""
+        agora = time.monotonic()
+        for token in [t for t, (_, _, _, validade) in self._aprovacoes.items() if validade < agora]:
+            del self._aprovacoes[token]
+        token = secrets.token_urlsafe(16)
+        self._aprovacoes[token] = (chat_id, comando, cwd, agora + VALIDADE_APROVACAO)
+        return token
+
+    def aprovar(self, token: str, chat_id: Optional[int]) -> Optional[Tuple[str, str]]:
+        """Consome o token: (comando, diretório) se é do mesmo chat e ainda vale, senão None"""
+        pendente = self._aprovacoes.pop(token, None)
+        if pendente is None:
+            return None
+        dono, comando, cwd, validade = pendente
+        if dono != chat_id or validade < time.monotonic():
+            return None
+        return comando, cwd
+
+    def iniciar(self, comando: Union[str, List[str]], cwd: str, chat_id: Optional[int] = None,
+                limite_segundos: Optional[float] = None) -> Execucao:
+        """Agenda o comando e devolve a execução na hora (a saída chega por acompanhar()).
+
+        Uma string é dividida como no shell; se tiver pipes, redirecionamentos
+        ou &&, roda com /bin/sh -c (ainda via create_subprocess_exec).
+        """
+        texto = comando.strip() if isinstance(comando, str) else None
+        argv = argv_de(texto) if isinstance(comando, str) else list(comando)
+        if not argv:
+            raise ValueError("Comando vazio")
+        if not os.path.isdir(cwd):
+            raise FileNotFoundError(f"Diretório não existe: {cwd}")
+        execucao = Execucao(str(next(self._ids)), argv, cwd, chat_id,
+                            limite_segundos or self.limite_segundos, self.limite_saida, texto)
+        self._execucoes[execucao.id] = execucao
+        execucao._tarefa = asyncio.get_running_loop().create_task(self._rodar(execucao))
+        # Cancelada antes de começar a rodar, a corrotina nem entra no try de _rodar
+        execucao._tarefa.add_done_callback(lambda _: execucao.terminou or execucao._finalizar("cancelado"))
+        self._podar()
+        logger.info(f"Execução {execucao.id} agendada em {cwd}: {execucao.comando}")
+        return execucao
+
+    async def _rodar(self, execucao: Execucao) -> None:
+        processo = None
+        estado = "erro"
+        try:
+            async with self._semaforo:
+                try:
+                    processo = await asyncio.create_subprocess_exec(
+                        *execucao.argv,
+                        cwd=execucao.cwd,
+                        env=self._ambiente(),
+                        stdin=asyncio.subprocess.DEVNULL,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.STDOUT,
+                        start_new_session=True
+                    )
+                except OSError as e:
+                    execucao.codigo = 127 if isinstance(e, FileNotFoundError) else 126
+                    execucao._acrescentar(f"{e.strerror or e}: {execucao.argv[0]}\n".encode())
+                    return
+                execucao.pid = processo.pid
+                execucao.estado = "rodando"
+                execucao._avisar()
+                try:
+                    await asyncio.wait_for(self._ler(execucao, processo), execucao.limite_segundos)
+                    execucao.codigo = await processo.wait()
+                    estado = "concluido" if execucao.codigo == 0 else "erro"
+                except asyncio.TimeoutError:
+                    estado = "tempo_esgotado"
+                    await self._matar(execucao, processo)
+        except asyncio.CancelledError:
+            estado = "cancelado"
+            if processo is not None:
+                await self._matar(execucao, processo)
+        except Exception as e:
+            logger.error(f"Erro na execução {execucao.id}: {e}")
+            execucao._acrescentar(f"\n{e}\n".encode())
+        finally:
+            execucao._finalizar(estado)
+
+    @staticmethod
+    async def _ler(execucao: Execucao, processo) -> None:
+        while True:
+            dados = await processo.stdout.read(4096)
+            if not dados:
+                return
+            execucao._acrescentar(dados)
+
+    @staticmethod
+    async def _matar(execucao: Execucao, processo) -> None:
+        """SIGTERM no grupo do processo (pega os filhos também) e SIGKILL se não sair em 2s"""
+        for sinal, espera in ((signal.SIGTERM, 2.0), (signal.SIGKILL, 5.0)):
+            try:
+                os.killpg(processo.pid, sinal)
+            except ProcessLookupError:
+                pass
+            try:
+                execucao.codigo = await asyncio.wait_for(processo.wait(), espera)
+                return
+            except asyncio.TimeoutError:
+                continue
+        logger.error(f"Execução {execucao.id} (pid {processo.pid}) não terminou após SIGKILL")
+
+    def cancelar(self, id: str) -> bool:
+        execucao = self._execucoes.get(id)
+        if execucao is None or execucao.terminou or execucao._tarefa is None:
+            return False
+        execucao._tarefa.cancel()
+        return True
+
+    def obter(self, id: str) -> Optional[Execucao]:
+        return self._execucoes.get(id)
+
+    def ativas(self, chat_id: Optional[int] = None) -> List[Execucao]:
+        return [e for e in self._execucoes.values()
+                if not e.terminou and (chat_id is None or e.chat_id == chat_id)]
+
+    def _podar(self) -> None:
+        """Esquece as execuções terminadas mais antigas além de `manter`"""
+        terminadas = [id for id, e in self._execucoes.items() if e.terminou]
+        for id in terminadas[:max(len(terminadas) - self.manter, 0)]:
+            del self._execucoes[id]
+
+    async def encerrar(self) -> None:
+        """Cancela tudo que ainda roda e espera os processos saírem"""
+        ativas = self.ativas()
+        for execucao in ativas:
+            self.cancelar(execucao.id)
+        await asyncio.gather(*(e.aguardar() for e in ativas))
@@ -0,0 +1,367 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import logging
+import os
+import shutil
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Threads de E/S (syscalls liberam o GIL; não há io_uring na biblioteca padrão)
+MAX_WORKERS = 8
+OPERACOES = ("criar_arquivo", "criar_diretorio", "escrever", "mover", "copiar", "remover")
+
+
+class LoteError(Exception):
+    """Operação inválida no lote (tipo desconhecido, caminho fora da base)"""
+    pass
+
+
+def _resolver(base: Path, caminho: str) -> Path:
+    """Caminho absoluto dentro de `base` (já resolvida); relativos são relativos a ela.
+
+    Links simbólicos são seguidos antes da verificação: um link dentro da base
+    que aponta para fora é recusado. O último componente não é resolvido (remover
+    ou mover um link mexe no link, não no que ele aponta).
+    """
+    alvo = Path(os.path.normpath(base / os.path.expanduser(caminho)))
+    alvo = alvo.parent.resolve() / alvo.name if alvo != base else base
+    for real in (alvo.parent, alvo.resolve()):
+        if real != base and base not in real.parents:
+            raise LoteError(f"Caminho fora de {base}: {caminho}")
+    return alvo
+
+
+def normalizar(operacoes: List[Dict], base: str) -> List[Dict]:
+    """Valida o lote e resolve os caminhos (sem alterar o disco)"""
+    base = Path(base).resolve()
+    normalizadas = []
+    for indice, operacao in enumerate(operacoes):
+        tipo = operacao.get("op")
+        if tipo not in OPERACOES:
+            raise LoteError(f"Operação {indice}: tipo '{tipo}' não suportado ({', '.join(OPERACOES)})")
+        item = dict(operacao, indice=indice, alvo=_resolver(base, operacao["caminho"]))
+        if tipo in ("mover", "copiar"):
+            if not operacao.get("destino"):
+                raise LoteError(f"Operação {indice}: '{tipo}' precisa de destino")
+            item["destino_abs"] = _resolver(base, operacao["destino"])
+        normalizadas.append(item)
+    return normalizadas
+
+
+def _caminhos(item: Dict) -> Tuple[Path, ...]:
+    return (item["alvo"], item["destino_abs"]) if "destino_abs" in item else (item["alvo"],)
+
+
+def _sobrepoe(a: Path, b: Path) -> bool:
+    return a == b or a in b.parents or b in a.parents
+
+
+def ondas(itens: List[Dict]) -> List[List[Dict]]:
+    """Agrupa em ondas de operações independentes, preservando a ordem entre as que se sobrepõem.
+
+    `mkdir a` seguido de `escrever a/x` ficam em ondas diferentes; `mkdir a b c`
+    roda numa onda só.
+    """
+    resultado: List[List[Dict]] = []
+    atual: List[Dict] = []
+    for item in itens:
+        if any(_sobrepoe(p, q) for outro in atual for p in _caminhos(item) for q in _caminhos(outro)):
+            resultado.append(atual)
+            atual = []
+        atual.append(item)
+    if atual:
+        resultado.append(atual)
+    return resultado
+
+
+def _executar(item: Dict, sobrescrever: bool) -> None:
+    tipo, alvo = item["op"], item["alvo"]
+    if tipo == "criar_diretorio":
+        alvo.mkdir(parents=True, exist_ok=True)
+    elif tipo in ("criar_arquivo", "escrever"):
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        if tipo == "criar_arquivo":
+            # Como o touch: não apaga conteúdo existente
+            alvo.touch(exist_ok=True)
+        else:
+            if alvo.exists() and not sobrescrever:
+                raise FileExistsError(f"{alvo} já existe")
+            with open(alvo, "w", encoding="utf-8") as f:
+                f.write(item.get("conteudo", ""))
+    elif tipo in ("mover", "copiar"):
+        destino = item["destino_abs"]
+        if destino.is_dir() and not alvo.is_dir():
+            destino = destino / alvo.name
+        if destino.exists() and not sobrescrever:
+            raise FileExistsError(f"{destino} já existe")
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        if tipo == "mover":
+            shutil.move(str(alvo), str(destino))
+        elif alvo.is_dir():
+            shutil.copytree(alvo, destino, dirs_exist_ok=sobrescrever)
+        else:
+            shutil.copy2(alvo, destino)
+    elif tipo == "remover":
+        if alvo.is_dir() and not alvo.is_symlink():
+            if not item.get("recursivo") and any(alvo.iterdir()):
+                raise OSError(f"{alvo} não está vazio (use recursivo)")
+            shutil.rmtree(alvo)
+        else:
+            alvo.unlink()
+
+
+def _resultado(item: Dict, erro: Optional[Exception] = None) -> Dict:
+    resultado = {"indice": item["indice"], "op": item["op"], "caminho": str(item["alvo"]), "ok": erro is None}
+    if "destino_abs" in item:
+        resultado["destino"] = str(item["destino_abs"])
+    if erro is not None:
+        resultado["erro"] = str(erro)
+    return resultado
+
+
+def executar_lote(operacoes: List[Dict], base: str, atomico: bool = False, sobrescrever: bool = False,
+                  max_workers: int = MAX_WORKERS) -> Dict:
+    """Executa um lote de operações de arquivo num pool de threads com resultado por item.
+
+    Cada operação é um dicionário {"op", "caminho", ["destino"], ["conteudo"],
+    ["recursivo"]}. No modo normal cada item tem seu próprio sucesso ou erro;
+    com atomico=True é tudo ou nada (ver _lote_atomico).
+    """
+    inicio = time.perf_counter()
+    itens = normalizar(operacoes, base)
+    if atomico:
+        resultados = _lote_atomico(itens, Path(base).resolve(), sobrescrever, max_workers)
+    else:
+        resultados = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fileops") as pool:
+            for onda in ondas(itens):
+                erros = pool.map(lambda item: _tentar(item, sobrescrever), onda)
+                resultados += [_resultado(item, erro) for item, erro in zip(onda, erros)]
+    resultados.sort(key=lambda r: r["indice"])
+    lote = {
+        "ok": all(r["ok"] for r in resultados),
+        "atomico": atomico,
+        "resultados": resultados,
+        "segundos": round(time.perf_counter() - inicio, 4)
+    }
+    logger.info(f"Lote de {len(itens)} operações em {base}: "
+                f"{sum(r['ok'] for r in resultados)} ok em {lote['segundos']}s")
+    return lote
+
+
+def _tentar(item: Dict, sobrescrever: bool) -> Optional[Exception]:
+    try:
+        _executar(item, sobrescrever)
+    except Exception as e:
+        return e
+    return None
+
+
+def copiar(origem: Path, destino: Path) -> None:
+    if origem.is_dir():
+        shutil.copytree(origem, destino)
+    else:
+        shutil.copy2(origem, destino)
+
+
+def _no_disco(caminho: Path) -> Optional[str]:
+    if caminho.is_dir():
+        return "diretorio"
+    return "arquivo" if caminho.exists() or caminho.is_symlink() else None
+
+
+def _validar(itens: List[Dict], sobrescrever: bool) -> Optional[Tuple[Dict, Exception]]:
+    """Confere o lote em ordem contra um estado simulado do disco.
+
+    `simulado` guarda o que o lote já fez: "arquivo"/"diretorio" (criado),
+    None (removido ou movido) ou o Path no disco de onde o conteúdo veio (mover
+    e copiar de algo que já existia). Assim `escrever x` seguido de
+    `mover x -> y` é aceito, e dois itens gravando o mesmo destino são recusados.
+    Preenche item["final"] (e item["origem_disco"] quando a origem já existia).
+    """
+    simulado: Dict[Path, object] = {}
+    destinos: Dict[Path, int] = {}
+
+    def tipo_de(caminho: Path) -> Optional[str]:
+        for acima in (caminho, *caminho.parents):
+            if acima not in simulado:
+                continue
+            valor = simulado[acima]
+            if isinstance(valor, Path):
+                return _no_disco(valor / caminho.relative_to(acima))
+            # Dentro de algo removido, de um arquivo ou de um diretório novo (vazio)
+            return valor if acima == caminho else None
+        return _no_disco(caminho)
+
+    def origem_disco(caminho: Path) -> Optional[Path]:
+        """Onde está hoje no disco o conteúdo de `caminho` (None se vem do próprio lote)"""
+        for acima in (caminho, *caminho.parents):
+            if acima in simulado:
+                valor = simulado[acima]
+                return valor / caminho.relative_to(acima) if isinstance(valor, Path) else None
+        return caminho
+
+    def tem_conteudo(pasta: Path) -> bool:
+        disco = origem_disco(pasta)
+        if disco is not None and any(tipo_de(pasta / filho.name) for filho in disco.iterdir()):
+            return True
+        return any(caminho.parent == pasta and tipo_de(caminho) for caminho in simulado)
+
+    for item in itens:
+        tipo, alvo = item["op"], item["alvo"]
+        try:
+            origem = tipo_de(alvo)
+            if tipo in ("mover", "copiar", "remover") and origem is None:
+                raise FileNotFoundError(f"{alvo} não existe")
+            if tipo == "remover" and origem == "diretorio" and not item.get("recursivo") and tem_conteudo(alvo):
+                raise OSError(f"{alvo} não está vazio (use recursivo)")
+            final = item["destino_abs"] if "destino_abs" in item else alvo
+            if tipo in ("mover", "copiar") and tipo_de(final) == "diretorio" and origem != "diretorio":
+                final = final / alvo.name
+            item["final"] = final
+            existente = tipo_de(final)
+            if tipo in ("escrever", "mover", "copiar") and existente is not None and not sobrescrever:
+                raise FileExistsError(f"{final} já existe")
+            if tipo == "criar_diretorio" and existente == "arquivo":
+                raise FileExistsError(f"{final} já existe e não é um diretório")
+            if tipo != "remover":
+                if final in destinos and tipo != "criar_diretorio":
+                    raise LoteError(f"{final} é destino de mais de uma operação do lote "
+                                    f"(itens {destinos[final]} e {item['indice']})")
+                destinos.setdefault(final, item["indice"])
+
+            if tipo in ("mover", "copiar"):
+                disco = origem_disco(alvo)
+                if disco is not None:
+                    item["origem_disco"] = disco
+                simulado[final] = disco if disco is not None else origem
+                if tipo == "mover":
+                    simulado[alvo] = None
+            elif tipo == "remover":
+                simulado[alvo] = None
+            elif existente is None:
+                simulado[final] = "diretorio" if tipo == "criar_diretorio" else "arquivo"
+            elif tipo == "escrever":
+                simulado[final] = "arquivo"
+        except Exception as e:
+            return item, e
+    return None
+
+
+def _lote_atomico(itens: List[Dict], base: Path, sobrescrever: bool, max_workers: int) -> List[Dict]:
+    """Tudo ou nada: prepara num diretório de staging e publica com renames.
+
+    1. Conteúdo novo (arquivos, diretórios e cópias) é montado em paralelo em
+       <base>/.lote-<id>/, no mesmo sistema de arquivos; nada visível muda.
+    2. A publicação é uma sequência de renames (só metadados): o que seria
+       sobrescrito ou removido vai para a lixeira do staging, e cada passo
+       entra num log de desfazer.
+    3. Se algo falhar, o log é desfeito em ordem reversa; no fim o staging
+       (com a lixeira) é apagado.
+    """
+    staging = base / f".lote-{uuid.uuid4().hex[:12]}"
+    lixeira = staging / "lixeira"
+    lixeira.mkdir(parents=True)
+    desfazer: List[Tuple[Path, Path]] = []  # (de onde veio, para onde foi)
+    falha: Optional[Tuple[Dict, Exception]] = None
+
+    def preparar(item: Dict) -> Optional[Exception]:
+        tipo, alvo = item["op"], item["alvo"]
+        pronto = staging / "novo" / str(item["indice"])
+        try:
+            pronto.parent.mkdir(parents=True, exist_ok=True)
+            if tipo == "criar_diretorio":
+                pronto.mkdir()
+            elif tipo == "criar_arquivo":
+                pronto.touch()
+            elif tipo == "escrever":
+                with open(pronto, "w", encoding="utf-8") as f:
+                    f.write(item.get("conteudo", ""))
+            elif tipo == "copiar" and "origem_disco" in item:
+                copiar(item["origem_disco"], pronto)
+            elif tipo == "mover" and "origem_disco" in item and \
+                    os.stat(item["origem_disco"]).st_dev != os.stat(staging).st_dev:
+                # Entre sistemas de arquivos rename não serve: copia agora, apaga a origem na publicação
+                copiar(item["origem_disco"], pronto)
+                item["entre_dispositivos"] = True
+            item["pronto"] = pronto
+        except Exception as e:
+            return e
+        return None
+
+    def tirar_do_caminho(caminho: Path) -> None:
+        if caminho.exists() or caminho.is_symlink():
+            guardado = lixeira / uuid.uuid4().hex
+            os.rename(caminho, guardado)
+            desfazer.append((caminho, guardado))
+
+    def criar_pais(caminho: Path) -> None:
+        faltando = []
+        pasta = caminho.parent
+        while not pasta.exists():
+            faltando.append(pasta)
+            pasta = pasta.parent
+        for pasta in reversed(faltando):
+            pasta.mkdir()
+            desfazer.append((pasta, None))
+
+    try:
+        # 1. Validação em ordem (cada item vê o efeito dos anteriores) e preparação em paralelo
+        falha = _validar(itens, sobrescrever)
+        if falha is None:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fileops") as pool:
+                erros = list(pool.map(preparar, itens))
+            falha = next(((item, erro) for item, erro in zip(itens, erros) if erro), None)
+
+        # 2. Publicação em ordem, com log de desfazer
+        if falha is None:
+            for item in itens:
+                try:
+                    tipo, alvo, final = item["op"], item["alvo"], item["final"]
+                    if tipo == "remover":
+                        tirar_do_caminho(alvo)
+                    elif tipo == "criar_diretorio" and final.is_dir():
+                        continue
+                    elif tipo == "criar_arquivo" and final.exists():
+                        continue
+                    elif tipo == "mover" and not item.get("entre_dispositivos"):
+                        if sobrescrever:
+                            tirar_do_caminho(final)
+                        criar_pais(final)
+                        os.rename(alvo, final)
+                        desfazer.append((alvo, final))
+                    else:
+                        if tipo == "copiar" and "origem_disco" not in item:
+                            # Origem criada por um item anterior do lote: só existe agora
+                            copiar(alvo, item["pronto"])
+                        if sobrescrever:
+                            tirar_do_caminho(final)
+                        criar_pais(final)
+                        os.rename(item["pronto"], final)
+                        desfazer.append((item["pronto"], final))
+                        if item.get("entre_dispositivos"):
+                            tirar_do_caminho(alvo)
+                except Exception as e:
+                    falha = (item, e)
+                    break
+
+        if falha is not None:
+            for origem, destino in reversed(desfazer):
+                try:
+                    if destino is None:
+                        origem.rmdir()
+                    else:
+                        os.rename(destino, origem)
+                except OSError as e:
+                    logger.error(f"Falha ao desfazer {destino} -> {origem}: {e}")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    if falha is None:
+        return [_resultado(item) for item in itens]
+    item_falho, erro = falha
+    return [_resultado(item, erro if item is item_falho else Exception("cancelado: lote atômico desfeito"))
+            for item in itens]
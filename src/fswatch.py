@@ -0,0 +1,132 @@
+from typing import List, Optional
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Máscaras de eventos (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Eventos que mudam a árvore de diretórios
+IN_MUDANCA_ARVORE = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+_CABECALHO = struct.Struct("iIII")
+
+_libc = None
+
+
+def _carregar_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return _libc
+
+
+def inotify_disponivel() -> bool:
+    """Verifica se o kernel/libc oferecem inotify"""
+    try:
+        libc = _carregar_libc()
+        return hasattr(libc, "inotify_init1")
+    except (OSError, AttributeError):
+        return False
+
+
+class Evento:
+    __slots__ = ("wd", "mascara", "cookie", "nome")
+
+    def __init__(self, wd: int, mascara: int, cookie: int, nome: str):
+        self.wd = wd
+        self.mascara = mascara
+        self.cookie = cookie
+        self.nome = nome
+
+    @property
+    def is_dir(self) -> bool:
+        return bool(self.mascara & IN_ISDIR)
+
+    def __repr__(self):
+        return f"Evento(wd={self.wd}, mascara={self.mascara:#x}, nome={self.nome!r})"
+
+
+class Inotify:
+    """Wrapper mínimo de inotify via ctypes (sem dependências externas)"""
+
+    def __init__(self):
+        libc = _carregar_libc()
+        self.fd = libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self.fd < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, f"inotify_init1: {os.strerror(erro)}")
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def adicionar(self, caminho: str, mascara: int) -> int:
+        """Observa um caminho e retorna o watch descriptor"""
+        wd = _carregar_libc().inotify_add_watch(self.fd, os.fsencode(caminho), mascara)
+        if wd < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, f"inotify_add_watch({caminho}): {os.strerror(erro)}")
+        return wd
+
+    def remover(self, wd: int) -> None:
+        """Deixa de observar um watch descriptor (ignora se já removido)"""
+        _carregar_libc().inotify_rm_watch(self.fd, wd)
+
+    def ler(self, timeout: Optional[float] = None) -> List[Evento]:
+        """Espera eventos por até `timeout` segundos (None = indefinidamente)"""
+        espera = -1 if timeout is None else max(0, int(timeout * 1000))
+        if not self._poll.poll(espera):
+            return []
+
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        eventos = []
+        pos = 0
+        while pos + _CABECALHO.size <= len(dados):
+            wd, mascara, cookie, tamanho = _CABECALHO.unpack_from(dados, pos)
+            pos += _CABECALHO.size
+            nome = dados[pos:pos + tamanho].rstrip(b"\0")
+            pos += tamanho
+            eventos.append(Evento(wd, mascara, cookie, os.fsdecode(nome)))
+        return eventos
+
+    def fechar(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
@@ -0,0 +1,372 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from .fswatch import (Inotify, inotify_disponivel, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_FROM,
+                      IN_MOVED_TO, IN_Q_OVERFLOW, IN_IGNORED)
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 30.0
+# Espera entre o primeiro evento e o recálculo (um checkout gera dezenas de eventos)
+ATRASO = 0.3
+# Repositórios fora do PathIndex não recebem eventos da árvore de trabalho: o cache vence
+VALIDADE_SEM_EVENTOS = 30.0
+MAX_ARQUIVOS = 50
+_MASCARA_GIT = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+# Sem prompt de credenciais, sem travar o index em leituras, saída em inglês estável
+_AMBIENTE = {"GIT_TERMINAL_PROMPT": "0", "GIT_OPTIONAL_LOCKS": "0", "LC_ALL": "C"}
+_STATUS = ("status", "--porcelain=v2", "--branch", "-z")
+
+
+class GitError(Exception):
+    """Comando git falhou (a mensagem é o stderr do git)"""
+    pass
+
+
+def raiz_do_repositorio(caminho: str) -> Optional[str]:
+    """Sobe a partir de `caminho` até achar um .git, sem chamar o git"""
+    atual = os.path.abspath(caminho)
+    while True:
+        if os.path.exists(os.path.join(atual, ".git")):
+            return atual
+        pai = os.path.dirname(atual)
+        if pai == atual:
+            return None
+        atual = pai
+
+
+def diretorio_git(raiz: str) -> str:
+    """O .git do repositório (em worktrees e submódulos .git é um arquivo apontando para ele)"""
+    git = os.path.join(raiz, ".git")
+    if os.path.isfile(git):
+        with open(git, encoding="utf-8") as f:
+            conteudo = f.read().strip()
+        if conteudo.startswith("gitdir:"):
+            return os.path.normpath(os.path.join(raiz, conteudo[len("gitdir:"):].strip()))
+    return git
+
+
+def parse_status(saida: str) -> Dict:
+    """Interpreta a saída de `git status --porcelain=v2 --branch -z`"""
+    status = {"branch": None, "head": None, "upstream": None, "a_frente": 0, "atras": 0,
+              "staged": 0, "modificados": 0, "novos": 0, "conflitos": 0, "arquivos": []}
+    entradas = saida.split("\0")
+    i = 0
+    while i < len(entradas):
+        linha = entradas[i]
+        i += 1
+        if not linha:
+            continue
+        if linha.startswith("# branch.oid "):
+            oid = linha[len("# branch.oid "):]
+            status["head"] = None if oid == "(initial)" else oid[:7]
+        elif linha.startswith("# branch.head "):
+            head = linha[len("# branch.head "):]
+            status["branch"] = None if head == "(detached)" else head
+        elif linha.startswith("# branch.upstream "):
+            status["upstream"] = linha[len("# branch.upstream "):]
+        elif linha.startswith("# branch.ab "):
+            a_frente, atras = linha[len("# branch.ab "):].split()
+            status["a_frente"], status["atras"] = int(a_frente), -int(atras)
+        elif linha[0] in "12":
+            # 1 XY sub mH mI mW hH hI caminho / 2 ... Xscore caminho, seguido do caminho original
+            campos = linha.split(" ", 8 if linha[0] == "1" else 9)
+            xy = campos[1]
+            if xy[0] != ".":
+                status["staged"] += 1
+            if xy[1] != ".":
+                status["modificados"] += 1
+            status["arquivos"].append((xy.replace(".", " "), campos[-1]))
+            if linha[0] == "2":
+                i += 1
+        elif linha[0] == "u":
+            status["conflitos"] += 1
+            status["arquivos"].append(("UU", linha.split(" ", 10)[-1]))
+        elif linha[0] == "?":
+            status["novos"] += 1
+            status["arquivos"].append(("??", linha[2:]))
+    status["sujo"] = bool(status["staged"] or status["modificados"] or status["novos"] or status["conflitos"])
+    status["total_arquivos"] = len(status["arquivos"])
+    del status["arquivos"][MAX_ARQUIVOS:]
+    return status
+
+
+def descrever(status: Dict) -> str:
+    """Uma linha com o estado da árvore de trabalho (para o resumo do projeto)"""
+    partes = []
+    for chave, nome in (("modificados", "modificado(s)"), ("novos", "novo(s)"),
+                        ("staged", "no stage"), ("conflitos", "em conflito")):
+        if status[chave]:
+            partes.append(f"{status[chave]} {nome}")
+    linha = f"✏️ Alterações: {', '.join(partes)}" if partes else "✅ Sem alterações"
+    if status["a_frente"] or status["atras"]:
+        linha += f" (↑{status['a_frente']} ↓{status['atras']} em relação a {status['upstream']})"
+    return linha
+
+
+async def executar_git(*args: str, cwd: str, timeout: float = TIMEOUT) -> str:
+    """Roda o git num subprocesso assíncrono e devolve o stdout; GitError se falhar"""
+    try:
+        processo = await asyncio.create_subprocess_exec(
+            "git", *args,
+            cwd=cwd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, **_AMBIENTE}
+        )
+    except FileNotFoundError:
+        raise GitError("git não está instalado")
+    try:
+        saida, erro = await asyncio.wait_for(processo.communicate(), timeout)
+    except asyncio.TimeoutError:
+        processo.kill()
+        await processo.wait()
+        raise GitError(f"git {args[0]}: tempo esgotado ({timeout:.0f}s)")
+    if processo.returncode != 0:
+        raise GitError(erro.decode("utf-8", errors="replace").strip() or f"git {args[0]} saiu com código {processo.returncode}")
+    return saida.decode("utf-8", errors="replace")
+
+
+class GitIndex:
+    """Status dos repositórios dos projetos em cache, invalidado por eventos do sistema de arquivos.
+
+    Cada repositório acompanhado tem o .git observado com inotify (HEAD,
+    index e refs: checkout, commit, add) e recebe do PathIndex os eventos
+    da árvore de trabalho. Um evento só marca o status como velho; uma
+    thread roda `git status` ATRASO depois do primeiro evento (os seguintes
+    entram no mesmo cálculo). Assim
+    status_em_cache() nunca chama o git e serve para o resumo de cada
+    mensagem.
+    """
+
+    def __init__(self, path_index=None):
+        self.path_index = path_index
+        self._cond = threading.Condition()
+        self._status: Dict[str, Dict] = {}
+        self._pendentes: Dict[str, float] = {}  # raiz -> quando recalcular
+        self._observados: Dict[str, List[int]] = {}
+        self._wd: Dict[int, str] = {}
+        self._raiz_de: Dict[str, Tuple[Optional[str], float]] = {}
+        self._inotify: Optional[Inotify] = None
+        self._ativo = False
+        if path_index is not None:
+            path_index.ouvir(self._evento_arvore)
+
+    # --- Cache ---
+
+    def raiz(self, caminho: str) -> Optional[str]:
+        caminho = os.path.normpath(caminho)
+        raiz, quando = self._raiz_de.get(caminho, (None, 0.0))
+        # "Não é repositório" vale por pouco tempo: um git init depois deve aparecer
+        if raiz is None and time.monotonic() - quando > 5.0:
+            raiz = raiz_do_repositorio(caminho)
+            self._raiz_de[caminho] = (raiz, time.monotonic())
+        return raiz
+
+    def _agendar(self, raiz: str, atraso: float = ATRASO) -> None:
+        with self._cond:
+            self._pendentes[raiz] = min(self._pendentes.get(raiz, float("inf")), time.monotonic() + atraso)
+            self._cond.notify()
+
+    def acompanhar(self, caminho: str) -> Optional[str]:
+        """Passa a manter o status do repositório de `caminho` (calculado em background)"""
+        raiz = self.raiz(caminho)
+        if raiz is None:
+            return None
+        with self._cond:
+            if raiz not in self._observados:
+                self._observar(raiz)
+                self._pendentes[raiz] = time.monotonic()
+                self._cond.notify()
+        return raiz
+
+    def status_em_cache(self, caminho: str) -> Optional[Dict]:
+        """Último status conhecido, sem chamar o git; None enquanto o primeiro cálculo não termina"""
+        raiz = self.raiz(caminho)
+        if raiz is None:
+            return None
+        status = self._status.get(raiz)
+        if status is None:
+            self.acompanhar(raiz)
+            return None
+        fora_do_indice = self.path_index is None or not raiz.startswith(str(self.path_index.raiz))
+        if fora_do_indice and time.monotonic() - status["atualizado_em"] > VALIDADE_SEM_EVENTOS:
+            self._agendar(raiz, 0)
+        return status
+
+    def _evento_arvore(self, diretorio: str) -> None:
+        for raiz in list(self._observados):
+            if diretorio == raiz or diretorio.startswith(raiz + os.sep) or raiz.startswith(diretorio + os.sep):
+                self._agendar(raiz)
+
+    def _calcular(self, raiz: str) -> None:
+        try:
+            resultado = subprocess.run(["git", *_STATUS], cwd=raiz, capture_output=True, timeout=TIMEOUT,
+                                       env={**os.environ, **_AMBIENTE})
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"git status falhou em {raiz}: {e}")
+            return
+        if resultado.returncode != 0:
+            logger.warning(f"git status falhou em {raiz}: {resultado.stderr.decode(errors='replace').strip()}")
+            return
+        self._guardar(raiz, parse_status(resultado.stdout.decode("utf-8", errors="replace")))
+
+    def _guardar(self, raiz: str, status: Dict) -> Dict:
+        status["raiz"] = raiz
+        status["atualizado_em"] = time.monotonic()
+        self._status[raiz] = status
+        return status
+
+    # --- Observador ---
+
+    def _observar(self, raiz: str) -> None:
+        """Observa o .git e as pastas de refs/heads (branches "feature/x" criam subpastas)"""
+        wds = self._observados.setdefault(raiz, [])
+        if self._inotify is None:
+            return
+        git = diretorio_git(raiz)
+        pastas = [git]
+        for pasta, _, _ in os.walk(os.path.join(git, "refs", "heads")):
+            pastas.append(pasta)
+        for pasta in pastas:
+            try:
+                wd = self._inotify.adicionar(pasta, _MASCARA_GIT)
+            except OSError as e:
+                logger.warning(f"Não foi possível observar {pasta}: {e}")
+                continue
+            if wd not in self._wd:
+                self._wd[wd] = raiz
+                wds.append(wd)
+
+    def _ler_eventos(self) -> None:
+        while self._ativo:
+            for evento in self._inotify.ler(timeout=1.0):
+                if evento.mascara & IN_Q_OVERFLOW:
+                    for raiz in list(self._observados):
+                        self._agendar(raiz)
+                    continue
+                raiz = self._wd.get(evento.wd)
+                if raiz is None:
+                    continue
+                if evento.mascara & IN_IGNORED:
+                    self._wd.pop(evento.wd, None)
+                    continue
+                if evento.mascara & IN_CREATE and evento.is_dir:
+                    with self._cond:
+                        self._observar(raiz)
+                # O rename do .lock para o nome final já gera o evento que importa
+                if not evento.nome.endswith(".lock"):
+                    self._agendar(raiz)
+
+    def _recalcular(self) -> None:
+        while self._ativo:
+            with self._cond:
+                agora = time.monotonic()
+                vencidos = [raiz for raiz, quando in self._pendentes.items() if quando <= agora]
+                if not vencidos:
+                    self._cond.wait(min(self._pendentes.values(), default=agora + 60.0) - agora)
+                    continue
+                for raiz in vencidos:
+                    del self._pendentes[raiz]
+            for raiz in vencidos:
+                self._calcular(raiz)
+
+    def iniciar(self) -> None:
+        """Threads do observador do .git e do recálculo do status"""
+        if self._ativo:
+            return
+        self._ativo = True
+        try:
+            if inotify_disponivel():
+                self._inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"inotify indisponível, status do git só pela árvore de trabalho e validade: {e}")
+        if self._inotify is not None:
+            threading.Thread(target=self._ler_eventos, daemon=True, name="git-index-eventos").start()
+        threading.Thread(target=self._recalcular, daemon=True, name="git-index").start()
+
+    def parar(self) -> None:
+        self._ativo = False
+        with self._cond:
+            self._cond.notify()
+
+    # --- Operações (assíncronas) ---
+
+    def _raiz_ou_erro(self, caminho: str) -> str:
+        raiz = self.raiz(caminho)
+        if raiz is None:
+            raise GitError(f"{caminho} não está num repositório git")
+        return raiz
+
+    async def status(self, caminho: str) -> Dict:
+        """Status atual (roda o git agora e atualiza o cache)"""
+        raiz = self._raiz_ou_erro(caminho)
+        self.acompanhar(raiz)
+        return self._guardar(raiz, parse_status(await executar_git(*_STATUS, cwd=raiz)))
+
+    async def branches(self, caminho: str) -> List[str]:
+        raiz = self._raiz_ou_erro(caminho)
+        saida = await executar_git("branch", "--format=%(refname:short)", cwd=raiz)
+        return [linha for linha in saida.splitlines() if linha]
+
+    async def checkout(self, caminho: str, branch: str, criar: bool = False) -> Dict:
+        """Troca de branch (criar=True cria a partir do HEAD) e devolve o status novo.
+
+        Usa git switch: só aceita branches (nunca confunde com um arquivo) e
+        cria a branch local rastreando origin/<branch> quando ela só existe lá.
+        """
+        raiz = self._raiz_ou_erro(caminho)
+        # O nome vai como argumento do switch: "--orphan", "--detach"... seriam lidos como opções
+        if branch.startswith("-"):
+            raise GitError(f"Nome de branch inválido: {branch}")
+        try:
+            await executar_git("check-ref-format", "--branch", branch, cwd=raiz)
+        except GitError:
+            raise GitError(f"Nome de branch inválido: {branch}")
+        await executar_git("switch", *(["-c"] if criar else []), branch, cwd=raiz)
+        return await self.status(raiz)
+
+    async def log(self, caminho: str, quantidade: int = 10) -> List[Dict]:
+        raiz = self._raiz_ou_erro(caminho)
+        try:
+            saida = await executar_git("log", f"-n{quantidade}", "--format=%h%x1f%an%x1f%ar%x1f%s%x1e", cwd=raiz)
+        except GitError as e:
+            # Repositório sem nenhum commit
+            if "does not have any commits" in str(e):
+                return []
+            raise
+        commits = []
+        for registro in saida.split("\x1e"):
+            campos = registro.strip("\n").split("\x1f")
+            if len(campos) == 4:
+                commits.append(dict(zip(("sha", "autor", "quando", "assunto"), campos)))
+        return commits
+
+    async def diff_resumo(self, caminho: str) -> Dict:
+        """Linhas adicionadas e removidas por arquivo (stage e árvore de trabalho contra o HEAD)"""
+        raiz = self._raiz_ou_erro(caminho)
+        try:
+            saidas = [await executar_git("diff", "HEAD", "--numstat", cwd=raiz)]
+        except GitError:
+            # Sem HEAD (nenhum commit): o que está no stage e o que não está
+            saidas = [await executar_git("diff", "--cached", "--numstat", cwd=raiz),
+                      await executar_git("diff", "--numstat", cwd=raiz)]
+        arquivos = []
+        for saida in saidas:
+            for linha in saida.splitlines():
+                adicoes, remocoes, nome = linha.split("\t", 2)
+                # Binários aparecem como "-"
+                arquivos.append({"arquivo": nome, "adicoes": int(adicoes) if adicoes != "-" else 0,
+                                 "remocoes": int(remocoes) if remocoes != "-" else 0, "binario": adicoes == "-"})
+        arquivos.sort(key=lambda a: -(a["adicoes"] + a["remocoes"]))
+        return {
+            "arquivos": arquivos,
+            "adicoes": sum(a["adicoes"] for a in arquivos),
+            "remocoes": sum(a["remocoes"] for a in arquivos)
+        }
@@ -0,0 +1,532 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_MARKDOWN = {".md", ".markdown"}
+EXTENSOES_TEXTO = {".txt", ".rst", ".log"}
+EXTENSOES_CODIGO = {
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".sh", ".bash", ".go", ".rs", ".java", ".c", ".h",
+    ".cpp", ".hpp", ".rb", ".php", ".sql", ".json", ".yaml", ".yml", ".toml", ".ini", ".cfg",
+}
+DIRETORIOS_IGNORADOS = {".git", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+# Tamanhos em tokens (palavras separadas por espaço): o all-MiniLM-L6-v2
+# trunca em 256 word pieces, ~200 palavras cabem com folga
+TAMANHO_PADRAO = 200
+SOBREPOSICAO_PADRAO = 40
+LOTE_PADRAO = 256
+# Tamanho máximo de arquivo lido (runbooks grandes ainda cabem)
+TAMANHO_MAXIMO_ARQUIVO = 5 * 1024 * 1024
+
+_TITULO = re.compile(r'^(#{1,6})\s+(.*\S)\s*$')
+
+
+def _tokens(texto: str) -> int:
+    return len(texto.split())
+
+
+def tipo_arquivo(caminho: Path) -> Optional[str]:
+    sufixo = caminho.suffix.lower()
+    if sufixo in EXTENSOES_MARKDOWN:
+        return "markdown"
+    if sufixo in EXTENSOES_TEXTO:
+        return "texto"
+    if sufixo in EXTENSOES_CODIGO:
+        return "codigo"
+    return None
+
+
+def dividir_linhas(linhas: List[str], tamanho: int, sobreposicao: int) -> Iterator[str]:
+    """Janelas de linhas com até `tamanho` tokens, repetindo as últimas
+    `sobreposicao` tokens da janela anterior. Linhas maiores que a janela
+    são quebradas por palavras."""
+    janela: List[Tuple[str, int]] = []
+    total = 0
+
+    def partes(linha: str) -> Iterator[Tuple[str, int]]:
+        palavras = linha.split()
+        if len(palavras) <= tamanho:
+            yield linha, len(palavras)
+            return
+        passo = max(tamanho - sobreposicao, 1)
+        for inicio in range(0, len(palavras), passo):
+            pedaco = palavras[inicio:inicio + tamanho]
+            yield " ".join(pedaco), len(pedaco)
+            if inicio + tamanho >= len(palavras):
+                break
+
+    for linha in linhas:
+        for parte, n in partes(linha):
+            if total + n > tamanho and total > 0:
+                yield "\n".join(l for l, _ in janela)
+                # Mantém o fim da janela como sobreposição
+                mantidas, acumulado = [], 0
+                for item in reversed(janela):
+                    if acumulado + item[1] > sobreposicao:
+                        break
+                    mantidas.append(item)
+                    acumulado += item[1]
+                janela = list(reversed(mantidas))
+                total = acumulado
+            janela.append((parte, n))
+            total += n
+
+    if total > 0:
+        yield "\n".join(l for l, _ in janela)
+
+
+def dividir_markdown(texto: str, tamanho: int, sobreposicao: int) -> Iterator[Tuple[str, str]]:
+    """Divide por títulos; seções longas viram janelas. Retorna (seção, trecho)
+    com o caminho de títulos prefixado ao trecho para dar contexto ao embedding."""
+    titulos: List[str] = []
+    linhas: List[str] = []
+
+    def emitir():
+        secao = " > ".join(titulos)
+        for trecho in dividir_linhas(linhas, tamanho - _tokens(secao), sobreposicao):
+            yield secao, f"{secao}\n{trecho}" if secao else trecho
+
+    for linha in texto.splitlines():
+        titulo = _TITULO.match(linha)
+        if titulo:
+            yield from emitir()
+            nivel = len(titulo.group(1))
+            titulos = titulos[:nivel - 1] + [titulo.group(2)]
+            linhas = []
+        elif linha.strip() or linhas:
+            linhas.append(linha)
+    yield from emitir()
+
+
+# Início de definição no nível zero (Python, JS/TS, Go, Rust, Java, shell...)
+_DEFINICAO = re.compile(
+    r'^(?:export\s+)?(?:default\s+)?(?:pub(?:\(\w+\))?\s+)?(?:public\s+|private\s+|protected\s+)?'
+    r'(?:static\s+)?(?:async\s+)?'
+    r'(?:def|class|function|interface|type|enum|const|let|var|fn|func|impl|struct|trait|mod)\b\s*\*?\s*([\w$]*)'
+    # Atribuição no nível zero (constantes de módulo em Python/shell)
+    r'|^([A-Za-z_]\w*)\s*(?::[^=]+)?=(?!=)'
+)
+_ANOTACAO = re.compile(r'^(?:@|#|//|/\*|\*)')
+
+
+def blocos_codigo(linhas: List[str]) -> Iterator[Tuple[str, int, int]]:
+    """Separa código em blocos por definições de nível zero.
+
+    Comentários e decoradores logo acima de uma definição ficam no mesmo
+    bloco. Retorna (símbolo, linha inicial, linha final) com índices base 0
+    e fim exclusivo.
+    """
+    inicios = [(0, "")]
+    for i, linha in enumerate(linhas):
+        definicao = _DEFINICAO.match(linha)
+        if not definicao:
+            continue
+        simbolo = definicao.group(1) or definicao.group(2) or ""
+        if i == 0:
+            inicios[0] = (0, simbolo)
+            continue
+        inicio = i
+        while inicio > 0 and _ANOTACAO.match(linhas[inicio - 1]) and inicio - 1 > inicios[-1][0]:
+            inicio -= 1
+        inicios.append((inicio, simbolo))
+
+    for n, (inicio, simbolo) in enumerate(inicios):
+        fim = inicios[n + 1][0] if n + 1 < len(inicios) else len(linhas)
+        if fim > inicio:
+            yield simbolo, inicio, fim
+
+
+def _janelas(linhas: List[str], inicio: int, fim: int,
+             tamanho: int, sobreposicao: int) -> Iterator[Tuple[int, int]]:
+    """Intervalos de linhas [ini, fim) com até `tamanho` tokens e sobreposição"""
+    ini = inicio
+    while ini < fim:
+        total, j = 0, ini
+        while j < fim and (total + _tokens(linhas[j]) <= tamanho or j == ini):
+            total += _tokens(linhas[j])
+            j += 1
+        yield ini, j
+        if j >= fim:
+            return
+        # Recua até `sobreposicao` tokens para a próxima janela
+        proximo, repetidos = j, 0
+        while proximo - 1 > ini and repetidos + _tokens(linhas[proximo - 1]) <= sobreposicao:
+            proximo -= 1
+            repetidos += _tokens(linhas[proximo])
+        ini = proximo
+
+
+def dividir_codigo(texto: str, tamanho: int = TAMANHO_PADRAO,
+                   sobreposicao: int = SOBREPOSICAO_PADRAO) -> Iterator[Tuple[str, str, int]]:
+    """Trechos de código alinhados a definições: blocos pequenos consecutivos
+    são agrupados até `tamanho` tokens e blocos grandes viram janelas.
+    Retorna (símbolo, trecho, linha inicial base 1)."""
+    linhas = texto.splitlines()
+    grupo: List[Tuple[str, int, int]] = []
+    tokens_grupo = 0
+
+    def emitir_grupo():
+        if not grupo:
+            return
+        inicio, fim = grupo[0][1], grupo[-1][2]
+        trecho = "\n".join(linhas[inicio:fim])
+        if trecho.strip():
+            simbolo = next((s for s, _, _ in grupo if s), "")
+            yield simbolo, trecho, inicio + 1
+
+    for simbolo, inicio, fim in blocos_codigo(linhas):
+        tokens = sum(_tokens(l) for l in linhas[inicio:fim])
+        if tokens > tamanho:
+            yield from emitir_grupo()
+            grupo, tokens_grupo = [], 0
+            for ini, fim_janela in _janelas(linhas, inicio, fim, tamanho, sobreposicao):
+                yield simbolo, "\n".join(linhas[ini:fim_janela]), ini + 1
+            continue
+        if tokens_grupo + tokens > tamanho:
+            yield from emitir_grupo()
+            grupo, tokens_grupo = [], 0
+        grupo.append((simbolo, inicio, fim))
+        tokens_grupo += tokens
+    yield from emitir_grupo()
+
+
+def dividir_arquivo(texto: str, tipo: str, tamanho: int = TAMANHO_PADRAO,
+                    sobreposicao: int = SOBREPOSICAO_PADRAO) -> Iterator[Tuple[str, str]]:
+    """Trechos (seção, texto) de um arquivo conforme o tipo"""
+    if tipo == "markdown":
+        yield from dividir_markdown(texto, tamanho, sobreposicao)
+        return
+    if tipo == "codigo":
+        for simbolo, trecho, _ in dividir_codigo(texto, tamanho, sobreposicao):
+            yield simbolo, trecho
+        return
+    for trecho in dividir_linhas(texto.splitlines(), tamanho, sobreposicao):
+        if trecho.strip():
+            yield "", trecho
+
+
+def hash_conteudo(texto: str) -> str:
+    """Identificador do trecho: sha256 do texto normalizado (espaços colapsados)"""
+    normalizado = " ".join(texto.split())
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest()[:32]
+
+
+def listar_arquivos(diretorio: Path) -> Iterator[Path]:
+    for raiz, dirs, arquivos in os.walk(diretorio):
+        dirs[:] = sorted(d for d in dirs if d not in DIRETORIOS_IGNORADOS and not d.startswith("."))
+        for nome in sorted(arquivos):
+            caminho = Path(raiz) / nome
+            if tipo_arquivo(caminho) is not None:
+                yield caminho
+
+
+# --- Embedding nos processos do pool ---
+
+_embedding_function = None
+
+
+def _iniciar_worker(modelos_dir: str, nome_motor: str):
+    """Carrega nos processos o mesmo motor usado pelo EmbeddingService da base.
+
+    Se o processo não consegue esse motor (criar_motor caiu para outro), falha
+    em vez de gravar vetores de outro modelo na coleção.
+    """
+    global _embedding_function
+    from .embeddings import backend_de, criar_motor
+    _embedding_function = criar_motor(Path(modelos_dir), backend_de(nome_motor))
+    if _embedding_function.nome != nome_motor:
+        raise RuntimeError(f"Motor de embedding {_embedding_function.nome} no worker, esperado {nome_motor}")
+
+
+def _embed_lote(textos: List[str]) -> List[List[float]]:
+    return _embedding_function(textos)
+
+
+# --- Estado para retomar ---
+
+class EstadoIngestao:
+    """Arquivos já ingeridos (mtime, tamanho e ids dos trechos), salvo de forma atômica"""
+
+    def __init__(self, caminho: Path):
+        self.caminho = caminho
+        self.arquivos: Dict[str, Dict] = {}
+        if caminho.exists():
+            try:
+                self.arquivos = json.loads(caminho.read_text(encoding="utf-8")).get("arquivos", {})
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"Estado de ingestão ilegível, recomeçando: {e}")
+
+    def atualizado(self, chave: str, stat: os.stat_result) -> bool:
+        registro = self.arquivos.get(chave)
+        return bool(registro) and registro["mtime_ns"] == stat.st_mtime_ns and registro["tamanho"] == stat.st_size
+
+    def referencias(self) -> Counter:
+        """Quantos arquivos usam cada id de trecho"""
+        return Counter(i for r in self.arquivos.values() for i in set(r["ids"]))
+
+    def salvar(self) -> None:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.caminho.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"arquivos": self.arquivos}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.caminho)
+
+
+class Progresso:
+    def __init__(self, total_arquivos: int, saida=None):
+        self.total_arquivos = total_arquivos
+        self.arquivos = 0
+        self.trechos = 0
+        self.duplicados = 0
+        self.inicio = time.perf_counter()
+        self._ultimo = 0.0
+        self.saida = saida if saida is not None else sys.stderr
+
+    @property
+    def vazao(self) -> float:
+        return self.trechos / max(time.perf_counter() - self.inicio, 1e-9)
+
+    def mostrar(self, forcar: bool = False) -> None:
+        agora = time.perf_counter()
+        if not forcar and agora - self._ultimo < 0.5:
+            return
+        self._ultimo = agora
+        self.saida.write(
+            f"\rArquivos {self.arquivos}/{self.total_arquivos} | trechos {self.trechos} "
+            f"| duplicados {self.duplicados} | {self.vazao:,.1f} trechos/s"
+        )
+        self.saida.flush()
+
+
+def ingerir_diretorio(kb, diretorio: str,
+                      tamanho: int = TAMANHO_PADRAO,
+                      sobreposicao: int = SOBREPOSICAO_PADRAO,
+                      tamanho_lote: int = LOTE_PADRAO,
+                      processos: Optional[int] = None,
+                      arquivo_estado: Optional[Path] = None,
+                      mostrar_progresso: bool = True) -> Dict:
+    """Ingere Markdown, texto e código de um diretório na base de conhecimento.
+
+    Os trechos são deduplicados pelo hash do conteúdo (que também é o id no
+    Chroma), embeddados em lotes num pool de processos e gravados com
+    upsert em lote no Chroma e no índice lexical. Um arquivo só entra no
+    estado quando todos os seus trechos foram gravados, então uma execução
+    interrompida retoma de onde parou.
+    """
+    diretorio = Path(diretorio).resolve()
+    if not diretorio.is_dir():
+        raise NotADirectoryError(f"Diretório não encontrado: {diretorio}")
+
+    arquivo_estado = arquivo_estado or kb.data_dir / "ingest_state.json"
+    estado = EstadoIngestao(arquivo_estado)
+    processos = processos or max(1, (os.cpu_count() or 2) // 2)
+
+    arquivos = list(listar_arquivos(diretorio))
+    progresso = Progresso(len(arquivos))
+    vistos: set = set()
+    # Arquivos que usam cada id, atualizado a cada arquivo processado nesta execução:
+    # um trecho só sai do Chroma quando nenhum arquivo o usa mais
+    referencias = estado.referencias()
+
+    # Trechos de cada arquivo ainda não gravados: chave -> ids pendentes
+    pendentes: Dict[str, set] = {}
+    concluidos: Dict[str, Dict] = {}
+    lote: List[Tuple[str, str, Dict, str]] = []  # (id, texto, metadados, chave do arquivo)
+    em_voo = {}
+    ultimo_salvamento = time.monotonic()
+
+    def concluir(chave: str):
+        estado.arquivos[chave] = concluidos.pop(chave)
+        pendentes.pop(chave, None)
+        progresso.arquivos += 1
+
+    def gravar(itens, embeddings):
+        ids = [i[0] for i in itens]
+        kb.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[i[1] for i in itens],
+            metadatas=[i[2] for i in itens]
+        )
+        kb.lexical.upsert_many((i[0], i[1], i[2]) for i in itens)
+        progresso.trechos += len(itens)
+        for doc_id, _, _, chave in itens:
+            restantes = pendentes.get(chave)
+            if restantes is not None:
+                restantes.discard(doc_id)
+                if not restantes:
+                    concluir(chave)
+
+    def coletar(maximo_em_voo: Optional[int]):
+        """Grava os lotes já embeddados; bloqueia enquanto houver mais de
+        `maximo_em_voo` lotes pendentes (None = não bloqueia)"""
+        nonlocal ultimo_salvamento
+        while em_voo:
+            bloquear = maximo_em_voo is not None and len(em_voo) > maximo_em_voo
+            prontos, _ = wait(list(em_voo), timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+            if not prontos:
+                break
+            for futuro in prontos:
+                gravar(em_voo.pop(futuro), futuro.result())
+            if time.monotonic() - ultimo_salvamento > 5:
+                estado.salvar()
+                ultimo_salvamento = time.monotonic()
+            if mostrar_progresso:
+                progresso.mostrar()
+
+    def enviar(pool):
+        nonlocal lote
+        if not lote:
+            return
+        # Trechos que já estão no Chroma (execução interrompida) não são reembeddados
+        existentes = set(kb.collection.get(ids=[i[0] for i in lote], include=[])["ids"])
+        novos = []
+        for item in lote:
+            if item[0] in existentes:
+                progresso.duplicados += 1
+                restantes = pendentes.get(item[3])
+                if restantes is not None:
+                    restantes.discard(item[0])
+                    if not restantes:
+                        concluir(item[3])
+            else:
+                novos.append(item)
+        lote = []
+        if novos:
+            em_voo[pool.submit(_embed_lote, [i[1] for i in novos])] = novos
+        # Limita os lotes em voo para não acumular embeddings na memória
+        coletar(processos * 2)
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto, initializer=_iniciar_worker,
+                             initargs=(str(kb.embeddings.data_dir / "modelos"), kb.embeddings.nome)) as pool:
+        try:
+            for caminho in arquivos:
+                chave = str(caminho.relative_to(diretorio))
+                stat = caminho.stat()
+                if estado.atualizado(chave, stat):
+                    progresso.arquivos += 1
+                    vistos.update(estado.arquivos[chave]["ids"])
+                    # Registros de antes do campo "raiz" passam a ser deste diretório
+                    estado.arquivos[chave].setdefault("raiz", str(diretorio))
+                    continue
+                if stat.st_size > TAMANHO_MAXIMO_ARQUIVO:
+                    logger.warning(f"Arquivo ignorado por tamanho: {chave}")
+                    progresso.arquivos += 1
+                    continue
+
+                try:
+                    texto = caminho.read_text(encoding="utf-8")
+                except UnicodeDecodeError:
+                    logger.warning(f"Arquivo ignorado (não é UTF-8): {chave}")
+                    progresso.arquivos += 1
+                    continue
+
+                tipo = tipo_arquivo(caminho)
+                ids_arquivo: List[str] = []
+                ids_pendentes: set = set()
+                for indice, (secao, trecho) in enumerate(dividir_arquivo(texto, tipo, tamanho, sobreposicao)):
+                    doc_id = hash_conteudo(trecho)
+                    ids_arquivo.append(doc_id)
+                    if doc_id in vistos:
+                        progresso.duplicados += 1
+                        continue
+                    vistos.add(doc_id)
+                    ids_pendentes.add(doc_id)
+                    lote.append((doc_id, trecho, {
+                        "fonte": chave,
+                        "secao": secao,
+                        "indice": indice,
+                        "tipo": tipo,
+                        "ingerido_em": datetime.now().isoformat()
+                    }, chave))
+                    if len(lote) >= tamanho_lote:
+                        enviar(pool)
+
+                # Trechos que deixaram de existir num arquivo alterado
+                anteriores = set(estado.arquivos.get(chave, {}).get("ids", []))
+                referencias.subtract(anteriores)
+                referencias.update(set(ids_arquivo))
+                removidos = {i for i in anteriores if referencias[i] <= 0}
+                if removidos:
+                    kb.collection.delete(ids=list(removidos))
+                    kb.lexical.delete(removidos)
+
+                concluidos[chave] = {"mtime_ns": stat.st_mtime_ns, "tamanho": stat.st_size, "ids": ids_arquivo,
+                                     "raiz": str(diretorio)}
+                if ids_pendentes:
+                    pendentes[chave] = ids_pendentes
+                else:
+                    concluir(chave)
+
+            enviar(pool)
+            coletar(0)
+
+            # Arquivos deste diretório que sumiram desde a última ingestão (só numa
+            # execução completa: interrompida, a lista de vistos está pela metade)
+            presentes = {str(caminho.relative_to(diretorio)) for caminho in arquivos}
+            sumidos = [chave for chave, registro in estado.arquivos.items()
+                       if registro.get("raiz") == str(diretorio) and chave not in presentes]
+            for chave in sumidos:
+                anteriores = set(estado.arquivos.pop(chave)["ids"])
+                referencias.subtract(anteriores)
+                removidos = {i for i in anteriores if referencias[i] <= 0}
+                if removidos:
+                    kb.collection.delete(ids=list(removidos))
+                    kb.lexical.delete(removidos)
+            if sumidos:
+                logger.info(f"{len(sumidos)} arquivos removidos de {diretorio} saíram da base")
+        finally:
+            # Interrompido ou não, guarda os arquivos concluídos até aqui
+            estado.salvar()
+            if mostrar_progresso:
+                progresso.mostrar(forcar=True)
+                progresso.saida.write("\n")
+
+    duracao = time.perf_counter() - progresso.inicio
+    resumo = {
+        "arquivos": progresso.arquivos,
+        "trechos": progresso.trechos,
+        "duplicados": progresso.duplicados,
+        "segundos": round(duracao, 2),
+        "trechos_por_segundo": round(progresso.vazao, 1)
+    }
+    logger.info(f"Ingestão de {diretorio} concluída: {resumo}")
+    return resumo
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia ingest", description="Ingere documentos na base de conhecimento")
+    parser.add_argument("diretorio", help="Diretório com Markdown, texto e código")
+    parser.add_argument("--tamanho", type=int, default=TAMANHO_PADRAO, help="Tokens por trecho")
+    parser.add_argument("--sobreposicao", type=int, default=SOBREPOSICAO_PADRAO, help="Tokens repetidos entre trechos")
+    parser.add_argument("--lote", type=int, default=LOTE_PADRAO, help="Trechos por lote de embedding")
+    parser.add_argument("--processos", type=int, help="Processos de embedding")
+    parser.add_argument("--data-dir", default="/root/projetos/chat-ia-terminal/data")
+    args = parser.parse_args(argv)
+
+    from .knowledge import KnowledgeBase
+    kb = KnowledgeBase(args.data_dir)
+    try:
+        resumo = ingerir_diretorio(kb, args.diretorio, args.tamanho, args.sobreposicao, args.lote, args.processos)
+    except KeyboardInterrupt:
+        print("\nIngestão interrompida; execute de novo para continuar.")
+        return
+    print(f"{resumo['arquivos']} arquivos, {resumo['trechos']} trechos novos, {resumo['duplicados']} duplicados "
+          f"em {resumo['segundos']}s ({resumo['trechos_por_segundo']} trechos/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,75 @@
 from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import importlib.util
 import json
-import chromadb
+import logging
+import os
+import threading
+import time
 from datetime import datetime
 
+from .backup import BackupStore
+from .checkpoints import CheckpointStore
+from .embeddings import abrir_colecao, get_embedding_service
+from .metrics import BUSCA_LATENCIA, CHROMA_LATENCIA
+from .search import DocumentIndex, reciprocal_rank_fusion
+
+# Re-rank é opcional; sentence-transformers (e o torch) só são importados pela thread do Reranker
+RERANK_DISPONIVEL = importlib.util.find_spec("sentence_transformers") is not None
+
+logger = logging.getLogger(__name__)
+
+# Constante da fusão por ranking recíproco (valor usual da literatura)
+RRF_K = 60
+
+
+def _where_chroma(where: Optional[Dict]) -> Optional[Dict]:
+    """O Chroma exige $and explícito quando o filtro tem mais de uma chave"""
+    if not where or len(where) == 1:
+        return where or None
+    return {"$and": [{chave: valor} for chave, valor in where.items()]}
+
+
+class Reranker:
+    """Cross-encoder local, carregado em background e usado só se couber no orçamento"""
+
+    def __init__(self, modelo: str):
+        self.modelo = modelo
+        self.encoder = None
+        self.ms_por_par: Optional[float] = None  # média móvel medida
+        threading.Thread(target=self._carregar, daemon=True, name="reranker-load").start()
+
+    def _carregar(self):
+        try:
+            from sentence_transformers import CrossEncoder
+            self.encoder = CrossEncoder(self.modelo)
+            logger.info(f"Cross-encoder {self.modelo} carregado")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cross-encoder {self.modelo}: {e}")
+
+    def cabe_no_orcamento(self, pares: int, restante_ms: float) -> bool:
+        if self.encoder is None:
+            return False
+        if self.ms_por_par is None:
+            return True  # primeira execução calibra a estimativa
+        return self.ms_por_par * pares <= restante_ms
+
+    def reordenar(self, query: str, resultados: List[Dict]) -> List[Dict]:
+        inicio = time.perf_counter()
+        scores = self.encoder.predict([(query, r["text"]) for r in resultados])
+        ms = (time.perf_counter() - inicio) * 1000 / max(len(resultados), 1)
+        self.ms_por_par = ms if self.ms_por_par is None else 0.8 * self.ms_por_par + 0.2 * ms
+
+        for resultado, score in zip(resultados, scores):
+            resultado["rerank_score"] = float(score)
+        return sorted(resultados, key=lambda r: r["rerank_score"], reverse=True)
+
+
 class KnowledgeBase:
-    def __init__(self, data_dir: str = "/root/projetos/chat-ia-terminal/data"):
+    def __init__(self, data_dir: str = "/root/projetos/chat-ia-terminal/data",
+                 reranker_model: Optional[str] = None,
+                 orcamento_ms: Optional[float] = None):
         self.data_dir = Path(data_dir)
         self.chroma_dir = self.data_dir / "chroma_db"
         self.checkpoints_dir = self.data_dir / "checkpoints"
@@ -17,9 +81,45 @@ class KnowledgeBase:
         self.checkpoints_dir.mkdir(exist_ok=True)
         self.system_backups_dir.mkdir(exist_ok=True)
         
+        # Checkpoints comprimidos e codificados como deltas
+        self.checkpoints = CheckpointStore(self.checkpoints_dir)
+        
+        # Backups deduplicados, fora de data/
+        self.backups = BackupStore(padrao=str(self.data_dir.parent / "backups"))
+        
         # Inicializa ChromaDB
+        import chromadb
         self.client = chromadb.PersistentClient(path=str(self.chroma_dir))
-        self.collection = self.client.get_or_create_collection("knowledge")
+        self.embeddings = get_embedding_service(str(self.data_dir))
+        self.collection = abrir_colecao(self.client, "knowledge", self.embeddings)
+        
+        # Índice lexical ao lado do vetorial
+        self.lexical = DocumentIndex(self.data_dir / "knowledge_fts.db")
+        self._sincronizar_lexical()
+        
+        # As duas buscas rodam em paralelo
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="knowledge")
+        
+        # Re-rank opcional por cross-encoder, limitado pelo orçamento de latência
+        reranker_model = reranker_model or os.getenv("KNOWLEDGE_RERANKER")
+        self.orcamento_ms = orcamento_ms or float(os.getenv("KNOWLEDGE_ORCAMENTO_MS", "250"))
+        self.reranker = None
+        if reranker_model:
+            if not RERANK_DISPONIVEL:
+                logger.warning("sentence-transformers não instalado; re-rank desativado")
+            else:
+                self.reranker = Reranker(reranker_model)
+    
+    def _sincronizar_lexical(self):
+        """Indexa no FTS os documentos que só existem no ChromaDB"""
+        try:
+            if self.lexical.count() >= self.collection.count():
+                return
+            existentes = self.collection.get(include=["documents", "metadatas"])
+            self.lexical.upsert_many(zip(existentes["ids"], existentes["documents"], existentes["metadatas"]))
+            logger.info(f"Índice lexical sincronizado com {len(existentes['ids'])} documentos")
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar índice lexical: {e}")
     
     def add_knowledge(self, text: str, metadata: Optional[Dict] = None) -> str:
         """Adiciona novo conhecimento à base"""
@@ -29,82 +129,133 @@ class KnowledgeBase:
         # Adiciona timestamp
         metadata["timestamp"] = datetime.now().isoformat()
         
-        # Adiciona ao ChromaDB
+        doc_id = metadata.get("id", str(datetime.now().timestamp()))
+        
+        # Adiciona ao ChromaDB e ao índice lexical
         self.collection.add(
             documents=[text],
             metadatas=[metadata],
-            ids=[metadata.get("id", str(datetime.now().timestamp()))]
+            ids=[doc_id]
         )
+        self.lexical.upsert(doc_id, text, metadata)
         
         return "Conhecimento adicionado com sucesso"
     
-    def search_knowledge(self, query: str, n_results: int = 5) -> List[Dict]:
-        """Busca conhecimento similar à query"""
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+    def ingest_directory(self, directory: str, **kwargs) -> Dict:
+        """Ingere um diretório de Markdown, texto e código (ver src/ingest.py)"""
+        from .ingest import ingerir_diretorio
+        return ingerir_diretorio(self, directory, **kwargs)
+    
+    def _busca_vetorial(self, query: str, n_results: int, where: Optional[Dict]) -> List[Dict]:
+        total = self.collection.count()
+        if total == 0:
+            return []
+        with CHROMA_LATENCIA.tempo(colecao="knowledge", operacao="query"), BUSCA_LATENCIA.tempo(etapa="vetorial"):
+            results = self.collection.query(
+                query_texts=[query],
+                n_results=min(n_results, total),
+                where=_where_chroma(where)
+            )
         
-        # Formata resultados
-        formatted_results = []
-        for i in range(len(results["documents"][0])):
-            formatted_results.append({
-                "text": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i]
-            })
-        
-        return formatted_results
+        return [{
+            "id": results["ids"][0][i],
+            "text": results["documents"][0][i],
+            "metadata": results["metadatas"][0][i],
+            "distance": results["distances"][0][i]
+        } for i in range(len(results["ids"][0]))]
     
-    def save_checkpoint(self, chat_state: Dict) -> str:
-        """Salva um checkpoint do estado atual do chat"""
-        checkpoint_id = str(datetime.now().timestamp())
-        checkpoint_file = self.checkpoints_dir / f"{checkpoint_id}.json"
+    def _busca_lexical(self, query: str, n_results: int, where: Optional[Dict]) -> List[Dict]:
+        with BUSCA_LATENCIA.tempo(etapa="lexical"):
+            return self.lexical.search(query, n_results, where)
+    
+    def search_knowledge(self, query: str, n_results: int = 5,
+                         where: Optional[Dict] = None,
+                         rerank: bool = True,
+                         orcamento_ms: Optional[float] = None) -> List[Dict]:
+        """Busca híbrida: vetorial (ChromaDB) e lexical (BM25) em paralelo, fundidas por RRF.
+        
+        `where` usa a sintaxe de filtros do Chroma e é aplicado antes do
+        ranking nas duas buscas. O re-rank por cross-encoder só roda se
+        estiver configurado e couber no orçamento de latência.
+        """
+        inicio = time.perf_counter()
+        candidatos = max(n_results * 4, 20)
+        
+        vetorial = self._executor.submit(self._busca_vetorial, query, candidatos, where)
+        lexical = self._executor.submit(self._busca_lexical, query, candidatos, where)
         
-        with open(checkpoint_file, "w", encoding="utf-8") as f:
-            json.dump(chat_state, f, ensure_ascii=False, indent=2)
+        listas = []
+        for nome, futuro in (("vetorial", vetorial), ("lexical", lexical)):
+            try:
+                listas.append((nome, futuro.result()))
+            except Exception as e:
+                logger.error(f"Erro na busca {nome}: {e}")
+                listas.append((nome, []))
+        
+        # Junta os dados de cada documento e funde os rankings
+        documentos: Dict[str, Dict] = {}
+        for nome, resultados in listas:
+            for resultado in resultados:
+                doc = documentos.setdefault(resultado["id"], {
+                    "id": resultado["id"],
+                    "text": resultado["text"],
+                    "metadata": resultado["metadata"],
+                    "distance": None,
+                    "fontes": []
+                })
+                doc["fontes"].append(nome)
+                if "distance" in resultado:
+                    doc["distance"] = resultado["distance"]
+        
+        fundidos = reciprocal_rank_fusion(
+            ([r["id"] for r in resultados] for _, resultados in listas), k=RRF_K
+        )
+        formatted_results = []
+        for doc_id, score in fundidos:
+            documentos[doc_id]["score"] = score
+            formatted_results.append(documentos[doc_id])
         
-        return checkpoint_id
+        # Re-rank dos melhores candidatos, se houver tempo
+        orcamento = orcamento_ms or self.orcamento_ms
+        if rerank and self.reranker is not None and formatted_results:
+            topo = formatted_results[:candidatos]
+            restante = orcamento - (time.perf_counter() - inicio) * 1000
+            if self.reranker.cabe_no_orcamento(len(topo), restante):
+                with BUSCA_LATENCIA.tempo(etapa="rerank"):
+                    formatted_results = self.reranker.reordenar(query, topo)
+        
+        BUSCA_LATENCIA.observe(time.perf_counter() - inicio, etapa="total")
+        return formatted_results[:n_results]
+    
+    def save_checkpoint(self, chat_state: Dict) -> str:
+        """Salva um checkpoint do estado atual do chat (delta contra o anterior)"""
+        return self.checkpoints.salvar(chat_state)
     
     def load_checkpoint(self, checkpoint_id: str) -> Dict:
         """Carrega um checkpoint específico"""
-        checkpoint_file = self.checkpoints_dir / f"{checkpoint_id}.json"
-        
-        if not checkpoint_file.exists():
-            raise FileNotFoundError(f"Checkpoint {checkpoint_id} não encontrado")
-        
-        with open(checkpoint_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.checkpoints.carregar(checkpoint_id)
     
     def list_checkpoints(self) -> List[Dict]:
-        """Lista todos os checkpoints disponíveis"""
-        checkpoints = []
-        for file in self.checkpoints_dir.glob("*.json"):
-            with open(file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                checkpoints.append({
-                    "id": file.stem,
-                    "timestamp": data.get("timestamp", ""),
-                    "description": data.get("description", "")
-                })
-        return checkpoints
+        """Lista todos os checkpoints disponíveis (lê só o manifesto)"""
+        return self.checkpoints.listar()
     
     def backup_system(self, system_state: Dict) -> str:
-        """Faz backup do estado do sistema"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.system_backups_dir / f"backup_{timestamp}.json"
-        
-        with open(backup_file, "w", encoding="utf-8") as f:
-            json.dump(system_state, f, ensure_ascii=False, indent=2)
-        
-        return timestamp
+        """Faz backup incremental de data/ junto com o estado do sistema"""
+        estado = json.dumps(system_state, ensure_ascii=False, indent=2).encode("utf-8")
+        resumo = self.backups.criar(
+            {"data": str(self.data_dir)},
+            rotulo="sistema",
+            extras={"system_state.json": estado},
+            ignorar=(str(self.system_backups_dir),)
+        )
+        return resumo["id"]
     
     def restore_system(self, backup_id: str) -> Dict:
-        """Restaura um backup do sistema"""
+        """Restaura o estado do sistema de um backup (os arquivos de data/ via BackupStore.restaurar)"""
+        # Backups do formato antigo (um JSON por backup)
         backup_file = self.system_backups_dir / f"backup_{backup_id}.json"
+        if backup_file.exists():
+            with open(backup_file, "r", encoding="utf-8") as f:
+                return json.load(f)
         
-        if not backup_file.exists():
-            raise FileNotFoundError(f"Backup {backup_id} não encontrado")
-        
-        with open(backup_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return json.loads(self.backups.ler(backup_id, "system_state.json"))
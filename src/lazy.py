@@ -0,0 +1,49 @@
+from typing import Callable, Generic, Optional, TypeVar
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Preguicoso(Generic[T]):
+    """Valor pesado (cliente do Chroma, modelo, cliente HTTP) criado só quando é usado.
+
+    A fábrica roda uma única vez, no primeiro obter(), com lock: uma thread
+    de aquecimento e a primeira requisição podem chegar juntas. Atributos
+    desconhecidos são repassados ao valor, então um cliente preguiçoso
+    pode ser entregue a quem espera o cliente de verdade.
+    """
+
+    def __init__(self, fabrica: Callable[[], T], nome: str):
+        self._fabrica = fabrica
+        self._nome = nome
+        self._valor: Optional[T] = None
+        self._pronto = False
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<Preguicoso {self._nome} {'carregado' if self._pronto else 'pendente'}>"
+
+    @property
+    def carregado(self) -> bool:
+        return self._pronto
+
+    def obter(self) -> T:
+        if self._pronto:
+            return self._valor
+        with self._lock:
+            if not self._pronto:
+                inicio = time.perf_counter()
+                self._valor = self._fabrica()
+                self._pronto = True
+                logger.info(f"{self._nome} carregado em {time.perf_counter() - inicio:.2f}s")
+        return self._valor
+
+    def __getattr__(self, nome: str):
+        # Só chamado para o que não é atributo do próprio Preguicoso
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self.obter(), nome)
@@ -0,0 +1,283 @@
+from typing import Dict, Iterator, List, Optional
+from pathlib import Path
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional; sem ele os blocos usam gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+VERSAO_INDICE = 1
+
+# Linhas por bloco comprimido: blocos menores pulam mais dados nas consultas,
+# blocos maiores comprimem melhor
+LINHAS_POR_BLOCO = 512
+# Temporários de compactação mais velhos que isso são de uma compactação interrompida
+IDADE_TEMPORARIO_ABANDONADO = 3600
+
+
+class BloomFilter:
+    """Bloom filter simples com double hashing sobre blake2b"""
+
+    def __init__(self, bits: int, hashes: int, dados: Optional[bytearray] = None):
+        self.bits = bits
+        self.hashes = hashes
+        self.dados = dados if dados is not None else bytearray((bits + 7) // 8)
+
+    @classmethod
+    def para_capacidade(cls, itens: int, taxa_falso_positivo: float = 0.01) -> "BloomFilter":
+        """Dimensiona o filtro para `itens` elementos distintos"""
+        itens = max(itens, 1)
+        bits = max(64, int(-itens * math.log(taxa_falso_positivo) / (math.log(2) ** 2)))
+        hashes = max(1, round(bits / itens * math.log(2)))
+        return cls(bits, hashes)
+
+    def _posicoes(self, valor: str) -> Iterator[int]:
+        digest = hashlib.blake2b(valor.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, valor: str) -> None:
+        for pos in self._posicoes(valor):
+            self.dados[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, valor: str) -> bool:
+        return all(self.dados[pos >> 3] & (1 << (pos & 7)) for pos in self._posicoes(valor))
+
+    def to_dict(self) -> Dict:
+        return {
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "dados": base64.b64encode(bytes(self.dados)).decode("ascii")
+        }
+
+    @classmethod
+    def from_dict(cls, dados: Dict) -> "BloomFilter":
+        return cls(dados["bits"], dados["hashes"], bytearray(base64.b64decode(dados["dados"])))
+
+
+def _comprimir(dados: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(dados)
+    return zlib.compress(dados, 6)
+
+
+def _descomprimir(dados: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return zlib.decompress(dados)
+
+
+def caminhos_compactados(arquivo_log: Path):
+    """Retorna (arquivo de blocos, índice) de um arquivo de log diário"""
+    base = arquivo_log.with_suffix("")
+    return base.with_suffix(".blk"), base.with_suffix(".idx")
+
+
+def limpar_temporarios(log_dir: Path, idade: float = IDADE_TEMPORARIO_ABANDONADO) -> List[Path]:
+    """Remove .blk.tmp e .idx.tmp deixados por uma compactação interrompida.
+
+    O .log original só é apagado depois dos renames, então nada se perde; os
+    recentes ficam porque podem ser de outro processo compactando agora.
+    """
+    removidos = []
+    limite = time.time() - idade
+    for padrao in ("*.blk.tmp", "*.idx.tmp"):
+        for temporario in log_dir.glob(padrao):
+            try:
+                if temporario.stat().st_mtime < limite:
+                    temporario.unlink()
+                    removidos.append(temporario)
+            except FileNotFoundError:
+                continue
+    if removidos:
+        logger.info(f"{len(removidos)} temporários de compactação abandonados removidos de {log_dir}")
+    return removidos
+
+
+def _chave(valor) -> str:
+    return "" if valor is None else str(valor)
+
+
+def compactar_arquivo(arquivo_log: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Optional[Path]:
+    """Comprime um log diário em blocos e grava o índice ao lado.
+
+    Para cada bloco o índice guarda offset, tamanho, timestamps mínimo e
+    máximo, níveis presentes e bloom filters de chat_id e provider. Os
+    arquivos novos são gravados com nomes temporários e renomeados só no
+    fim; o log original é removido depois disso.
+    """
+    if not arquivo_log.exists():
+        return None
+
+    codec = "zstd" if zstandard is not None else "gzip"
+    arquivo_blocos, arquivo_indice = caminhos_compactados(arquivo_log)
+    tmp_blocos = arquivo_blocos.with_suffix(".blk.tmp")
+    tmp_indice = arquivo_indice.with_suffix(".idx.tmp")
+
+    blocos: List[Dict] = []
+    offset = 0
+
+    def gravar_bloco(saida, linhas: List[str], entradas: List[Dict]):
+        nonlocal offset
+        dados = _comprimir("".join(linhas).encode("utf-8"), codec)
+        saida.write(dados)
+
+        chats = {_chave(e.get("chat_id")) for e in entradas}
+        providers = {_chave(e.get("provider")) for e in entradas}
+        bloom_chat = BloomFilter.para_capacidade(len(chats))
+        bloom_provider = BloomFilter.para_capacidade(len(providers))
+        for chat in chats:
+            bloom_chat.add(chat)
+        for provider in providers:
+            bloom_provider.add(provider)
+
+        timestamps = [e["timestamp"] for e in entradas if e.get("timestamp")]
+        blocos.append({
+            "offset": offset,
+            "tamanho": len(dados),
+            "linhas": len(linhas),
+            "ts_min": min(timestamps) if timestamps else "",
+            "ts_max": max(timestamps) if timestamps else "",
+            "niveis": sorted({_chave(e.get("level")) for e in entradas}),
+            "bloom_chat_id": bloom_chat.to_dict(),
+            "bloom_provider": bloom_provider.to_dict()
+        })
+        offset += len(dados)
+
+    with open(arquivo_log, "r", encoding="utf-8") as entrada, open(tmp_blocos, "wb") as saida:
+        linhas: List[str] = []
+        entradas: List[Dict] = []
+        for linha in entrada:
+            try:
+                entradas.append(json.loads(linha))
+            except json.JSONDecodeError:
+                continue
+            linhas.append(linha if linha.endswith("\n") else linha + "\n")
+            if len(linhas) >= linhas_por_bloco:
+                gravar_bloco(saida, linhas, entradas)
+                linhas, entradas = [], []
+        if linhas:
+            gravar_bloco(saida, linhas, entradas)
+        saida.flush()
+        os.fsync(saida.fileno())
+
+    with open(tmp_indice, "w", encoding="utf-8") as f:
+        json.dump({"versao": VERSAO_INDICE, "codec": codec, "blocos": blocos}, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+
+    # O índice é renomeado por último: enquanto ele não existe, vale o .log
+    os.replace(tmp_blocos, arquivo_blocos)
+    os.replace(tmp_indice, arquivo_indice)
+    arquivo_log.unlink()
+
+    logger.info(f"Log {arquivo_log.name} compactado em {len(blocos)} blocos ({codec})")
+    return arquivo_indice
+
+
+def _filtrar(entrada: Dict, level, chat_id, provider, start_time, end_time) -> bool:
+    if level and entrada.get("level") != level:
+        return False
+    if chat_id and entrada.get("chat_id") != chat_id:
+        return False
+    if provider and entrada.get("provider") != provider:
+        return False
+    if start_time or end_time:
+        timestamp = entrada.get("timestamp", "")
+        if start_time and timestamp < start_time:
+            return False
+        if end_time and timestamp > end_time:
+            return False
+    return True
+
+
+def _bloco_relevante(bloco: Dict, level, chat_id, provider, start_time, end_time) -> bool:
+    """Decide pelo índice se o bloco pode conter resultados"""
+    if level and level not in bloco["niveis"]:
+        return False
+    if start_time and bloco["ts_max"] and bloco["ts_max"] < start_time:
+        return False
+    if end_time and bloco["ts_min"] and bloco["ts_min"] > end_time:
+        return False
+    if chat_id and _chave(chat_id) not in bloco["bloom_chat_id"]:
+        return False
+    if provider and _chave(provider) not in bloco["bloom_provider"]:
+        return False
+    return True
+
+
+# Índices já carregados, por caminho: (mtime, índice com blooms decodificados)
+_cache_indices: Dict[Path, tuple] = {}
+
+
+def _carregar_indice(arquivo_indice: Path) -> Dict:
+    mtime = arquivo_indice.stat().st_mtime_ns
+    em_cache = _cache_indices.get(arquivo_indice)
+    if em_cache and em_cache[0] == mtime:
+        return em_cache[1]
+
+    with open(arquivo_indice, "r", encoding="utf-8") as f:
+        indice = json.load(f)
+    for bloco in indice["blocos"]:
+        bloco["bloom_chat_id"] = BloomFilter.from_dict(bloco["bloom_chat_id"])
+        bloco["bloom_provider"] = BloomFilter.from_dict(bloco["bloom_provider"])
+
+    _cache_indices[arquivo_indice] = (mtime, indice)
+    return indice
+
+
+def consultar_arquivo(arquivo_log: Path,
+                      level: Optional[str] = None,
+                      chat_id: Optional[int] = None,
+                      provider: Optional[str] = None,
+                      start_time: Optional[str] = None,
+                      end_time: Optional[str] = None) -> Iterator[Dict]:
+    """Percorre um log diário (compactado ou não) aplicando os filtros"""
+    arquivo_blocos, arquivo_indice = caminhos_compactados(arquivo_log)
+
+    # Condições necessárias checadas no texto da linha antes do json.loads
+    termos = [str(t) for t in (chat_id, provider, level) if t]
+
+    if arquivo_indice.exists():
+        indice = _carregar_indice(arquivo_indice)
+        codec = indice["codec"]
+
+        with open(arquivo_blocos, "rb") as f:
+            for bloco in indice["blocos"]:
+                if not _bloco_relevante(bloco, level, chat_id, provider, start_time, end_time):
+                    continue
+                f.seek(bloco["offset"])
+                dados = _descomprimir(f.read(bloco["tamanho"]), codec)
+                for linha in dados.decode("utf-8").splitlines():
+                    if termos and not all(t in linha for t in termos):
+                        continue
+                    entrada = json.loads(linha)
+                    if _filtrar(entrada, level, chat_id, provider, start_time, end_time):
+                        yield entrada
+        return
+
+    if not arquivo_log.exists():
+        return
+
+    with open(arquivo_log, "r", encoding="utf-8") as f:
+        for linha in f:
+            if termos and not all(t in linha for t in termos):
+                continue
+            try:
+                entrada = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            if _filtrar(entrada, level, chat_id, provider, start_time, end_time):
+                yield entrada
@@ -1,59 +1,256 @@
+from typing import Iterator, List, Optional, Pattern
+from datetime import datetime, timedelta
+import argparse
 import os
+import re
+import sys
 import time
-from datetime import datetime
 from .config import COLORS
+from .fswatch import (
+    Inotify, inotify_disponivel,
+    IN_MODIFY, IN_CREATE, IN_MOVED_TO, IN_MOVED_FROM, IN_DELETE, IN_Q_OVERFLOW
+)
 
-def get_current_log_file():
-    log_dir = "logs"
+CORES_NIVEL = {
+    "ERROR": COLORS.RED,
+    "WARNING": COLORS.YELLOW,
+    "INFO": COLORS.LIGHT_BLUE,
+}
+ORDEM_NIVEL = {"INFO": 0, "WARNING": 1, "ERROR": 2}
+
+def get_current_log_file(log_dir: str = "logs"):
     current_date = datetime.now().strftime("%Y-%m-%d")
     return os.path.join(log_dir, f"{current_date}.log")
 
+def nivel_da_linha(line: str) -> Optional[str]:
+    """Identifica o nível da linha.
+
+    No CPython o `in` de string é mais rápido que um regex com alternância
+    (ver bench_log_viewer.py), então a ordem de prioridade é mantida aqui.
+    """
+    if "ERROR" in line:
+        return "ERROR"
+    if "WARNING" in line:
+        return "WARNING"
+    if "INFO" in line:
+        return "INFO"
+    return None
+
 def colorize_log_line(line):
     # Adiciona cores baseado no nível do log
-    if "ERROR" in line:
-        return f"{COLORS.RED}{line}{COLORS.RESET}"
-    elif "WARNING" in line:
-        return f"{COLORS.YELLOW}{line}{COLORS.RESET}"
-    elif "INFO" in line:
-        return f"{COLORS.LIGHT_BLUE}{line}{COLORS.RESET}"
-    else:
-        return line
-
-def follow_log():
+    nivel = nivel_da_linha(line)
+    if nivel:
+        return f"{CORES_NIVEL[nivel]}{line}{COLORS.RESET}"
+    return line
+
+def formatar_lote(linhas: List[str],
+                  nivel_minimo: Optional[str] = None,
+                  filtro: Optional[Pattern] = None) -> str:
+    """Filtra e colore um lote de linhas, gerando um único bloco de saída"""
+    minimo = ORDEM_NIVEL[nivel_minimo] if nivel_minimo else -1
+    saida = []
+    for line in linhas:
+        if filtro is not None and not filtro.search(line):
+            continue
+        nivel = nivel_da_linha(line)
+        if nivel:
+            if ORDEM_NIVEL[nivel] < minimo:
+                continue
+            saida.append(f"{CORES_NIVEL[nivel]}{line}{COLORS.RESET}")
+        elif minimo < 0:
+            saida.append(line)
+    return "\n".join(saida) + "\n" if saida else ""
+
+def _segundos_ate_meia_noite() -> float:
+    agora = datetime.now()
+    amanha = (agora + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (amanha - agora).total_seconds() + 0.5
+
+class LogFollower:
+    """Acompanha o log do dia acordando só quando o arquivo muda.
+
+    Usa inotify no diretório de logs (modify/create/move/delete) e cai para
+    polling quando inotify não está disponível. Trata troca de dia,
+    rotação por rename/remoção e truncamento do arquivo.
+    """
+
+    def __init__(self, log_dir: str = "logs", usar_inotify: Optional[bool] = None,
+                 intervalo_polling: float = 0.1, do_inicio: bool = False):
+        self.log_dir = log_dir
+        self.usar_inotify = inotify_disponivel() if usar_inotify is None else usar_inotify
+        self.intervalo_polling = intervalo_polling
+        self.do_inicio = do_inicio
+
+        self.caminho = get_current_log_file(log_dir)
+        self.arquivo = None
+        self._resto = ""
+        self._inode = None
+        self._ativo = True
+
+    def _abrir(self, do_fim: bool) -> bool:
+        """Abre o arquivo atual; retorna False se ainda não existe"""
+        self._fechar()
+        try:
+            self.arquivo = open(self.caminho, "r", encoding="utf-8", errors="replace")
+        except FileNotFoundError:
+            return False
+        if do_fim:
+            self.arquivo.seek(0, 2)
+        self._inode = os.fstat(self.arquivo.fileno()).st_ino
+        self._resto = ""
+        return True
+
+    def _fechar(self) -> None:
+        if self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+    def _ler_disponivel(self) -> List[str]:
+        """Lê tudo que foi escrito desde a última leitura"""
+        if self.arquivo is None:
+            return []
+
+        # Truncamento: o arquivo ficou menor que a posição atual
+        if os.fstat(self.arquivo.fileno()).st_size < self.arquivo.tell():
+            self.arquivo.seek(0)
+            self._resto = ""
+
+        dados = self.arquivo.read()
+        if not dados:
+            return []
+        dados = self._resto + dados
+        linhas = dados.split("\n")
+        # A última parte só vira linha quando chegar o "\n"
+        self._resto = linhas.pop()
+        return linhas
+
+    def _trocar_de_dia(self) -> bool:
+        """Troca para o arquivo do novo dia, se a data mudou"""
+        novo = get_current_log_file(self.log_dir)
+        if novo == self.caminho:
+            return False
+        self.caminho = novo
+        self._abrir(do_fim=False)
+        return True
+
+    def parar(self) -> None:
+        self._ativo = False
+
+    def lotes(self) -> Iterator[List[str]]:
+        """Gera lotes de linhas novas à medida que chegam"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._abrir(do_fim=not self.do_inicio)
+        try:
+            if self.usar_inotify:
+                yield from self._lotes_inotify()
+            else:
+                yield from self._lotes_polling()
+        finally:
+            self._fechar()
+
+    def _lotes_inotify(self) -> Iterator[List[str]]:
+        with Inotify() as inotify:
+            inotify.adicionar(
+                self.log_dir,
+                IN_MODIFY | IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            )
+
+            # Linhas escritas entre a abertura e o registro do watch
+            linhas = self._ler_disponivel()
+            if linhas:
+                yield linhas
+
+            while self._ativo:
+                eventos = inotify.ler(timeout=_segundos_ate_meia_noite())
+                if not eventos:
+                    # Só o timeout da meia-noite acorda sem evento
+                    if self._trocar_de_dia():
+                        yield [f"{COLORS.YELLOW}Mudança de dia detectada, trocando arquivo de log...{COLORS.RESET}"]
+                    continue
+
+                nome_atual = os.path.basename(self.caminho)
+                ler = False
+                for evento in eventos:
+                    if evento.mascara & IN_Q_OVERFLOW:
+                        ler = True
+                    elif evento.nome != nome_atual:
+                        # Arquivo de outro dia criado: confere a data só nesse caso
+                        if evento.mascara & (IN_CREATE | IN_MOVED_TO) and self._trocar_de_dia():
+                            nome_atual = os.path.basename(self.caminho)
+                    elif evento.mascara & IN_MODIFY:
+                        ler = True
+                    elif evento.mascara & (IN_CREATE | IN_MOVED_TO):
+                        # Arquivo recriado (rotação): drena o antigo e reabre
+                        linhas = self._ler_disponivel()
+                        if linhas:
+                            yield linhas
+                        self._abrir(do_fim=False)
+                        ler = True
+                    elif evento.mascara & (IN_MOVED_FROM | IN_DELETE):
+                        linhas = self._ler_disponivel()
+                        if linhas:
+                            yield linhas
+                        self._fechar()
+
+                if ler:
+                    linhas = self._ler_disponivel()
+                    if linhas:
+                        yield linhas
+
+    def _lotes_polling(self) -> Iterator[List[str]]:
+        ultima_verificacao = time.monotonic()
+        while self._ativo:
+            linhas = self._ler_disponivel()
+            if linhas:
+                yield linhas
+                continue
+
+            # Data e rotação são verificadas no máximo uma vez por segundo
+            agora = time.monotonic()
+            if agora - ultima_verificacao >= 1.0:
+                ultima_verificacao = agora
+                if self._trocar_de_dia():
+                    yield [f"{COLORS.YELLOW}Mudança de dia detectada, trocando arquivo de log...{COLORS.RESET}"]
+                    continue
+                try:
+                    inode = os.stat(self.caminho).st_ino
+                except FileNotFoundError:
+                    inode = None
+                if inode is not None and inode != self._inode:
+                    self._abrir(do_fim=False)
+                    continue
+
+            time.sleep(self.intervalo_polling)
+
+def follow_log(nivel_minimo: Optional[str] = None,
+               filtro: Optional[str] = None,
+               usar_inotify: Optional[bool] = None,
+               log_dir: str = "logs"):
     print(f"{COLORS.GREEN}=== Monitor de Logs ==={COLORS.RESET}")
     print(f"{COLORS.LIGHT_BLUE}Monitorando logs em tempo real...{COLORS.RESET}\n")
-    
-    current_file = get_current_log_file()
-    
-    # Espera o arquivo de log ser criado
-    while not os.path.exists(current_file):
+
+    follower = LogFollower(log_dir, usar_inotify=usar_inotify)
+    if not os.path.exists(follower.caminho):
         print(f"{COLORS.YELLOW}Aguardando arquivo de log ser criado...{COLORS.RESET}")
-        time.sleep(1)
-    
-    # Abre o arquivo e vai para o final
-    with open(current_file, "r") as file:
-        file.seek(0, 2)  # Vai para o final do arquivo
-        while True:
-            line = file.readline()
-            if not line:
-                # Verifica se mudou o dia e precisa trocar de arquivo
-                new_file = get_current_log_file()
-                if new_file != current_file:
-                    print(f"{COLORS.YELLOW}Mudança de dia detectada, trocando arquivo de log...{COLORS.RESET}")
-                    current_file = new_file
-                    file.close()
-                    # Espera o novo arquivo ser criado
-                    while not os.path.exists(current_file):
-                        time.sleep(1)
-                    file = open(current_file, "r")
-                else:
-                    time.sleep(0.1)  # Pequena pausa para não sobrecarregar a CPU
-                continue
-            print(colorize_log_line(line.strip()))
 
-def main():
+    padrao = re.compile(filtro) if filtro else None
+    for lote in follower.lotes():
+        # Uma escrita por lote, em vez de um print por linha
+        saida = formatar_lote(lote, nivel_minimo, padrao)
+        if saida:
+            sys.stdout.write(saida)
+            sys.stdout.flush()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia logs", description="Monitora os logs em tempo real")
+    parser.add_argument("-l", "--nivel", choices=list(ORDEM_NIVEL), help="Nível mínimo a exibir")
+    parser.add_argument("-f", "--filtro", help="Expressão regular que a linha deve conter")
+    parser.add_argument("--polling", action="store_true", help="Força o modo polling (sem inotify)")
+    parser.add_argument("-d", "--dir", default="logs", help="Diretório dos logs")
+    args = parser.parse_args(argv)
+
     try:
-        follow_log()
+        follow_log(args.nivel, args.filtro, False if args.polling else None, args.dir)
     except KeyboardInterrupt:
         print(f"\n{COLORS.YELLOW}Monitor de logs encerrado.{COLORS.RESET}")
 
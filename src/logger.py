@@ -1,8 +1,240 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
+from logging.handlers import QueueHandler
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+import atexit
 import json
 import logging
+import queue
+import sys
+import threading
+import time
+
+from .metrics import REGISTRY
+from .log_store import compactar_arquivo, consultar_arquivo, limpar_temporarios
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; o json da stdlib funciona igual, só mais lento
+    orjson = None
+
+FORMATO_PADRAO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+LOGS_DESCARTADOS = REGISTRY.counter(
+    "nexusia_logs_descartados_total", "Registros de log descartados com o buffer cheio")
+
+def json_dumps(obj: Any) -> str:
+    """Serializa em JSON compacto, usando orjson quando disponível"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+class _LoteMixin:
+    """Escreve sem dar flush a cada registro; o pipeline faz o flush em lote"""
+    
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class _ArquivoLoteHandler(_LoteMixin, logging.FileHandler):
+    pass
+
+class _ConsoleLoteHandler(_LoteMixin, logging.StreamHandler):
+    pass
+
+class _QueueHandlerSemBloqueio(QueueHandler):
+    """QueueHandler que descarta (e contabiliza) em vez de bloquear"""
+    
+    def __init__(self, pipeline: "LogPipeline"):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+    
+    def enqueue(self, record):
+        self.pipeline.enfileirar(record)
+
+class _LinhaArquivo:
+    __slots__ = ("caminho", "texto")
+    
+    def __init__(self, caminho: Path, texto: str):
+        self.caminho = caminho
+        self.texto = texto
+
+class _Marcador:
+    """Item de controle: pede flush e avisa quando tudo antes dele foi escrito"""
+    __slots__ = ("evento",)
+    
+    def __init__(self):
+        self.evento = threading.Event()
+
+class LogPipeline:
+    """Pipeline de logging com fila limitada e escrita em lote numa thread.
+    
+    Quem registra só faz um put_nowait: formatação, I/O e flush acontecem na
+    thread de escrita, que agrupa os registros e faz flush no máximo a cada
+    `intervalo_flush` segundos. Com a fila cheia o registro é descartado e
+    contado em `descartados`, sem bloquear o event loop.
+    """
+    
+    def __init__(self,
+                 handlers: List[logging.Handler],
+                 capacidade: int = 10000,
+                 intervalo_flush: float = 0.5):
+        self.queue: queue.Queue = queue.Queue(maxsize=capacidade)
+        self.handlers = handlers
+        self.intervalo_flush = intervalo_flush
+        self.descartados = 0
+        
+        # Só o arquivo JSON do dia fica aberto; muda quando o caminho muda
+        self._caminho_atual: Optional[Path] = None
+        self._arquivo_atual = None
+        
+        self._thread = threading.Thread(target=self._loop, name="log-pipeline", daemon=True)
+        self._thread.start()
+    
+    def enfileirar(self, item) -> bool:
+        """Coloca um item na fila sem bloquear; retorna False se descartado"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.descartados += 1
+            LOGS_DESCARTADOS.inc()
+            return False
+    
+    def escrever_linha(self, caminho: Path, texto: str) -> bool:
+        """Agenda a escrita de uma linha (sem quebra) num arquivo"""
+        return self.enfileirar(_LinhaArquivo(caminho, texto))
+    
+    def sincronizar(self, timeout: float = 5.0) -> bool:
+        """Aguarda a escrita de tudo que foi enfileirado até agora"""
+        if not self._thread.is_alive():
+            return False
+        marcador = _Marcador()
+        try:
+            self.queue.put(marcador, timeout=timeout)
+        except queue.Full:
+            return False
+        return marcador.evento.wait(timeout)
+    
+    def _processar(self, item) -> None:
+        if isinstance(item, _LinhaArquivo):
+            if item.caminho != self._caminho_atual:
+                if self._arquivo_atual is not None:
+                    self._arquivo_atual.close()
+                self._arquivo_atual = open(item.caminho, "a", encoding="utf-8")
+                self._caminho_atual = item.caminho
+            self._arquivo_atual.write(item.texto)
+            self._arquivo_atual.write("\n")
+            return
+        
+        for handler in self.handlers:
+            if item.levelno >= handler.level:
+                handler.handle(item)
+    
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+        if self._arquivo_atual is not None:
+            try:
+                self._arquivo_atual.flush()
+            except Exception:
+                pass
+    
+    def _loop(self) -> None:
+        ultimo_flush = time.monotonic()
+        pendente = False
+        while True:
+            try:
+                item = self.queue.get(timeout=self.intervalo_flush)
+            except queue.Empty:
+                if pendente:
+                    self._flush()
+                    pendente = False
+                ultimo_flush = time.monotonic()
+                continue
+            
+            if item is None:
+                break
+            
+            if isinstance(item, _Marcador):
+                self._flush()
+                pendente = False
+                item.evento.set()
+                continue
+            
+            try:
+                self._processar(item)
+                pendente = True
+            except Exception as e:
+                sys.stderr.write(f"Erro no pipeline de logging: {e}\n")
+            
+            if time.monotonic() - ultimo_flush >= self.intervalo_flush:
+                self._flush()
+                pendente = False
+                ultimo_flush = time.monotonic()
+        
+        self._flush()
+    
+    def parar(self, timeout: float = 5.0) -> None:
+        """Escreve o que estiver na fila e encerra a thread"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._arquivo_atual is not None:
+            self._arquivo_atual.close()
+            self._arquivo_atual = None
+        for handler in self.handlers:
+            handler.close()
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+def configurar_logging(arquivo: Optional[str] = None,
+                       level: int = logging.INFO,
+                       format: str = FORMATO_PADRAO,
+                       console: bool = True,
+                       capacidade: int = 10000,
+                       intervalo_flush: float = 0.5) -> LogPipeline:
+    """Configura o logging raiz com o pipeline assíncrono (idempotente).
+    
+    Substitui o logging.basicConfig com FileHandler síncrono: o root logger
+    passa a ter apenas um QueueHandler que não bloqueia.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+        
+        formatter = logging.Formatter(format)
+        handlers: List[logging.Handler] = []
+        if console:
+            handlers.append(_ConsoleLoteHandler())
+        if arquivo:
+            handlers.append(_ArquivoLoteHandler(arquivo, encoding="utf-8", delay=True))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        _pipeline = LogPipeline(handlers, capacidade, intervalo_flush)
+        
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandlerSemBloqueio(_pipeline))
+        root.setLevel(level)
+        
+        atexit.register(_pipeline.parar)
+        return _pipeline
 
 class ChatLogger:
     def __init__(self, log_dir: str = "/root/projetos/chat-ia-terminal/logs"):
@@ -15,20 +247,16 @@ class ChatLogger:
         # Arquivo de log do dia
         self.current_date = datetime.now().strftime("%Y%m%d")
         self.log_file = self.log_dir / f"{self.current_date}_chat.log"
+        
+        # Compacta dias que ficaram sem compactar (ex.: bot parado na virada do dia),
+        # descartando antes o que sobrou de uma compactação interrompida
+        limpar_temporarios(self.log_dir)
+        self._compactacao_lock = threading.Lock()
+        threading.Thread(target=self.compactar_logs, name="log-compactacao", daemon=True).start()
     
     def setup_logging(self):
         """Configura o sistema de logging"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.StreamHandler(),  # Console
-                logging.FileHandler(  # Arquivo
-                    self.log_dir / "chat.log",
-                    encoding="utf-8"
-                )
-            ]
-        )
+        self.pipeline = configurar_logging(str(self.log_dir / "chat.log"))
         self.logger = logging.getLogger("ChatBot")
     
     def _rotate_log_file(self):
@@ -37,6 +265,27 @@ class ChatLogger:
         if current_date != self.current_date:
             self.current_date = current_date
             self.log_file = self.log_dir / f"{self.current_date}_chat.log"
+            
+            # Compacta os dias anteriores fora da thread que está registrando
+            threading.Thread(target=self.compactar_logs, name="log-compactacao", daemon=True).start()
+    
+    def compactar_logs(self) -> List[Path]:
+        """Comprime em blocos indexados todos os logs diários já rotacionados"""
+        # As linhas ainda no buffer precisam estar no arquivo antes de compactar
+        self.pipeline.sincronizar()
+        
+        compactados = []
+        with self._compactacao_lock:
+            for log_file in sorted(self.log_dir.glob("*_chat.log")):
+                if log_file == self.log_file:
+                    continue
+                try:
+                    indice = compactar_arquivo(log_file)
+                    if indice:
+                        compactados.append(indice)
+                except Exception as e:
+                    self.logger.error(f"Erro ao compactar {log_file.name}: {e}")
+        return compactados
     
     def log_message(self, 
                     level: str,
@@ -58,10 +307,8 @@ class ChatLogger:
         if extra:
             log_entry.update(extra)
         
-        # Registra no arquivo de log do dia
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            json.dump(log_entry, f, ensure_ascii=False)
-            f.write("\n")
+        # Agenda a escrita no arquivo de log do dia (feita em lote pelo pipeline)
+        self.pipeline.escrever_linha(self.log_file, json_dumps(log_entry))
         
         # Registra no logger do sistema
         if level == "ERROR":
@@ -71,6 +318,46 @@ class ChatLogger:
         else:
             self.logger.info(message)
     
+    def _arquivos_do_periodo(self, start_date: Optional[str], end_date: Optional[str]) -> List[Path]:
+        """Lista os logs diários (compactados ou não) do período, em ordem"""
+        if not (start_date and end_date):
+            return [self.log_file]
+        
+        datas = set()
+        for padrao in ("*_chat.log", "*_chat.idx"):
+            for arquivo in self.log_dir.glob(padrao):
+                data = arquivo.stem.split("_")[0]
+                if start_date <= data <= end_date:
+                    datas.add(data)
+        return [self.log_dir / f"{data}_chat.log" for data in sorted(datas)]
+    
+    def iter_logs(self,
+                  start_date: Optional[str] = None,
+                  end_date: Optional[str] = None,
+                  level: Optional[str] = None,
+                  chat_id: Optional[int] = None,
+                  provider: Optional[str] = None,
+                  start_time: Optional[str] = None,
+                  end_time: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Percorre os logs com filtros, sem carregar tudo em memória.
+        
+        Nos dias compactados, o índice descarta os blocos que não podem conter
+        o nível, chat_id, provider ou intervalo (start_time/end_time em ISO)
+        pedidos, e só os blocos restantes são lidos e descomprimidos.
+        """
+        # Garante que as linhas ainda no buffer já estejam no arquivo
+        self.pipeline.sincronizar()
+        
+        for log_file in self._arquivos_do_periodo(start_date, end_date):
+            yield from consultar_arquivo(
+                log_file,
+                level=level,
+                chat_id=chat_id,
+                provider=provider,
+                start_time=start_time,
+                end_time=end_time
+            )
+    
     def get_logs(self,
                  start_date: Optional[str] = None,
                  end_date: Optional[str] = None,
@@ -78,58 +365,31 @@ class ChatLogger:
                  chat_id: Optional[int] = None,
                  provider: Optional[str] = None) -> list:
         """Recupera logs com filtros"""
-        logs = []
-        
-        # Determina quais arquivos processar
-        if start_date and end_date:
-            log_files = sorted(self.log_dir.glob("*_chat.log"))
-            log_files = [f for f in log_files 
-                        if start_date <= f.stem.split("_")[0] <= end_date]
-        else:
-            log_files = [self.log_file]
-        
-        # Processa cada arquivo
-        for log_file in log_files:
-            if not log_file.exists():
-                continue
-                
-            with open(log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line)
-                        
-                        # Aplica filtros
-                        if level and entry.get("level") != level:
-                            continue
-                        if chat_id and entry.get("chat_id") != chat_id:
-                            continue
-                        if provider and entry.get("provider") != provider:
-                            continue
-                            
-                        logs.append(entry)
-                    except json.JSONDecodeError:
-                        continue
-        
-        return logs
+        return list(self.iter_logs(start_date, end_date, level, chat_id, provider))
     
     def export_logs(self, output_file: str, **filters) -> str:
         """Exporta logs filtrados para um arquivo"""
-        logs = self.get_logs(**filters)
-        
         output_path = self.log_dir / output_file
+        
+        # Escreve o array JSON à medida que os resultados chegam
         with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
+            f.write("[")
+            for i, entry in enumerate(self.iter_logs(**filters)):
+                f.write(",\n" if i else "\n")
+                f.write(json_dumps(entry))
+            f.write("\n]\n")
         
         return str(output_path)
     
     def cleanup_old_logs(self, days_to_keep: int = 30):
         """Remove logs mais antigos que o especificado"""
-        cutoff_date = datetime.now().strftime("%Y%m%d")
+        cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y%m%d")
         
-        for log_file in self.log_dir.glob("*_chat.log"):
-            try:
-                file_date = log_file.stem.split("_")[0]
-                if file_date < cutoff_date:
-                    log_file.unlink()
-            except (IndexError, ValueError):
-                continue
+        for padrao in ("*_chat.log", "*_chat.blk", "*_chat.idx"):
+            for log_file in self.log_dir.glob(padrao):
+                try:
+                    file_date = log_file.stem.split("_")[0]
+                    if file_date < cutoff_date:
+                        log_file.unlink()
+                except (IndexError, ValueError, FileNotFoundError):
+                    continue
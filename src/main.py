@@ -2,17 +2,11 @@ import os
 import logging
 from dotenv import load_dotenv
 
+from src.logger import configurar_logging
 from src.telegram_bot import TelegramInterface
 
-# Configura logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("bot.log")
-    ]
-)
+# Configura logging (escrita em lote numa thread, sem bloquear o bot)
+configurar_logging("bot.log")
 
 logger = logging.getLogger(__name__)
 
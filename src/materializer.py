@@ -0,0 +1,147 @@
+from typing import List
+from pathlib import Path
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ioctl(FICLONE) do Linux: o destino compartilha os extents da origem (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+# Erros que significam "não dá para clonar/linkar aqui", não falha de E/S
+_SEM_SUPORTE = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EMLINK}
+
+# Pares (dispositivo origem, dispositivo destino) em que o FICLONE já falhou
+_sem_reflink = set()
+
+# Hardlinks para o store são opcionais (MATERIALIZAR_HARDLINKS=1) e nunca como root:
+# o 0444 é a única proteção do inode compartilhado e root o ignora, então uma edição
+# num projeto alteraria o store e todos os outros projetos
+HARDLINKS = os.getenv("MATERIALIZAR_HARDLINKS", "0") == "1" and os.geteuid() != 0
+# Hashes dos arquivos de uma versão do store, conferidos antes de reaproveitá-la com hardlinks
+MANIFESTO = ".sha256.json"
+
+
+def clonar_arquivo(origem: Path, destino: Path) -> bool:
+    """Cria `destino` como reflink de `origem`; False se o sistema de arquivos não suporta"""
+    chave = (os.stat(origem).st_dev, os.stat(destino.parent).st_dev)
+    if chave in _sem_reflink:
+        return False
+    with open(origem, "rb") as src:
+        fd = os.open(destino, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(fd, FICLONE, src.fileno())
+            return True
+        except OSError as e:
+            if e.errno not in _SEM_SUPORTE:
+                raise
+            _sem_reflink.add(chave)
+        finally:
+            os.close(fd)
+    os.unlink(destino)
+    return False
+
+
+def materializar_arquivo(origem: Path, destino: Path, modo: int, imutavel: bool) -> str:
+    """Coloca `origem` em `destino` pelo caminho mais barato e devolve qual foi usado.
+
+    reflink (cópia sob demanda, independente) > hardlink (só para arquivos
+    imutáveis e com HARDLINKS: o inode é compartilhado com o store) > cópia de verdade.
+    """
+    if clonar_arquivo(origem, destino):
+        os.chmod(destino, modo)
+        return "reflink"
+    if imutavel and HARDLINKS:
+        try:
+            os.link(origem, destino)
+            return "hardlink"
+        except OSError as e:
+            if e.errno not in _SEM_SUPORTE:
+                raise
+    shutil.copyfile(origem, destino)
+    os.chmod(destino, modo)
+    return "copia"
+
+
+def _sha256(caminho: Path) -> str:
+    with open(caminho, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def gravar_manifesto(diretorio: Path) -> None:
+    """Registra o hash de cada arquivo de `diretorio` (antes de ele ser publicado)"""
+    hashes = {str(p.relative_to(diretorio)): _sha256(p) for p in sorted(diretorio.rglob("*"))
+              if p.is_file() and p.name != MANIFESTO}
+    (diretorio / MANIFESTO).write_text(json.dumps(hashes), encoding="utf-8")
+
+
+def verificar_manifesto(diretorio: Path) -> bool:
+    """Se os arquivos ainda batem com o manifesto (False também sem manifesto)"""
+    try:
+        hashes = json.loads((diretorio / MANIFESTO).read_text(encoding="utf-8"))
+        return all(_sha256(diretorio / relativo) == valor for relativo, valor in hashes.items())
+    except (OSError, ValueError):
+        return False
+
+
+class TemplateStore:
+    """Cópias versionadas e somente leitura dos arquivos estáticos dos templates.
+
+    Cada versão fica em <diretorio>/<template>/<versao>/ e nunca é alterada:
+    os projetos podem apontar hardlinks para ela sem que editar o template
+    em templates/ mude projetos já criados. Uma versão nova é montada num
+    diretório temporário e renomeada, então leitores nunca veem metade.
+    Com HARDLINKS, a versão é conferida contra o manifesto de hashes antes de
+    cada uso e remontada se algum projeto a alterou pelo inode compartilhado.
+    """
+
+    def __init__(self, diretorio: str = "/root/projetos/chat-ia-terminal/data/templates"):
+        self.diretorio = Path(os.getenv("TEMPLATE_STORE_DIR", diretorio))
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def caminho(self, nome: str, versao: str) -> Path:
+        return self.diretorio / nome / versao
+
+    def preparar(self, template) -> Path:
+        """Garante a versão atual do template no store e devolve o diretório dela"""
+        destino = self.caminho(template.nome, template.versao)
+        if destino.exists() and not HARDLINKS:
+            return destino
+        with self._lock:
+            if destino.exists():
+                if not HARDLINKS or verificar_manifesto(destino):
+                    return destino
+                logger.warning(f"Template {template.nome} versão {template.versao} alterado no store; remontando")
+                shutil.rmtree(destino)
+            temporario = destino.with_name(f".{template.versao}.{os.getpid()}.tmp")
+            shutil.rmtree(temporario, ignore_errors=True)
+            for relativo, modo in template.estaticos():
+                alvo = temporario / relativo
+                alvo.parent.mkdir(parents=True, exist_ok=True)
+                # Do template para o store nunca há hardlink: templates/ é editável
+                materializar_arquivo(template.raiz / relativo, alvo, modo & ~0o222, imutavel=False)
+            temporario.mkdir(parents=True, exist_ok=True)
+            gravar_manifesto(temporario)
+            os.replace(temporario, destino)
+            logger.info(f"Template {template.nome} versão {template.versao} adicionado ao store")
+        return destino
+
+    def versoes(self, nome: str) -> List[str]:
+        pasta = self.diretorio / nome
+        if not pasta.exists():
+            return []
+        return [p.name for p in sorted(pasta.iterdir(), key=lambda p: p.stat().st_mtime)
+                if p.is_dir() and not p.name.startswith(".")]
+
+    def podar(self, nome: str, manter: int = 3) -> int:
+        """Remove versões antigas; projetos com hardlinks para elas não são afetados"""
+        antigas = self.versoes(nome)[:-manter] if manter else self.versoes(nome)
+        for versao in antigas:
+            shutil.rmtree(self.caminho(nome, versao))
+        return len(antigas)
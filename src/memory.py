@@ -2,8 +2,14 @@ from typing import List, Dict, Optional
 from datetime import datetime
 import logging
 import json
+import threading
 from pathlib import Path
-import chromadb
+
+from .embeddings import abrir_colecao, get_embedding_service, nome_colecao
+from .lazy import Preguicoso
+from .metrics import CHROMA_LATENCIA
+from .retention import COLECAO, recuperar_reconstrucao
+from .search import MessageIndex
 
 logger = logging.getLogger(__name__)
 
@@ -17,15 +23,56 @@ class Memory:
         self.data_dir.mkdir(exist_ok=True)
         self.chroma_dir.mkdir(exist_ok=True)
         
-        # Inicializa ChromaDB
-        self.client = chromadb.PersistentClient(path=str(self.chroma_dir))
-        self.collection = self.client.get_or_create_collection("chat_memory")
+        # ChromaDB aberto no primeiro uso (ou no aquecimento do bot): a importação e o
+        # PersistentClient levam segundos e não precisam atrasar o início do bot
+        self._chroma = Preguicoso(self._abrir_chroma, "memória (ChromaDB)")
+        
+        # Índice de texto completo das conversas
+        self.search_index = MessageIndex(self.data_dir / "search.db")
+        
+        # Serializa escritas no ChromaDB com a compactação (ver src/retention.py)
+        self.lock = threading.Lock()
         
         # Cache das últimas 10 mensagens por chat
         self.message_cache: Dict[int, List[Dict]] = {}
         
         logger.info("Sistema de memória inicializado")
     
+    def _abrir_chroma(self) -> None:
+        import chromadb
+        self._client = chromadb.PersistentClient(path=str(self.chroma_dir))
+        self._embeddings = get_embedding_service(str(self.data_dir))
+        # Uma coleção por motor de embedding; a sem versão é de antes dessa separação
+        self._nome_colecao = nome_colecao(COLECAO, self._embeddings.nome)
+        recuperar_reconstrucao(self._client, COLECAO)
+        recuperar_reconstrucao(self._client, self._nome_colecao)
+        self._collection = abrir_colecao(self._client, COLECAO, self._embeddings)
+    
+    @property
+    def client(self):
+        self._chroma.obter()
+        return self._client
+    
+    @property
+    def embeddings(self):
+        self._chroma.obter()
+        return self._embeddings
+    
+    @property
+    def nome_colecao(self) -> str:
+        self._chroma.obter()
+        return self._nome_colecao
+    
+    @property
+    def collection(self):
+        self._chroma.obter()
+        return self._collection
+    
+    @collection.setter
+    def collection(self, colecao) -> None:
+        # A compactação troca a coleção por uma reconstruída
+        self._collection = colecao
+    
     def add_interaction(self, chat_id: int, user_message: str, bot_response: str) -> None:
         """Adiciona uma interação completa (mensagem do usuário e resposta do bot) à memória"""
         # Adiciona mensagem do usuário
@@ -37,10 +84,11 @@ class Memory:
         """Adiciona uma mensagem à memória"""
         try:
             # Prepara a mensagem
+            agora = datetime.now()
             message = {
                 "role": role,
                 "content": content,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": agora.isoformat()
             }
             
             # Adiciona ao cache de mensagens recentes
@@ -53,11 +101,18 @@ class Memory:
             if len(self.message_cache[chat_id]) > 10:
                 self.message_cache[chat_id].pop(0)
             
-            # Salva no ChromaDB
-            self.collection.add(
-                documents=[json.dumps(message)],
-                metadatas=[{"chat_id": str(chat_id)}],
-                ids=[f"{chat_id}_{datetime.now().timestamp()}"])
+            message_id = f"{chat_id}_{agora.timestamp()}"
+            
+            # Indexa para busca por texto
+            self.search_index.add(content, role, chat_id=chat_id,
+                                  timestamp=message["timestamp"], message_id=message_id)
+            
+            # Salva no ChromaDB ("ts" permite à retenção filtrar por idade)
+            with self.lock, CHROMA_LATENCIA.tempo(colecao=COLECAO, operacao="add"):
+                self.collection.add(
+                    documents=[json.dumps(message)],
+                    metadatas=[{"chat_id": str(chat_id), "role": role, "ts": agora.timestamp()}],
+                    ids=[message_id])
             
         except Exception as e:
             logger.error(f"Erro ao adicionar mensagem à memória: {e}")
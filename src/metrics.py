@@ -0,0 +1,316 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PORTA_PADRAO = int(os.getenv("METRICS_PORT", "9464"))
+
+# Buckets padrão (segundos), adequados para latência de LLM e de I/O
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor: str) -> str:
+    """Escapa um valor de rótulo para o formato de texto do Prometheus"""
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    """Base das métricas: valores ficam em shards por thread.
+
+    Cada thread incrementa apenas o próprio dicionário, então o caminho
+    quente (inc/observe) não usa lock. O lock só é tomado quando uma thread
+    nova registra seu shard; a coleta soma os shards na hora da leitura.
+    """
+
+    tipo = "untyped"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._local = threading.local()
+        self._shards: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _chave(self, rotulos: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(rotulos.get(r, "")) for r in self.rotulos)
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1.0, **rotulos) -> None:
+        """Incrementa o contador"""
+        shard = self._shard()
+        chave = self._chave(rotulos)
+        shard[chave] = shard.get(chave, 0.0) + valor
+
+    def valores(self) -> Dict[Tuple[str, ...], float]:
+        """Soma os shards de todas as threads"""
+        total: Dict[Tuple[str, ...], float] = {}
+        for shard in list(self._shards):
+            for chave, valor in list(shard.items()):
+                total[chave] = total.get(chave, 0.0) + valor
+        return total
+
+    def expor(self) -> List[str]:
+        linhas = self._cabecalho()
+        for chave, valor in sorted(self.valores().items()):
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._funcoes: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, valor: float, **rotulos) -> None:
+        """Define o valor atual (a atribuição em dicionário é atômica)"""
+        self._valores[self._chave(rotulos)] = valor
+
+    def set_funcao(self, funcao: Callable[[], float], **rotulos) -> None:
+        """Registra uma função avaliada a cada coleta (ex.: tamanho de fila)"""
+        self._funcoes[self._chave(rotulos)] = funcao
+
+    def valores(self) -> Dict[Tuple[str, ...], float]:
+        valores = dict(self._valores)
+        for chave, funcao in list(self._funcoes.items()):
+            try:
+                valores[chave] = float(funcao())
+            except Exception as e:
+                logger.debug(f"Erro ao coletar gauge {self.nome}: {e}")
+        return valores
+
+    def expor(self) -> List[str]:
+        linhas = self._cabecalho()
+        for chave, valor in sorted(self.valores().items()):
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = (),
+                 buckets: Iterable[float] = BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **rotulos) -> None:
+        """Registra uma observação"""
+        shard = self._shard()
+        chave = self._chave(rotulos)
+        estado = shard.get(chave)
+        if estado is None:
+            # [contagens por bucket..., +Inf, soma]
+            estado = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[chave] = estado
+        estado[bisect.bisect_left(self.buckets, valor)] += 1
+        estado[-1] += valor
+
+    @contextmanager
+    def tempo(self, **rotulos):
+        """Mede a duração de um bloco em segundos"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **rotulos)
+
+    def valores(self) -> Dict[Tuple[str, ...], List[float]]:
+        total: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in list(self._shards):
+            for chave, estado in list(shard.items()):
+                acumulado = total.setdefault(chave, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, valor in enumerate(estado):
+                    acumulado[i] += valor
+        return total
+
+    def expor(self) -> List[str]:
+        linhas = self._cabecalho()
+        limites = self.buckets + (float("inf"),)
+        for chave, estado in sorted(self.valores().items()):
+            acumulado = 0
+            for limite, contagem in zip(limites, estado):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, le)} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(estado[-1])}")
+            linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return linhas
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, classe, nome: str, *args, **kwargs):
+        metrica = self._metricas.get(nome)
+        if metrica is None:
+            with self._lock:
+                metrica = self._metricas.get(nome)
+                if metrica is None:
+                    metrica = classe(nome, *args, **kwargs)
+                    self._metricas[nome] = metrica
+        return metrica
+
+    def counter(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()) -> Counter:
+        """Obtém (ou cria) um contador"""
+        return self._registrar(Counter, nome, ajuda, rotulos)
+
+    def gauge(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()) -> Gauge:
+        """Obtém (ou cria) um gauge"""
+        return self._registrar(Gauge, nome, ajuda, rotulos)
+
+    def histogram(self, nome: str, ajuda: str, rotulos: Iterable[str] = (),
+                  buckets: Iterable[float] = BUCKETS_PADRAO) -> Histogram:
+        """Obtém (ou cria) um histograma"""
+        return self._registrar(Histogram, nome, ajuda, rotulos, buckets)
+
+    def expor(self) -> str:
+        """Gera o texto no formato de exposição do Prometheus"""
+        linhas = []
+        for metrica in list(self._metricas.values()):
+            linhas.extend(metrica.expor())
+        return "\n".join(linhas) + "\n"
+
+
+# Registro global do processo
+REGISTRY = MetricsRegistry()
+
+# Métricas compartilhadas pelos componentes do bot
+MENSAGENS = REGISTRY.counter(
+    "nexusia_mensagens_total", "Mensagens processadas pelo orquestrador", ["tipo"])
+PROCESSAMENTO = REGISTRY.histogram(
+    "nexusia_processamento_segundos", "Tempo total de processamento de uma mensagem")
+LLM_LATENCIA = REGISTRY.histogram(
+    "nexusia_llm_latencia_segundos", "Latência das chamadas ao LLM", ["provider", "modelo"])
+LLM_TOKENS = REGISTRY.counter(
+    "nexusia_llm_tokens_total", "Tokens consumidos pelo LLM", ["provider", "modelo", "direcao"])
+LLM_ERROS = REGISTRY.counter(
+    "nexusia_llm_erros_total", "Chamadas ao LLM que falharam", ["provider", "modelo"])
+CHROMA_LATENCIA = REGISTRY.histogram(
+    "nexusia_chroma_segundos", "Tempo das operações no ChromaDB", ["colecao", "operacao"])
+BUSCA_LATENCIA = REGISTRY.histogram(
+    "nexusia_busca_segundos", "Tempo das etapas da busca híbrida na base de conhecimento", ["etapa"])
+TELEGRAM_RECEBIDAS = REGISTRY.counter(
+    "nexusia_telegram_recebidas_total", "Mensagens recebidas do Telegram")
+TELEGRAM_ERROS_ENVIO = REGISTRY.counter(
+    "nexusia_telegram_erros_envio_total", "Falhas ao enviar mensagens ao Telegram")
+FILA = REGISTRY.gauge(
+    "nexusia_fila_tamanho", "Itens aguardando em filas internas", ["fila"])
+EMBEDDINGS_CACHE = REGISTRY.counter(
+    "nexusia_embeddings_cache_total", "Textos consultados no cache de embeddings", ["resultado"])
+EMBEDDING_LATENCIA = REGISTRY.histogram(
+    "nexusia_embedding_segundos", "Tempo de cálculo de um lote de embeddings", ["motor"])
+EXECUCOES = REGISTRY.counter(
+    "nexusia_execucoes_total", "Comandos de shell executados, por resultado", ["resultado"])
+EXECUCOES_ATIVAS = REGISTRY.gauge(
+    "nexusia_execucoes_ativas", "Comandos de shell rodando ou na fila")
+ESTADOS_GRAVADOS = REGISTRY.counter(
+    "nexusia_estados_gravados_total", "Estados de projeto por chat gravados em disco")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = self.registry.expor().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        # Evita poluir o log com cada coleta
+        pass
+
+
+_servidor: Optional[ThreadingHTTPServer] = None
+
+
+def iniciar_servidor_metricas(porta: int = PORTA_PADRAO, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Expõe /metrics em localhost numa thread daemon (idempotente)"""
+    global _servidor
+    if _servidor is not None:
+        return _servidor
+    try:
+        _servidor = ThreadingHTTPServer((host, porta), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Não foi possível iniciar o endpoint de métricas em {host}:{porta}: {e}")
+        return None
+
+    thread = threading.Thread(target=_servidor.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logger.info(f"Métricas disponíveis em http://{host}:{porta}/metrics")
+    return _servidor
+
+
+def parse_metricas(texto: str) -> Dict[str, Dict[str, float]]:
+    """Converte o formato de texto em {nome: {rótulos: valor}}"""
+    resultado: Dict[str, Dict[str, float]] = {}
+    for linha in texto.splitlines():
+        if not linha or linha.startswith("#"):
+            continue
+        try:
+            serie, valor = linha.rsplit(" ", 1)
+        except ValueError:
+            continue
+        if "{" in serie:
+            nome, rotulos = serie.split("{", 1)
+            rotulos = rotulos.rstrip("}")
+        else:
+            nome, rotulos = serie, ""
+        resultado.setdefault(nome, {})[rotulos] = float(valor)
+    return resultado
+
+
+def ler_metricas(porta: int = PORTA_PADRAO, host: str = "127.0.0.1", timeout: float = 2.0) -> Dict[str, Dict[str, float]]:
+    """Lê o endpoint /metrics de um processo em execução"""
+    from urllib.request import urlopen
+
+    with urlopen(f"http://{host}:{porta}/metrics", timeout=timeout) as resposta:
+        return parse_metricas(resposta.read().decode("utf-8"))
@@ -0,0 +1,637 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import threading
+import time
+
+from .materializer import HARDLINKS, MANIFESTO, gravar_manifesto, materializar_arquivo, verificar_manifesto
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_PADRAO = os.getenv("NPM_REGISTRY", "https://registry.npmjs.org")
+# Metadados de pacote (packuments) são reaproveitados por esse tempo antes de consultar o registry
+METADADOS_TTL = 24 * 3600
+TIMEOUT = 30
+MAX_DOWNLOADS = 16
+
+
+class PacoteError(Exception):
+    """Faixa inválida, pacote inexistente ou cache sem o que a instalação offline precisa"""
+    pass
+
+
+# --- Semver (o subconjunto usado em package.json) ---
+
+_VERSAO = re.compile(r"^v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+_PARCIAL = re.compile(r"^v?(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+
+
+def _pre(texto: Optional[str]) -> Tuple:
+    # Sem prerelease ordena depois de qualquer prerelease da mesma versão
+    if not texto:
+        return (1,)
+    return (0, tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in texto.split(".")))
+
+
+def chave_versao(versao: str) -> Optional[Tuple]:
+    m = _VERSAO.match(versao.strip())
+    if not m:
+        return None
+    return (int(m.group(1)), int(m.group(2)), int(m.group(3)), _pre(m.group(4)))
+
+
+def _limite(maior: int, menor: int, patch: int, pre: str = "0") -> Tuple:
+    return (maior, menor, patch, _pre(pre))
+
+
+def _comparadores(token: str) -> List[Tuple[str, Tuple]]:
+    """Um termo de faixa (^1.2, ~1.2.3, >=1, 1.x, ...) como comparadores simples"""
+    m = re.match(r"^(<=|>=|<|>|=|\^|~>?)?(.*)$", token)
+    operador, resto = m.group(1) or "", m.group(2)
+    p = _PARCIAL.match(resto)
+    if not p:
+        raise PacoteError(f"Faixa de versão não suportada: {token}")
+    partes = [None if g is None or g in "xX*" else int(g) for g in p.group(1, 2, 3)]
+    maior, menor, patch = partes
+    if maior is None:
+        return [] if operador in ("", "=", ">=", "^", "~", "~>") else [("<", _limite(0, 0, 0))]
+    # Curingas depois de um número também são curingas
+    if menor is None:
+        patch = None
+    base = (maior, menor or 0, patch or 0, _pre(p.group(4)))
+    completo = patch is not None
+
+    if operador in ("", "="):
+        if completo:
+            return [("=", base)]
+        fim = _limite(maior + 1, 0, 0) if menor is None else _limite(maior, menor + 1, 0)
+        return [(">=", base), ("<", fim)]
+    if operador == "^":
+        if maior > 0 or menor is None:
+            fim = _limite(maior + 1, 0, 0)
+        elif menor > 0 or patch is None:
+            fim = _limite(0, menor + 1, 0)
+        else:
+            fim = _limite(0, 0, patch + 1)
+        return [(">=", base), ("<", fim)]
+    if operador in ("~", "~>"):
+        fim = _limite(maior + 1, 0, 0) if menor is None else _limite(maior, menor + 1, 0)
+        return [(">=", base), ("<", fim)]
+    proximo = _limite(maior + 1, 0, 0) if menor is None else _limite(maior, menor + 1, 0)
+    if operador == ">":
+        return [(">", base)] if completo else [(">=", proximo)]
+    if operador == "<=":
+        return [("<=", base)] if completo else [("<", proximo)]
+    if operador == "<":
+        return [("<", base if completo else _limite(maior, menor or 0, 0))]
+    return [(">=", base)]
+
+
+class Faixa:
+    """Faixa semver do npm: alternativas separadas por || de comparadores em conjunção"""
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.conjuntos: List[Tuple[List[Tuple[str, Tuple]], set]] = []
+        for alternativa in (texto.strip() or "*").split("||"):
+            alternativa = re.sub(r"(<=|>=|<|>|=|\^|~>?)\s+", r"\1", alternativa.strip())
+            hifen = re.match(r"^(\S+)\s+-\s+(\S+)$", alternativa)
+            if hifen:
+                termos = [f">={hifen.group(1)}", f"<={hifen.group(2)}"]
+            else:
+                termos = alternativa.split() or ["*"]
+            comparadores = []
+            # Prereleases só casam com comparadores que citam a mesma versão com prerelease
+            com_pre = set()
+            for termo in termos:
+                for operador, alvo in _comparadores(termo):
+                    comparadores.append((operador, alvo))
+                    if "-" in termo and alvo[3] != (1,):
+                        com_pre.add(alvo[:3])
+            self.conjuntos.append((comparadores, com_pre))
+
+    def satisfaz(self, versao: str) -> bool:
+        chave = chave_versao(versao)
+        if chave is None:
+            return False
+        for comparadores, com_pre in self.conjuntos:
+            if chave[3] != (1,) and chave[:3] not in com_pre:
+                continue
+            if all(_comparar(chave, operador, alvo) for operador, alvo in comparadores):
+                return True
+        return False
+
+    def melhor(self, versoes: List[str], preferida: Optional[str] = None) -> Optional[str]:
+        # Como o npm: a dist-tag "latest" ganha se estiver na faixa
+        if preferida and self.satisfaz(preferida):
+            return preferida
+        candidatas = [v for v in versoes if self.satisfaz(v)]
+        return max(candidatas, key=chave_versao) if candidatas else None
+
+
+@lru_cache(maxsize=4096)
+def faixa(texto: str) -> Faixa:
+    return Faixa(texto)
+
+
+def _comparar(chave: Tuple, operador: str, alvo: Tuple) -> bool:
+    if operador == "=":
+        return chave == alvo
+    if operador == ">=":
+        return chave >= alvo
+    if operador == ">":
+        return chave > alvo
+    if operador == "<=":
+        return chave <= alvo
+    return chave < alvo
+
+
+# --- Cache endereçado por conteúdo ---
+
+def _integridade(dados: bytes, algoritmo: str = "sha512") -> str:
+    return f"{algoritmo}-{base64.b64encode(hashlib.new(algoritmo, dados).digest()).decode()}"
+
+
+def _escrever_atomico(destino: Path, dados: bytes) -> None:
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temporario, "wb") as f:
+        f.write(dados)
+    os.replace(temporario, destino)
+
+
+class CachePacotes:
+    """Espelho local de pacotes npm: metadados, tarballs e lockfiles resolvidos.
+
+    Tarballs ficam em conteudo/<algoritmo>/<hash[:2]>/<hash>, verificados
+    pela integridade (SRI) do registry; cada um é extraído uma única vez em
+    extraidos/ (somente leitura) e instalado nos projetos por reflink,
+    hardlink (só com MATERIALIZAR_HARDLINKS, fora do root) ou cópia.
+    Lockfiles (formato v3 do npm) ficam em locks/, indexados pelo conjunto
+    de dependências, então projetos do mesmo template reaproveitam a mesma
+    resolução. Com offline=True nada é buscado na rede.
+    """
+
+    def __init__(self, diretorio: str = "/root/projetos/chat-ia-terminal/data/pacotes",
+                 registry: str = REGISTRY_PADRAO, offline: bool = False):
+        self.diretorio = Path(os.getenv("PACOTES_DIR", diretorio))
+        self.registry = registry.rstrip("/")
+        self.offline = offline
+        for sub in ("metadados", "conteudo", "extraidos", "locks"):
+            (self.diretorio / sub).mkdir(parents=True, exist_ok=True)
+        self._metadados: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.estatisticas = {"metadados_rede": 0, "tarballs_rede": 0, "tarballs_cache": 0, "locks_cache": 0}
+
+    def _trava(self, chave: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(chave, threading.Lock())
+
+    def _baixar(self, url: str, aceitar: str = "*/*") -> bytes:
+        if self.offline:
+            raise PacoteError(f"Modo offline: {url} não está no cache")
+        requisicao = Request(url, headers={"Accept": aceitar, "User-Agent": "chat-ia-terminal"})
+        with urlopen(requisicao, timeout=TIMEOUT) as resposta:
+            return resposta.read()
+
+    # --- Metadados ---
+
+    def metadados(self, nome: str) -> Dict:
+        """Packument resumido do pacote (versões, dist-tags, dependências de cada versão)"""
+        if nome in self._metadados:
+            return self._metadados[nome]
+        with self._trava(f"meta:{nome}"):
+            if nome in self._metadados:
+                return self._metadados[nome]
+            arquivo = self.diretorio / "metadados" / (quote(nome, safe="@") + ".json")
+            recente = arquivo.exists() and time.time() - arquivo.stat().st_mtime < METADADOS_TTL
+            if arquivo.exists() and (recente or self.offline):
+                dados = json.loads(arquivo.read_bytes())
+            else:
+                try:
+                    bruto = self._baixar(f"{self.registry}/{quote(nome, safe='@')}",
+                                         "application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8")
+                except PacoteError:
+                    raise
+                except Exception as e:
+                    if arquivo.exists():
+                        logger.warning(f"Registry indisponível para {nome}, usando metadados em cache: {e}")
+                        bruto = arquivo.read_bytes()
+                    else:
+                        raise PacoteError(f"Não foi possível obter {nome}: {e}")
+                else:
+                    self.estatisticas["metadados_rede"] += 1
+                    _escrever_atomico(arquivo, bruto)
+                dados = json.loads(bruto)
+            self._metadados[nome] = dados
+            return dados
+
+    # --- Resolução ---
+
+    def resolver(self, raiz: Dict) -> Dict:
+        """Resolve as dependências de um package.json num lockfile v3 (node_modules achatado)"""
+        pacotes: Dict[str, Dict] = {}
+        # (caminho de quem depende, nome, faixa, só de desenvolvimento, opcional)
+        pendentes = [("", nome, faixa, False, False) for nome, faixa in raiz.get("dependencies", {}).items()]
+        pendentes += [("", nome, faixa, False, True) for nome, faixa in raiz.get("optionalDependencies", {}).items()]
+        pendentes += [("", nome, faixa, True, False) for nome, faixa in raiz.get("devDependencies", {}).items()]
+
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOADS, thread_name_prefix="pacotes") as pool:
+            while pendentes:
+                # Busca os metadados do nível inteiro em paralelo (o custo de um cache frio é a latência)
+                nomes = {nome for _, nome, _, _, _ in pendentes if nome not in self._metadados}
+                erros = dict(zip(nomes, pool.map(self._metadados_ou_erro, nomes)))
+                proximos = []
+                for pai, nome, faixa, dev, opcional in pendentes:
+                    if erros.get(nome):
+                        if opcional:
+                            continue
+                        raise erros[nome]
+                    caminho = self._colocar(pacotes, pai, nome, faixa, opcional)
+                    if caminho is None:
+                        continue
+                    entrada = pacotes[caminho]
+                    if entrada.pop("_novo", False):
+                        proximos += [(caminho, n, f, dev, opcional) for n, f in entrada.get("dependencies", {}).items()]
+                        proximos += [(caminho, n, f, dev, True) for n, f in entrada.get("optionalDependencies", {}).items()]
+                        proximos += [(caminho, n, f, dev, opcional) for n, f in entrada.pop("_peers", {}).items()]
+                pendentes = proximos
+
+        self._marcar_dev(pacotes, raiz)
+        for entrada in pacotes.values():
+            entrada.pop("_tags", None)
+
+        raiz_lock = {k: raiz[k] for k in ("name", "version") if k in raiz}
+        for campo in ("dependencies", "devDependencies", "optionalDependencies"):
+            if raiz.get(campo):
+                raiz_lock[campo] = raiz[campo]
+        return {
+            "name": raiz.get("name", ""),
+            "version": raiz.get("version", ""),
+            "lockfileVersion": 3,
+            "requires": True,
+            "packages": {"": raiz_lock, **{k: pacotes[k] for k in sorted(pacotes)}}
+        }
+
+    def _metadados_ou_erro(self, nome: str) -> Optional[Exception]:
+        try:
+            self.metadados(nome)
+        except Exception as e:
+            return e if isinstance(e, PacoteError) else PacoteError(f"{nome}: {e}")
+        return None
+
+    @staticmethod
+    def _visivel(pacotes: Dict, pai: str, nome: str) -> Optional[str]:
+        """Caminho que o Node carregaria para `nome` a partir de `pai` (sobe os node_modules)"""
+        nivel = pai
+        while True:
+            caminho = f"{nivel}/node_modules/{nome}" if nivel else f"node_modules/{nome}"
+            if caminho in pacotes:
+                return caminho
+            if not nivel:
+                return None
+            anterior = nivel.rsplit("/node_modules/", 1)
+            nivel = anterior[0] if len(anterior) > 1 else ""
+
+    @staticmethod
+    def _alguem_usa(pacotes: Dict, nivel: str, nome: str, exceto: str) -> bool:
+        """Algum pacote em `nivel` ou abaixo (fora `exceto`) depende de `nome`"""
+        prefixo = nivel + "/node_modules/"
+        return any(nome in entrada.get(campo, {})
+                   for caminho, entrada in pacotes.items()
+                   if caminho != exceto and (caminho == nivel or caminho.startswith(prefixo))
+                   for campo in ("dependencies", "optionalDependencies", "peerDependencies"))
+
+    def _marcar_dev(self, pacotes: Dict, raiz: Dict) -> None:
+        """dev=true só no que não é alcançável a partir das dependências de produção"""
+        producao = set()
+        pilha = [("", nome) for campo in ("dependencies", "optionalDependencies") for nome in raiz.get(campo, {})]
+        while pilha:
+            caminho = self._visivel(pacotes, *pilha.pop())
+            if caminho is None or caminho in producao:
+                continue
+            producao.add(caminho)
+            entrada = pacotes[caminho]
+            for campo in ("dependencies", "optionalDependencies", "peerDependencies"):
+                pilha += [(caminho, nome) for nome in entrada.get(campo, {})]
+        for caminho, entrada in pacotes.items():
+            if caminho in producao:
+                entrada.pop("dev", None)
+            else:
+                entrada["dev"] = True
+
+    def _colocar(self, pacotes: Dict, pai: str, nome: str, faixa_texto: str, opcional: bool) -> Optional[str]:
+        """Reaproveita a cópia visível a partir de `pai` ou coloca o pacote no nível mais alto possível"""
+        if faixa_texto.startswith("npm:"):
+            raise PacoteError(f"Alias não suportado: {nome}@{faixa_texto}")
+        if re.match(r"^(file:|link:|git|https?:|github:|[\w.-]+/[\w.-]+$)", faixa_texto):
+            raise PacoteError(f"Dependência fora do registry não suportada: {nome}@{faixa_texto}")
+        niveis = [pai]
+        while niveis[-1]:
+            anterior = niveis[-1].rsplit("/node_modules/", 1)
+            niveis.append(anterior[0] if len(anterior) > 1 else "")
+        # Sobe de `pai` até a raiz procurando a cópia que o Node encontraria
+        conflito = None
+        for nivel in niveis:
+            caminho = f"{nivel}/node_modules/{nome}" if nivel else f"node_modules/{nome}"
+            if caminho in pacotes:
+                existente = pacotes[caminho]
+                try:
+                    compativel = faixa(faixa_texto).satisfaz(existente["version"])
+                except PacoteError:
+                    compativel = False
+                if compativel or faixa_texto in existente.get("_tags", ()):
+                    if not opcional:
+                        existente.pop("optional", None)
+                    return caminho
+                conflito = niveis.index(nivel)
+                break
+        if conflito is None:
+            destino = ""
+        elif conflito == 0:
+            # Duas faixas incompatíveis do mesmo pacote no mesmo nível: fica a primeira
+            return f"{pai}/node_modules/{nome}" if pai else f"node_modules/{nome}"
+        else:
+            # O nível mais alto abaixo do conflito que não muda o que outro pacote já resolveu
+            destino = pai
+            for nivel in reversed(niveis[:conflito]):
+                if nivel == pai or not self._alguem_usa(pacotes, nivel, nome, pai):
+                    destino = nivel
+                    break
+        caminho = f"{destino}/node_modules/{nome}" if destino else f"node_modules/{nome}"
+
+        dados = self.metadados(nome)
+        tags = dados.get("dist-tags", {})
+        versoes = dados.get("versions", {})
+        versao = tags[faixa_texto] if faixa_texto in tags else faixa(faixa_texto).melhor(list(versoes), tags.get("latest"))
+        if versao is None or versao not in versoes:
+            if opcional:
+                return None
+            raise PacoteError(f"Nenhuma versão de {nome} satisfaz {faixa_texto}")
+        manifesto = versoes[versao]
+        dist = manifesto.get("dist", {})
+        integridade = dist.get("integrity") or \
+            f"sha1-{base64.b64encode(bytes.fromhex(dist['shasum'])).decode()}"
+        entrada = {"version": versao, "resolved": dist["tarball"], "integrity": integridade, "_novo": True}
+        for campo in ("dependencies", "optionalDependencies", "bin", "engines", "license"):
+            if manifesto.get(campo):
+                entrada[campo] = manifesto[campo]
+        # npm 7+ instala peerDependencies não opcionais
+        peers_opcionais = {n for n, meta in manifesto.get("peerDependenciesMeta", {}).items() if meta.get("optional")}
+        peers = {n: f for n, f in manifesto.get("peerDependencies", {}).items() if n not in peers_opcionais}
+        if peers:
+            entrada["peerDependencies"] = manifesto["peerDependencies"]
+            entrada["_peers"] = peers
+        if opcional:
+            entrada["optional"] = True
+        if faixa_texto in tags:
+            entrada["_tags"] = (faixa_texto,)
+        pacotes[caminho] = entrada
+        return caminho
+
+    def lock_para(self, package_json: Dict) -> Dict:
+        """Lockfile para este conjunto de dependências, resolvido uma vez e guardado em locks/"""
+        dependencias = {campo: package_json.get(campo, {})
+                        for campo in ("dependencies", "devDependencies", "optionalDependencies")}
+        chave = hashlib.sha256(json.dumps([self.registry, dependencias], sort_keys=True).encode()).hexdigest()[:24]
+        arquivo = self.diretorio / "locks" / f"{chave}.json"
+        with self._trava(f"lock:{chave}"):
+            if arquivo.exists():
+                lock = json.loads(arquivo.read_bytes())
+                self.estatisticas["locks_cache"] += 1
+            else:
+                lock = self.resolver(package_json)
+                _escrever_atomico(arquivo, json.dumps(lock, indent=2).encode())
+        # Nome e versão são do projeto, o resto é compartilhado
+        for destino in (lock, lock["packages"][""]):
+            destino["name"] = package_json.get("name", "")
+            destino["version"] = package_json.get("version", "")
+        return lock
+
+    # --- Tarballs ---
+
+    def _caminho_conteudo(self, integridade: str) -> Tuple[str, Path]:
+        algoritmo, valor = integridade.split()[0].split("-", 1)
+        hexa = base64.b64decode(valor).hex()
+        return algoritmo, self.diretorio / "conteudo" / algoritmo / hexa[:2] / hexa
+
+    def tarball(self, url: str, integridade: str) -> Path:
+        """Tarball verificado no cache, baixando se ainda não estiver lá"""
+        algoritmo, destino = self._caminho_conteudo(integridade)
+        if destino.exists():
+            self.estatisticas["tarballs_cache"] += 1
+            return destino
+        with self._trava(f"tgz:{destino.name}"):
+            if not destino.exists():
+                try:
+                    dados = self._baixar(url)
+                except PacoteError:
+                    raise
+                except Exception as e:
+                    raise PacoteError(f"Falha ao baixar {url}: {e}")
+                if _integridade(dados, algoritmo) != integridade.split()[0]:
+                    raise PacoteError(f"Integridade não confere para {url}")
+                _escrever_atomico(destino, dados)
+                self.estatisticas["tarballs_rede"] += 1
+        return destino
+
+    def extraido(self, url: str, integridade: str) -> Path:
+        """Conteúdo do tarball extraído uma vez, somente leitura, pronto para ser linkado"""
+        _, origem = self._caminho_conteudo(integridade)
+        destino = self.diretorio / "extraidos" / origem.name
+        if destino.exists() and not HARDLINKS:
+            return destino
+        tarball = self.tarball(url, integridade)
+        with self._trava(f"ext:{destino.name}"):
+            if destino.exists():
+                # Com hardlinks, um script de instalação pode ter alterado o inode compartilhado
+                if not HARDLINKS or verificar_manifesto(destino):
+                    return destino
+                logger.warning(f"Extração de {url} alterada no cache; extraindo de novo")
+                shutil.rmtree(destino)
+            temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+            shutil.rmtree(temporario, ignore_errors=True)
+            temporario.mkdir(parents=True)
+            with tarfile.open(tarball, "r:*") as tar:
+                for membro in tar:
+                    # O primeiro componente é "package/" (ou o nome do pacote, em tarballs antigos)
+                    partes = PurePosixPath(membro.name).parts[1:]
+                    if not partes or ".." in partes or not (membro.isfile() or membro.isdir()):
+                        continue
+                    alvo = temporario.joinpath(*partes)
+                    if membro.isdir():
+                        alvo.mkdir(parents=True, exist_ok=True)
+                        continue
+                    alvo.parent.mkdir(parents=True, exist_ok=True)
+                    with tar.extractfile(membro) as f, open(alvo, "wb") as saida:
+                        shutil.copyfileobj(f, saida)
+                    os.chmod(alvo, (membro.mode & 0o555) | 0o444)
+            self._marcar_binarios(temporario)
+            gravar_manifesto(temporario)
+            os.replace(temporario, destino)
+        return destino
+
+    def _marcar_binarios(self, diretorio: Path) -> None:
+        manifesto = diretorio / "package.json"
+        if not manifesto.exists():
+            return
+        try:
+            dados = json.loads(manifesto.read_bytes())
+        except ValueError:
+            return
+        for relativo in _binarios(dados.get("name", ""), dados.get("bin")).values():
+            alvo = diretorio / relativo
+            if alvo.is_file():
+                os.chmod(alvo, 0o555)
+
+    # --- Instalação ---
+
+    def instalar(self, projeto: str, lock: Optional[Dict] = None) -> Dict:
+        """Instala node_modules a partir do lockfile, como `npm ci`, usando só o cache quando possível.
+
+        Scripts de ciclo de vida (postinstall etc.) não são executados.
+        """
+        inicio = time.perf_counter()
+        projeto = Path(projeto)
+        if lock is None:
+            lock = json.loads((projeto / "package-lock.json").read_text(encoding="utf-8"))
+        pacotes = {k: v for k, v in lock["packages"].items() if k.startswith("node_modules/")}
+
+        # Baixa e extrai em paralelo; o que já está no cache não toca na rede
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOADS, thread_name_prefix="pacotes") as pool:
+            extraidos = dict(zip(pacotes, pool.map(
+                lambda item: self._extraido_ou_erro(*item),
+                [(k, v) for k, v in pacotes.items()])))
+        falhas = [f"{k}: {e}" for k, e in extraidos.items() if isinstance(e, Exception)
+                  and not pacotes[k].get("optional")]
+        if falhas:
+            raise PacoteError("Falha ao obter pacotes: " + "; ".join(falhas[:5]))
+
+        node_modules = projeto / "node_modules"
+        if node_modules.exists():
+            shutil.rmtree(node_modules)
+        arquivos = []
+        for caminho, origem in extraidos.items():
+            if isinstance(origem, Exception):
+                continue
+            for raiz, _, nomes in os.walk(origem):
+                for nome in nomes:
+                    if nome == MANIFESTO and raiz == str(origem):
+                        continue
+                    arquivo = Path(raiz) / nome
+                    arquivos.append((arquivo, projeto / caminho / arquivo.relative_to(origem)))
+        for pasta in sorted({destino.parent for _, destino in arquivos}, key=lambda p: len(p.parts)):
+            pasta.mkdir(parents=True, exist_ok=True)
+
+        formas: Dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOADS, thread_name_prefix="pacotes") as pool:
+            for forma in pool.map(lambda item: materializar_arquivo(item[0], item[1], item[0].stat().st_mode & 0o777,
+                                                                    imutavel=True), arquivos):
+                formas[forma] = formas.get(forma, 0) + 1
+
+        self._ligar_binarios(projeto, pacotes)
+        resultado = {
+            "pacotes": len(pacotes),
+            "arquivos": len(arquivos),
+            "formas": formas,
+            "segundos": round(time.perf_counter() - inicio, 3)
+        }
+        logger.info(f"Dependências instaladas em {projeto}: {resultado}")
+        return resultado
+
+    def _extraido_ou_erro(self, caminho: str, pacote: Dict):
+        try:
+            return self.extraido(pacote["resolved"], pacote["integrity"])
+        except Exception as e:
+            return e
+
+    def _ligar_binarios(self, projeto: Path, pacotes: Dict) -> None:
+        for caminho, pacote in pacotes.items():
+            if not pacote.get("bin"):
+                continue
+            nome = caminho.rsplit("node_modules/", 1)[1]
+            pasta_bin = projeto / caminho[:-len(nome)] / ".bin"
+            pasta_bin.mkdir(parents=True, exist_ok=True)
+            for comando, relativo in _binarios(nome, pacote["bin"]).items():
+                link = pasta_bin / comando
+                if not link.exists() and not link.is_symlink():
+                    os.symlink(os.path.join("..", nome, relativo), link)
+
+    # --- Projetos ---
+
+    def preparar_projeto(self, projeto: str, instalar: bool = False) -> Dict:
+        """Garante package-lock.json no projeto (o do template ou um resolvido em cache) e instala se pedido"""
+        projeto = Path(projeto)
+        package_json = json.loads((projeto / "package.json").read_text(encoding="utf-8"))
+        arquivo_lock = projeto / "package-lock.json"
+        if arquivo_lock.exists():
+            lock = json.loads(arquivo_lock.read_text(encoding="utf-8"))
+        else:
+            lock = self.lock_para(package_json)
+            arquivo_lock.write_text(json.dumps(lock, indent=2) + "\n", encoding="utf-8")
+        resultado = {"lock": str(arquivo_lock), "pacotes": len(lock["packages"]) - 1}
+        if instalar:
+            resultado["instalacao"] = self.instalar(str(projeto), lock)
+        return resultado
+
+    def podar(self) -> int:
+        """Remove extrações (recriadas a partir dos tarballs quando necessário)"""
+        removidos = 0
+        for pasta in (self.diretorio / "extraidos").iterdir():
+            shutil.rmtree(pasta)
+            removidos += 1
+        return removidos
+
+    def tamanho(self) -> Dict[str, int]:
+        return {sub: sum(p.stat().st_size for p in (self.diretorio / sub).rglob("*") if p.is_file())
+                for sub in ("metadados", "conteudo", "extraidos", "locks")}
+
+
+def _binarios(nome: str, bin_) -> Dict[str, str]:
+    if not bin_:
+        return {}
+    if isinstance(bin_, str):
+        return {nome.split("/")[-1]: bin_}
+    return {comando.split("/")[-1]: caminho for comando, caminho in bin_.items()}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia pacotes", description="Cache de pacotes npm e lockfiles")
+    parser.add_argument("--registry", default=REGISTRY_PADRAO)
+    parser.add_argument("--offline", action="store_true", help="Usa apenas o cache local")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    lock = sub.add_parser("lock", help="Gera package-lock.json para um projeto")
+    lock.add_argument("projeto")
+    instalar = sub.add_parser("install", help="Instala node_modules a partir do lockfile")
+    instalar.add_argument("projeto")
+    sub.add_parser("status", help="Tamanho do cache")
+    sub.add_parser("prune", help="Remove as extrações (mantém tarballs e locks)")
+    args = parser.parse_args(argv)
+
+    cache = CachePacotes(registry=args.registry, offline=args.offline)
+    try:
+        if args.comando == "lock":
+            print(json.dumps(cache.preparar_projeto(args.projeto), indent=2, ensure_ascii=False))
+        elif args.comando == "install":
+            print(json.dumps(cache.preparar_projeto(args.projeto, instalar=True), indent=2, ensure_ascii=False))
+        elif args.comando == "status":
+            for sub_dir, tamanho in cache.tamanho().items():
+                print(f"{sub_dir:<10} {tamanho / 1024 / 1024:8.1f} MB")
+        elif args.comando == "prune":
+            print(f"{cache.podar()} extrações removidas")
+    except PacoteError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
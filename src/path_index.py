@@ -0,0 +1,503 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from array import array
+from pathlib import Path
+import logging
+import os
+import re
+import threading
+
+from .fswatch import (Inotify, inotify_disponivel, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO,
+                      IN_DELETE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ONLYDIR)
+from .ingest import DIRETORIOS_IGNORADOS
+
+logger = logging.getLogger(__name__)
+
+# Nó removido (o índice fica na lista de livres para ser reaproveitado)
+_LIVRE = 255
+# Diretórios com mais filhos que isso ganham um dicionário nome -> filho (busca linear abaixo)
+LIMITE_LINEAR = 16
+# Teto de caminhos montados por busca (os de nomes mais bem pontuados primeiro)
+MAX_CANDIDATOS = 5000
+# IN_CLOSE_WRITE não muda a árvore, só interessa a quem ouve (status do git)
+_MASCARA = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_CLOSE_WRITE | IN_ONLYDIR
+
+
+def pontuar(consulta: str, alvo: str) -> Optional[int]:
+    """Pontuação estilo fzf: `consulta` precisa ser subsequência de `alvo` (já em minúsculas).
+
+    Bônus para letras no início de um componente ou logo após um separador
+    e para letras consecutivas; lacunas e caminhos longos custam pontos.
+    """
+    pontos = 0
+    posicao = 0
+    anterior = -2
+    for letra in consulta:
+        achou = alvo.find(letra, posicao)
+        if achou < 0:
+            return None
+        if achou == 0 or alvo[achou - 1] in "/_-. ":
+            pontos += 16
+        if achou == anterior + 1:
+            pontos += 8
+        else:
+            pontos -= min(achou - posicao, 8)
+        anterior = achou
+        posicao = achou + 1
+    return pontos * 4 - len(alvo)
+
+
+class PathIndex:
+    """Árvore do workspace em memória, mantida em dia com inotify.
+
+    Os nós ficam em arrays paralelos (pai, nome, tipo, primeiro filho,
+    irmãos e as ligações da lista de nós com o mesmo nome), cerca de 33
+    bytes por nó e nenhum objeto Python por caminho; só diretórios grandes
+    ganham um dicionário de filhos. Os nomes dos
+    componentes são internados, então "src" e "index.ts" existem uma vez só
+    mesmo em árvores de centenas de milhares de arquivos. Diretórios como
+    node_modules e .git entram como nós, mas o conteúdo não é indexado.
+    """
+
+    def __init__(self, raiz: str = "/root/projetos"):
+        self.raiz = Path(os.path.normpath(raiz))
+        self._lock = threading.RLock()
+        self._nomes: Dict[str, int] = {}
+        self._texto: List[str] = []
+        self._cabeca_nome = array("i")  # por nome: primeiro nó com esse nome
+        self._pai = array("i")
+        self._nome = array("i")
+        self._tipo = bytearray()  # 1 = diretório, 0 = arquivo, _LIVRE = removido
+        self._primeiro = array("i")  # primeiro filho
+        self._irmao = array("i")  # próximo irmão
+        self._irmao_ant = array("i")
+        self._grandes: Dict[int, Dict[int, int]] = {}
+        self._prox_nome = array("i")  # lista duplamente ligada dos nós com o mesmo nome
+        self._ant_nome = array("i")
+        self._livres: List[int] = []
+        self._wd: Dict[int, int] = {}
+        self._wd_de: Dict[int, int] = {}
+        self._inotify: Optional[Inotify] = None
+        self._ativo = False
+        self._pronto = threading.Event()
+        self._ouvintes: List[Callable[[str], None]] = []
+        # Versão da árvore e cache da última busca (a próxima tecla só filtra o resultado anterior)
+        self._versao = 0
+        self._cache_busca: Optional[Tuple[int, str, List[Tuple[int, int]]]] = None
+        self._novo(-1, "", True)
+
+    # --- Estrutura ---
+
+    def _internar(self, nome: str) -> int:
+        indice = self._nomes.get(nome)
+        if indice is None:
+            indice = self._nomes[nome] = len(self._texto)
+            self._texto.append(nome)
+            self._cabeca_nome.append(-1)
+        return indice
+
+    def _ligar(self, no: int, pai: int, nome_id: int) -> None:
+        """Põe o nó na lista de filhos de `pai` e na lista do nome"""
+        self._pai[no], self._nome[no] = pai, nome_id
+        if pai >= 0:
+            primeiro = self._primeiro[pai]
+            self._irmao[no], self._irmao_ant[no] = primeiro, -1
+            if primeiro >= 0:
+                self._irmao_ant[primeiro] = no
+            self._primeiro[pai] = no
+            grande = self._grandes.get(pai)
+            if grande is not None:
+                grande[nome_id] = no
+        cabeca = self._cabeca_nome[nome_id]
+        self._prox_nome[no], self._ant_nome[no] = cabeca, -1
+        if cabeca >= 0:
+            self._ant_nome[cabeca] = no
+        self._cabeca_nome[nome_id] = no
+
+    def _desligar(self, no: int) -> None:
+        pai = self._pai[no]
+        if pai >= 0:
+            anterior, proximo = self._irmao_ant[no], self._irmao[no]
+            if anterior >= 0:
+                self._irmao[anterior] = proximo
+            else:
+                self._primeiro[pai] = proximo
+            if proximo >= 0:
+                self._irmao_ant[proximo] = anterior
+            grande = self._grandes.get(pai)
+            if grande is not None:
+                grande.pop(self._nome[no], None)
+        anterior, proximo = self._ant_nome[no], self._prox_nome[no]
+        if anterior >= 0:
+            self._prox_nome[anterior] = proximo
+        else:
+            self._cabeca_nome[self._nome[no]] = proximo
+        if proximo >= 0:
+            self._ant_nome[proximo] = anterior
+        self._pai[no] = -1
+
+    def _novo(self, pai: int, nome: str, e_dir: bool) -> int:
+        nome_id = self._internar(nome)
+        if self._livres:
+            no = self._livres.pop()
+            self._tipo[no] = int(e_dir)
+            self._primeiro[no] = -1
+        else:
+            no = len(self._tipo)
+            for campo in (self._pai, self._nome, self._primeiro, self._irmao, self._irmao_ant,
+                          self._prox_nome, self._ant_nome):
+                campo.append(-1)
+            self._tipo.append(int(e_dir))
+        self._ligar(no, pai, nome_id)
+        self._versao += 1
+        return no
+
+    def _filhos(self, no: int):
+        filho = self._primeiro[no]
+        while filho >= 0:
+            yield filho
+            filho = self._irmao[filho]
+
+    def _remover(self, no: int) -> None:
+        """Remove o nó e toda a subárvore"""
+        self._desligar(no)
+        pilha = [no]
+        while pilha:
+            atual = pilha.pop()
+            filhos = list(self._filhos(atual))
+            for filho in filhos:
+                self._desligar(filho)
+            pilha.extend(filhos)
+            wd = self._wd_de.pop(atual, None)
+            if wd is not None:
+                self._wd.pop(wd, None)
+                if self._inotify:
+                    self._inotify.remover(wd)
+            self._grandes.pop(atual, None)
+            self._tipo[atual] = _LIVRE
+            self._primeiro[atual] = -1
+            self._livres.append(atual)
+        self._versao += 1
+
+    def _filho(self, no: int, nome: str) -> Optional[int]:
+        nome_id = self._nomes.get(nome)
+        if nome_id is None:
+            return None
+        grande = self._grandes.get(no)
+        if grande is not None:
+            return grande.get(nome_id)
+        nomes, irmao = self._nome, self._irmao
+        filho, passos = self._primeiro[no], 0
+        while filho >= 0:
+            if nomes[filho] == nome_id:
+                return filho
+            passos += 1
+            if passos > LIMITE_LINEAR:
+                grande = self._grandes[no] = {nomes[f]: f for f in self._filhos(no)}
+                return grande.get(nome_id)
+            filho = irmao[filho]
+        return None
+
+    def _caminho(self, no: int) -> str:
+        partes = []
+        while no > 0:
+            partes.append(self._texto[self._nome[no]])
+            no = self._pai[no]
+        return "/".join(reversed(partes))
+
+    def _no(self, relativo: str) -> Optional[int]:
+        no = 0
+        for parte in relativo.split("/"):
+            if parte in ("", "."):
+                continue
+            no = self._filho(no, parte)
+            if no is None:
+                return None
+        return no
+
+    def _relativo(self, caminho: str) -> Optional[str]:
+        """Caminho relativo à raiz do índice, ou None se estiver fora dela"""
+        absoluto = os.path.normpath(os.path.join(str(self.raiz), caminho))
+        if absoluto == str(self.raiz):
+            return ""
+        if not absoluto.startswith(str(self.raiz) + os.sep):
+            return None
+        return absoluto[len(str(self.raiz)) + 1:]
+
+    def adicionar(self, relativo: str, e_dir: bool = False) -> int:
+        """Inclui um caminho (e os diretórios intermediários) sem tocar no disco"""
+        with self._lock:
+            partes = [p for p in relativo.split("/") if p]
+            no = 0
+            for i, parte in enumerate(partes):
+                filho = self._filho(no, parte)
+                if filho is None:
+                    filho = self._novo(no, parte, e_dir or i < len(partes) - 1)
+                no = filho
+            return no
+
+    # --- Varredura e inotify ---
+
+    def _observar(self, no: int, absoluto: str) -> None:
+        if self._inotify is None:
+            return
+        try:
+            wd = self._inotify.adicionar(absoluto, _MASCARA)
+        except OSError as e:
+            logger.warning(f"Não foi possível observar {absoluto}: {e}")
+            return
+        self._wd[wd] = no
+        self._wd_de[no] = wd
+
+    def _varrer(self, no: int, absoluto: str) -> None:
+        """Indexa a subárvore de `absoluto` a partir do nó `no`"""
+        pilha = [(no, absoluto)]
+        while pilha:
+            atual, caminho = pilha.pop()
+            self._observar(atual, caminho)
+            try:
+                entradas = list(os.scandir(caminho))
+            except OSError:
+                continue
+            with self._lock:
+                # Diretório recém-criado no índice: não há filhos para procurar
+                vazio = self._primeiro[atual] < 0
+                for entrada in entradas:
+                    try:
+                        e_dir = entrada.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    filho = None if vazio else self._filho(atual, entrada.name)
+                    if filho is None:
+                        filho = self._novo(atual, entrada.name, e_dir)
+                    if e_dir and entrada.name not in DIRETORIOS_IGNORADOS and not entrada.name.startswith("."):
+                        pilha.append((filho, entrada.path))
+
+    def construir(self) -> None:
+        """Varredura completa da raiz (a árvore anterior é descartada)"""
+        with self._lock:
+            for filho in list(self._filhos(0)):
+                self._remover(filho)
+        if self.raiz.is_dir():
+            self._varrer(0, str(self.raiz))
+        self._pronto.set()
+        logger.info(f"Índice de caminhos de {self.raiz}: {self.estatisticas()}")
+
+    def ouvir(self, funcao: Callable[[str], None]) -> None:
+        """Registra `funcao(diretorio)`, chamada na thread do observador para cada diretório que mudou"""
+        self._ouvintes.append(funcao)
+
+    def _avisar(self, diretorios) -> None:
+        for diretorio in diretorios:
+            for funcao in self._ouvintes:
+                try:
+                    funcao(diretorio)
+                except Exception as e:
+                    logger.error(f"Erro num ouvinte do índice de caminhos: {e}")
+
+    def _aplicar(self, eventos) -> None:
+        movidos: Dict[int, int] = {}  # cookie -> nó que saiu de um diretório observado
+        alterados = set()
+        for evento in eventos:
+            if evento.mascara & IN_Q_OVERFLOW:
+                logger.warning("Fila do inotify estourou, reconstruindo o índice de caminhos")
+                self.construir()
+                self._avisar([str(self.raiz)])
+                return
+            with self._lock:
+                pai = self._wd.get(evento.wd)
+                if evento.mascara & IN_IGNORED:
+                    no = self._wd.pop(evento.wd, None)
+                    if no is not None:
+                        self._wd_de.pop(no, None)
+                    continue
+                if pai is None or not evento.nome or self._tipo[pai] == _LIVRE:
+                    continue
+                if self._ouvintes:
+                    alterados.add(str(self.raiz / self._caminho(pai)))
+                if evento.mascara & IN_CLOSE_WRITE:
+                    continue
+                existente = self._filho(pai, evento.nome)
+                if evento.mascara & IN_DELETE:
+                    if existente is not None:
+                        self._remover(existente)
+                elif evento.mascara & IN_MOVED_FROM:
+                    if existente is not None:
+                        # Desliga do pai; religa no IN_MOVED_TO com o mesmo cookie
+                        self._desligar(existente)
+                        movidos[evento.cookie] = existente
+                        self._versao += 1
+                elif evento.mascara & (IN_CREATE | IN_MOVED_TO):
+                    no = movidos.pop(evento.cookie, None) if evento.mascara & IN_MOVED_TO else None
+                    if existente is not None and existente != no:
+                        self._remover(existente)
+                    if no is not None:
+                        # Renomeação: só muda pai e nome, a subárvore (e os watches) continuam valendo
+                        self._ligar(no, pai, self._internar(evento.nome))
+                        self._versao += 1
+                        continue
+                    no = self._novo(pai, evento.nome, evento.is_dir)
+                    absoluto = str(self.raiz / self._caminho(no))
+            if evento.mascara & (IN_CREATE | IN_MOVED_TO) and evento.is_dir and \
+                    evento.nome not in DIRETORIOS_IGNORADOS and not evento.nome.startswith("."):
+                self._varrer(no, absoluto)
+        # Saiu para fora do workspace
+        with self._lock:
+            for no in movidos.values():
+                self._ligar(no, -1, self._nome[no])
+                self._remover(no)
+        self._avisar(alterados)
+
+    def _rodar(self) -> None:
+        try:
+            if inotify_disponivel():
+                self._inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"inotify indisponível, índice de caminhos sem atualização: {e}")
+        self.construir()
+        if self._inotify is None:
+            return
+        with self._inotify:
+            while self._ativo:
+                eventos = self._inotify.ler(timeout=1.0)
+                if eventos:
+                    self._aplicar(eventos)
+
+    def iniciar(self) -> None:
+        """Varredura inicial e observador numa thread em background"""
+        if self._ativo:
+            return
+        self._ativo = True
+        threading.Thread(target=self._rodar, daemon=True, name="path-index").start()
+
+    def parar(self) -> None:
+        self._ativo = False
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        return self._pronto.wait(timeout)
+
+    # --- Consultas ---
+
+    def existe(self, caminho: str) -> bool:
+        relativo = self._relativo(caminho)
+        if relativo is None or not self._pronto.is_set():
+            return os.path.exists(os.path.join(str(self.raiz), caminho))
+        with self._lock:
+            return self._no(relativo) is not None
+
+    def e_diretorio(self, caminho: str) -> bool:
+        relativo = self._relativo(caminho)
+        if relativo is None or not self._pronto.is_set():
+            return os.path.isdir(os.path.join(str(self.raiz), caminho))
+        with self._lock:
+            no = self._no(relativo)
+            return no is not None and self._tipo[no] == 1
+
+    def completar(self, texto: str, base: Optional[str] = None, limite: int = 10,
+                  so_diretorios: bool = False) -> List[str]:
+        """Completa o último componente de `texto` (relativo a `base`) por prefixo.
+
+        Devolve os textos completos, no mesmo formato digitado; diretórios
+        terminam com "/".
+        """
+        base = base or str(self.raiz)
+        pasta_digitada, _, parcial = texto.rpartition("/")
+        pasta = os.path.join(base, pasta_digitada) if not texto.startswith("/") else (pasta_digitada or "/")
+        prefixo = f"{pasta_digitada}/" if texto.count("/") else ""
+        relativo = self._relativo(pasta)
+        candidatos: List[Tuple[str, bool]] = []
+        with self._lock:
+            no = self._no(relativo) if relativo is not None and self._pronto.is_set() else None
+            indexado = no is not None and self._primeiro[no] >= 0
+            if indexado:
+                candidatos = [(self._texto[self._nome[filho]], self._tipo[filho] == 1)
+                              for filho in self._filhos(no)
+                              if self._texto[self._nome[filho]].startswith(parcial)]
+        if not indexado:
+            # Fora do workspace ou dentro de um diretório não indexado (node_modules): lê do disco
+            try:
+                candidatos = [(e.name, e.is_dir()) for e in os.scandir(pasta) if e.name.startswith(parcial)]
+            except OSError:
+                candidatos = []
+        if not parcial.startswith("."):
+            candidatos = [c for c in candidatos if not c[0].startswith(".")]
+        if so_diretorios:
+            candidatos = [c for c in candidatos if c[1]]
+        candidatos.sort(key=lambda c: (not c[1], c[0].lower()))
+        return [f"{prefixo}{nome}{'/' if e_dir else ''}" for nome, e_dir in candidatos[:limite]]
+
+    def _abaixo(self, no: int, ancestral: int) -> bool:
+        while no > 0 and no != ancestral:
+            no = self._pai[no]
+        return no == ancestral
+
+    def buscar(self, consulta: str, limite: int = 10, so_diretorios: bool = False,
+               dentro: Optional[str] = None) -> List[str]:
+        """Busca aproximada (subsequência) nos caminhos relativos à raiz, melhores primeiro.
+
+        O último componente da consulta é casado primeiro contra os nomes
+        internados (poucos milhares, não um por arquivo); só os nós dos
+        nomes mais bem pontuados viram caminhos completos para a pontuação
+        final, no máximo MAX_CANDIDATOS.
+        """
+        consulta = consulta.strip().lower().strip("/")
+        if not consulta:
+            return []
+        ultimo = consulta.rsplit("/", 1)[-1]
+        padrao = re.compile(".*?".join(map(re.escape, ultimo)))
+
+        with self._lock:
+            ancestral = 0
+            if dentro:
+                relativo = self._relativo(dentro)
+                ancestral = self._no(relativo) if relativo is not None else None
+                if ancestral is None:
+                    return []
+            # Nomes internados candidatos; digitando letra a letra, filtra o resultado anterior
+            if self._cache_busca and self._cache_busca[0] == self._versao and ultimo.startswith(self._cache_busca[1]):
+                ids = [i for _, i in self._cache_busca[2] if padrao.search(self._texto[i].lower())]
+            else:
+                ids = [i for i, nome in enumerate(self._texto) if padrao.search(nome.lower())]
+            nomes = sorted(((pontuar(ultimo, self._texto[i].lower()), i) for i in ids), reverse=True)
+            self._cache_busca = (self._versao, ultimo, nomes)
+
+            tipo = self._tipo
+            caminhos: List[Tuple[str, bool]] = []
+            for _, nome_id in nomes:
+                no = self._cabeca_nome[nome_id]
+                while no >= 0 and len(caminhos) < MAX_CANDIDATOS:
+                    if no > 0 and (tipo[no] == 1 or not so_diretorios) and (not ancestral or self._abaixo(no, ancestral)):
+                        caminhos.append((self._caminho(no), tipo[no] == 1))
+                    no = self._prox_nome[no]
+                if len(caminhos) >= MAX_CANDIDATOS:
+                    break
+
+        resultados = []
+        for caminho, e_dir in caminhos:
+            pontos = pontuar(consulta, caminho.lower())
+            if pontos is not None:
+                resultados.append((pontos, caminho + ("/" if e_dir else "")))
+        resultados.sort(key=lambda r: (-r[0], len(r[1]), r[1]))
+        return [caminho for _, caminho in resultados[:limite]]
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "nos": len(self._tipo) - len(self._livres),
+                "diretorios": self._tipo.count(1),
+                "nomes_unicos": len(self._texto),
+                "observados": len(self._wd)
+            }
+
+
+_indices: Dict[str, PathIndex] = {}
+_indices_lock = threading.Lock()
+
+
+def get_path_index(raiz: str = "/root/projetos") -> PathIndex:
+    """Índice compartilhado por raiz (uma varredura e um observador por processo)"""
+    chave = os.path.normpath(raiz)
+    with _indices_lock:
+        if chave not in _indices:
+            _indices[chave] = PathIndex(chave)
+            _indices[chave].iniciar()
+        return _indices[chave]
@@ -0,0 +1,242 @@
+from typing import Iterator, List, Optional, TextIO, Tuple
+import re
+import sys
+import unicodedata
+
+from .config import COLORS
+
+# Sequências ANSI (CSI e escapes de um caractere), compilado uma única vez
+ANSI_RE = re.compile(r'(\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~]))')
+
+# Largura visual por caractere, preenchida sob demanda
+_LARGURAS = {}
+
+
+def strip_ansi(text: str) -> str:
+    """Remove códigos ANSI de uma string"""
+    return ANSI_RE.sub('', text)
+
+
+def char_width(char: str) -> int:
+    """Largura visual de um caractere no terminal (memoizada)"""
+    largura = _LARGURAS.get(char)
+    if largura is not None:
+        return largura
+
+    codigo = ord(char)
+    if (codigo == 0x200D or 0xFE00 <= codigo <= 0xFE0F or 0x1F3FB <= codigo <= 0x1F3FF
+            or unicodedata.combining(char)):
+        # ZWJ, seletores de variação, tons de pele e marcas combinantes
+        # se juntam ao caractere anterior e não ocupam coluna
+        largura = 0
+    elif codigo >= 0x1F000 or unicodedata.east_asian_width(char) in ('F', 'W'):
+        largura = 2
+    else:
+        largura = 1
+
+    _LARGURAS[char] = largura
+    return largura
+
+
+def string_width(text: str) -> int:
+    """Calcula a largura visual de uma string, considerando emojis e caracteres especiais"""
+    largura = 0
+    larguras = _LARGURAS
+    for parte in ANSI_RE.split(text)[::2]:
+        for char in parte:
+            w = larguras.get(char)
+            largura += w if w is not None else char_width(char)
+    return largura
+
+
+def _quebrar(line: str, max_width: int) -> Tuple[List[Tuple[str, int]], str, int]:
+    """Quebra uma linha em tempo linear.
+
+    Retorna os pedaços já fechados e o resto ainda aberto (texto e largura),
+    que pode crescer se mais texto chegar, como no BoxStreamer.
+    """
+    resultado: List[Tuple[str, int]] = []
+    pecas: List[str] = []       # caracteres e sequências ANSI do pedaço atual
+    larguras: List[int] = []    # largura de cada peça (0 para ANSI)
+    largura = 0
+    ultimo_espaco = -1          # índice em `pecas` do último espaço
+
+    def emitir(ate: int, pular: int):
+        """Emite pecas[:ate] e mantém pecas[ate + pular:] (sem espaços à esquerda)"""
+        nonlocal pecas, larguras, largura, ultimo_espaco
+        resultado.append(("".join(pecas[:ate]), sum(larguras[:ate])))
+        resto, resto_larguras = pecas[ate + pular:], larguras[ate + pular:]
+        # Equivalente ao lstrip() da implementação anterior
+        inicio = 0
+        while inicio < len(resto) and resto[inicio] == " ":
+            inicio += 1
+        pecas, larguras = resto[inicio:], resto_larguras[inicio:]
+        largura = sum(larguras)
+        ultimo_espaco = -1
+        for i in range(len(pecas) - 1, -1, -1):
+            if pecas[i] == " ":
+                ultimo_espaco = i
+                break
+
+    for indice, token in enumerate(ANSI_RE.split(line)):
+        if indice % 2:
+            # Sequência ANSI: largura zero
+            pecas.append(token)
+            larguras.append(0)
+            continue
+
+        for char in token:
+            w = _LARGURAS.get(char)
+            if w is None:
+                w = char_width(char)
+
+            if largura + w > max_width and largura > 0:
+                if char == " ":
+                    # O próprio espaço é o ponto de quebra
+                    emitir(len(pecas), 0)
+                    continue
+                if ultimo_espaco >= 0:
+                    emitir(ultimo_espaco, 1)
+                # O que sobrou depois do último espaço vai para a linha seguinte
+                # e, somado a um caractere largo, ainda pode exceder a largura
+                if largura + w > max_width and largura > 0:
+                    emitir(len(pecas), 0)
+
+            if char == " ":
+                ultimo_espaco = len(pecas)
+            pecas.append(char)
+            larguras.append(w)
+            largura += w
+
+    return resultado, "".join(pecas), largura
+
+
+def wrap_line(line: str, max_width: int) -> List[Tuple[str, int]]:
+    """Quebra uma linha em pedaços de até `max_width` colunas, em tempo linear.
+
+    A linha é tokenizada uma vez em texto e sequências ANSI; as sequências
+    são mantidas no pedaço em que aparecem e não contam largura. A quebra
+    acontece no último espaço do pedaço (o espaço é descartado, como antes)
+    ou, sem espaço, no caractere que excederia a largura. Retorna pares
+    (texto, largura visual).
+    """
+    pedacos, resto, largura = _quebrar(line, max_width)
+    if resto:
+        pedacos.append((resto, largura))
+    return pedacos
+
+
+def iter_box_lines(text: str, color: str = COLORS.GREEN, width: int = 50) -> Iterator[str]:
+    """Gera as linhas do box uma a uma, sem montar o texto inteiro"""
+    conteudo = width - 4  # -4 para os caracteres ║ e espaços
+    yield f"{color}╔{'═' * (width-2)}╗{COLORS.RESET}"
+
+    for line in text.split("\n"):
+        for pedaco, largura in wrap_line(line, conteudo):
+            padding = conteudo - largura
+            yield f"{color}║{COLORS.RESET} {pedaco}{' ' * padding} {color}║{COLORS.RESET}"
+
+    yield f"{color}╚{'═' * (width-2)}╝{COLORS.RESET}"
+
+
+def create_box(text: str, color: str = COLORS.GREEN, width: int = 50) -> str:
+    return "\n".join(iter_box_lines(text, color, width))
+
+
+def print_box(text: str, color: str = COLORS.GREEN, width: int = 50,
+              stream: Optional[TextIO] = None) -> None:
+    """Escreve o box no terminal à medida que as linhas são geradas"""
+    stream = stream or sys.stdout
+    for linha in iter_box_lines(text, color, width):
+        stream.write(linha)
+        stream.write("\n")
+    stream.flush()
+
+
+class BoxStreamer:
+    """Desenha um box incrementalmente, à medida que o texto chega.
+
+    Linhas já quebradas são escritas de vez; a linha em andamento é
+    redesenhada no lugar (com \\r) a cada fragmento, então o custo por
+    fragmento fica limitado à largura do box.
+    """
+
+    def __init__(self, color: str = COLORS.GREEN, width: int = 50,
+                 stream: Optional[TextIO] = None):
+        self.color = color
+        self.width = width
+        self.conteudo = width - 4  # -4 para os caracteres ║ e espaços
+        self.stream = stream or sys.stdout
+        self._atual = ""              # texto da linha ainda não finalizada
+        self._pular_espacos = False   # continuação de uma quebra: ignora espaços iniciais
+        self._pendente = ""           # sequência ANSI cortada entre fragmentos
+        self._aberto = False
+
+    def _linha(self, texto: str, largura: int) -> str:
+        padding = self.conteudo - largura
+        return f"{self.color}║{COLORS.RESET} {texto}{' ' * padding} {self.color}║{COLORS.RESET}"
+
+    @property
+    def aberto(self) -> bool:
+        return self._aberto
+
+    def abrir(self) -> None:
+        if not self._aberto:
+            self.stream.write(f"{self.color}╔{'═' * (self.width-2)}╗{COLORS.RESET}\n")
+            self._aberto = True
+
+    def _processar(self, segmento: str, fim_de_linha: bool, saida: List[str]) -> None:
+        if self._pular_espacos:
+            segmento = segmento.lstrip(" ")
+            if segmento:
+                self._pular_espacos = False
+        self._atual += segmento
+
+        prontos, resto, largura = _quebrar(self._atual, self.conteudo)
+        if fim_de_linha:
+            if resto:
+                prontos.append((resto, largura))
+            self._atual = ""
+            self._pular_espacos = False
+        else:
+            # O resto ainda pode crescer; depois de uma quebra, espaços
+            # iniciais são descartados como no lstrip() do create_box
+            self._atual = resto
+            self._pular_espacos = bool(prontos) and not resto
+
+        for texto, largura in prontos:
+            saida.append("\r" + self._linha(texto, largura) + "\n")
+
+    def escrever(self, fragmento: str) -> None:
+        """Acrescenta texto ao box e atualiza o terminal"""
+        self.abrir()
+        fragmento = self._pendente + fragmento
+        self._pendente = ""
+        escape = fragmento.rfind("\x1b")
+        if escape >= 0 and not ANSI_RE.match(fragmento, escape) and len(fragmento) - escape < 32:
+            # Segura o início de uma sequência ANSI até ela terminar
+            fragmento, self._pendente = fragmento[:escape], fragmento[escape:]
+
+        saida: List[str] = []
+        *completas, resto = fragmento.split("\n")
+        for segmento in completas:
+            self._processar(segmento, True, saida)
+        self._processar(resto, False, saida)
+
+        if self._atual:
+            saida.append("\r" + self._linha(self._atual, string_width(self._atual)))
+        self.stream.write("".join(saida))
+        self.stream.flush()
+
+    def fechar(self) -> None:
+        """Finaliza a linha em andamento e desenha a base do box"""
+        self.abrir()
+        saida: List[str] = []
+        if self._pendente:
+            self._atual += self._pendente
+            self._pendente = ""
+        if self._atual:
+            self._processar("", True, saida)
+        saida.append(f"\r{self.color}╚{'═' * (self.width-2)}╝{COLORS.RESET}\n")
+        self.stream.write("".join(saida))
+        self.stream.flush()
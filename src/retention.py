@@ -0,0 +1,378 @@
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+
+from .metrics import CHROMA_LATENCIA
+
+logger = logging.getLogger(__name__)
+
+COLECAO = "chat_memory"
+# Política aplicada a chats sem configuração própria em data/retencao.json
+POLITICA_PADRAO = {
+    "ttl_dias": 180,           # apaga mensagens (e resumos) mais velhos que isso
+    "max_por_chat": 2000,      # mantém no máximo N documentos por chat
+    "resumir_apos_dias": 30    # troca turnos mais velhos que isso por um resumo
+}
+LOTE_EXCLUSAO = 500
+LOTE_LEITURA = 5000
+# Reconstrói a coleção quando a compactação remove essa fração dos documentos:
+# o HNSW só marca vetores apagados e continua a percorrê-los nas consultas
+FRACAO_RECONSTRUCAO = 0.2
+INTERVALO_PADRAO_HORAS = float(os.getenv("MEMORY_COMPACTACAO_HORAS", "6"))
+# Nomes usados durante a reconstrução: a cópia em andamento e a coleção que ela substitui
+SUFIXO_COMPACTADA = "_compactada"
+SUFIXO_ANTIGA = "_antiga"
+
+
+def carregar_politicas(caminho: Path) -> Dict:
+    """Lê {"padrao": {...}, "chats": {"<chat_id>": {...}}}, completando com POLITICA_PADRAO"""
+    dados = {}
+    if caminho.exists():
+        try:
+            dados = json.loads(caminho.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Política de retenção inválida em {caminho}: {e}")
+    padrao = {**POLITICA_PADRAO, **dados.get("padrao", {})}
+    return {
+        "padrao": padrao,
+        "chats": {str(chat): {**padrao, **politica} for chat, politica in dados.get("chats", {}).items()}
+    }
+
+
+def _ts(doc_id: str, metadata: Dict) -> float:
+    """Momento da mensagem; documentos antigos não têm "ts", mas o id é "<chat>_<timestamp>" """
+    if metadata.get("ts") is not None:
+        return float(metadata["ts"])
+    try:
+        return float(doc_id.rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return time.time()
+
+
+def _colecao(client, nome: str):
+    try:
+        return client.get_collection(nome)
+    except Exception:  # o tipo do erro de coleção inexistente muda entre versões do Chroma
+        return None
+
+
+def _apagar(client, nome: str) -> None:
+    if _colecao(client, nome) is not None:
+        client.delete_collection(nome)
+
+
+def recuperar_reconstrucao(client, nome: str = COLECAO) -> None:
+    """Resolve uma reconstrução interrompida (chamada antes de abrir a coleção).
+
+    Cópia sem a troca: descartada. Coleção antiga já renomeada e a nova ainda
+    não: a antiga, completa, volta ao nome. Troca feita: apaga a antiga.
+    """
+    antiga, temporaria = f"{nome}{SUFIXO_ANTIGA}", f"{nome}{SUFIXO_COMPACTADA}"
+    if _colecao(client, antiga) is not None:
+        if _colecao(client, nome) is None:
+            logger.warning(f"Reconstrução de {nome} interrompida na troca; restaurando a coleção anterior")
+            client.get_collection(antiga).modify(name=nome)
+        else:
+            client.delete_collection(antiga)
+    if _colecao(client, temporaria) is not None:
+        logger.warning(f"Descartando a cópia incompleta {temporaria}")
+        client.delete_collection(temporaria)
+
+
+def resumo_extrativo(mensagens: List[Dict]) -> str:
+    """Resumo sem LLM: as perguntas do usuário no período, sem repetições"""
+    vistas, linhas, total = set(), [], 0
+    for mensagem in mensagens:
+        if mensagem.get("role") != "user":
+            continue
+        texto = " ".join(mensagem.get("content", "").split())[:200]
+        if not texto or texto.lower() in vistas:
+            continue
+        vistas.add(texto.lower())
+        linhas.append(f"- {texto}")
+        total += len(texto)
+        if total > 2000:
+            break
+    return "Assuntos tratados:\n" + "\n".join(linhas)
+
+
+def resumidor_llm(client, modelo: str = "mixtral-8x7b-32768") -> Callable[[List[Dict]], str]:
+    """Resumidor que usa o LLM do orquestrador e cai para o extrativo em caso de erro"""
+    def resumir(mensagens: List[Dict]) -> str:
+        conversa = "\n".join(f"{m.get('role')}: {m.get('content', '')}" for m in mensagens)[-12000:]
+        try:
+            completion = client.chat.completions.create(
+                model=modelo,
+                messages=[
+                    {"role": "system", "content": "Resuma a conversa abaixo em português, em tópicos curtos, "
+                                                  "mantendo decisões, nomes de projetos, caminhos e comandos."},
+                    {"role": "user", "content": conversa}
+                ],
+                temperature=0.2,
+                max_tokens=400
+            )
+            return completion.choices[0].message.content
+        except Exception as e:
+            logger.warning(f"Erro ao resumir com o LLM ({e}); usando resumo extrativo")
+            return resumo_extrativo(mensagens)
+    return resumir
+
+
+def tamanho_diretorio(caminho: Path) -> int:
+    return sum(f.stat().st_size for f in caminho.rglob("*") if f.is_file())
+
+
+def medir_consultas(memory, consultas: List[str], repeticoes: int = 3) -> Dict:
+    """p50/p95 (ms) de consultas à coleção de memória"""
+    tempos = []
+    for _ in range(repeticoes):
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            memory.collection.query(query_texts=[consulta], n_results=5)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {"p50_ms": round(statistics.median(tempos), 2), "p95_ms": round(tempos[int(len(tempos) * 0.95) - 1], 2)}
+
+
+class CompactadorMemoria:
+    """Aplica as políticas de retenção à coleção chat_memory.
+
+    Para cada chat: resume e apaga turnos mais velhos que `resumir_apos_dias`,
+    apaga o que passou do TTL e corta o excesso acima de `max_por_chat`
+    (mensagens mais antigas primeiro, resumos por último). As exclusões são
+    feitas em lotes; no fim o SQLite do Chroma passa por VACUUM e, se muito
+    foi removido, a coleção é reconstruída para o índice HNSW encolher.
+    """
+
+    def __init__(self, memory, resumidor: Optional[Callable[[List[Dict]], str]] = None,
+                 politicas: Optional[Dict] = None, intervalo_horas: float = INTERVALO_PADRAO_HORAS):
+        self.memory = memory
+        self.resumidor = resumidor or resumo_extrativo
+        self.politicas = politicas or carregar_politicas(memory.data_dir / "retencao.json")
+        self.intervalo = intervalo_horas * 3600
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def politica(self, chat_id: str) -> Dict:
+        return self.politicas["chats"].get(str(chat_id), self.politicas["padrao"])
+
+    def _listar(self) -> Dict[str, List[tuple]]:
+        """(id, ts, metadata) de todos os documentos, agrupados por chat"""
+        por_chat: Dict[str, List[tuple]] = {}
+        inicio = 0
+        while True:
+            with CHROMA_LATENCIA.tempo(colecao=COLECAO, operacao="get"):
+                lote = self.memory.collection.get(include=["metadatas"], limit=LOTE_LEITURA, offset=inicio)
+            if not lote["ids"]:
+                break
+            for doc_id, metadata in zip(lote["ids"], lote["metadatas"]):
+                metadata = metadata or {}
+                por_chat.setdefault(str(metadata.get("chat_id", "")), []).append((doc_id, _ts(doc_id, metadata), metadata))
+            inicio += len(lote["ids"])
+        return por_chat
+
+    def _excluir(self, ids: List[str]) -> None:
+        for inicio in range(0, len(ids), LOTE_EXCLUSAO):
+            with self.memory.lock, CHROMA_LATENCIA.tempo(colecao=COLECAO, operacao="delete"):
+                self.memory.collection.delete(ids=ids[inicio:inicio + LOTE_EXCLUSAO])
+
+    def _resumir(self, chat_id: str, documentos: List[tuple]) -> None:
+        """Grava um documento de resumo no lugar dos turnos antigos"""
+        ids = [d[0] for d in documentos]
+        mensagens = []
+        for inicio in range(0, len(ids), LOTE_LEITURA):
+            lote = self.memory.collection.get(ids=ids[inicio:inicio + LOTE_LEITURA], include=["documents"])
+            for documento in lote["documents"]:
+                try:
+                    mensagens.append(json.loads(documento))
+                except (TypeError, json.JSONDecodeError):
+                    mensagens.append({"role": "user", "content": documento or ""})
+        mensagens.sort(key=lambda m: m.get("timestamp", ""))
+
+        de = datetime.fromtimestamp(min(d[1] for d in documentos))
+        ate = datetime.fromtimestamp(max(d[1] for d in documentos))
+        conteudo = f"Resumo da conversa de {de:%d/%m/%Y} a {ate:%d/%m/%Y}:\n{self.resumidor(mensagens)}"
+        resumo = {"role": "system", "content": conteudo, "timestamp": ate.isoformat()}
+        with self.memory.lock, CHROMA_LATENCIA.tempo(colecao=COLECAO, operacao="add"):
+            self.memory.collection.upsert(
+                ids=[f"{chat_id}_resumo_{ate.timestamp()}"],
+                documents=[json.dumps(resumo)],
+                metadatas=[{"chat_id": chat_id, "role": "system", "ts": ate.timestamp(),
+                            "tipo": "resumo", "mensagens": len(documentos)}]
+            )
+
+    def _vacuum(self) -> None:
+        """Devolve ao sistema o espaço das linhas apagadas no SQLite do Chroma"""
+        banco = self.memory.chroma_dir / "chroma.sqlite3"
+        if not banco.exists():
+            return
+        try:
+            conn = sqlite3.connect(str(banco), timeout=30)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"VACUUM do ChromaDB não executado: {e}")
+
+    def _reconstruir(self) -> None:
+        """Copia os documentos restantes (com embeddings) para uma coleção nova e troca as duas.
+
+        A cópia roda sem o lock (o bot continua gravando na coleção atual); com o
+        lock, só o que mudou durante a cópia e a troca de nomes. A coleção antiga
+        é renomeada antes da nova assumir o nome e só é apagada depois: um crash
+        no meio deixa nomes que recuperar_reconstrucao() resolve na abertura.
+        """
+        client, nome = self.memory.client, self.memory.nome_colecao
+        nome_temporario, nome_antigo = f"{nome}{SUFIXO_COMPACTADA}", f"{nome}{SUFIXO_ANTIGA}"
+        _apagar(client, nome_temporario)
+        atual = self.memory.collection
+        nova = client.get_or_create_collection(nome_temporario, embedding_function=self.memory.embeddings)
+        copiados = set()
+        inicio = 0
+        while True:
+            lote = atual.get(include=["documents", "metadatas", "embeddings"], limit=LOTE_LEITURA, offset=inicio)
+            if not lote["ids"]:
+                break
+            nova.add(ids=lote["ids"], documents=lote["documents"],
+                     metadatas=lote["metadatas"], embeddings=lote["embeddings"])
+            copiados.update(lote["ids"])
+            inicio += len(lote["ids"])
+
+        with self.memory.lock:
+            # Mensagens gravadas (ou apagadas) enquanto a cópia rodava
+            ids = set()
+            inicio = 0
+            while True:
+                lote = atual.get(include=[], limit=LOTE_LEITURA, offset=inicio)
+                if not lote["ids"]:
+                    break
+                ids.update(lote["ids"])
+                inicio += len(lote["ids"])
+            faltando = list(ids - copiados)
+            for inicio in range(0, len(faltando), LOTE_LEITURA):
+                lote = atual.get(ids=faltando[inicio:inicio + LOTE_LEITURA],
+                                 include=["documents", "metadatas", "embeddings"])
+                nova.add(ids=lote["ids"], documents=lote["documents"],
+                         metadatas=lote["metadatas"], embeddings=lote["embeddings"])
+            sobrando = list(copiados - ids)
+            for inicio in range(0, len(sobrando), LOTE_EXCLUSAO):
+                nova.delete(ids=sobrando[inicio:inicio + LOTE_EXCLUSAO])
+
+            atual.modify(name=nome_antigo)
+            nova.modify(name=nome)
+            self.memory.collection = client.get_collection(nome, embedding_function=self.memory.embeddings)
+        _apagar(client, nome_antigo)
+
+    def compactar(self, agora: Optional[float] = None) -> Dict:
+        """Executa uma rodada de retenção e devolve o relatório"""
+        agora = agora or time.time()
+        inicio = time.perf_counter()
+        antes = {"documentos": self.memory.collection.count(),
+                 "bytes": tamanho_diretorio(self.memory.chroma_dir)}
+        resumidos = expirados = excedentes = 0
+
+        for chat_id, documentos in self._listar().items():
+            politica = self.politica(chat_id)
+            limite_ttl = agora - politica["ttl_dias"] * 86400
+            limite_resumo = agora - politica["resumir_apos_dias"] * 86400
+
+            expirar = [d for d in documentos if d[1] < limite_ttl]
+            expirados += len(expirar)
+            vivos = [d for d in documentos if d[1] >= limite_ttl]
+
+            antigos = [d for d in vivos if d[1] < limite_resumo and d[2].get("tipo") != "resumo"]
+            novo_resumo = 0
+            if len(antigos) > 1:
+                try:
+                    self._resumir(chat_id, antigos)
+                    expirar += antigos
+                    resumidos += len(antigos)
+                    ids_antigos = {d[0] for d in antigos}
+                    vivos = [d for d in vivos if d[0] not in ids_antigos]
+                    novo_resumo = 1
+                except Exception as e:
+                    logger.error(f"Erro ao resumir o chat {chat_id}: {e}")
+
+            # Cota: sai primeiro a mensagem mais antiga, resumos por último
+            excesso = len(vivos) + novo_resumo - politica["max_por_chat"]
+            if excesso > 0:
+                vivos.sort(key=lambda d: (d[2].get("tipo") == "resumo", d[1]))
+                expirar += vivos[:excesso]
+                excedentes += excesso
+
+            self._excluir([d[0] for d in expirar])
+
+        removidos = antes["documentos"] - self.memory.collection.count()
+        reconstruida = False
+        if antes["documentos"] and removidos / antes["documentos"] >= FRACAO_RECONSTRUCAO:
+            self._reconstruir()
+            reconstruida = True
+        self._vacuum()
+
+        relatorio = {
+            "antes": antes,
+            "depois": {"documentos": self.memory.collection.count(),
+                       "bytes": tamanho_diretorio(self.memory.chroma_dir)},
+            "expirados": expirados,
+            "resumidos": resumidos,
+            "excedentes": excedentes,
+            "removidos": removidos,
+            "reconstruida": reconstruida,
+            "segundos": round(time.perf_counter() - inicio, 2)
+        }
+        logger.info(f"Compactação de {COLECAO}: {relatorio}")
+        return relatorio
+
+    # --- Execução periódica ---
+
+    def _executar(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.compactar()
+            except Exception as e:
+                logger.error(f"Erro na compactação da memória: {e}")
+
+    def iniciar(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, daemon=True, name="memory-compact")
+            self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia compact", description="Aplica a retenção à memória de conversas")
+    parser.add_argument("--data-dir", default="/root/projetos/chat-ia-terminal/data")
+    parser.add_argument("--consultas", nargs="*", default=["erro no docker", "criar projeto react", "configurar bot"],
+                        help="Consultas usadas para medir a latência antes e depois")
+    args = parser.parse_args(argv)
+
+    from .memory import Memory
+    memory = Memory(args.data_dir)
+    latencia_antes = medir_consultas(memory, args.consultas)
+    relatorio = CompactadorMemoria(memory).compactar()
+    latencia_depois = medir_consultas(memory, args.consultas)
+
+    antes, depois = relatorio["antes"], relatorio["depois"]
+    print(f"Documentos: {antes['documentos']} -> {depois['documentos']} "
+          f"({relatorio['expirados']} expirados, {relatorio['resumidos']} resumidos, "
+          f"{relatorio['excedentes']} acima da cota)")
+    print(f"Disco (chroma_db): {antes['bytes'] / 1024 / 1024:.1f} MB -> {depois['bytes'] / 1024 / 1024:.1f} MB"
+          f"{' (coleção reconstruída)' if relatorio['reconstruida'] else ''}")
+    print(f"Consulta: p50 {latencia_antes['p50_ms']} -> {latencia_depois['p50_ms']} ms, "
+          f"p95 {latencia_antes['p95_ms']} -> {latencia_depois['p95_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+import ctypes
+import ctypes.util
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from .materializer import materializar_arquivo
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(os.getenv("SCAFFOLD_TEMPLATES_DIR", Path(__file__).resolve().parent.parent / "templates"))
+# Threads de escrita (a maior parte do tempo é syscall, que libera o GIL)
+MAX_WORKERS = 8
+
+# Arquivos maiores que isso nunca são tratados como texto com variáveis
+LIMITE_TEXTO = 1024 * 1024
+# Padrão de "imutaveis" quando template.json não define: podem virar hardlinks do store
+IMUTAVEIS_PADRAO = ["node_modules/**"]
+
+# {{ variavel }} ou {{ variavel|filtro }}
+_MARCADOR = re.compile(r"\{\{\s*([A-Za-z_]\w*)\s*(?:\|\s*([a-z]+)\s*)?\}\}")
+
+
+def _pascal(valor: str) -> str:
+    return "".join(p[:1].upper() + p[1:] for p in re.split(r"[^0-9A-Za-z]+", valor) if p)
+
+
+FILTROS = {
+    "json": lambda v: json.dumps(v)[1:-1],  # escapa para dentro de uma string JSON
+    "pascal": _pascal,                      # minha-pagina -> MinhaPagina
+    "kebab": lambda v: re.sub(r"[^0-9a-z]+", "-", re.sub(r"(?<=[a-z0-9])([A-Z])", r"-\1", v).lower()).strip("-"),
+    "lower": str.lower,
+    "upper": str.upper,
+}
+
+
+class TemplateError(Exception):
+    """Template inválido, variável faltando ou conflito com arquivos existentes"""
+    pass
+
+
+class _Texto:
+    """Texto pré-compilado: literais e (variável, filtro) alternados"""
+
+    __slots__ = ("partes", "variaveis")
+
+    def __init__(self, texto: str, origem: str):
+        self.partes: List[Union[str, Tuple[str, Optional[str]]]] = []
+        self.variaveis = set()
+        posicao = 0
+        for marcador in _MARCADOR.finditer(texto):
+            if marcador.start() > posicao:
+                self.partes.append(texto[posicao:marcador.start()])
+            nome, filtro = marcador.group(1), marcador.group(2)
+            if filtro and filtro not in FILTROS:
+                raise TemplateError(f"Filtro desconhecido '{filtro}' em {origem}")
+            self.partes.append((nome, filtro))
+            self.variaveis.add(nome)
+            posicao = marcador.end()
+        if posicao < len(texto):
+            self.partes.append(texto[posicao:])
+
+    def render(self, valores: Dict[str, str]) -> str:
+        return "".join(
+            parte if isinstance(parte, str) else
+            (FILTROS[parte[1]](valores[parte[0]]) if parte[1] else valores[parte[0]])
+            for parte in self.partes
+        )
+
+
+class Template:
+    """Árvore de arquivos de templates/<nome>/arquivos com as variáveis de template.json.
+
+    Caminhos e conteúdos são compilados uma vez no carregamento. Arquivos
+    sem variáveis, que não são UTF-8 (imagens, fontes) ou que casam com
+    "imutaveis" são estáticos: não ficam em memória e são materializados
+    a partir do TemplateStore (reflink, hardlink ou cópia).
+    """
+
+    def __init__(self, diretorio: Path):
+        self.nome = diretorio.name
+        self.diretorio = diretorio
+        config_path = diretorio / "template.json"
+        config = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+        self.descricao = config.get("descricao", "")
+        # Variáveis com valor None são obrigatórias
+        self.variaveis: Dict[str, Optional[str]] = config.get("variaveis", {})
+
+        self.imutaveis: List[str] = config.get("imutaveis", IMUTAVEIS_PADRAO)
+
+        self.diretorios = [_Texto(d, f"{self.nome}:diretorios") for d in config.get("diretorios", [])]
+        # (caminho, conteúdo compilado ou caminho relativo do arquivo estático, modo, imutável)
+        self.arquivos: List[Tuple[_Texto, Union[_Texto, str], int, bool]] = []
+        self.raiz = diretorio / "arquivos"
+        assinatura = hashlib.sha256(config_path.read_bytes() if config_path.exists() else b"")
+        for caminho in sorted(p for p in self.raiz.rglob("*") if p.is_file()):
+            relativo = caminho.relative_to(self.raiz).as_posix()
+            info = caminho.stat()
+            imutavel = any(fnmatch.fnmatch(relativo, padrao) for padrao in self.imutaveis)
+            conteudo: Union[_Texto, str] = relativo
+            if not imutavel and info.st_size <= LIMITE_TEXTO:
+                try:
+                    texto = _Texto(caminho.read_bytes().decode("utf-8"), relativo)
+                    if texto.variaveis:
+                        conteudo = texto
+                except UnicodeDecodeError:
+                    pass
+            if isinstance(conteudo, str):
+                assinatura.update(f"{relativo}\0{info.st_size}\0{info.st_mtime_ns}\0{info.st_mode}\n".encode())
+            self.arquivos.append((_Texto(relativo, relativo), conteudo, info.st_mode & 0o777, imutavel))
+        # Versão dos arquivos estáticos no TemplateStore
+        self.versao = assinatura.hexdigest()[:16]
+
+        usadas = set().union(*(c.variaveis for c, _, _, _ in self.arquivos),
+                             *(c.variaveis for _, c, _, _ in self.arquivos if isinstance(c, _Texto)),
+                             *(d.variaveis for d in self.diretorios))
+        nao_declaradas = usadas - set(self.variaveis)
+        if nao_declaradas:
+            raise TemplateError(f"Template {self.nome} usa variáveis não declaradas: {', '.join(sorted(nao_declaradas))}")
+
+    def estaticos(self) -> List[Tuple[str, int]]:
+        return [(conteudo, modo) for _, conteudo, modo, _ in self.arquivos if isinstance(conteudo, str)]
+
+    def valores(self, variaveis: Dict[str, str]) -> Dict[str, str]:
+        valores = {k: v for k, v in self.variaveis.items() if v is not None}
+        valores.update({k: str(v) for k, v in variaveis.items()})
+        faltando = [k for k in self.variaveis if k not in valores]
+        if faltando:
+            raise TemplateError(f"Template {self.nome} precisa de: {', '.join(faltando)}")
+        return valores
+
+
+class TemplateRegistry:
+    """Templates disponíveis, recarregados quando o diretório do template muda"""
+
+    def __init__(self, diretorio: Path = TEMPLATES_DIR):
+        self.diretorio = Path(diretorio)
+        self._cache: Dict[str, Tuple[float, Template]] = {}
+        self._lock = threading.Lock()
+
+    def _versao(self, diretorio: Path) -> float:
+        return max((p.stat().st_mtime for p in diretorio.rglob("*")), default=0.0)
+
+    def get(self, nome: str) -> Template:
+        diretorio = self.diretorio / nome
+        if not diretorio.is_dir() or "/" in nome or nome.startswith("."):
+            raise TemplateError(f"Template '{nome}' não encontrado. Disponíveis: {', '.join(self.listar())}")
+        versao = self._versao(diretorio)
+        with self._lock:
+            em_cache = self._cache.get(nome)
+            if em_cache and em_cache[0] == versao:
+                return em_cache[1]
+            template = Template(diretorio)
+            self._cache[nome] = (versao, template)
+            return template
+
+    def listar(self) -> List[str]:
+        if not self.diretorio.exists():
+            return []
+        return sorted(p.name for p in self.diretorio.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def _caminho_seguro(destino: Path, relativo: str) -> Path:
+    """Impede que um caminho renderizado saia do destino"""
+    partes = PurePosixPath(relativo).parts
+    if not partes or relativo.startswith("/") or ".." in partes:
+        raise TemplateError(f"Caminho inválido no template: {relativo}")
+    return destino.joinpath(*partes)
+
+
+_libc = None
+
+
+def _sincronizar(destino: Path) -> None:
+    """Barreira única de durabilidade: syncfs no sistema de arquivos do destino"""
+    global _libc
+    fd = os.open(destino, os.O_RDONLY)
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(_libc, "syncfs") or _libc.syncfs(fd) != 0:
+            os.sync()
+    except OSError:
+        os.sync()
+    finally:
+        os.close(fd)
+
+
+def gerar(template: Template, destino: str, variaveis: Dict[str, str],
+          sobrescrever: bool = False, max_workers: int = MAX_WORKERS, store=None) -> Dict:
+    """Gera o template em `destino` e devolve o manifesto dos arquivos criados.
+
+    Com um TemplateStore, os arquivos estáticos vêm da versão do template
+    no store (reflink; hardlink se imutáveis e MATERIALIZAR_HARDLINKS=1 fora
+    do root; senão cópia); sem ele, são copiados direto de templates/.
+    """
+    inicio = time.perf_counter()
+    destino = Path(destino)
+    valores = template.valores(variaveis)
+
+    # Renderiza tudo antes de tocar no disco: erro de template não deixa projeto pela metade
+    arquivos = []
+    for caminho, conteudo, modo, imutavel in template.arquivos:
+        relativo = caminho.render(valores)
+        dados = conteudo.render(valores).encode("utf-8") if isinstance(conteudo, _Texto) else conteudo
+        arquivos.append((relativo, _caminho_seguro(destino, relativo), dados, modo, imutavel))
+    diretorios = [d.render(valores) for d in template.diretorios]
+    for relativo in diretorios:
+        _caminho_seguro(destino, relativo)
+
+    if not sobrescrever:
+        conflitos = [relativo for relativo, alvo, _, _, _ in arquivos if alvo.exists()]
+        if conflitos:
+            raise TemplateError(f"Arquivos já existem em {destino}: {', '.join(conflitos[:5])}"
+                                f"{'...' if len(conflitos) > 5 else ''}")
+
+    origem = store.preparar(template) if store is not None else template.raiz
+
+    # Diretórios primeiro (poucos, em série); depois os arquivos em paralelo
+    pastas = {destino} | {alvo.parent for _, alvo, _, _, _ in arquivos} | {destino / d for d in diretorios}
+    for pasta in sorted(pastas, key=lambda p: len(p.parts)):
+        pasta.mkdir(parents=True, exist_ok=True)
+
+    def escrever(item) -> Tuple[str, int]:
+        _, alvo, dados, modo, imutavel = item
+        # Nunca escreve por cima: o arquivo antigo pode ser um hardlink do store
+        if sobrescrever and (alvo.exists() or alvo.is_symlink()):
+            alvo.unlink()
+        if isinstance(dados, str):
+            # Só o que vem do store (somente leitura, versionado) pode virar hardlink
+            forma = materializar_arquivo(origem / dados, alvo, modo, imutavel and store is not None)
+            return forma, alvo.stat().st_size
+        with open(alvo, "wb") as f:
+            f.write(dados)
+        os.chmod(alvo, modo)
+        return "escrito", len(dados)
+
+    if len(arquivos) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(arquivos)), thread_name_prefix="scaffold") as pool:
+            resultados = list(pool.map(escrever, arquivos))
+    else:
+        resultados = [escrever(item) for item in arquivos]
+    _sincronizar(destino)
+
+    manifesto = {
+        "template": template.nome,
+        "versao": template.versao,
+        "destino": str(destino),
+        "arquivos": [{"caminho": relativo, "bytes": tamanho, "forma": forma}
+                     for (relativo, _, _, _, _), (forma, tamanho) in zip(arquivos, resultados)],
+        "diretorios": sorted(diretorios),
+        "segundos": round(time.perf_counter() - inicio, 4)
+    }
+    logger.info(f"Template {template.nome} gerado em {destino}: {len(arquivos)} arquivos em {manifesto['segundos']}s")
+    return manifesto
+
+
+def arvore(manifesto: Dict, limite: int = 20) -> str:
+    """Estrutura criada em formato de árvore (para as respostas dos agentes)"""
+    arquivos = {a["caminho"] for a in manifesto["arquivos"]}
+    diretorios = set(manifesto["diretorios"])
+    for caminho in arquivos | diretorios:
+        partes = caminho.split("/")
+        diretorios.update("/".join(partes[:i]) for i in range(1, len(partes)))
+    caminhos = sorted(diretorios | arquivos)
+    linhas = []
+    for caminho in caminhos[:limite]:
+        partes = caminho.split("/")
+        e_diretorio = caminho in diretorios
+        linhas.append(f"{'  ' * (len(partes) - 1)}- {'/' if e_diretorio else ''}{partes[-1]}")
+    if len(caminhos) > limite:
+        linhas.append(f"  ... e mais {len(caminhos) - limite}")
+    return "\n".join(linhas)
@@ -0,0 +1,372 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    message_id TEXT UNIQUE,
+    chat_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_ts ON messages(chat_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(timestamp);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    chat_id,
+    content='messages',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, content, chat_id)
+    VALUES (new.id, new.content, new.chat_id);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content, chat_id)
+    VALUES ('delete', old.id, old.content, old.chat_id);
+END;
+"""
+
+_INSERIR = """
+INSERT OR IGNORE INTO messages (message_id, chat_id, role, timestamp, content)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+# Filtros aceitos na consulta em texto: chat:ID role:user desde:AAAA-MM-DD ate:AAAA-MM-DD
+_FILTRO = re.compile(r'^(chat|role|desde|ate):(\S+)$')
+_PALAVRA = re.compile(r'\w', re.UNICODE)
+
+
+def parse_consulta(texto: str) -> Tuple[str, Dict[str, str]]:
+    """Separa os termos de busca dos filtros `chave:valor`"""
+    termos, filtros = [], {}
+    for parte in texto.split():
+        encontrado = _FILTRO.match(parte)
+        if encontrado:
+            filtros[encontrado.group(1)] = encontrado.group(2)
+        else:
+            termos.append(parte)
+    return " ".join(termos), filtros
+
+
+def termos_fts(consulta: str) -> List[str]:
+    """Converte texto livre em termos FTS5 seguros.
+
+    Cada trecho separado por espaço vira uma frase entre aspas, então
+    identificadores como ERR_CONN_REFUSED, python-dotenv ou --force
+    casam como sequência exata de tokens; `termo*` vira busca por
+    prefixo. Operadores e aspas do usuário não chegam ao parser do FTS5.
+    """
+    termos = []
+    for termo in consulta.split():
+        prefixo = termo.endswith("*")
+        termo = termo.rstrip("*").replace('"', '')
+        if not _PALAVRA.search(termo):
+            continue
+        termos.append(f'"{termo}"*' if prefixo else f'"{termo}"')
+    return termos
+
+
+def _expressao_fts(consulta: str) -> str:
+    """Expressão com todos os termos (AND implícito), restrita à coluna `content`"""
+    termos = termos_fts(consulta)
+    return f"content: ({' '.join(termos)})" if termos else ""
+
+
+def _filtro_coluna(coluna: str, valor) -> str:
+    valor = str(valor).replace('"', '""')
+    return f'{coluna}: "{valor}"'
+
+
+def _limite_final(data: str) -> str:
+    """Data final inclusiva: AAAA-MM-DD vira o início do dia seguinte"""
+    if len(data) == 10:
+        return (date.fromisoformat(data) + timedelta(days=1)).isoformat()
+    return data
+
+
+class MessageIndex:
+    """Índice de texto completo das conversas (SQLite FTS5 com BM25).
+
+    A tabela `messages` guarda as mensagens e `messages_fts` é um índice
+    external-content sobre ela, mantido por triggers. Inserções são
+    idempotentes pelo `message_id`.
+    """
+
+    def __init__(self, db_path: str = "/root/projetos/chat-ia-terminal/data/search.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: leituras não bloqueiam a escrita de outro processo (bot x terminal)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def add(self, content: str, role: str, chat_id="terminal",
+            timestamp: Optional[str] = None, message_id: Optional[str] = None) -> None:
+        """Indexa uma mensagem"""
+        if not content:
+            return
+        with self._lock:
+            self.conn.execute(_INSERIR, (
+                message_id,
+                str(chat_id),
+                role,
+                timestamp or datetime.now().isoformat(),
+                content
+            ))
+            self.conn.commit()
+
+    def add_many(self, messages: Iterable[Dict], chat_id="terminal") -> int:
+        """Indexa várias mensagens numa única transação; retorna quantas eram novas"""
+        linhas = (
+            (m.get("id"), str(m.get("chat_id", chat_id)), m["role"],
+             m.get("timestamp") or datetime.now().isoformat(), m["content"])
+            for m in messages if m.get("content")
+        )
+        with self._lock:
+            cursor = self.conn.executemany(_INSERIR, linhas)
+            self.conn.commit()
+            return max(cursor.rowcount, 0)
+
+    def count(self, chat_id=None) -> int:
+        with self._lock:
+            if chat_id is None:
+                return self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE chat_id = ?", (str(chat_id),)
+            ).fetchone()[0]
+
+    def search(self, query: str,
+               chat_id=None,
+               role: Optional[str] = None,
+               start_date: Optional[str] = None,
+               end_date: Optional[str] = None,
+               limit: int = 10) -> List[Dict]:
+        """Busca mensagens por relevância (BM25), com filtros opcionais"""
+        expressao = _expressao_fts(query)
+        if not expressao:
+            return []
+
+        condicoes = ["messages_fts MATCH ?"]
+        filtros: List = []
+        if chat_id is not None:
+            # chat_id também é coluna do FTS5: filtrar no MATCH cruza as listas
+            # de postings em vez de buscar em `messages` cada linha do termo.
+            # A comparação exata continua no SQL (o tokenizer ignora o sinal
+            # de chats de grupo, ex. -100123)
+            expressao += " AND " + _filtro_coluna("chat_id", chat_id)
+            condicoes.append("m.chat_id = ?")
+            filtros.append(str(chat_id))
+        if role:
+            # Só dois valores possíveis: filtrar no FTS5 não seleciona nada
+            condicoes.append("m.role = ?")
+            filtros.append(role)
+        parametros: List = [expressao] + filtros
+        if start_date:
+            condicoes.append("m.timestamp >= ?")
+            parametros.append(start_date)
+        if end_date:
+            condicoes.append("m.timestamp < ?")
+            parametros.append(_limite_final(end_date))
+        parametros.append(limit)
+
+        sql = f"""
+            SELECT m.message_id, m.chat_id, m.role, m.timestamp,
+                   snippet(messages_fts, 0, '[', ']', '…', 16) AS trecho,
+                   bm25(messages_fts, 1.0, 0.0) AS score
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY score
+            LIMIT ?
+        """
+
+        inicio = time.perf_counter()
+        with self._lock:
+            linhas = self.conn.execute(sql, parametros).fetchall()
+        logger.debug(f"Busca '{expressao}' retornou {len(linhas)} resultados em "
+                     f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+        return [dict(linha) for linha in linhas]
+
+    def search_text(self, texto: str, chat_id=None, limit: int = 10) -> List[Dict]:
+        """Busca a partir de texto livre com filtros `chat:`, `role:`, `desde:` e `ate:`"""
+        consulta, filtros = parse_consulta(texto)
+        return self.search(
+            consulta,
+            chat_id=filtros.get("chat", chat_id),
+            role=filtros.get("role"),
+            start_date=filtros.get("desde"),
+            end_date=filtros.get("ate"),
+            limit=limit
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_SCHEMA_DOCUMENTOS = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    doc_id TEXT UNIQUE NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    content,
+    content='documents',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+    INSERT INTO documents_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE OF content ON documents BEGIN
+    INSERT INTO documents_fts(documents_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO documents_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+_OPERADORES = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+_CHAVE_METADADO = re.compile(r'^[\w.\-]+$')
+
+
+def _sql_where(where: Dict, parametros: List) -> str:
+    """Traduz um filtro no formato `where` do Chroma para SQL sobre o JSON de metadados.
+
+    Suporta igualdade direta, $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin,
+    $and e $or.
+    """
+    partes = []
+    for chave, valor in where.items():
+        if chave in ("$and", "$or"):
+            juncao = " AND " if chave == "$and" else " OR "
+            partes.append("(" + juncao.join(_sql_where(w, parametros) for w in valor) + ")")
+            continue
+
+        if not _CHAVE_METADADO.match(chave):
+            raise ValueError(f"Chave de metadado inválida: {chave}")
+        coluna = f"json_extract(d.metadata, '$.\"{chave}\"')"
+
+        condicoes = valor if isinstance(valor, dict) else {"$eq": valor}
+        for operador, operando in condicoes.items():
+            if operador in ("$in", "$nin"):
+                marcadores = ", ".join("?" * len(operando))
+                negacao = "NOT " if operador == "$nin" else ""
+                partes.append(f"{coluna} {negacao}IN ({marcadores})")
+                parametros.extend(operando)
+            elif operador in _OPERADORES:
+                partes.append(f"{coluna} {_OPERADORES[operador]} ?")
+                parametros.append(operando)
+            else:
+                raise ValueError(f"Operador não suportado: {operador}")
+    return " AND ".join(partes) if partes else "1"
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Funde rankings somando 1 / (k + posição) de cada lista (RRF)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for posicao, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + posicao)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class DocumentIndex:
+    """Índice lexical (FTS5 com BM25) de documentos com metadados.
+
+    Complementa a busca vetorial: termos exatos como códigos de erro,
+    nomes de pacotes e flags casam aqui mesmo quando o embedding não
+    os aproxima.
+    """
+
+    def __init__(self, db_path: str = "/root/projetos/chat-ia-terminal/data/knowledge_fts.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA_DOCUMENTOS)
+        self.conn.commit()
+
+    def upsert_many(self, documents: Iterable[Tuple[str, str, Optional[Dict]]]) -> None:
+        """Insere ou atualiza (doc_id, texto, metadados) numa única transação"""
+        linhas = (
+            (doc_id, content, json.dumps(metadata or {}, ensure_ascii=False))
+            for doc_id, content, metadata in documents
+        )
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO documents (doc_id, content, metadata) VALUES (?, ?, ?)
+                ON CONFLICT(doc_id) DO UPDATE SET content = excluded.content, metadata = excluded.metadata
+            """, linhas)
+            self.conn.commit()
+
+    def upsert(self, doc_id: str, content: str, metadata: Optional[Dict] = None) -> None:
+        self.upsert_many([(doc_id, content, metadata)])
+
+    def delete(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            self.conn.executemany("DELETE FROM documents WHERE doc_id = ?", ((i,) for i in doc_ids))
+            self.conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, n_results: int = 10, where: Optional[Dict] = None) -> List[Dict]:
+        """Busca por relevância BM25; qualquer termo pode casar (OR)"""
+        termos = termos_fts(query)
+        if not termos:
+            return []
+
+        parametros: List = [" OR ".join(termos)]
+        filtro = _sql_where(where, parametros) if where else "1"
+        parametros.append(n_results)
+
+        with self._lock:
+            linhas = self.conn.execute(f"""
+                SELECT d.doc_id, d.content, d.metadata, bm25(documents_fts) AS score
+                FROM documents_fts
+                JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND {filtro}
+                ORDER BY score
+                LIMIT ?
+            """, parametros).fetchall()
+
+        return [{
+            "id": linha["doc_id"],
+            "text": linha["content"],
+            "metadata": json.loads(linha["metadata"]),
+            "score": linha["score"]
+        } for linha in linhas]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
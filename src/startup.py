@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional
+from pathlib import Path
+import argparse
+import os
+import subprocess
+import sys
+
+# Módulo importado por cada ponto de entrada (o script chat-ia, run_telegram.py e main.py
+# importam o telegram_bot; `python -m src` abre o assistente do terminal ou um subcomando)
+ENTRADAS = {
+    "telegram": "src.telegram_bot",
+    "terminal": "src.assistant",
+    "cli": "src.__main__",
+    # O grosso do bot: agentes, memória, embeddings e base de conhecimento
+    "orquestrador": "src.agents.orquestrador_agent",
+}
+# Tempo máximo de importação de cada entrada, sem contar a partida do interpretador
+ORCAMENTO_PADRAO = float(os.getenv("STARTUP_ORCAMENTO", "1.0"))
+# Dependências que só devem carregar no primeiro uso (ou no aquecimento), nunca na partida
+PESADOS = ("chromadb", "onnxruntime", "numpy", "tokenizers", "torch", "sentence_transformers",
+           "openai", "groq", "playwright", "bs4", "requests")
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def medir(modulo: str, repeticoes: int = 3) -> Dict:
+    """Importa `modulo` num interpretador novo com -X importtime.
+
+    Devolve o menor tempo de parede entre as repetições (a primeira costuma
+    pagar o cache de disco frio) e a árvore de importações dessa execução.
+    """
+    codigo = ("import time\n"
+              "inicio = time.perf_counter()\n"
+              f"import {modulo}\n"
+              "print(time.perf_counter() - inicio)\n")
+    melhor = None
+    for _ in range(repeticoes):
+        resultado = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                                   cwd=RAIZ, capture_output=True, text=True)
+        if resultado.returncode != 0:
+            ultima = resultado.stderr.strip().splitlines()[-1] if resultado.stderr.strip() else "sem saída"
+            return {"modulo": modulo, "erro": ultima, "segundos": None, "importacoes": []}
+        segundos = float(resultado.stdout.strip().splitlines()[-1])
+        if melhor is None or segundos < melhor["segundos"]:
+            melhor = {"modulo": modulo, "erro": None, "segundos": segundos,
+                      "importacoes": parse_importtime(resultado.stderr)}
+    return melhor
+
+
+def parse_importtime(saida: str) -> List[Dict]:
+    """Linhas do -X importtime: tempo próprio e acumulado (µs) e profundidade de cada módulo"""
+    importacoes = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|", 2)
+        importacoes.append({
+            "nome": nome.strip(),
+            "proprio_us": int(proprio),
+            "acumulado_us": int(acumulado),
+            "nivel": (len(nome) - len(nome.lstrip()) - 1) // 2
+        })
+    return importacoes
+
+
+def por_pacote(importacoes: List[Dict]) -> Dict[str, int]:
+    """Tempo próprio somado por pacote de topo (src, telegram, prompt_toolkit...)"""
+    total: Dict[str, int] = {}
+    for item in importacoes:
+        pacote = item["nome"].split(".", 1)[0]
+        total[pacote] = total.get(pacote, 0) + item["proprio_us"]
+    return total
+
+
+def pesados_carregados(importacoes: List[Dict]) -> List[str]:
+    carregados = {item["nome"].split(".", 1)[0] for item in importacoes}
+    return [nome for nome in PESADOS if nome in carregados]
+
+
+def relatorio(medicao: Dict, orcamento: float, top: int = 10) -> str:
+    if medicao["erro"]:
+        return f"{medicao['modulo']}: não importa neste ambiente ({medicao['erro']})"
+    situacao = "✅" if medicao["segundos"] <= orcamento else "❌ acima do orçamento"
+    linhas = [f"{medicao['modulo']}: {medicao['segundos'] * 1000:.0f} ms "
+              f"(orçamento {orcamento * 1000:.0f} ms) {situacao}"]
+    pesados = pesados_carregados(medicao["importacoes"])
+    if pesados:
+        linhas.append(f"  ⚠️ carregados na partida: {', '.join(pesados)}")
+    linhas.append("  por pacote (tempo próprio):")
+    pacotes = sorted(por_pacote(medicao["importacoes"]).items(), key=lambda item: -item[1])
+    for pacote, us in pacotes[:top]:
+        linhas.append(f"    {us / 1000:8.1f} ms  {pacote}")
+    linhas.append("  módulos mais lentos (acumulado, só os importados diretamente por outro pacote):")
+    raizes = [item for item in medicao["importacoes"] if item["nivel"] <= 1]
+    for item in sorted(raizes, key=lambda item: -item["acumulado_us"])[:top]:
+        linhas.append(f"    {item['acumulado_us'] / 1000:8.1f} ms  {item['nome']}")
+    return "\n".join(linhas)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="chat-ia startup",
+                                     description="Tempo de importação de cada ponto de entrada (-X importtime)")
+    parser.add_argument("entradas", nargs="*",
+                        help=f"Entradas a medir: {', '.join(ENTRADAS)} (padrão: todas)")
+    parser.add_argument("--orcamento", type=float, default=ORCAMENTO_PADRAO, help="Segundos por entrada")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    desconhecidas = [entrada for entrada in args.entradas if entrada not in ENTRADAS]
+    if desconhecidas:
+        parser.error(f"entrada desconhecida: {', '.join(desconhecidas)}")
+
+    estourou = False
+    for entrada in args.entradas or list(ENTRADAS):
+        medicao = medir(ENTRADAS[entrada], args.repeticoes)
+        print(f"[{entrada}] {relatorio(medicao, args.orcamento, args.top)}\n")
+        estourou |= medicao["segundos"] is not None and medicao["segundos"] > args.orcamento
+    if estourou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from typing import Dict, Any
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters, ContextTypes
+from typing import Dict, Any, List, Optional
+import asyncio
+import itertools
 import logging
 import traceback
 
 from .agents.orquestrador_agent import OrquestradorAgent
+from .executor import INTERVALO, formatar
+from .search import parse_consulta
+from .metrics import FILA, TELEGRAM_RECEBIDAS, TELEGRAM_ERROS_ENVIO, iniciar_servidor_metricas
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +21,38 @@ class TelegramInterface:
         self.app = Application.builder().token(token).build()
         self.orquestrador = OrquestradorAgent(groq_api_key)
         
-        # Registra os handlers
+        # Comandos sugeridos por chat e por teclado (o callback_data só leva geração e índice: limite de 64 bytes)
+        self._sugestoes: Dict[int, Dict[int, List[str]]] = {}
+        self._geracao = itertools.count(1)
+        
+        # Registra os handlers (/cd, /touch, /projeto... vão para o orquestrador)
         self.app.add_handler(CommandHandler("start", self._start))
-        self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self._message))
+        self.app.add_handler(CommandHandler("buscar", self._buscar))
+        self.app.add_handler(CallbackQueryHandler(self._sugestao, pattern=r"^s:\d+:\d+$"))
+        self.app.add_handler(MessageHandler(filters.TEXT, self._message))
+        
+        # Profundidade da fila de updates, lida a cada coleta de métricas
+        FILA.set_funcao(self.app.update_queue.qsize, fila="telegram_updates")
         
         logger.info("TelegramInterface iniciado com sucesso")
     
     def start(self):
         """Inicia o bot"""
         logger.info("Iniciando aplicação do Telegram...")
+        iniciar_servidor_metricas()
+        # SDK do LLM, ChromaDB e modelo carregam em background enquanto o polling começa
+        self.orquestrador.aquecer()
         logger.info("Handlers registrados, iniciando polling...")
         self.app.run_polling()
     
+    async def _responder(self, update: Update, texto: str, **kwargs):
+        """Envia uma resposta, contabilizando falhas de envio"""
+        try:
+            return await update.effective_message.reply_text(texto, **kwargs)
+        except Exception:
+            TELEGRAM_ERROS_ENVIO.inc()
+            raise
+    
     async def _start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Responde ao comando /start"""
         if not update.message:
@@ -35,21 +61,55 @@ class TelegramInterface:
         chat_id = update.message.chat_id
         logger.info(f"Inicializando novo chat {chat_id}")
         
-        await update.message.reply_text(
-            "Oi, sou o Nexus. O que precisa?"
-        )
+        await self._responder(update, "Oi, sou o Nexus. O que precisa?")
     
-    async def _message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Processa mensagens de texto"""
-        if not update.message or not update.message.text:
+    async def _buscar(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Busca no histórico do próprio chat: /buscar <termos> [role:user] [desde:AAAA-MM-DD]"""
+        if not update.message:
             return
         
         chat_id = update.message.chat_id
-        mensagem = update.message.text
+        consulta, filtros = parse_consulta(" ".join(context.args or []))
+        if not consulta:
+            await self._responder(update, "Uso: /buscar <termos> [role:user|assistant] [desde:AAAA-MM-DD] [ate:AAAA-MM-DD]")
+            return
         
-        # Log da mensagem recebida
-        logger.info(f"Mensagem recebida do chat {chat_id}: {mensagem}")
+        # O filtro de chat é sempre o chat atual
+        try:
+            resultados = self.orquestrador.memory.search_index.search(
+                consulta,
+                chat_id=chat_id,
+                role=filtros.get("role"),
+                start_date=filtros.get("desde"),
+                end_date=filtros.get("ate"),
+                limit=10
+            )
+        except ValueError:
+            await self._responder(update, "Data inválida. Use o formato AAAA-MM-DD.")
+            return
+        if not resultados:
+            await self._responder(update, "Nenhuma mensagem encontrada.")
+            return
         
+        linhas = [f"{r['timestamp'][:16].replace('T', ' ')} ({r['role']}): {r['trecho']}" for r in resultados]
+        await self._responder(update, "\n\n".join(linhas))
+    
+    def _teclado(self, chat_id: int, sugestoes: Optional[List[Dict]]) -> Optional[InlineKeyboardMarkup]:
+        """Teclado inline com os caminhos sugeridos (um botão por linha)"""
+        if not sugestoes:
+            return None
+        sugestoes = sugestoes[:8]
+        geracao = next(self._geracao)
+        teclados = self._sugestoes.setdefault(chat_id, {})
+        teclados[geracao] = [s["comando"] for s in sugestoes]
+        # Só os teclados mais recentes continuam valendo
+        for antiga in sorted(teclados)[:-20]:
+            del teclados[antiga]
+        return InlineKeyboardMarkup([[InlineKeyboardButton(s["texto"], callback_data=f"s:{geracao}:{i}")]
+                                     for i, s in enumerate(sugestoes)])
+    
+    async def _processar(self, update: Update, context: ContextTypes.DEFAULT_TYPE, chat_id: int, mensagem: str):
+        """Passa a mensagem ao orquestrador e envia a resposta (com sugestões, se houver)"""
         try:
             # Indica que está digitando
             await context.bot.send_chat_action(chat_id=chat_id, action="typing")
@@ -61,23 +121,82 @@ class TelegramInterface:
             logger.info(f"Resultado do processamento: {resultado}")
             
             # Envia a resposta
-            if resultado.get("tipo") == "erro":
-                await update.message.reply_text(resultado["mensagem"])
+            execucao = resultado.get("execucao")
+            if execucao is not None:
+                enviada = await self._responder(update, formatar(execucao), reply_markup=self._teclado_execucao(chat_id, execucao))
+                # A saída é transmitida fora do handler: outros chats (e este) continuam sendo atendidos
+                context.application.create_task(self._transmitir(chat_id, enviada, execucao))
                 return
             
-            if resultado.get("tipo") in ["comando_arquivo", "comando_diretorio"]:
-                if resultado.get("sucesso"):
-                    await update.message.reply_text("Operação realizada com sucesso.")
-                else:
-                    await update.message.reply_text(resultado["mensagem"])
-            
-            else:  # conversa normal
-                if resultado.get("sucesso"):
-                    await update.message.reply_text(resultado["resposta"])
-                else:
-                    await update.message.reply_text("Erro: " + resultado.get("resposta", "Erro desconhecido"))
+            texto = resultado.get("resposta") or resultado.get("mensagem") or "Operação realizada com sucesso."
+            await self._responder(update, texto, reply_markup=self._teclado(chat_id, resultado.get("sugestoes")))
             
         except Exception as e:
             logger.error(f"Erro ao processar mensagem: {e}")
             logger.error("Traceback completo:", exc_info=True)
-            await update.message.reply_text("Erro: Ocorreu um erro ao processar sua mensagem. Detalhes: " + str(e))
+            await self._responder(update, "Erro: Ocorreu um erro ao processar sua mensagem. Detalhes: " + str(e))
+    
+    def _teclado_execucao(self, chat_id: int, execucao) -> Optional[InlineKeyboardMarkup]:
+        if execucao.terminou:
+            return None
+        return self._teclado(chat_id, [{"texto": "⏹ Cancelar", "comando": f"/cancelar {execucao.id}"}])
+    
+    async def _transmitir(self, chat_id: int, mensagem, execucao):
+        """Edita a mensagem com a saída do comando, no máximo uma edição por INTERVALO"""
+        anterior = formatar(execucao)
+        teclado = self._teclado_execucao(chat_id, execucao)
+        async for atual in execucao.acompanhar(INTERVALO):
+            texto = formatar(atual)
+            if texto == anterior:
+                continue
+            try:
+                await mensagem.edit_text(texto, reply_markup=None if atual.terminou else teclado)
+                anterior = texto
+            except RetryAfter as e:
+                # Limite de edições do Telegram: espera e a próxima edição leva a saída acumulada
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                logger.warning(f"Falha ao editar a saída da execução {execucao.id}: {e}")
+            except Exception:
+                TELEGRAM_ERROS_ENVIO.inc()
+                logger.error(f"Erro ao transmitir a execução {execucao.id}", exc_info=True)
+        if formatar(execucao) != anterior:
+            # A última edição pode ter caído no RetryAfter
+            try:
+                await mensagem.edit_text(formatar(execucao), reply_markup=None)
+            except Exception as e:
+                logger.warning(f"Falha ao editar a saída final da execução {execucao.id}: {e}")
+    
+    async def _message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Processa mensagens de texto e comandos"""
+        if not update.message or not update.message.text:
+            return
+        
+        chat_id = update.message.chat_id
+        mensagem = update.message.text
+        
+        # Log da mensagem recebida
+        logger.info(f"Mensagem recebida do chat {chat_id}: {mensagem}")
+        TELEGRAM_RECEBIDAS.inc()
+        
+        await self._processar(update, context, chat_id, mensagem)
+    
+    async def _sugestao(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Botão de sugestão: executa o comando guardado como se o usuário o tivesse digitado"""
+        query = update.callback_query
+        chat_id = query.message.chat_id
+        _, geracao, indice = query.data.split(":")
+        comandos = self._sugestoes.get(chat_id, {}).get(int(geracao), [])
+        indice = int(indice)
+        if indice >= len(comandos):
+            await query.answer("Sugestão expirada, envie o comando de novo.")
+            return
+        
+        await query.answer()
+        # Tira o teclado da mensagem anterior para não executar a mesma sugestão duas vezes
+        await query.edit_message_reply_markup(reply_markup=None)
+        comando = comandos[indice]
+        self._sugestoes[chat_id].pop(int(geracao), None)
+        logger.info(f"Sugestão escolhida no chat {chat_id}: {comando}")
+        TELEGRAM_RECEBIDAS.inc()
+        await self._processar(update, context, chat_id, comando)
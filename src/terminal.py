@@ -1,17 +1,54 @@
 from typing import Optional, Dict, Any
 from prompt_toolkit import PromptSession
 from prompt_toolkit.history import FileHistory
-from prompt_toolkit.completion import WordCompleter
+from prompt_toolkit.completion import Completer, Completion, WordCompleter
 from prompt_toolkit.styles import Style
 from pathlib import Path
 import json
+import os
 import asyncio
 from datetime import datetime
 
+from .search import MessageIndex
+from .path_index import get_path_index
+from .executor import Executor
+
+
+class CaminhoCompleter(Completer):
+    """Completa o primeiro termo com os comandos e os argumentos de cd/touch com o índice de caminhos"""
+    
+    def __init__(self, palavras: WordCompleter, terminal: "TerminalInterface"):
+        self.palavras = palavras
+        self.terminal = terminal
+    
+    def get_completions(self, document, complete_event):
+        texto = document.text_before_cursor
+        comando, espaco, argumento = texto.partition(" ")
+        if not espaco or comando not in ("cd", "touch"):
+            yield from self.palavras.get_completions(document, complete_event)
+            return
+        
+        parcial = argumento.rsplit(" ", 1)[-1]
+        indice = self.terminal.path_index
+        base = self.terminal.diretorio_atual
+        candidatos = indice.completar(parcial, base, limite=30, so_diretorios=comando == "cd")
+        if not candidatos and "/" not in parcial and len(parcial) >= 2:
+            # Sem prefixo que case: busca aproximada no workspace (caminhos absolutos)
+            candidatos = [os.path.join(str(indice.raiz), c)
+                          for c in indice.buscar(parcial, limite=15, so_diretorios=comando == "cd")]
+        for candidato in candidatos:
+            yield Completion(candidato, start_position=-len(parcial))
+
 class TerminalInterface:
     def __init__(self, data_dir: str = "/root/projetos/chat-ia-terminal/data"):
         self.data_dir = Path(data_dir)
         self.history_file = self.data_dir / "terminal_history"
+        self.search_index = MessageIndex(self.data_dir / "search.db")
+        
+        # Navegação no workspace (cd/touch com autocompletar pelo índice em memória) e execução de comandos
+        self.path_index = get_path_index()
+        self.diretorio_atual = str(self.path_index.raiz)
+        self.executor = Executor()
         
         # Configura o prompt
         self.session = PromptSession(
@@ -37,14 +74,20 @@ class TerminalInterface:
             "config": self.manage_config,
             "logs": self.view_logs,
             "backup": self.manage_backup,
-            "knowledge": self.manage_knowledge
+            "knowledge": self.manage_knowledge,
+            "search": self.search_history,
+            "cd": self.change_directory,
+            "touch": self.touch_files,
+            "run": self.run_command
         }
         
         # Auto-completar
         self.completer = WordCompleter(
             list(self.commands.keys()) + 
-            ["groq", "deepseek", "show", "set", "reset", "list", "search", "add"]
+            ["groq", "deepseek", "show", "set", "reset", "list", "search", "add", "ingest",
+             "create", "restore", "verify", "prune"]
         )
+        self.completer = CaminhoCompleter(self.completer, self)
     
     async def show_help(self, args: Optional[str] = None):
         """Mostra ajuda sobre comandos disponíveis"""
@@ -58,8 +101,16 @@ class TerminalInterface:
         provider [nome]         - Muda ou mostra o provedor atual
         config [show|set|reset] - Gerencia configurações
         logs [filtros]          - Visualiza logs do sistema
-        backup [create|restore] - Gerencia backups
+        backup [create|list|restore|verify|prune]
+                                - Gerencia backups incrementais de data/ e config/
+                                  (backup restore <id> [destino])
         knowledge [comandos]    - Gerencia base de conhecimento
+                                  (knowledge ingest <diretório> ingere documentos)
+        search <termos>         - Busca no histórico de conversas
+                                  (filtros: chat:ID role:user desde:AAAA-MM-DD ate:AAAA-MM-DD)
+        cd [caminho]            - Muda o diretório atual no workspace (Tab completa)
+        touch <arquivo...>      - Cria arquivos no diretório atual (Tab completa)
+        run <comando>           - Executa um comando no diretório atual (Ctrl+C cancela)
         """
         print(help_text)
     
@@ -94,13 +145,135 @@ class TerminalInterface:
     
     async def manage_backup(self, args: Optional[str] = None):
         """Gerencia backups do sistema"""
-        # Implementar lógica de backup
-        pass
+        from .backup import BackupStore
+        store = BackupStore(padrao=str(self.data_dir.parent / "backups"))
+        parts = args.split() if args else []
+        acao = parts[0] if parts else "list"
+        
+        # As operações leem e gravam arquivos grandes, rodam fora do loop
+        if acao == "create":
+            raizes = {"data": str(self.data_dir)}
+            config_dir = self.data_dir.parent / "config"
+            if config_dir.exists():
+                raizes["config"] = str(config_dir)
+            resumo = await asyncio.to_thread(store.criar, raizes, parts[1] if len(parts) > 1 else "manual")
+            print(f"✅ Backup {resumo['id']}: {resumo['total_arquivos']} arquivos "
+                  f"({resumo['total_bytes'] / 1024 / 1024:.1f} MB), {resumo['arquivos_lidos']} lidos, "
+                  f"{resumo['bytes_novos'] / 1024:.0f} KB novos em {resumo['segundos']}s")
+        elif acao == "list":
+            backups = store.listar()
+            if not backups:
+                print("Nenhum backup encontrado.")
+                return
+            for resumo in backups:
+                print(f"{resumo['id']}  {resumo['rotulo']:<8} {resumo['total_arquivos']:>6} arquivos  "
+                      f"{resumo['total_bytes'] / 1024 / 1024:8.1f} MB  +{resumo['bytes_novos'] / 1024:.0f} KB")
+        elif acao == "restore" and len(parts) >= 2:
+            # Nunca sobrescreve data/ em uso: restaura num diretório separado
+            destino = parts[2] if len(parts) > 2 else str(self.data_dir.parent / f"restore_{parts[1]}")
+            resultado = await asyncio.to_thread(store.restaurar, parts[1], destino)
+            print(f"✅ {resultado['arquivos']} arquivos restaurados em {resultado['destino']}")
+        elif acao == "verify":
+            resultado = await asyncio.to_thread(store.verificar, parts[1] if len(parts) > 1 else None)
+            print(f"{resultado['backups']} backups, {resultado['pedacos']} pedaços verificados")
+            for problema in resultado["problemas"]:
+                print(f"  ❌ {problema}")
+        elif acao == "prune":
+            resultado = await asyncio.to_thread(store.podar)
+            print(f"{len(resultado['backups_removidos'])} backups e {resultado['pedacos_removidos']} pedaços removidos "
+                  f"({resultado['bytes_liberados'] / 1024 / 1024:.1f} MB liberados)")
+        else:
+            print("Uso: backup [create [rótulo]|list|restore <id> [destino]|verify [id]|prune]")
     
     async def manage_knowledge(self, args: Optional[str] = None):
         """Gerencia base de conhecimento"""
-        # Implementar lógica de conhecimento
-        pass
+        parts = args.split(maxsplit=1) if args else []
+        if len(parts) == 2 and parts[0] == "ingest":
+            from .knowledge import KnowledgeBase
+            kb = KnowledgeBase(str(self.data_dir))
+            # A ingestão é bloqueante (pool de processos), roda fora do loop
+            resumo = await asyncio.to_thread(kb.ingest_directory, parts[1].strip())
+            print(f"{resumo['arquivos']} arquivos, {resumo['trechos']} trechos novos, "
+                  f"{resumo['duplicados']} duplicados ({resumo['trechos_por_segundo']} trechos/s)")
+            return
+        
+        print("Uso: knowledge ingest <diretório>")
+    
+    async def search_history(self, args: Optional[str] = None):
+        """Busca no histórico de conversas"""
+        if not args:
+            print("Uso: search <termos> [chat:ID] [role:user|assistant] [desde:AAAA-MM-DD] [ate:AAAA-MM-DD]")
+            return
+        
+        results = self.search_index.search_text(args, limit=20)
+        if not results:
+            print("Nenhuma mensagem encontrada.")
+            return
+        
+        for result in results:
+            timestamp = datetime.fromisoformat(result["timestamp"]).strftime("%d/%m/%Y %H:%M")
+            print(f"[{timestamp}] chat {result['chat_id']} | {result['role']}")
+            print(f"  {result['trecho']}")
+        print(f"\n{len(results)} resultado(s)")
+    
+    async def change_directory(self, args: Optional[str] = None):
+        """Muda o diretório atual; sem argumento volta para a raiz do workspace"""
+        if not args:
+            self.diretorio_atual = str(self.path_index.raiz)
+        else:
+            alvo = os.path.normpath(os.path.join(self.diretorio_atual, os.path.expanduser(args.strip())))
+            if not (self.path_index.e_diretorio(alvo) or os.path.isdir(alvo)):
+                print(f"Diretório não encontrado: {alvo}")
+                for sugestao in self.path_index.buscar(args.strip(), limite=5, so_diretorios=True):
+                    print(f"  {os.path.join(str(self.path_index.raiz), sugestao)}")
+                return
+            self.diretorio_atual = alvo
+        print(self.diretorio_atual)
+    
+    async def touch_files(self, args: Optional[str] = None):
+        """Cria arquivos (relativos ao diretório atual)"""
+        if not args:
+            print("Uso: touch <arquivo...>")
+            return
+        from .fileops import executar_lote
+        operacoes = [{"op": "criar_arquivo", "caminho": nome} for nome in args.split()]
+        lote = await asyncio.to_thread(executar_lote, operacoes, self.diretorio_atual)
+        for resultado in lote["resultados"]:
+            print(f"{'✅' if resultado['ok'] else '❌'} {resultado['caminho']}"
+                  + (f": {resultado['erro']}" if not resultado["ok"] else ""))
+    
+    async def run_command(self, args: Optional[str] = None):
+        """Executa um comando no diretório atual mostrando a saída conforme ela chega"""
+        if not args:
+            print("Uso: run <comando>")
+            return
+        try:
+            execucao = self.executor.iniciar(args, self.diretorio_atual)
+        except (ValueError, OSError) as e:
+            print(f"Não foi possível executar: {e}")
+            return
+        
+        mostrado = 0
+        try:
+            async for atual in execucao.acompanhar(0.05):
+                print(atual.saida(mostrado), end="", flush=True)
+                mostrado = atual.total
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl+C cancela o comando, não o terminal
+            self.executor.cancelar(execucao.id)
+            await execucao.aguardar()
+            tarefa = asyncio.current_task()
+            if tarefa is not None and tarefa.cancelling():
+                tarefa.uncancel()
+        
+        if execucao.estado == "concluido":
+            print(f"\n[concluído em {execucao.segundos:.1f}s]")
+        elif execucao.estado == "erro":
+            print(f"\n[código {execucao.codigo} em {execucao.segundos:.1f}s]")
+        elif execucao.estado == "cancelado":
+            print(f"\n[cancelado após {execucao.segundos:.1f}s]")
+        else:
+            print(f"\n[tempo esgotado: {execucao.limite_segundos:.0f}s]")
     
     async def process_command(self, command: str) -> bool:
         """Processa um comando do usuário"""
@@ -132,7 +305,7 @@ class TerminalInterface:
             try:
                 # Obtém comando do usuário
                 command = await self.session.prompt_async(
-                    ">>> ",
+                    f"{os.path.relpath(self.diretorio_atual, self.path_index.raiz)} >>> ",
                     style=self.style,
                     completer=self.completer
                 )
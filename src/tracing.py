@@ -0,0 +1,252 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Âncora entre o relógio monotônico e o relógio de parede. As durações são
+# sempre medidas com perf_counter_ns; o horário absoluto só é derivado na
+# exportação, então ajustes de NTP não distorcem os spans.
+_ANCORA_UNIX_NS = time.time_ns()
+_ANCORA_PERF_NS = time.perf_counter_ns()
+
+# Códigos de status do OTLP
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+def agora_ns() -> int:
+    """Retorna o relógio monotônico de alta resolução em nanossegundos"""
+    return time.perf_counter_ns()
+
+
+def para_unix_ns(perf_ns: int) -> int:
+    """Converte um instante monotônico para nanossegundos desde a epoch"""
+    return _ANCORA_UNIX_NS + (perf_ns - _ANCORA_PERF_NS)
+
+
+# traceId válido no OTLP: 16 bytes em hexadecimal, não todos zero
+_TRACE_ID_RE = re.compile(r"(?!0{32})[0-9a-f]{32}")
+
+
+def trace_id_de(request_id: str) -> str:
+    """Trace id OTLP de um request id: ele mesmo se já for válido, senão os
+    primeiros 16 bytes do seu SHA-256 (o request id original fica como atributo)"""
+    if _TRACE_ID_RE.fullmatch(request_id.lower()):
+        return request_id.lower()
+    return hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+
+
+def novo_span_id() -> str:
+    """Gera um span id de 8 bytes em hexadecimal"""
+    return os.urandom(8).hex()
+
+
+class Span:
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "nome",
+        "inicio_ns", "fim_ns", "status", "atributos"
+    )
+
+    def __init__(self, trace_id: str, nome: str, parent_id: Optional[str] = None,
+                 atributos: Optional[Dict] = None):
+        self.trace_id = trace_id
+        self.span_id = novo_span_id()
+        self.parent_id = parent_id
+        self.nome = nome
+        self.inicio_ns = agora_ns()
+        self.fim_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.atributos = atributos or {}
+
+    @property
+    def finalizado(self) -> bool:
+        return self.fim_ns is not None
+
+    def finalizar(self, status: int = STATUS_OK) -> None:
+        """Fecha o span, se ainda estiver aberto"""
+        if self.fim_ns is None:
+            self.fim_ns = agora_ns()
+            self.status = status
+
+    def duracao_ms(self) -> Optional[float]:
+        """Duração do span em milissegundos (None se ainda aberto)"""
+        if self.fim_ns is None:
+            return None
+        return (self.fim_ns - self.inicio_ns) / 1_000_000
+
+    def inicio_datetime(self) -> datetime:
+        """Horário de início do span no relógio de parede"""
+        return datetime.fromtimestamp(para_unix_ns(self.inicio_ns) / 1e9)
+
+    def to_otlp(self) -> Dict:
+        """Converte o span para o formato JSON do OTLP"""
+        fim_ns = self.fim_ns if self.fim_ns is not None else self.inicio_ns
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.nome,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(para_unix_ns(self.inicio_ns)),
+            "endTimeUnixNano": str(para_unix_ns(fim_ns)),
+            "attributes": [_atributo_otlp(k, v) for k, v in self.atributos.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _atributo_otlp(chave: str, valor) -> Dict:
+    """Converte um atributo para o formato KeyValue do OTLP"""
+    if isinstance(valor, bool):
+        return {"key": chave, "value": {"boolValue": valor}}
+    if isinstance(valor, int):
+        return {"key": chave, "value": {"intValue": str(valor)}}
+    if isinstance(valor, float):
+        return {"key": chave, "value": {"doubleValue": valor}}
+    return {"key": chave, "value": {"stringValue": str(valor)}}
+
+
+def _valor_atributo(valor: Dict):
+    """Extrai o valor de um AnyValue do OTLP"""
+    if "stringValue" in valor:
+        return valor["stringValue"]
+    if "intValue" in valor:
+        return int(valor["intValue"])
+    if "doubleValue" in valor:
+        return valor["doubleValue"]
+    if "boolValue" in valor:
+        return valor["boolValue"]
+    return None
+
+
+class ExportadorOTLPArquivo:
+    """Grava spans em arquivos JSON Lines compatíveis com OTLP/JSON.
+
+    Cada linha é um ExportTraceServiceRequest completo com os spans de uma
+    requisição, então os arquivos podem ser reenviados a um coletor
+    OpenTelemetry ou agregados localmente sem nenhum serviço externo.
+    """
+
+    def __init__(self,
+                 traces_dir: str = "/root/projetos/chat-ia-terminal/data/traces",
+                 servico: str = "nexusia-bot"):
+        self.traces_dir = Path(traces_dir)
+        self.traces_dir.mkdir(parents=True, exist_ok=True)
+        self.servico = servico
+
+    def _arquivo_do_dia(self) -> Path:
+        return self.traces_dir / f"{datetime.now().strftime('%Y%m%d')}_spans.jsonl"
+
+    def exportar(self, spans: List[Span]) -> None:
+        """Grava um lote de spans (normalmente um trace completo)"""
+        if not spans:
+            return
+
+        requisicao = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [_atributo_otlp("service.name", self.servico)]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "nexusia.streaming"},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+
+        with open(self._arquivo_do_dia(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(requisicao, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+
+def carregar_spans(arquivos: Iterable[Path]) -> Iterator[Dict]:
+    """Lê spans exportados e retorna nome, duração e atributos de cada um"""
+    for arquivo in arquivos:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    requisicao = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+
+                for resource in requisicao.get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        for span in scope.get("spans", []):
+                            inicio = int(span["startTimeUnixNano"])
+                            fim = int(span["endTimeUnixNano"])
+                            yield {
+                                "nome": span["name"],
+                                "trace_id": span["traceId"],
+                                "duracao_ms": (fim - inicio) / 1_000_000,
+                                "status": span.get("status", {}).get("code", STATUS_UNSET),
+                                "atributos": {
+                                    a["key"]: _valor_atributo(a["value"])
+                                    for a in span.get("attributes", [])
+                                }
+                            }
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def calcular_percentis(arquivos: Iterable[Path],
+                       percentis: Iterable[float] = (50, 99),
+                       chave: str = "agente") -> Dict[str, Dict[str, float]]:
+    """Agrega as durações dos spans por etapa e calcula os percentis.
+
+    As etapas são agrupadas pelo atributo `chave` combinado à ação, o que
+    agrupa a mesma etapa de agente ao longo de dias de tráfego.
+    """
+    duracoes: Dict[str, List[float]] = {}
+    for span in carregar_spans(arquivos):
+        atributos = span["atributos"]
+        etapa = f"{atributos.get(chave, '?')}: {atributos.get('acao', span['nome'])}"
+        duracoes.setdefault(etapa, []).append(span["duracao_ms"])
+
+    resultado = {}
+    for etapa, valores in duracoes.items():
+        valores.sort()
+        resultado[etapa] = {"n": len(valores)}
+        for p in percentis:
+            resultado[etapa][f"p{p:g}"] = _percentil(valores, p)
+    return resultado
+
+
+def main(argv: Optional[List[str]] = None):
+    """Mostra p50/p99 por etapa a partir dos arquivos de spans"""
+    import sys
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        arquivos = [Path(a) for a in argv]
+    else:
+        arquivos = sorted(ExportadorOTLPArquivo().traces_dir.glob("*_spans.jsonl"))
+
+    if not arquivos:
+        print("Nenhum arquivo de spans encontrado")
+        return
+
+    resultado = calcular_percentis(arquivos)
+    largura = max(len(etapa) for etapa in resultado) if resultado else 10
+    print(f"{'Etapa':<{largura}}  {'n':>7}  {'p50 (ms)':>10}  {'p99 (ms)':>10}")
+    for etapa, stats in sorted(resultado.items(), key=lambda item: -item[1]["p99"]):
+        print(f"{etapa:<{largura}}  {stats['n']:>7}  {stats['p50']:>10.2f}  {stats['p99']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+from typing import Dict, List, Optional, Set
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from .embeddings import abrir_colecao, get_embedding_service
+from .fswatch import Inotify, inotify_disponivel, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO, IN_Q_OVERFLOW, IN_IGNORED
+from .ingest import DIRETORIOS_IGNORADOS, dividir_codigo, dividir_markdown, dividir_linhas, listar_arquivos, tipo_arquivo
+from .lazy import Preguicoso
+from .metrics import CHROMA_LATENCIA
+from .search import DocumentIndex, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+# Arquivos maiores que isso costumam ser gerados (bundles, lockfiles)
+TAMANHO_MAXIMO = 512 * 1024
+# Janela para juntar eventos do mesmo arquivo (editores gravam em várias etapas)
+DEBOUNCE_SEGUNDOS = 0.2
+# Tokens por trecho: menor que na ingestão de documentos, para o trecho
+# apontar para uma função específica
+TAMANHO_TRECHO = 160
+SOBREPOSICAO_TRECHO = 20
+
+# Formato dos metadados dos trechos; arquivos gravados numa versão anterior são reindexados
+# (2: "projeto" é a raiz configurada do projeto, não a primeira pasta sob o workspace)
+VERSAO_METADADOS = 2
+# Onde o próprio bot está instalado (código, logs/, saídas dos benchmarks)
+RAIZ_BOT = Path(__file__).resolve().parent.parent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    tamanho INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    ids TEXT NOT NULL,
+    versao INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS projetos (
+    raiz TEXT PRIMARY KEY
+);
+"""
+
+
+def _trechos(texto: str, tipo: str) -> List[Dict]:
+    """Trechos de um arquivo com símbolo e linha inicial"""
+    if tipo == "codigo":
+        return [{"simbolo": s, "texto": t, "linha": l}
+                for s, t, l in dividir_codigo(texto, TAMANHO_TRECHO, SOBREPOSICAO_TRECHO)]
+    if tipo == "markdown":
+        return [{"simbolo": s, "texto": t, "linha": 0}
+                for s, t in dividir_markdown(texto, TAMANHO_TRECHO, SOBREPOSICAO_TRECHO)]
+    return [{"simbolo": "", "texto": t, "linha": 0}
+            for t in dividir_linhas(texto.splitlines(), TAMANHO_TRECHO, SOBREPOSICAO_TRECHO) if t.strip()]
+
+
+class WorkspaceIndexer:
+    """Mantém os arquivos dos projetos indexados na coleção "workspace".
+
+    O manifesto (SQLite) guarda mtime, tamanho, hash e ids dos trechos de
+    cada arquivo. Ao reindexar um arquivo só os trechos novos são
+    embeddados e os que sumiram são apagados; arquivos com mtime e tamanho
+    iguais ao manifesto nem são lidos. Mudanças chegam pelos agentes
+    (`agendar`) e pelo observador inotify, e são processadas numa thread.
+    """
+
+    def __init__(self, workspace: str = "/root/projetos",
+                 data_dir: str = "/root/projetos/chat-ia-terminal/data"):
+        self.workspace = Path(workspace).resolve()
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        # Diretórios do próprio bot que não devem ser indexados: dados, código (com logs/ e
+        # as saídas dos benchmarks), a instalação em data_dir/.. e o repositório de backups
+        self.ignorados = {
+            self.data_dir.resolve(),
+            self.data_dir.resolve().parent,
+            RAIZ_BOT,
+            Path("logs").resolve(),
+            Path(os.getenv("BACKUP_DIR", "/root/projetos/chat-ia-terminal/backups")).resolve()
+        }
+        # Nunca o próprio workspace (ou algo acima dele), como um data_dir direto em /root/projetos
+        self.ignorados = {d for d in self.ignorados if d != self.workspace and d not in self.workspace.parents}
+
+        # ChromaDB aberto pela primeira indexação (já na thread) ou pela primeira consulta
+        self._chroma = Preguicoso(self._abrir_chroma, "índice do workspace (ChromaDB)")
+        self.lexical = DocumentIndex(self.data_dir / "workspace_fts.db")
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.data_dir / "workspace_manifest.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        colunas = [linha[1] for linha in self.conn.execute("PRAGMA table_info(arquivos)")]
+        if "versao" not in colunas:
+            self.conn.execute("ALTER TABLE arquivos ADD COLUMN versao INTEGER NOT NULL DEFAULT 1")
+            self.conn.commit()
+        # Raízes dos projetos criados pelo bot (podem estar fora do workspace)
+        self.projetos: Set[Path] = {Path(raiz) for (raiz,) in self.conn.execute("SELECT raiz FROM projetos")}
+
+        self._fila: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._observador: Optional[threading.Thread] = None
+        self._ativo = False
+
+    # --- ChromaDB ---
+
+    def _abrir_chroma(self) -> None:
+        import chromadb
+        self.client = chromadb.PersistentClient(path=str(self.data_dir / "chroma_db"))
+        self.embeddings = get_embedding_service(str(self.data_dir))
+        self._collection = abrir_colecao(self.client, "workspace", self.embeddings)
+
+    @property
+    def collection(self):
+        self._chroma.obter()
+        return self._collection
+
+    # --- Manifesto ---
+
+    def _manifesto(self, chave: str) -> Optional[Dict]:
+        with self._lock:
+            linha = self.conn.execute(
+                "SELECT mtime_ns, tamanho, hash, ids, versao FROM arquivos WHERE caminho = ?", (chave,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {"mtime_ns": linha[0], "tamanho": linha[1], "hash": linha[2], "ids": json.loads(linha[3]),
+                "versao": linha[4]}
+
+    def _gravar_manifesto(self, chave: str, stat: os.stat_result, hash_arquivo: str, ids: List[str]) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO arquivos (caminho, mtime_ns, tamanho, hash, ids, versao) VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, stat.st_mtime_ns, stat.st_size, hash_arquivo, json.dumps(ids), VERSAO_METADADOS)
+            )
+            self.conn.commit()
+
+    def _chave(self, caminho: Path) -> Optional[str]:
+        """Caminho relativo ao workspace (absoluto num projeto fora dele), ou None se não é indexado"""
+        try:
+            relativo = caminho.relative_to(self.workspace)
+            chave = str(relativo)
+        except ValueError:
+            raiz = self._raiz_registrada(caminho)
+            if raiz is None:
+                return None
+            relativo = caminho.relative_to(raiz)
+            chave = str(caminho)
+        if any(parte in DIRETORIOS_IGNORADOS or parte.startswith(".") for parte in relativo.parts[:-1]):
+            return None
+        if any(caminho == d or d in caminho.parents for d in self.ignorados):
+            return None
+        return chave
+
+    # --- Projetos ---
+
+    def _raiz_registrada(self, caminho: Path) -> Optional[Path]:
+        dentro = [raiz for raiz in self.projetos if caminho == raiz or raiz in caminho.parents]
+        return max(dentro, key=lambda raiz: len(raiz.parts)) if dentro else None
+
+    def registrar_projeto(self, raiz: str) -> None:
+        """Registra a raiz configurada de um projeto (caminho_base/nome) e agenda a indexação dele"""
+        raiz = Path(os.path.abspath(raiz))
+        if raiz not in self.projetos:
+            with self._lock:
+                self.conn.execute("INSERT OR IGNORE INTO projetos (raiz) VALUES (?)", (str(raiz),))
+                self.conn.commit()
+            self.projetos.add(raiz)
+        self.agendar(str(raiz))
+
+    def projeto_de(self, diretorio: str) -> str:
+        """Projeto de um diretório: a raiz registrada que o contém ou, sem registro, a primeira
+        pasta sob o workspace ("" fora dos dois)"""
+        diretorio = Path(os.path.abspath(diretorio))
+        raiz = self._raiz_registrada(diretorio)
+        if raiz is not None:
+            return str(raiz)
+        try:
+            partes = diretorio.relative_to(self.workspace).parts
+        except ValueError:
+            return ""
+        return str(self.workspace / partes[0]) if partes else ""
+
+    # --- Indexação ---
+
+    def reindexar_arquivo(self, caminho: str) -> Dict:
+        """Atualiza o índice de um arquivo (ou o remove se não existe mais)"""
+        caminho = Path(os.path.abspath(caminho))
+        chave = self._chave(caminho)
+        if chave is None:
+            return {"status": "ignorado"}
+
+        try:
+            stat = caminho.stat()
+        except FileNotFoundError:
+            return self.remover(str(caminho))
+
+        if caminho.is_dir():
+            return self.sincronizar(str(caminho))
+
+        tipo = tipo_arquivo(caminho)
+        if tipo is None or stat.st_size > TAMANHO_MAXIMO:
+            return self.remover(str(caminho))
+
+        anterior = self._manifesto(chave)
+        atual = anterior is not None and anterior["versao"] == VERSAO_METADADOS
+        if atual and anterior["mtime_ns"] == stat.st_mtime_ns and anterior["tamanho"] == stat.st_size:
+            return {"status": "inalterado"}
+
+        try:
+            dados = caminho.read_bytes()
+            texto = dados.decode("utf-8")
+        except (UnicodeDecodeError, OSError):
+            return self.remover(str(caminho))
+
+        hash_arquivo = hashlib.sha256(dados).hexdigest()
+        if atual and anterior["hash"] == hash_arquivo:
+            # Só o mtime mudou (touch, checkout)
+            self._gravar_manifesto(chave, stat, hash_arquivo, anterior["ids"])
+            return {"status": "inalterado"}
+
+        projeto = self.projeto_de(str(caminho.parent))
+        trechos = {}
+        for trecho in _trechos(texto, tipo):
+            # O id depende do caminho e do conteúdo: trechos iguais ao da
+            # versão anterior mantêm o id e não são reembeddados
+            doc_id = hashlib.sha256(f"{chave}\0{trecho['texto']}".encode("utf-8")).hexdigest()[:32]
+            trechos[doc_id] = trecho
+
+        ids_anteriores = set(anterior["ids"]) if anterior else set()
+        # Metadados de outra versão: todos os trechos são regravados
+        novos = [i for i in trechos if i not in ids_anteriores or not atual]
+        removidos = ids_anteriores - set(trechos)
+
+        if novos:
+            documentos = [f"# {chave}\n{trechos[i]['texto']}" for i in novos]
+            metadados = [{
+                "caminho": chave,
+                "projeto": projeto,
+                "simbolo": trechos[i]["simbolo"],
+                "linha": trechos[i]["linha"],
+                "tipo": tipo
+            } for i in novos]
+            with CHROMA_LATENCIA.tempo(colecao="workspace", operacao="upsert"):
+                self.collection.upsert(ids=novos, documents=documentos, metadatas=metadados)
+            self.lexical.upsert_many(zip(novos, documentos, metadados))
+        if removidos:
+            with CHROMA_LATENCIA.tempo(colecao="workspace", operacao="delete"):
+                self.collection.delete(ids=list(removidos))
+            self.lexical.delete(removidos)
+
+        self._gravar_manifesto(chave, stat, hash_arquivo, list(trechos))
+        return {"status": "atualizado", "novos": len(novos), "removidos": len(removidos)}
+
+    def remover(self, caminho: str) -> Dict:
+        """Remove do índice um arquivo ou todos os arquivos sob um diretório"""
+        chave = self._chave(Path(os.path.abspath(caminho)))
+        if chave is None:
+            return {"status": "ignorado"}
+        return self._remover_chave(chave)
+
+    def _remover_chave(self, chave: str) -> Dict:
+        with self._lock:
+            linhas = self.conn.execute(
+                "SELECT caminho, ids FROM arquivos WHERE caminho = ? OR caminho LIKE ? ESCAPE '\\'",
+                (chave, chave.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "/%")
+            ).fetchall()
+        if not linhas:
+            return {"status": "inalterado"}
+
+        ids = [i for _, ids_json in linhas for i in json.loads(ids_json)]
+        if ids:
+            with CHROMA_LATENCIA.tempo(colecao="workspace", operacao="delete"):
+                self.collection.delete(ids=ids)
+            self.lexical.delete(ids)
+        with self._lock:
+            self.conn.executemany("DELETE FROM arquivos WHERE caminho = ?", ((c,) for c, _ in linhas))
+            self.conn.commit()
+        return {"status": "removido", "arquivos": len(linhas), "removidos": len(ids)}
+
+    def sincronizar(self, raiz: Optional[str] = None) -> Dict:
+        """Varre o workspace (ou um subdiretório) e reconcilia com o manifesto"""
+        raiz = Path(os.path.abspath(raiz)) if raiz else self.workspace
+        inicio = time.perf_counter()
+        vistos: Set[str] = set()
+        atualizados = 0
+
+        # A varredura completa inclui os projetos registrados fora do workspace
+        raizes = [raiz]
+        if raiz == self.workspace:
+            raizes += [p for p in self.projetos if self.workspace not in p.parents and p.is_dir()]
+        for caminho in (c for r in raizes for c in listar_arquivos(r)):
+            chave = self._chave(caminho)
+            if chave is None:
+                continue
+            vistos.add(chave)
+            if self.reindexar_arquivo(str(caminho))["status"] == "atualizado":
+                atualizados += 1
+
+        # Arquivos do manifesto que não existem mais
+        prefixo = self._chave(raiz) if raiz != self.workspace else ""
+        with self._lock:
+            registrados = [c for (c,) in self.conn.execute("SELECT caminho FROM arquivos")]
+        removidos = 0
+        for chave in registrados:
+            if chave in vistos or (prefixo and not chave.startswith(prefixo + "/")):
+                continue
+            # Pela chave: arquivos que passaram a ser ignorados também saem do índice
+            self._remover_chave(chave)
+            removidos += 1
+
+        resumo = {"status": "sincronizado", "arquivos": len(vistos), "atualizados": atualizados,
+                  "removidos": removidos, "segundos": round(time.perf_counter() - inicio, 3)}
+        logger.info(f"Workspace {raiz} sincronizado: {resumo}")
+        return resumo
+
+    # --- Processamento em background ---
+
+    def agendar(self, caminho: str) -> None:
+        """Pede a reindexação de um caminho sem bloquear quem chamou (agentes)"""
+        self._fila.put(os.path.abspath(caminho))
+
+    def _processar_fila(self) -> None:
+        while self._ativo:
+            caminho = self._fila.get()
+            if caminho is None:
+                break
+            # Junta os eventos que chegarem logo em seguida
+            pendentes = {caminho}
+            limite = time.monotonic() + DEBOUNCE_SEGUNDOS
+            while True:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    proximo = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if proximo is None:
+                    self._ativo = False
+                    break
+                pendentes.add(proximo)
+
+            for pendente in sorted(pendentes):
+                try:
+                    inicio = time.perf_counter()
+                    resultado = self.reindexar_arquivo(pendente)
+                    if resultado["status"] != "inalterado" and resultado["status"] != "ignorado":
+                        logger.info(f"Workspace: {pendente} {resultado} em "
+                                    f"{(time.perf_counter() - inicio) * 1000:.1f} ms")
+                except Exception as e:
+                    logger.error(f"Erro ao reindexar {pendente}: {e}")
+
+    def _observar(self) -> None:
+        """Observa o workspace com inotify e agenda os caminhos alterados"""
+        mascara = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+        with Inotify() as inotify:
+            diretorios: Dict[int, Path] = {}
+
+            def observar_arvore(raiz: Path):
+                for atual, dirs, _ in os.walk(raiz):
+                    dirs[:] = [d for d in dirs if d not in DIRETORIOS_IGNORADOS and not d.startswith(".")
+                               and Path(atual, d).resolve() not in self.ignorados]
+                    try:
+                        diretorios[inotify.adicionar(atual, mascara)] = Path(atual)
+                    except OSError as e:
+                        logger.warning(f"Não foi possível observar {atual}: {e}")
+
+            observar_arvore(self.workspace)
+            for raiz in list(self.projetos):
+                if raiz != self.workspace and self.workspace not in raiz.parents and raiz.is_dir():
+                    observar_arvore(raiz)
+            while self._ativo:
+                for evento in inotify.ler(timeout=1.0):
+                    if evento.mascara & IN_Q_OVERFLOW:
+                        self.agendar(str(self.workspace))
+                        continue
+                    if evento.mascara & IN_IGNORED:
+                        diretorios.pop(evento.wd, None)
+                        continue
+                    base = diretorios.get(evento.wd)
+                    if base is None or not evento.nome:
+                        continue
+                    caminho = base / evento.nome
+                    if evento.is_dir and evento.mascara & (IN_CREATE | IN_MOVED_TO):
+                        observar_arvore(caminho)
+                    self.agendar(str(caminho))
+
+    def iniciar(self, observar: bool = True, sincronizar: bool = True) -> None:
+        """Inicia a thread de indexação (com varredura inicial) e o observador"""
+        if self._ativo:
+            return
+        self._ativo = True
+        if sincronizar:
+            self.agendar(str(self.workspace))
+        self._thread = threading.Thread(target=self._processar_fila, daemon=True, name="workspace-index")
+        self._thread.start()
+        if observar and inotify_disponivel():
+            self._observador = threading.Thread(target=self._observar, daemon=True, name="workspace-watch")
+            self._observador.start()
+
+    def parar(self) -> None:
+        self._ativo = False
+        self._fila.put(None)
+
+    # --- Consulta ---
+
+    def buscar(self, query: str, n_results: int = 5, projeto: Optional[str] = None) -> List[Dict]:
+        """Busca híbrida (vetorial + BM25, fundidas por RRF) nos arquivos do workspace.
+
+        `projeto` é a raiz do projeto (ver projeto_de) para restringir a busca a ele.
+        """
+        where = {"projeto": projeto} if projeto else None
+        candidatos = max(n_results * 4, 20)
+
+        vetorial = []
+        total = self.collection.count()
+        if total:
+            with CHROMA_LATENCIA.tempo(colecao="workspace", operacao="query"):
+                resultado = self.collection.query(query_texts=[query], n_results=min(candidatos, total), where=where)
+            vetorial = [{"id": i, "text": d, "metadata": m}
+                        for i, d, m in zip(resultado["ids"][0], resultado["documents"][0], resultado["metadatas"][0])]
+        lexical = self.lexical.search(query, candidatos, where)
+
+        documentos = {r["id"]: r for r in vetorial + lexical}
+        fundidos = reciprocal_rank_fusion([[r["id"] for r in vetorial], [r["id"] for r in lexical]])
+        return [dict(documentos[doc_id], score=score) for doc_id, score in fundidos[:n_results]]
+
+    def contexto(self, query: str, diretorio: Optional[str] = None, n_results: int = 3) -> str:
+        """Trechos relevantes (do projeto que contém `diretorio`, se houver) para o prompt do ConversaAgent"""
+        partes = []
+        for r in self.buscar(query, n_results, self.projeto_de(diretorio) if diretorio else None):
+            meta = r["metadata"]
+            local = f"{meta['caminho']}:{meta['linha']}" if meta.get("linha") else meta["caminho"]
+            partes.append(f"[{local}]\n{r['text']}")
+        return "\n\n".join(partes)
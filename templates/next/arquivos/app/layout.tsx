@@ -0,0 +1,11 @@
+export const metadata = {
+  title: '{{ titulo }}',
+};
+
+export default function RootLayout({ children }: { children: React.ReactNode }) {
+  return (
+    <html lang="pt-BR">
+      <body>{children}</body>
+    </html>
+  );
+}
@@ -0,0 +1,7 @@
+export default function Home() {
+  return (
+    <main className="container mx-auto p-4">
+      <h1 className="text-2xl font-bold mb-4">{{ titulo }}</h1>
+    </main>
+  );
+}
@@ -0,0 +1,11 @@
+import React from 'react';
+
+const {{ nome_pagina|pascal }}: React.FC = () => {
+  return (
+    <div className="container mx-auto p-4">
+      <h1 className="text-2xl font-bold mb-4">{{ nome_pagina }}</h1>
+    </div>
+  );
+};
+
+export default {{ nome_pagina|pascal }};
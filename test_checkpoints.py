@@ -0,0 +1,78 @@
+"""Regressão dos ids de checkpoint: um id repetido virava a base de si mesmo
+na cadeia de deltas e a restauração nunca terminava.
+
+    python test_checkpoints.py        (ou: python -m pytest test_checkpoints.py)
+"""
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from src.checkpoints import CheckpointStore
+
+
+def estado(n: int):
+    return {"description": f"v{n}", "messages": [{"role": "user", "content": f"mensagem {i}"} for i in range(n)]}
+
+
+def carregar_com_limite(store: CheckpointStore, checkpoint_id: str, segundos: float = 5.0):
+    """carregar() numa thread: se a cadeia tiver um ciclo, falha em vez de travar o teste"""
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.update(estado=store.carregar(checkpoint_id)), daemon=True)
+    thread.start()
+    thread.join(segundos)
+    assert not thread.is_alive(), f"carregar({checkpoint_id!r}) não terminou"
+    return resultado["estado"]
+
+
+def test_id_repetido_recusado():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(Path(tmp))
+        store.salvar(estado(20), checkpoint_id="fixo")
+        try:
+            store.salvar(estado(21), checkpoint_id="fixo")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("salvar() aceitou um checkpoint_id que já existe")
+        assert carregar_com_limite(store, "fixo") == estado(20)
+        assert [c["id"] for c in store.listar()] == ["fixo"]
+
+
+def test_ids_gerados_unicos():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(Path(tmp))
+        ids = [store.salvar(estado(n)) for n in range(50)]
+        assert len(set(ids)) == len(ids)
+        for n, checkpoint_id in enumerate(ids):
+            assert carregar_com_limite(store, checkpoint_id) == estado(n)
+
+
+def test_manifesto_com_id_repetido():
+    """Manifestos gravados antes da correção: vale a primeira entrada do id"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CheckpointStore(Path(tmp))
+        store.salvar(estado(20), checkpoint_id="a")
+        store.salvar(estado(21), checkpoint_id="b")
+        linhas = store.manifesto.read_text(encoding="utf-8").splitlines()
+        repetida = dict(json.loads(linhas[-1]), base="b", profundidade=1)
+        with open(store.manifesto, "a", encoding="utf-8") as f:
+            f.write(json.dumps(repetida) + "\n")
+
+        reaberto = CheckpointStore(Path(tmp))
+        assert carregar_com_limite(reaberto, "b") == estado(21)
+        assert [c["id"] for c in reaberto.listar()] == ["a", "b"]
+
+
+if __name__ == "__main__":
+    falhas = 0
+    for nome, teste in list(globals().items()):
+        if nome.startswith("test_"):
+            try:
+                teste()
+                print(f"{nome}: ✅")
+            except AssertionError as e:
+                print(f"❌ {nome}: {e}")
+                falhas += 1
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,96 @@
+"""Regressão das permissões dos comandos de arquivo: /rm, /mv e /cp só para os
+chats de EXEC_CHATS_AUTORIZADOS, e /cd e as operações de arquivo presos ao
+workspace e às raízes dos projetos.
+
+    python test_permissoes.py        (ou: python -m pytest test_permissoes.py)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+AUTORIZADO, INTRUSO = 42, 7
+os.environ["EXEC_CHATS_AUTORIZADOS"] = str(AUTORIZADO)
+
+from src.agents.comando_agent import ComandoAgent
+from src.agents.estados.estado_projeto import EstadosProjeto
+from src.agents.estados.streaming_state import StreamingState
+from src.agents.file_agent import FileAgent
+from src.agents.orquestrador_agent import OrquestradorAgent
+from src.executor import Executor
+
+
+def orquestrador(workspace: Path, dados: Path) -> OrquestradorAgent:
+    """Só as partes usadas pelos comandos de arquivo (sem LLM, ChromaDB ou observadores)"""
+    orq = OrquestradorAgent.__new__(OrquestradorAgent)
+    orq.workspace_index = SimpleNamespace(workspace=workspace, projetos=set())
+    orq.path_index = None
+    orq.executor = Executor()
+    orq.estados = EstadosProjeto(data_dir=str(dados))
+    orq.streaming = StreamingState()
+    orq.comando = ComandoAgent(None, orq.estados)
+    orq.file = FileAgent()
+    return orq
+
+
+def comando(orq: OrquestradorAgent, mensagem: str, chat_id: int):
+    orq.streaming.iniciar_fluxo(chat_id, mensagem)
+    return asyncio.run(orq.processar_comando(mensagem, chat_id=chat_id))
+
+
+def test_chat_nao_autorizado_nao_remove():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(tmp) / "projetos"
+        (workspace / "app" / "src").mkdir(parents=True)
+        orq = orquestrador(workspace, Path(tmp) / "dados")
+        orq.estados.obter(INTRUSO).atualizar(diretorio_atual=str(workspace / "app"))
+
+        for mensagem in ("/rm -r src", "/mv src lib", "/cp src lib"):
+            resultado = comando(orq, mensagem, INTRUSO)
+            assert resultado["tipo"] == "erro" and "⛔" in resultado["resposta"], resultado
+        assert (workspace / "app" / "src").is_dir()
+
+
+def test_cd_fora_das_raizes():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(tmp) / "projetos"
+        (workspace / "app").mkdir(parents=True)
+        orq = orquestrador(workspace, Path(tmp) / "dados")
+        orq.estados.obter(AUTORIZADO).atualizar(diretorio_atual=str(workspace / "app"))
+
+        for destino in ("/", "../..", tmp):
+            resultado = comando(orq, f"/cd {destino}", AUTORIZADO)
+            assert resultado["tipo"] == "erro" and "⛔" in resultado["resposta"], resultado
+        assert orq.estados.obter(AUTORIZADO).get_diretorio_atual() == str(workspace / "app")
+
+        # Um diretório salvo fora das raízes não serve de base para as operações
+        orq.estados.obter(AUTORIZADO).atualizar(diretorio_atual="/")
+        resultado = comando(orq, "/rm -r etc", AUTORIZADO)
+        assert resultado["tipo"] == "erro" and "⛔" in resultado["resposta"], resultado
+
+
+def test_chat_autorizado_remove_no_workspace():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(tmp) / "projetos"
+        (workspace / "app" / "src").mkdir(parents=True)
+        orq = orquestrador(workspace, Path(tmp) / "dados")
+        orq.estados.obter(AUTORIZADO).atualizar(diretorio_atual=str(workspace / "app"))
+
+        resultado = comando(orq, "/rm -r src", AUTORIZADO)
+        assert resultado["tipo"] == "sucesso", resultado
+        assert not (workspace / "app" / "src").exists()
+
+
+if __name__ == "__main__":
+    falhas = 0
+    for nome, teste in list(globals().items()):
+        if nome.startswith("test_"):
+            try:
+                teste()
+                print(f"{nome}: ✅")
+            except AssertionError as e:
+                print(f"❌ {nome}: {e}")
+                falhas += 1
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,72 @@
+"""Regressão da quebra de linhas do box: nenhum pedaço pode passar de
+`max_width` colunas, senão a borda direita do box sai do lugar.
+
+    python test_render.py        (ou: python -m pytest test_render.py)
+"""
+import random
+import sys
+
+from src.render import BoxStreamer, string_width, strip_ansi, wrap_line
+
+# Resto depois do último espaço seguido de um caractere largo
+CASOS = [
+    (" a中a a", 2),
+    ("\x1b[0m 中😀a", 3),
+    ("ab 中中", 3),
+    ("a b😀😀 c", 3),
+]
+
+
+def verificar(linha: str, max_width: int):
+    for pedaco, largura in wrap_line(linha, max_width):
+        assert largura == string_width(pedaco), (linha, max_width, pedaco)
+        assert largura <= max_width, f"{linha!r} em {max_width} colunas: {pedaco!r} tem {largura}"
+
+
+def test_casos_conhecidos():
+    for linha, max_width in CASOS:
+        verificar(linha, max_width)
+
+
+def test_aleatorio():
+    gerador = random.Random(31)
+    alfabeto = [" ", "a", "b", "中", "😀", "\x1b[0m", "́"]
+    for _ in range(20000):
+        linha = "".join(gerador.choice(alfabeto) for _ in range(gerador.randint(0, 16)))
+        verificar(linha, gerador.randint(2, 6))
+
+
+def test_box_streamer():
+    class Saida:
+        def __init__(self):
+            self.texto = ""
+
+        def write(self, texto):
+            self.texto += texto
+
+        def flush(self):
+            pass
+
+    for linha, _ in CASOS:
+        saida = Saida()
+        box = BoxStreamer(width=7, stream=saida)
+        for char in linha:
+            box.escrever(char)
+        box.fechar()
+        # Cada linha (a última versão depois dos \r) tem a largura do box
+        for desenhada in saida.texto.split("\n"):
+            if desenhada:
+                assert string_width(strip_ansi(desenhada.split("\r")[-1])) == 7, repr(desenhada)
+
+
+if __name__ == "__main__":
+    falhas = 0
+    for nome, teste in list(globals().items()):
+        if nome.startswith("test_"):
+            try:
+                teste()
+                print(f"{nome}: ✅")
+            except AssertionError as e:
+                print(f"❌ {nome}: {e}")
+                falhas += 1
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,55 @@
+"""Regressão do tempo de partida: cada ponto de entrada precisa importar
+dentro do orçamento e sem carregar as dependências pesadas (ChromaDB,
+modelos, SDKs de LLM), que ficam para o primeiro uso.
+
+    python test_startup.py        (ou: python -m pytest test_startup.py)
+    STARTUP_ORCAMENTO=0.5 python test_startup.py
+"""
+import sys
+
+from src.startup import ENTRADAS, ORCAMENTO_PADRAO, medir, pesados_carregados
+
+
+def verificar(entrada: str):
+    medicao = medir(ENTRADAS[entrada])
+    if medicao["erro"]:
+        # Sem python-telegram-bot, prompt_toolkit etc. não há o que medir
+        try:
+            import pytest
+            pytest.skip(f"{entrada}: {medicao['erro']}")
+        except ImportError:
+            print(f"{entrada}: ignorado ({medicao['erro']})")
+            return
+    pesados = pesados_carregados(medicao["importacoes"])
+    assert not pesados, f"{entrada} carrega na partida: {', '.join(pesados)}"
+    assert medicao["segundos"] <= ORCAMENTO_PADRAO, (
+        f"{entrada} levou {medicao['segundos'] * 1000:.0f} ms (orçamento {ORCAMENTO_PADRAO * 1000:.0f} ms)"
+    )
+    print(f"{entrada}: {medicao['segundos'] * 1000:.0f} ms ✅")
+
+
+def test_telegram():
+    verificar("telegram")
+
+
+def test_terminal():
+    verificar("terminal")
+
+
+def test_cli():
+    verificar("cli")
+
+
+def test_orquestrador():
+    verificar("orquestrador")
+
+
+if __name__ == "__main__":
+    falhas = 0
+    for entrada in ENTRADAS:
+        try:
+            verificar(entrada)
+        except AssertionError as e:
+            print(f"❌ {e}")
+            falhas += 1
+    sys.exit(1 if falhas else 0)